@@ -9,9 +9,14 @@ from alembic.config import Config
 from dotenv import load_dotenv
 from flask import Flask, render_template, request, send_from_directory, url_for, g, redirect
 from flask_login import current_user, login_required
+from werkzeug.local import LocalProxy
 from logtail import LogtailHandler
 
 from limits import init_limits
+from modules.assets.pipeline import FAVICON_MAX_AGE, init_assets
+from modules.common.metrics import init_metrics
+from modules.common.template_context import cached_urls, lazy, once
+from modules.common.query_stats import init_query_stats
 from models import University, db
 
 # Blueprints
@@ -27,12 +32,66 @@ from modules.skillmapper import bp as skillmapper_bp
 from modules.admin.routes import admin_bp
 from modules.dream.routes import dream_bp
 from modules.coach.routes import coach_bp
+from modules.ai_jobs.routes import ai_jobs_bp
 
 # 🔹 Central credits config (single source of truth)
 from modules.credits.config import FEATURE_COSTS, STARTING_BALANCES, SHOP_PACKAGES
 
 load_dotenv()
 
+# Static files: no tenant lookup, no admin-isolation check (both may hit the DB)
+STATIC_ENDPOINTS = frozenset({"static", "favicon"})
+
+# Pages whose output never depends on the host's tenant: skip the University
+# lookup in load_current_tenant (portfolio.view is cached; see
+# modules/portfolio/render.py).
+TENANT_FREE_ENDPOINTS = STATIC_ENDPOINTS | {"portfolio.view"}
+
+# feature_paths key -> endpoint (see inject_globals)
+STUDENT_NAV = {
+    "dashboard": "dashboard",
+    "profile": "settings.profile",  # single portal for both resume scan & manual edit
+    "resume": "settings.profile",
+    "portfolio": "portfolio.index",
+    "internships": "internships.index",
+    "referral": "referral.index",
+    "jobpack": "jobpack.index",
+    "skillmapper": "skillmapper.index",
+    "dream": "dream.index",
+    "coach": "coach.index",
+    "settings": "settings.index",
+    "billing": "billing.shop",
+    "login": "auth.login",
+    "logout": "auth.logout",
+    "signup": "auth.register",
+}
+ADMIN_NAV = {
+    "admin_dashboard": "admin.dashboard",
+    "admin_analytics": "admin.analytics",
+    "admin_strategy": "admin.strategy",
+    "admin_users": "admin.users",
+    "admin_deals": "admin.deals",
+    "admin_vouchers": "admin.vouchers",
+    "settings": "settings.index",
+    "logout": "auth.logout",
+}
+ADMIN_HIDDEN_STUDENT_KEYS = (
+    "dashboard",
+    "profile",
+    "resume",
+    "portfolio",
+    "internships",
+    "referral",
+    "jobpack",
+    "skillmapper",
+    "dream",
+    "coach",
+    "billing",
+)
+NAV_ENDPOINTS = tuple(
+    dict.fromkeys(["landing", *STUDENT_NAV.values(), *ADMIN_NAV.values()])
+)
+
 
 # -------------------- Jinja helpers --------------------
 def free_coins():
@@ -270,7 +329,10 @@ def create_app():
     db.init_app(app)
     login_manager.init_app(app)
     init_limits(app)
+    init_query_stats(app)  # per-request SQL counts / N+1 flags
+    init_metrics(app)  # /metrics + request latency histograms
     init_oauth(app)  # NEW: Google OAuth
+    init_assets(app)  # fingerprinted + precompressed static files (static/dist)
 
     # -------------------- Tenant resolution (IMPORTANT) --------------------
     @app.before_request
@@ -285,6 +347,8 @@ def create_app():
                   or domain == "<slug>.<tld>"
         """
         g.current_tenant = None
+        if request.endpoint in TENANT_FREE_ENDPOINTS:
+            return
         host = (request.host or "").split(":")[0]
         if not host:
             return
@@ -323,6 +387,9 @@ def create_app():
         - super/ultra admins should only use /admin/* + /auth/* + /settings/* + static.
           Any other route -> redirect to admin.dashboard.
         """
+        # before current_user: loading the user is a DB query
+        if request.endpoint in STATIC_ENDPOINTS:
+            return None
         try:
             if not getattr(current_user, "is_authenticated", False):
                 return None
@@ -370,6 +437,7 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(dream_bp, url_prefix="/dream")
     app.register_blueprint(coach_bp, url_prefix="/coach")
+    app.register_blueprint(ai_jobs_bp, url_prefix="/ai-jobs")
 
     # Expose helper callables (legacy support)
     register_template_globals(app)
@@ -413,7 +481,10 @@ def create_app():
     @app.route("/favicon.ico")
     def favicon():
         return send_from_directory(
-            app.static_folder, "favicon.ico", mimetype="image/vnd.microsoft.icon"
+            app.static_folder,
+            "favicon.ico",
+            mimetype="image/vnd.microsoft.icon",
+            max_age=FAVICON_MAX_AGE,
         )
 
     # -------------------- Context for all templates --------------------
@@ -422,117 +493,83 @@ def create_app():
         """
         Safe globals for all templates.
         Uses g.current_tenant set in load_current_tenant().
+
+        Values are lazy (modules/common/template_context.py): each is
+        computed the first time a template uses it, nav URLs once per app.
         """
-        tenant = getattr(g, "current_tenant", None)
-
-        # Fallback: if host-based tenant is missing but user is university-scoped, attach their university
-        if tenant is None and getattr(current_user, "is_authenticated", False):
-            uni_id = getattr(current_user, "university_id", None)
-            if uni_id:
-                try:
-                    tenant = University.query.get(int(uni_id))
-                except Exception:
-                    try:
-                        db.session.rollback()
-                    except Exception:
-                        pass
-                    tenant = None
+        is_authed = once(lambda: bool(getattr(current_user, "is_authenticated", False)))
 
-        tenant_name = tenant.name if tenant else None
+        def _tenant():
+            tenant = getattr(g, "current_tenant", None)
 
-        # Decide nav mode
-        is_authed = bool(getattr(current_user, "is_authenticated", False))
-        is_university_admin = is_authed and _is_university_admin_user(current_user) and not _is_global_admin_user(current_user)
-        is_super_admin = is_authed and _is_global_admin_user(current_user)
-        is_admin = is_authed and _is_any_admin_user(current_user)
+            # Fallback: if host-based tenant is missing but user is university-scoped, attach their university
+            if tenant is None and is_authed():
+                uni_id = getattr(current_user, "university_id", None)
+                if uni_id:
+                    try:
+                        tenant = db.session.get(University, int(uni_id))
+                    except Exception:
+                        try:
+                            db.session.rollback()
+                        except Exception:
+                            pass
+                        tenant = None
+            return tenant
+
+        tenant = once(_tenant)
+
+        # (is_admin, is_university_admin, is_super_admin)
+        @once
+        def roles():
+            if not is_authed():
+                return False, False, False
+            is_global = _is_global_admin_user(current_user)
+            return (
+                _is_any_admin_user(current_user),
+                _is_university_admin_user(current_user) and not is_global,
+                is_global,
+            )
+
+        def _feature_paths():
+            is_admin = roles()[0]
+            urls = cached_urls(NAV_ENDPOINTS)
+
+            # Decide what "home" should be
+            if is_authed():
+                home_url = urls[_admin_home_endpoint()] if is_admin else urls["dashboard"]
+            else:
+                home_url = urls["landing"]
 
-        nav_mode = "admin" if is_admin else "student"
-        nav_show_student_features = not is_admin
+            # Student feature paths (normal)
+            feature_paths = {key: urls[ep] for key, ep in STUDENT_NAV.items()}
+            feature_paths["home"] = home_url
 
-        # Decide what "home" should be
-        if is_authed:
+            # Keep legacy keys present so templates don’t crash; disable student ones for admin UI
             if is_admin:
-                home_url = _safe_url(_admin_home_endpoint())
-            else:
-                home_url = _safe_url("dashboard")
-        else:
-            home_url = _safe_url("landing")
-
-        # Single portal for both resume scan & manual edit
-        portal_url = _safe_url("settings.profile")
-
-        # Student feature paths (normal)
-        student_feature_paths = {
-            "home": home_url,
-            "dashboard": _safe_url("dashboard"),
-            "profile": portal_url,
-            "resume": portal_url,
-            "portfolio": _safe_url("portfolio.index"),
-            "internships": _safe_url("internships.index"),
-            "referral": _safe_url("referral.index"),
-            "jobpack": _safe_url("jobpack.index"),
-            "skillmapper": _safe_url("skillmapper.index"),
-            "dream": _safe_url("dream.index"),
-            "coach": _safe_url("coach.index"),
-            "settings": _safe_url("settings.index"),
-            "billing": _safe_url("billing.shop"),
-            "login": _safe_url("auth.login"),
-            "logout": _safe_url("auth.logout"),
-            "signup": _safe_url("auth.register"),
-        }
-
-        # Admin feature paths (admin-only)
-        admin_feature_paths = {
-            "home": home_url,
-            "admin_home": _safe_url(_admin_home_endpoint()),
-            "admin_dashboard": _safe_url("admin.dashboard"),
-            "admin_analytics": _safe_url("admin.analytics"),
-            "admin_strategy": _safe_url("admin.strategy"),
-            "admin_users": _safe_url("admin.users"),
-            "admin_deals": _safe_url("admin.deals"),
-            "admin_vouchers": _safe_url("admin.vouchers"),
-            "settings": _safe_url("settings.index"),
-            "logout": _safe_url("auth.logout"),
-        }
-
-        # Keep legacy keys present so templates don’t crash; disable student ones for admin UI
-        feature_paths = dict(student_feature_paths)
-        if is_admin:
-            for k in [
-                "dashboard",
-                "profile",
-                "resume",
-                "portfolio",
-                "internships",
-                "referral",
-                "jobpack",
-                "skillmapper",
-                "dream",
-                "coach",
-                "billing",
-            ]:
-                feature_paths[k] = "#"
-            feature_paths.update(admin_feature_paths)
-
-        # Admin flag for navbar: robust
-        nav_is_admin = bool(is_admin)
+                for k in ADMIN_HIDDEN_STUDENT_KEYS:
+                    feature_paths[k] = "#"
+                feature_paths.update({key: urls[ep] for key, ep in ADMIN_NAV.items()})
+                feature_paths["admin_home"] = urls[_admin_home_endpoint()]
+                feature_paths["home"] = home_url
+            return feature_paths
 
         return dict(
             now=datetime.utcnow(),
-            tenant=tenant,
-            tenant_name=tenant_name,
-            user_free=free_coins(),
-            user_pro=pro_coins(),
-            subscription_status=(
-                getattr(current_user, "subscription_status", "free") if is_authed else "free"
+            tenant=LocalProxy(tenant),
+            tenant_name=lazy(lambda: tenant().name if tenant() else None),
+            user_free=lazy(free_coins),
+            user_pro=lazy(pro_coins),
+            subscription_status=lazy(
+                lambda: getattr(current_user, "subscription_status", "free") if is_authed() else "free"
             ),
-            feature_paths=feature_paths,
-            nav_is_admin=nav_is_admin,
+            feature_paths=lazy(_feature_paths),
+            # Admin flag for navbar: robust
+            nav_is_admin=lazy(lambda: bool(roles()[0])),
             # NEW: role-aware UI flags for templates
-            nav_mode=nav_mode,
-            nav_show_student_features=nav_show_student_features,
-            nav_is_university_admin=is_university_admin,
-            nav_is_super_admin=is_super_admin,
+            nav_mode=lazy(lambda: "admin" if roles()[0] else "student"),
+            nav_show_student_features=lazy(lambda: not roles()[0]),
+            nav_is_university_admin=lazy(lambda: bool(roles()[1])),
+            nav_is_super_admin=lazy(lambda: bool(roles()[2])),
         )
 
     @app.errorhandler(404)
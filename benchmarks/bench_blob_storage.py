@@ -0,0 +1,177 @@
+# benchmarks/bench_blob_storage.py
+"""
+Compressed blob storage (modules/common/blobcodec.py): size and read cost.
+
+Default mode runs on the recorded model outputs and needs no database. For
+each fixture it reports the raw and stored sizes under every available
+codec, plus the mean microseconds of the read path: parsing plain text
+compared with decoding the stored bytes first.
+
+--report connects through the app (DATABASE_URL) and shows how the
+columns behind models.CompressedText are stored today: rows, stored bytes,
+decoded bytes and the space saved. On Postgres it also prints
+pg_total_relation_size for each table, TOAST included.
+
+Usage (from the repo root):
+    OPENAI_API_KEY=x python -m benchmarks.bench_blob_storage [--iterations 2000]
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_blob_storage --report
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")  # module-level clients only
+
+from modules.common import blobcodec  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "recorded"
+
+# (table, column) stored through models.CompressedText
+BLOB_COLUMNS = [
+    ("dream_plan_snapshot", "plan_json"),
+    ("coach_saved_plan", "plan_json"),
+    ("jobpack_report", "jd_text"),
+]
+
+
+def _codecs() -> Dict[str, bytes]:
+    codecs = {"zlib": blobcodec.ZLIB}
+    if blobcodec._zstd is not None:
+        codecs["zstd"] = blobcodec.ZSTD
+    return codecs
+
+
+def _parse(text: str) -> Any:
+    # some recorded outputs are fenced / not pure JSON; the read is still timed
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _time(fn: Callable[[Any], Any], value: Any, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(value)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(iterations: int) -> List[Dict[str, Any]]:
+    rows = []
+    for path in sorted(FIXTURES.glob("*.json")):
+        text = json.loads(path.read_text(encoding="utf-8")).get("content") or ""
+        raw_bytes = len(text.encode("utf-8"))
+        plain_us = _time(_parse, text, iterations)
+        for name, codec in _codecs().items():
+            stored = blobcodec.encode(text, codec=codec)
+            assert blobcodec.decode(stored) == text, f"{path.stem}: {name} round-trip mismatch"
+            read_us = _time(lambda v: _parse(blobcodec.decode(v)), stored, iterations)
+            rows.append(
+                {
+                    "fixture": path.stem,
+                    "codec": name,
+                    "raw_bytes": raw_bytes,
+                    "stored_bytes": len(stored),
+                    "ratio": round(raw_bytes / len(stored), 2) if stored else 0.0,
+                    "plain_read_us": round(plain_us, 1),
+                    "decoded_read_us": round(read_us, 1),
+                }
+            )
+    return rows
+
+
+def report() -> List[Dict[str, Any]]:
+    from sqlalchemy import inspect, text
+
+    from app import create_app
+    from models import db
+
+    rows = []
+    app = create_app()
+    with app.app_context():
+        bind = db.session.get_bind()
+        tables = inspect(bind).get_table_names()
+        for table, column in BLOB_COLUMNS:
+            if table not in tables:
+                continue
+            n = stored = decoded = encoded = 0
+            last_id = 0
+            while True:
+                batch = db.session.execute(
+                    text(f"SELECT id, {column} FROM {table} WHERE id > :last ORDER BY id LIMIT 500"),
+                    {"last": last_id},
+                ).fetchall()
+                if not batch:
+                    break
+                for rid, value in batch:
+                    last_id = rid
+                    if value is None:
+                        continue
+                    n += 1
+                    stored += len(value) if not isinstance(value, str) else len(value.encode("utf-8"))
+                    decoded += len(blobcodec.decode(value).encode("utf-8"))
+                    encoded += blobcodec.is_encoded(value)
+            row = {
+                "table": table,
+                "column": column,
+                "rows": n,
+                "encoded_rows": encoded,
+                "stored_bytes": stored,
+                "raw_bytes": decoded,
+                "saved_pct": round(100.0 * (1 - stored / decoded), 1) if decoded else 0.0,
+            }
+            if bind.dialect.name == "postgresql":
+                row["pg_total_relation_size"] = db.session.execute(
+                    text("SELECT pg_total_relation_size(:t)"), {"t": table}
+                ).scalar()
+            rows.append(row)
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=2000)
+    ap.add_argument("--report", action="store_true", help="measure the configured database instead")
+    ap.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = ap.parse_args(argv)
+
+    if args.report:
+        rows = report()
+        if args.json:
+            print(json.dumps(rows, indent=2))
+            return 0
+        print(f"{'table.column':<32}{'rows':>8}{'encoded':>9}{'stored B':>12}{'raw B':>12}{'saved':>8}")
+        for r in rows:
+            print(
+                f"{r['table'] + '.' + r['column']:<32}{r['rows']:>8}{r['encoded_rows']:>9}"
+                f"{r['stored_bytes']:>12}{r['raw_bytes']:>12}{r['saved_pct']:>7}%"
+                + (f"  (table {r['pg_total_relation_size']} B)" if "pg_total_relation_size" in r else "")
+            )
+        return 0
+
+    rows = run(max(1, args.iterations))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'fixture':<24}{'codec':>6}{'raw B':>9}{'stored B':>10}{'ratio':>7}{'plain µs':>10}{'decoded µs':>12}")
+        for r in rows:
+            print(
+                f"{r['fixture']:<24}{r['codec']:>6}{r['raw_bytes']:>9}{r['stored_bytes']:>10}"
+                f"{r['ratio']:>7}{r['plain_read_us']:>10}{r['decoded_read_us']:>12}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
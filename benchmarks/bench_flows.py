@@ -0,0 +1,574 @@
+# benchmarks/bench_flows.py
+"""
+End-to-end flow benchmark: Flask app + RQ workers + LLM stand-in.
+
+Drives the real routes with Flask test clients, one per virtual user, on
+--concurrency threads. Async flows (Job Pack, Dream, Skill Mapper,
+Internships) go through Redis and benchmarks/bench_worker.py processes,
+exactly as in production, and are polled via their status endpoints. LLM calls hit the recorded-response
+stand-in (benchmarks/llm_standin.py), never OpenAI.
+
+Flows
+    jobpack_free / jobpack_pro    POST /jobpack/ -> poll status -> GET report
+    skillmapper_free / _pro       POST /skillmapper/free|pro (JSON, 202)
+                                  -> poll status_url -> GET result
+    internship_free / _pro        POST /internships/analyse -> 302 /ai-jobs/<id>
+                                  -> poll /ai-jobs/<id>/status -> GET result
+    dream                         POST /dream/ -> poll status -> GET result
+    coach                         lock Dream plan -> POST /coach/start
+                                  -> GET /coach/ -> POST /coach/abort
+
+Coach has no LLM call on the request path (coach.tasks'
+process_coach_generation is not wired to any route), so it measures the
+DB-heavy session/task fan-out. Each coach user gets one untimed Dream run
+during setup.
+
+Reported per flow: runs, errors, throughput (runs/s over the whole
+benchmark), end-to-end p50/p95/p99, submit p50/p95 (first request only),
+HTTP requests and web-side SQL statements per run. Per worker task:
+jobs, SQL statements per job, mean job seconds.
+
+Needs Redis (REDIS_URL or --redis-url). The database defaults to a fresh
+SQLite file. For realistic numbers point --database-url at a scratch
+Postgres database; tables are created with create_all.
+
+    python -m benchmarks.bench_flows --runs 20 --concurrency 4 --workers 2
+    python -m benchmarks.bench_flows --flows jobpack_pro,dream --time-scale 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.llm_standin import add_latency_args, latency_from_args, start_standin  # noqa: E402
+
+log = logging.getLogger("bench_flows")
+
+INPUTS_PATH = Path(__file__).resolve().parent / "fixtures" / "flow_inputs.json"
+
+ALL_FLOWS = [
+    "jobpack_free",
+    "jobpack_pro",
+    "skillmapper_free",
+    "skillmapper_pro",
+    "internship_free",
+    "internship_pro",
+    "dream",
+    "coach",
+]
+
+
+# ---------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------
+
+_local = threading.local()
+
+
+def _install_query_counter() -> None:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, "counting", False):
+            _local.count = getattr(_local, "count", 0) + 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+@dataclass
+class FlowRun:
+    flow: str
+    ok: bool
+    seconds: float
+    submit_seconds: float
+    requests: int
+    queries: int
+    error: str = ""
+
+
+class FlowError(RuntimeError):
+    pass
+
+
+@dataclass
+class UserContext:
+    """One virtual user: a DB user, a logged-in test client and counters."""
+
+    user_id: int
+    client: Any
+    dream_snapshot_id: Optional[int] = None
+    requests: int = 0
+    submit_seconds: float = 0.0
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def call(self, method: str, url: str, **kwargs: Any):
+        started = time.perf_counter()
+        resp = self.client.open(url, method=method, **kwargs)
+        if self.requests == 0:
+            self.submit_seconds = time.perf_counter() - started
+        self.requests += 1
+        return resp
+
+
+# ---------------------------------------------------------------------
+# Flows
+# ---------------------------------------------------------------------
+
+
+class Flows:
+    def __init__(self, inputs: Dict[str, Any], *, poll_interval: float, timeout: float):
+        self.inputs = inputs
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def _poll(self, ctx: UserContext, url: str, done: Callable[[Dict[str, Any]], Optional[bool]]) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            resp = ctx.call("GET", url)
+            data = resp.get_json(silent=True) or {}
+            state = done(data)
+            if state is not None:
+                if not state:
+                    raise FlowError(f"job failed: {json.dumps(data)[:200]}")
+                return data
+            time.sleep(self.poll_interval)
+        raise FlowError(f"timed out polling {url}")
+
+    def jobpack(self, ctx: UserContext, pro: bool) -> None:
+        resp = ctx.call("POST", "/jobpack/", data={"mode": "pro" if pro else "basic", "jd": self.inputs["jd"]})
+        html = resp.get_data(as_text=True)
+        m = re.search(r"/jobpack/api/status/([\w-]+)", html)
+        r = re.search(r"/jobpack/report/(\d+)", html)
+        if resp.status_code != 200 or not m:
+            raise FlowError(f"jobpack submit: HTTP {resp.status_code} {resp.headers.get('Location', '')}")
+
+        def done(d):
+            status = d.get("status")
+            if status == "finished":
+                return bool((d.get("result") or {}).get("ok"))
+            if status in ("failed", "not_found", "error", "stopped", "canceled"):
+                return False
+            return None
+
+        self._poll(ctx, f"/jobpack/api/status/{m.group(1)}", done)
+        if r:
+            page = ctx.call("GET", f"/jobpack/report/{r.group(1)}")
+            if page.status_code != 200:
+                raise FlowError(f"jobpack report: HTTP {page.status_code}")
+
+    def _ai_job(self, ctx: UserContext, status_url: str, name: str) -> None:
+        """Poll a background AI job (modules/ai_jobs) to the end, then open its result page."""
+
+        def done(d):
+            status = d.get("status")
+            if status == "completed":
+                return True
+            if status in ("failed", "not_found", "error"):
+                return False
+            return None
+
+        data = self._poll(ctx, status_url, done)
+        page = ctx.call("GET", data.get("result_url") or "")
+        if page.status_code != 200:
+            raise FlowError(f"{name} result: HTTP {page.status_code}")
+
+    def skillmapper(self, ctx: UserContext, pro: bool) -> None:
+        body = {"free_text_skills": self.inputs["free_text_skills"], "target_domain": "Backend"}
+        resp = ctx.call("POST", f"/skillmapper/{'pro' if pro else 'free'}", json=body)
+        data = resp.get_json(silent=True) or {}
+        if resp.status_code != 202 or not data.get("status_url"):
+            raise FlowError(f"skillmapper: HTTP {resp.status_code} {data.get('error', '')}")
+        self._ai_job(ctx, data["status_url"], "skillmapper")
+
+    def internship(self, ctx: UserContext, pro: bool) -> None:
+        resp = ctx.call(
+            "POST", "/internships/analyse", data={"text": self.inputs["internship"], "mode": "pro" if pro else "free"}
+        )
+        location = resp.headers.get("Location", "")
+        m = re.search(r"/ai-jobs/(\d+)", location)
+        if resp.status_code != 302 or not m:
+            raise FlowError(f"internship: HTTP {resp.status_code} {location}")
+        self._ai_job(ctx, f"/ai-jobs/{m.group(1)}/status", "internship")
+
+    def dream(self, ctx: UserContext) -> None:
+        form = dict(self.inputs["dream"], path_type="job")
+        resp = ctx.call("POST", "/dream/", data=form)
+        m = re.search(r"/dream/processing/(\d+)", resp.headers.get("Location", ""))
+        if resp.status_code != 302 or not m:
+            raise FlowError(f"dream submit: HTTP {resp.status_code} {resp.headers.get('Location', '')}")
+        snapshot_id = int(m.group(1))
+
+        def done(d):
+            status = d.get("status")
+            if status == "completed":
+                return True
+            if status in ("failed", "not_found", "error"):
+                return False
+            return None
+
+        self._poll(ctx, f"/dream/api/status/{snapshot_id}", done)
+        page = ctx.call("GET", f"/dream/result/{snapshot_id}")
+        if page.status_code != 200:
+            raise FlowError(f"dream result: HTTP {page.status_code}")
+        ctx.dream_snapshot_id = snapshot_id
+
+    def coach(self, ctx: UserContext) -> None:
+        if not ctx.dream_snapshot_id:
+            raise FlowError("coach: no completed Dream plan for this user")
+        ctx.call("POST", f"/dream/lock-plan/{ctx.dream_snapshot_id}", data={"selected_projects": ["0"]})
+        resp = ctx.call("POST", "/coach/start", data={"path_type": "job"})
+        location = resp.headers.get("Location", "")
+        if resp.status_code != 302 or "/coach" not in location or "plans" in location:
+            raise FlowError(f"coach start: HTTP {resp.status_code} {location}")
+        page = ctx.call("GET", "/coach/?path_type=job")
+        if page.status_code != 200:
+            raise FlowError(f"coach index: HTTP {page.status_code}")
+        today = date.today()
+        cycle = f"user_{ctx.user_id}_path_job_month_{today.year}_{today.month:02d}"
+        ctx.call("POST", "/coach/abort", data={"path_type": "job", "month_cycle_id": cycle})
+
+    def run(self, name: str, ctx: UserContext) -> None:
+        if name.startswith("jobpack_"):
+            self.jobpack(ctx, name.endswith("_pro"))
+        elif name.startswith("skillmapper_"):
+            self.skillmapper(ctx, name.endswith("_pro"))
+        elif name.startswith("internship_"):
+            self.internship(ctx, name.endswith("_pro"))
+        elif name == "dream":
+            self.dream(ctx)
+        elif name == "coach":
+            self.coach(ctx)
+        else:
+            raise FlowError(f"unknown flow {name}")
+
+
+# ---------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------
+
+
+def _configure_env(args: argparse.Namespace, base_url: str) -> None:
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = os.getenv("BENCH_OPENAI_API_KEY", "standin")
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["REDIS_URL"] = args.redis_url
+    os.environ["AUTO_MIGRATE"] = "0"
+    os.environ["JOBPACK_ASYNC"] = "1"
+    os.environ["MOCK"] = "0"
+    os.environ.setdefault("FLASK_APP", "app:app")
+
+
+def _seed_users(flask_app, n: int, inputs: Dict[str, Any]) -> List[int]:
+    import hashlib
+
+    from models import ResumeAsset, User, UserProfile, db
+
+    tag = uuid.uuid4().hex[:8]
+    resume = inputs["resume"]
+    ids = []
+    with flask_app.app_context():
+        db.create_all()
+        for i in range(n):
+            u = User(
+                name=f"Bench User {i}",
+                email=f"bench-{tag}-{i}@bench.local",
+                verified=True,
+                email_verified=True,
+                subscription_status="pro",
+                coins_free=1_000_000,
+                coins_pro=1_000_000,
+            )
+            u.set_password(uuid.uuid4().hex)
+            db.session.add(u)
+            db.session.flush()
+            db.session.add(
+                UserProfile(
+                    user_id=u.id,
+                    full_name=u.name,
+                    headline="Final-year B.Tech CS student",
+                    location="Chennai, India",
+                    skills=[{"name": s, "level": 3} for s in ("Python", "SQL", "Flask", "Git", "Docker")],
+                    education=[{"school": "VelTech University", "degree": "B.Tech CS", "year": "2025"}],
+                    experience=[{"company": "FinSmart Labs", "role": "Backend Intern", "bullets": []}],
+                )
+            )
+            asset = ResumeAsset(
+                user_id=u.id,
+                filename="resume.pdf",
+                text=resume,
+                content_hash=hashlib.sha256(resume.encode("utf-8")).hexdigest(),
+            )
+            db.session.add(asset)
+            db.session.flush()
+            u.current_resume_id = asset.id
+            ids.append(u.id)
+        db.session.commit()
+    return ids
+
+
+def _login(flask_app, user_id: int):
+    client = flask_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    return client
+
+
+def _start_workers(args: argparse.Namespace) -> List[subprocess.Popen]:
+    cmd = [sys.executable, "-m", "benchmarks.bench_worker", "--redis-url", args.redis_url]
+    if args.no_fork:
+        cmd.append("--no-fork")
+    out = None if args.verbose else subprocess.DEVNULL
+    return [
+        subprocess.Popen(cmd, cwd=str(ROOT), env=dict(os.environ), stdout=out, stderr=out)
+        for _ in range(args.workers)
+    ]
+
+
+def _worker_stats(redis_url: str) -> Dict[str, Dict[str, float]]:
+    from redis import Redis
+
+    from benchmarks.bench_worker import JOBS_KEY, QUERIES_KEY, SECONDS_KEY
+
+    r = Redis.from_url(redis_url)
+    jobs = {k.decode(): int(v) for k, v in r.hgetall(JOBS_KEY).items()}
+    queries = {k.decode(): int(v) for k, v in r.hgetall(QUERIES_KEY).items()}
+    seconds = {k.decode(): float(v) for k, v in r.hgetall(SECONDS_KEY).items()}
+    return {
+        name: {
+            "jobs": n,
+            "queries_per_job": round(queries.get(name, 0) / n, 1) if n else 0.0,
+            "mean_job_s": round(seconds.get(name, 0.0) / n, 3) if n else 0.0,
+        }
+        for name, n in sorted(jobs.items())
+    }
+
+
+def _reset_worker_stats(redis_url: str) -> None:
+    from redis import Redis
+
+    from benchmarks.bench_worker import JOBS_KEY, QUERIES_KEY, SECONDS_KEY
+
+    Redis.from_url(redis_url).delete(JOBS_KEY, QUERIES_KEY, SECONDS_KEY)
+
+
+# ---------------------------------------------------------------------
+# Run + report
+# ---------------------------------------------------------------------
+
+
+def _execute(flows: Flows, name: str, pool: "queue.Queue[UserContext]") -> FlowRun:
+    ctx = pool.get()
+    ctx.requests = 0
+    ctx.submit_seconds = 0.0
+    _local.count = 0
+    _local.counting = True
+    started = time.perf_counter()
+    error = ""
+    try:
+        flows.run(name, ctx)
+    except Exception as e:  # one failed run must not stop the benchmark
+        error = f"{e.__class__.__name__}: {e}"
+    finally:
+        elapsed = time.perf_counter() - started
+        _local.counting = False
+        pool.put(ctx)
+    return FlowRun(name, not error, elapsed, ctx.submit_seconds, ctx.requests, _local.count, error)
+
+
+def summarize(runs: List[FlowRun], wall_s: float) -> List[Dict[str, Any]]:
+    rows = []
+    for name in ALL_FLOWS:
+        mine = [r for r in runs if r.flow == name]
+        if not mine:
+            continue
+        ok = [r for r in mine if r.ok]
+        lat = [r.seconds * 1000.0 for r in ok]
+        submit = [r.submit_seconds * 1000.0 for r in ok]
+        rows.append(
+            {
+                "flow": name,
+                "runs": len(mine),
+                "errors": len(mine) - len(ok),
+                "throughput_per_s": round(len(ok) / wall_s, 3) if wall_s else 0.0,
+                "p50_ms": round(percentile(lat, 50), 1),
+                "p95_ms": round(percentile(lat, 95), 1),
+                "p99_ms": round(percentile(lat, 99), 1),
+                "submit_p50_ms": round(percentile(submit, 50), 1),
+                "submit_p95_ms": round(percentile(submit, 95), 1),
+                "requests_per_run": round(sum(r.requests for r in ok) / len(ok), 1) if ok else 0.0,
+                "queries_per_run": round(sum(r.queries for r in ok) / len(ok), 1) if ok else 0.0,
+                "first_error": next((r.error for r in mine if r.error), ""),
+            }
+        )
+    return rows
+
+
+def _print_report(rows: List[Dict[str, Any]], workers: Dict[str, Dict[str, float]], standin: Dict[str, Any], wall_s: float) -> None:
+    print(f"\nwall time {wall_s:.1f}s")
+    head = f"{'flow':<18}{'runs':>5}{'err':>5}{'thru/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'submit p50':>11}{'req':>6}{'sql':>7}"
+    print(head)
+    print("-" * len(head))
+    for r in rows:
+        print(
+            f"{r['flow']:<18}{r['runs']:>5}{r['errors']:>5}{r['throughput_per_s']:>8}"
+            f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['submit_p50_ms']:>11}"
+            f"{r['requests_per_run']:>6}{r['queries_per_run']:>7}"
+        )
+    for r in rows:
+        if r["first_error"]:
+            print(f"  {r['flow']}: {r['first_error'][:160]}")
+    if workers:
+        print(f"\n{'worker task':<32}{'jobs':>6}{'sql/job':>9}{'mean s':>9}")
+        for name, w in workers.items():
+            print(f"{name:<32}{w['jobs']:>6}{w['queries_per_job']:>9}{w['mean_job_s']:>9}")
+    print("\nstand-in calls:", json.dumps(standin.get("calls", {}), sort_keys=True))
+    if standin.get("unmatched") or standin.get("errors"):
+        print("stand-in unmatched:", standin.get("unmatched"), "errors:", json.dumps(standin.get("errors", {})))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="End-to-end flow benchmark against the LLM stand-in")
+    ap.add_argument("--flows", default=",".join(ALL_FLOWS), help="comma-separated subset of: " + ", ".join(ALL_FLOWS))
+    ap.add_argument("--runs", type=int, default=10, help="runs per flow")
+    ap.add_argument("--concurrency", type=int, default=4, help="virtual users (threads)")
+    ap.add_argument("--workers", type=int, default=2, help="RQ worker processes to start (0 = use your own)")
+    ap.add_argument("--no-fork", action="store_true", help="workers run jobs in-process on a warm app")
+    ap.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    ap.add_argument("--database-url", default=None, help="default: fresh SQLite file in a temp dir")
+    ap.add_argument("--standin-url", default=None, help="use a running stand-in instead of starting one")
+    ap.add_argument("--poll-interval", type=float, default=0.25)
+    ap.add_argument("--timeout", type=float, default=180.0, help="per-flow polling timeout (s)")
+    ap.add_argument("--json", type=Path, default=None, help="also write results to this file")
+    ap.add_argument("--verbose", action="store_true")
+    add_latency_args(ap)
+    args = ap.parse_args(argv)
+
+    flow_names = [f.strip() for f in args.flows.split(",") if f.strip()]
+    unknown = sorted(set(flow_names) - set(ALL_FLOWS))
+    if unknown:
+        ap.error(f"unknown flows: {', '.join(unknown)}")
+    if not args.database_url:
+        args.database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="careerai-bench-"), "bench.db")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    server = None
+    if args.standin_url:
+        base_url = args.standin_url
+    else:
+        server = start_standin(
+            latency=latency_from_args(args),
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            cache_ttl_s=args.cache_ttl_s,
+            seed=args.seed,
+        )
+        base_url = server.base_url
+    _configure_env(args, base_url)
+
+    from redis import Redis
+
+    try:
+        Redis.from_url(args.redis_url).ping()
+    except Exception as e:
+        print(f"Redis is required ({args.redis_url}): {e}", file=sys.stderr)
+        return 2
+
+    from app import app as flask_app  # imports after env so create_app() sees it
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        flask_app.logger.setLevel(logging.WARNING)
+    _install_query_counter()
+
+    inputs = json.loads(INPUTS_PATH.read_text(encoding="utf-8"))
+    flows = Flows(inputs, poll_interval=args.poll_interval, timeout=args.timeout)
+    user_ids = _seed_users(flask_app, max(1, args.concurrency), inputs)
+
+    _reset_worker_stats(args.redis_url)
+    procs = _start_workers(args) if args.workers > 0 else []
+    try:
+        pool: "queue.Queue[UserContext]" = queue.Queue()
+        contexts = [UserContext(uid, _login(flask_app, uid)) for uid in user_ids]
+
+        if "coach" in flow_names:
+            for ctx in contexts:  # untimed: coach needs a completed Dream plan per user
+                flows.dream(ctx)
+                ctx.requests = 0
+        for ctx in contexts:
+            pool.put(ctx)
+
+        tasks = [name for name in flow_names for _ in range(args.runs)]
+        random.Random(args.seed).shuffle(tasks)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(contexts)) as ex:
+            runs = list(ex.map(lambda n: _execute(flows, n, pool), tasks))
+        wall_s = time.perf_counter() - started
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    rows = summarize(runs, wall_s)
+    workers = _worker_stats(args.redis_url)
+    standin = server.standin.snapshot() if server else {}
+    _print_report(rows, workers, standin, wall_s)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+                    "wall_s": round(wall_s, 3),
+                    "flows": rows,
+                    "workers": workers,
+                    "standin": standin,
+                    "runs": [asdict(r) for r in runs],
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+    if server:
+        server.shutdown()
+    return 0 if all(r["errors"] == 0 for r in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
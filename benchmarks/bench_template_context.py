@@ -0,0 +1,176 @@
+# benchmarks/bench_template_context.py
+"""
+Render time of the dashboard and Coach pages: lazy vs eager template context.
+
+app.inject_globals hands templates lazy values (modules/common/
+template_context.py): nav URLs are built once per app, and tenant,
+wallets and role flags are computed only when a template touches them.
+
+This script renders each page through the Flask test client, logged in
+as a university student (which exercises the tenant fallback lookup),
+in two modes:
+
+    eager   the previous behaviour. Every context value is resolved on
+            every render and the URL cache is cleared first, so each
+            render pays for all ~25 url_for calls.
+    lazy    the context processor as shipped
+
+For each page and mode it reports the mean and p95 milliseconds per
+request and the SQL statements per request. It uses a throwaway SQLite
+database unless --database-url is given.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_template_context [--iterations 300] [--pages dashboard,coach]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+PAGES = {"dashboard": "/dashboard", "coach": "/coach/"}
+MODES = ("eager", "lazy")
+
+
+def _configure_env(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["AUTO_MIGRATE"] = "0"
+    os.environ["QUERY_STATS_HEADER"] = "0"
+
+
+def _seed(flask_app) -> int:
+    from models import University, User, UserProfile, db
+
+    with flask_app.app_context():
+        db.create_all()
+        uni = University(name="Bench University", domain="bench.edu", tenant_slug="bench")
+        db.session.add(uni)
+        db.session.flush()
+        u = User(
+            name="Bench Student",
+            email=f"student-{time.time_ns()}@bench.edu",
+            role="student",
+            university_id=uni.id,
+            subscription_status="pro",
+            coins_free=120,
+            coins_pro=40,
+        )
+        u.set_password("bench")
+        db.session.add(u)
+        db.session.flush()
+        db.session.add(UserProfile(user_id=u.id, full_name=u.name, headline="Final-year B.Tech CS"))
+        db.session.commit()
+        return u.id
+
+
+def _eager(flask_app, original):
+    """inject_globals with every value resolved and a cold URL cache (previous behaviour)."""
+    from werkzeug.local import LocalProxy
+
+    def inject_globals_eager():
+        flask_app.extensions.pop("template_urls", None)
+        ctx = original()
+        return {k: (v._get_current_object() if isinstance(v, LocalProxy) else v) for k, v in ctx.items()}
+
+    return inject_globals_eager
+
+
+def _install_query_counter(flask_app) -> Dict[str, int]:
+    from sqlalchemy import event
+
+    from models import db
+
+    counter = {"n": 0}
+    with flask_app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: counter.__setitem__("n", counter["n"] + 1))
+    return counter
+
+
+def run(iterations: int, pages: List[str], database_url: Optional[str]) -> List[Dict[str, Any]]:
+    _configure_env(database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="careerai-bench-"), "bench.db"))
+
+    from app import app as flask_app  # imports after env so create_app() sees it
+
+    logging.getLogger().setLevel(logging.WARNING)
+    flask_app.logger.setLevel(logging.WARNING)
+
+    user_id = _seed(flask_app)
+    counter = _install_query_counter(flask_app)
+    procs = flask_app.template_context_processors[None]
+    slot = next(i for i, f in enumerate(procs) if f.__name__ == "inject_globals")
+    original = procs[slot]
+
+    client = flask_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+
+    rows = []
+    for page in pages:
+        url = PAGES[page]
+        for mode in MODES:
+            procs[slot] = _eager(flask_app, original) if mode == "eager" else original
+            for _ in range(min(20, iterations)):  # warm-up: template compile, first queries
+                client.get(url)
+            timings, queries = [], []
+            for _ in range(iterations):
+                counter["n"] = 0
+                started = time.perf_counter()
+                resp = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                queries.append(counter["n"])
+                if resp.status_code != 200:
+                    raise RuntimeError(f"{url} returned {resp.status_code} in {mode} mode")
+            timings.sort()
+            rows.append(
+                {
+                    "page": page,
+                    "mode": mode,
+                    "iterations": iterations,
+                    "mean_ms": round(statistics.fmean(timings), 3),
+                    "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 3),
+                    "queries": round(statistics.fmean(queries), 2),
+                }
+            )
+    procs[slot] = original
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=300)
+    ap.add_argument("--pages", default=",".join(PAGES), help="comma-separated subset of: " + ", ".join(PAGES))
+    ap.add_argument("--database-url", default=None, help="default: fresh SQLite file in a temp dir")
+    ap.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = ap.parse_args(argv)
+
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+    unknown = sorted(set(pages) - set(PAGES))
+    if unknown:
+        ap.error(f"unknown pages: {', '.join(unknown)}")
+
+    rows = run(max(1, args.iterations), pages, args.database_url)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'page':<12}{'mode':>7}{'mean ms':>10}{'p95 ms':>10}{'queries':>9}")
+    for r in rows:
+        print(f"{r['page']:<12}{r['mode']:>7}{r['mean_ms']:>10}{r['p95_ms']:>10}{r['queries']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+# benchmarks/bench_validators.py
+"""
+Old vs new output validation on recorded model outputs.
+
+Compares the frozen hand-written validators (benchmarks/legacy_validators.py)
+with the compiled validators in modules/common/schemas.py, as wired into
+ai.py / jobpack/utils_ats.py:
+
+- equivalence: both sides must produce the same dict for every fixture
+  (meta.generated_at_utc ignored, it is a wall-clock stamp),
+- speed: mean microseconds per call over --iterations runs.
+
+Usage (from the repo root):
+    OPENAI_API_KEY=x python -m benchmarks.bench_validators [--iterations 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")  # module-level clients only
+
+from benchmarks import legacy_validators as legacy  # noqa: E402
+from modules.common import ai  # noqa: E402
+from modules.common.schemas import normalize_jobpack  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "recorded"
+
+# Defaults analyze_jobpack applied before _normalize_for_template.
+_JOBPACK_DEFAULTS = {
+    "summary": "",
+    "role_detected": "",
+    "fit_overview": [],
+    "ats_score": 0,
+    "skill_table": [],
+    "rewrite_suggestions": [],
+    "next_steps": [],
+    "impact_summary": "",
+    "subscores": {},
+    "resume_ats": {},
+    "learning_links": [],
+    "interview_qa": [],
+    "practice_plan": [],
+    "application_checklist": [],
+    "role_intel": {},
+}
+
+
+def _legacy_jobpack(data: Dict[str, Any]) -> Dict[str, Any]:
+    for k, v in _JOBPACK_DEFAULTS.items():
+        data.setdefault(k, v)
+    return legacy._normalize_for_template(data)
+
+
+def load_fixture(name: str) -> Dict[str, Any]:
+    with open(FIXTURES / f"{name}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _payload(name: str) -> Any:
+    content = load_fixture(name)["content"]
+    if name.startswith("skill_mapper"):
+        return ai._parse_skillmapper_text(content)
+    return json.loads(content)
+
+
+# fixture -> (legacy validator, new validator)
+CASES: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    "portfolio_idea_free": (legacy._light_validate_portfolio_free, ai._light_validate_portfolio_free),
+    "portfolio_idea_pro": (legacy._light_validate_portfolio_pro, ai._light_validate_portfolio_pro),
+    "skill_mapper_free": (legacy._light_validate_skillmap, ai._light_validate_skillmap),
+    "skill_mapper_pro": (legacy._light_validate_skillmap, ai._light_validate_skillmap),
+    "daily_coach": (legacy._light_validate_daily_coach, ai._light_validate_daily_coach),
+    "daily_coach_month": (legacy._light_validate_dualtrack_month, ai._light_validate_dualtrack_month),
+    "dream_planner_job": (
+        lambda d: legacy._light_validate_dream_plan(d, "job"),
+        lambda d: ai._light_validate_dream_plan(d, "job"),
+    ),
+    "dream_planner_startup": (
+        lambda d: legacy._light_validate_dream_plan(d, "startup"),
+        lambda d: ai._light_validate_dream_plan(d, "startup"),
+    ),
+    "jobpack_free": (_legacy_jobpack, normalize_jobpack),
+    "jobpack_pro": (_legacy_jobpack, normalize_jobpack),
+}
+
+
+def _strip_clock(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_clock(v) for k, v in value.items() if k != "generated_at_utc"}
+    if isinstance(value, list):
+        return [_strip_clock(v) for v in value]
+    return value
+
+
+def _time(fn: Callable[[Any], Any], inputs: List[Any]) -> float:
+    started = time.perf_counter()
+    for payload in inputs:
+        fn(payload)
+    return (time.perf_counter() - started) / len(inputs) * 1e6
+
+
+def run(iterations: int) -> List[Dict[str, Any]]:
+    rows = []
+    for name, (old, new) in CASES.items():
+        payload = _payload(name)
+        same = _strip_clock(old(copy.deepcopy(payload))) == _strip_clock(new(copy.deepcopy(payload)))
+        # The legacy validators mutate their input, so both sides get fresh copies.
+        old_us = _time(old, [copy.deepcopy(payload) for _ in range(iterations)])
+        new_us = _time(new, [copy.deepcopy(payload) for _ in range(iterations)])
+        rows.append(
+            {
+                "fixture": name,
+                "legacy_us": round(old_us, 1),
+                "schemas_us": round(new_us, 1),
+                "speedup": round(old_us / new_us, 2) if new_us else 0.0,
+                "equivalent": same,
+            }
+        )
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--iterations", type=int, default=2000)
+    ap.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = ap.parse_args(argv)
+
+    rows = run(max(1, args.iterations))
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'fixture':<24}{'legacy µs':>12}{'schemas µs':>12}{'speedup':>10}  equivalent")
+        for r in rows:
+            print(
+                f"{r['fixture']:<24}{r['legacy_us']:>12}{r['schemas_us']:>12}"
+                f"{r['speedup']:>10}  {r['equivalent']}"
+            )
+    return 0 if all(r["equivalent"] for r in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
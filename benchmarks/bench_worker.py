@@ -0,0 +1,99 @@
+# benchmarks/bench_worker.py
+"""
+RQ worker for benchmarks/bench_flows.py.
+
+Same queues and weighted dequeue as worker.py, plus per-job SQL query
+counting. Each job's statement count is added to Redis hashes keyed by
+task function name, and bench_flows reads them back:
+
+    bench:worker:queries  {process_jobpack_analysis: N, ...}
+    bench:worker:jobs     {process_jobpack_analysis: jobs, ...}
+    bench:worker:seconds  {process_jobpack_analysis: total job seconds, ...}
+
+Like worker.py (a forking rq Worker) each job runs in a fresh work horse
+that imports the Flask app, so its create_app() cost is included. With
+--no-fork jobs run in-process on an app imported once, which shows what
+that per-job cost is.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from redis import Redis  # noqa: E402
+from rq import Queue, SimpleWorker  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from modules.common.scheduling import QUEUE_NAMES, SchedulingWorker  # noqa: E402
+
+
+QUERIES_KEY = "bench:worker:queries"
+JOBS_KEY = "bench:worker:jobs"
+SECONDS_KEY = "bench:worker:seconds"
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    _local.count = getattr(_local, "count", 0) + 1
+
+
+class _CountingMixin:
+    """Records SQL statements and wall time per job."""
+
+    def perform_job(self, job, queue):
+        _local.count = 0
+        started = time.perf_counter()
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            name = (job.func_name or "unknown").rsplit(".", 1)[-1]
+            pipe = self.connection.pipeline()
+            pipe.hincrby(QUERIES_KEY, name, getattr(_local, "count", 0))
+            pipe.hincrby(JOBS_KEY, name, 1)
+            pipe.hincrbyfloat(SECONDS_KEY, name, time.perf_counter() - started)
+            pipe.execute()
+
+
+class CountingWorker(_CountingMixin, SchedulingWorker):
+    pass
+
+
+class CountingSimpleWorker(_CountingMixin, SimpleWorker):
+    pass
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    ap.add_argument(
+        "--no-fork", action="store_true", help="run jobs in-process on an app imported once"
+    )
+    args = ap.parse_args()
+
+    worker_cls = CountingWorker
+    if args.no_fork:
+        import app  # noqa: F401
+
+        worker_cls = CountingSimpleWorker
+
+    conn = Redis.from_url(args.redis_url)
+    queues = [Queue(name, connection=conn) for name in QUEUE_NAMES]
+    worker = worker_cls(queues, connection=conn, name=f"bench-worker-{os.getpid()}")
+    worker.work(with_scheduler=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,677 @@
+# benchmarks/legacy_validators.py
+"""
+Frozen copies of the hand-written output validators that
+modules/common/schemas.py replaced (ai.py `_light_validate_*` and
+jobpack/utils_ats.py `_normalize_for_template`), kept verbatim as the
+baseline for benchmarks/bench_validators.py. Not imported by the app.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+CAREER_AI_VERSION = os.getenv("CAREER_AI_VERSION", "2025-Q4")
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def _inputs_digest(obj: Any) -> str:
+    try:
+        s = json.dumps(obj, sort_keys=True)[:5000]
+        return "sha256:" + hashlib.sha256(s.encode("utf-8")).hexdigest()
+    except Exception:
+        return "sha256:na"
+
+
+def _to_sentence(text: str) -> str:
+    text = (text or "").strip()
+    if not text:
+        return ""
+    if not text.endswith((".", "!", "?")):
+        text = text + "."
+    return text
+
+
+def _light_validate_portfolio_free(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        return {"mode": "free", "ideas": [], "meta": {}}
+    ideas = data.get("ideas") or []
+    if not isinstance(ideas, list):
+        ideas = []
+    if ideas:
+        i = ideas[0]
+        i["title"] = (i.get("title") or "Portfolio Project")[:120]
+        i["why"] = _to_sentence(i.get("why") or "")
+        i["what"] = [(str(x)[:110]) for x in (i.get("what") or [])][:6]
+        i["milestones"] = [(str(x)[:110]) for x in (i.get("milestones") or [])][:3]
+        i["resume_bullets"] = [(str(x)[:160]) for x in (i.get("resume_bullets") or [])][:3]
+        i["stack"] = [(str(x)[:32]) for x in (i.get("stack") or [])][:4]
+        ideas = [i]
+    meta = data.get("meta") or {}
+    return {"mode": "free", "ideas": ideas, "meta": meta}
+
+
+def _light_validate_portfolio_pro(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        return {"mode": "pro", "ideas": [], "meta": {}}
+    ideas = data.get("ideas") or []
+    if not isinstance(ideas, list):
+        ideas = []
+    out = []
+    for i in ideas[:3]:
+        i = dict(i)
+        i["title"] = (i.get("title") or "Portfolio Project")[:120]
+        i["why"] = _to_sentence(i.get("why") or "")
+        i["what"] = [(str(x)[:120]) for x in (i.get("what") or [])][:6]
+        i["milestones"] = [(str(x)[:120]) for x in (i.get("milestones") or [])][:6]
+        i["rubric"] = [(str(x)[:120]) for x in (i.get("rubric") or [])][:6]
+        i["risks"] = [(str(x)[:120]) for x in (i.get("risks") or [])][:4]
+        i["stretch_goals"] = [(str(x)[:120]) for x in (i.get("stretch_goals") or [])][:4]
+        i["resume_bullets"] = [(str(x)[:160]) for x in (i.get("resume_bullets") or [])][:5]
+        i["stack"] = [(str(x)[:32]) for x in (i.get("stack") or [])][:10]
+        i["mentor_note"] = (i.get("mentor_note") or "")[:260]
+        out.append(i)
+    meta = data.get("meta") or {}
+    return {"mode": "pro", "ideas": out, "meta": meta}
+
+
+def _light_validate_skillmap(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        return {
+            "mode": "free",
+            "roles": [],
+            "top_roles": [],
+            "hiring_now": [],
+            "market_insights": {},
+            "learning_paths": [],
+            "next_steps": [],
+            "impact_summary": "",
+            "call_to_action": "",
+            "meta": {},
+        }
+
+    roles = data.get("roles") or []
+    if not isinstance(roles, list):
+        roles = []
+    cleaned_roles = []
+    for r in roles[:6]:
+        r = dict(r)
+        r["title"] = (r.get("title") or r.get("role_title") or "Role")[:80]
+        r["level"] = (r.get("level") or r.get("seniority") or "Entry-level")[:60]
+        try:
+            ms = int(r.get("match_score") or r.get("fit_score") or 0)
+        except Exception:
+            ms = 0
+        r["match_score"] = max(0, min(100, ms))
+        r["why_fit"] = (r.get("why_fit") or r.get("summary") or "")[:400]
+        r["skills"] = [(str(x)[:40]) for x in (r.get("skills") or [])][:12]
+        r["gaps"] = [(str(x)[:40]) for x in (r.get("gaps") or [])][:12]
+        r["micro_projects"] = [(str(x)[:120]) for x in (r.get("micro_projects") or [])][:8]
+        r["salary"] = (r.get("salary") or "")[:120]
+        r["region"] = (r.get("region") or "")[:120]
+        cleaned_roles.append(r)
+
+    next_steps = data.get("next_steps") or []
+    if not isinstance(next_steps, list):
+        next_steps = []
+    next_steps = [(str(x)[:240]) for x in next_steps][:12]
+
+    impact_summary = (data.get("impact_summary") or "")[:800]
+    call_to_action = (data.get("call_to_action") or impact_summary)[:800]
+
+    out = {
+        "mode": data.get("mode") or "free",
+        "roles": cleaned_roles,
+        "top_roles": cleaned_roles[:3],
+        "hiring_now": data.get("hiring_now") or [],
+        "market_insights": data.get("market_insights") or {},
+        "learning_paths": data.get("learning_paths") or [],
+        "next_steps": next_steps,
+        "impact_summary": impact_summary,
+        "call_to_action": call_to_action,
+        "meta": data.get("meta") or {},
+    }
+    return out
+
+
+def _light_validate_daily_coach(data: Any) -> Dict[str, Any]:
+    """
+    Defensive validation so UI never explodes if the model returns odd JSON.
+
+    Expected shape (minimum):
+      {
+        "session_date": "2025-12-04",
+        "day_index": 7,                # interpreted as "week index" in Weekly Coach
+        "ai_note": "...short coaching note...",
+        "tasks": [
+          {
+            "id": 1,
+            "title": "Finish SQL joins tutorial",
+            "detail": "Do 20 practice questions on joins & aggregations.",
+            "category": "skills",
+            "sort_order": 1,
+            "suggested_minutes": 45,
+            "guide": "extra coaching note",
+            "tags": ["sql", "practice"],
+            "phase_label": "Phase 2 · Weeks 5–8 · Projects + practice",
+            "week_index": 5,
+            "difficulty": "medium",
+            "project_label": "Game Portfolio Project",
+            "milestone_title": "Implement core gameplay loop",
+            "milestone_step": "Code basic player movement & collision",
+            "is_done": false
+          },
+          ...
+        ],
+        "meta": {...}
+      }
+
+    NOTE:
+    - This validator is intentionally tolerant:
+      - Missing fields are filled with safe defaults.
+      - Extra fields are ignored by the DB layer and only used by UI.
+    """
+    if not isinstance(data, dict):
+        data = {}
+
+    session_date = data.get("session_date") or ""
+    day_index = data.get("day_index")
+    ai_note = data.get("ai_note") or ""
+    tasks = data.get("tasks") or []
+    meta = data.get("meta") or {}
+
+    clean_tasks: List[Dict[str, Any]] = []
+    if isinstance(tasks, list):
+        for idx, t in enumerate(tasks, start=1):
+            if not isinstance(t, dict):
+                continue
+
+            title = (t.get("title") or "").strip()
+            if not title:
+                continue
+
+            sort_order_raw = t.get("sort_order")
+            sort_order = sort_order_raw if isinstance(sort_order_raw, int) else idx
+
+            suggested_raw = t.get("suggested_minutes")
+            suggested_minutes = suggested_raw if isinstance(suggested_raw, int) else None
+
+            guide = (t.get("guide") or "").strip()
+            tags_val = t.get("tags") or []
+            if isinstance(tags_val, list):
+                tags = [str(x)[:32] for x in tags_val[:8] if str(x).strip()]
+            else:
+                tags = []
+
+            phase_label = (t.get("phase_label") or "").strip()[:80]
+            week_index_val = t.get("week_index")
+            week_index = week_index_val if isinstance(week_index_val, int) else None
+
+            difficulty = (t.get("difficulty") or "").strip()[:32]
+            project_label = (t.get("project_label") or "").strip()[:255]
+            milestone_title = (t.get("milestone_title") or "").strip()[:255]
+            milestone_step = (t.get("milestone_step") or "").strip()[:255]
+
+            clean_tasks.append(
+                {
+                    "id": t.get("id") or idx,
+                    "title": title[:255],
+                    "detail": (t.get("detail") or "").strip(),
+                    "category": (t.get("category") or "").strip()[:64],
+                    "sort_order": sort_order,
+                    "suggested_minutes": suggested_minutes,
+                    "guide": guide[:400],
+                    "tags": tags,
+                    # Per-task roadmap hints
+                    "phase_label": phase_label,
+                    "week_index": week_index,
+                    # Project / milestone awareness (P3)
+                    "difficulty": difficulty,
+                    "project_label": project_label,
+                    "milestone_title": milestone_title,
+                    "milestone_step": milestone_step,
+                    # UI state
+                    "is_done": bool(t.get("is_done", False)),
+                }
+            )
+
+    if not isinstance(meta, dict):
+        meta = {}
+    if "generated_at_utc" not in meta:
+        meta["generated_at_utc"] = _utc_now_iso()
+    if "inputs_digest" not in meta:
+        meta["inputs_digest"] = _inputs_digest({"source": "weekly_coach"})
+
+    if isinstance(day_index, int):
+        safe_day_index = day_index
+    else:
+        safe_day_index = None
+
+    return {
+        "session_date": str(session_date),
+        "day_index": safe_day_index,
+        "ai_note": ai_note.strip()[:1200],
+        "tasks": clean_tasks,
+        "meta": meta,
+    }
+
+
+def _light_validate_dualtrack_month(data: Any) -> Dict[str, Any]:
+    """
+    Defensive validator for 28-day dual-track month plan.
+
+    Normalizes:
+    - month_cycle: str
+    - ai_note: str
+    - weeks: exactly 4 entries (week_number 1..4)
+      - each with daily_tasks (7 items day=1..7) + weekly_task
+    """
+    if not isinstance(data, dict):
+        data = {}
+
+    month_cycle = str(data.get("month_cycle") or "").strip()[:64]
+    ai_note = str(data.get("ai_note") or "").strip()[:1600]
+    weeks_raw = data.get("weeks") or []
+    meta = data.get("meta") or {}
+
+    if not isinstance(meta, dict):
+        meta = {}
+
+    # helper clamps
+    def _clamp_int(v: Any, lo: int, hi: int, default: int) -> int:
+        try:
+            x = int(v)
+        except Exception:
+            return default
+        return max(lo, min(hi, x))
+
+    def _clean_category(cat: Any) -> str:
+        c = str(cat or "").strip().lower()
+        allowed = {"skills", "projects", "career_capital", "planning", "mindset", "wellbeing"}
+        return c if c in allowed else "skills"
+
+    def _clean_difficulty(d: Any, default: str = "easy") -> str:
+        v = str(d or "").strip().lower()
+        allowed = {"easy", "medium", "hard"}
+        return v if v in allowed else default
+
+    def _clean_tags(tags_val: Any) -> List[str]:
+        if not isinstance(tags_val, list):
+            return []
+        out = []
+        for x in tags_val[:6]:
+            s = str(x).strip()
+            if s:
+                out.append(s[:32])
+        return out
+
+    # Normalize weeks by mapping week_number => week payload
+    week_map: Dict[int, Dict[str, Any]] = {}
+    if isinstance(weeks_raw, list):
+        for w in weeks_raw:
+            if not isinstance(w, dict):
+                continue
+            wn = w.get("week_number")
+            try:
+                wn_int = int(wn)
+            except Exception:
+                continue
+            if wn_int < 1 or wn_int > 4:
+                continue
+            week_map[wn_int] = w
+
+    clean_weeks: List[Dict[str, Any]] = []
+
+    for wn in range(1, 5):
+        w = week_map.get(wn) or {}
+        week_note = str(w.get("week_note") or f"Week {wn} focus.").strip()[:1200]
+
+        # daily tasks
+        dailies_raw = w.get("daily_tasks") or []
+        day_map: Dict[int, Dict[str, Any]] = {}
+        if isinstance(dailies_raw, list):
+            for t in dailies_raw:
+                if not isinstance(t, dict):
+                    continue
+                try:
+                    day = int(t.get("day"))
+                except Exception:
+                    continue
+                if 1 <= day <= 7:
+                    day_map[day] = t
+
+        daily_tasks: List[Dict[str, Any]] = []
+        for day in range(1, 8):
+            t = day_map.get(day) or {}
+            title = str(t.get("title") or f"Day {day} task").strip()[:255]
+            detail = str(t.get("detail") or "").strip()[:1200]
+            category = _clean_category(t.get("category"))
+            est = _clamp_int(t.get("estimated_minutes"), 5, 60, 10)
+            # For dailies, prefer 5-20 (but keep within schema 5-60)
+            if est > 20:
+                est = 20
+            difficulty = _clean_difficulty(t.get("difficulty"), default="easy")
+            tags = _clean_tags(t.get("tags"))
+
+            week_index_val = t.get("week_index")
+            if not isinstance(week_index_val, int):
+                week_index_val = wn
+
+            daily_tasks.append(
+                {
+                    "day": day,
+                    "title": title,
+                    "detail": detail,
+                    "category": category,
+                    "estimated_minutes": est,
+                    "difficulty": difficulty,
+                    "tags": tags,
+                    "phase_label": str(t.get("phase_label") or "").strip()[:160],
+                    "week_index": week_index_val,
+                    "project_label": str(t.get("project_label") or "").strip()[:255],
+                    "milestone_title": str(t.get("milestone_title") or "").strip()[:255],
+                    "milestone_step": str(t.get("milestone_step") or "").strip()[:255],
+                }
+            )
+
+        # weekly task
+        weekly_raw = w.get("weekly_task") or {}
+        if not isinstance(weekly_raw, dict):
+            weekly_raw = {}
+
+        weekly_title = str(weekly_raw.get("title") or f"Week {wn} milestone").strip()[:255]
+        weekly_detail = str(weekly_raw.get("detail") or "").strip()[:1800]
+        weekly_category = _clean_category(weekly_raw.get("category"))
+        weekly_est = _clamp_int(weekly_raw.get("estimated_minutes"), 90, 480, 240)
+        badge = str(weekly_raw.get("milestone_badge") or f"Week {wn} Master").strip()[:64]
+        deliverable = str(weekly_raw.get("deliverable") or "").strip()[:255]
+        if not deliverable:
+            deliverable = "Shipped weekly artifact + README proof"
+
+        weekly_week_index = weekly_raw.get("week_index")
+        if not isinstance(weekly_week_index, int):
+            weekly_week_index = wn
+
+        weekly_task = {
+            "title": weekly_title,
+            "detail": weekly_detail,
+            "category": weekly_category,
+            "estimated_minutes": weekly_est,
+            "milestone_badge": badge,
+            "phase_label": str(weekly_raw.get("phase_label") or "").strip()[:160],
+            "week_index": weekly_week_index,
+            "project_label": str(weekly_raw.get("project_label") or "").strip()[:255],
+            "milestone_title": str(weekly_raw.get("milestone_title") or "").strip()[:255],
+            "milestone_step": str(weekly_raw.get("milestone_step") or "").strip()[:255],
+            "deliverable": deliverable,
+        }
+
+        clean_weeks.append(
+            {
+                "week_number": wn,
+                "week_note": week_note,
+                "daily_tasks": daily_tasks,
+                "weekly_task": weekly_task,
+            }
+        )
+
+    # meta defaults
+    if "generated_at_utc" not in meta:
+        meta["generated_at_utc"] = _utc_now_iso()
+    if "inputs_digest" not in meta:
+        meta["inputs_digest"] = _inputs_digest({"source": "dualtrack_month"})
+    meta.setdefault("career_ai_version", CAREER_AI_VERSION)
+
+    return {
+        "month_cycle": month_cycle,
+        "ai_note": ai_note,
+        "weeks": clean_weeks,
+        "meta": meta,
+    }
+
+
+def _light_validate_dream_plan(data: Any, mode: str) -> Dict[str, Any]:
+    """Keep Dream Planner payload UI-friendly and robust."""
+    if not isinstance(data, dict):
+        data = {}
+
+    out: Dict[str, Any] = {}
+
+    mode_clean = "startup" if (mode or "").lower() == "startup" else "job"
+    out["mode"] = mode_clean
+
+    summary = str(data.get("summary") or "")
+    out["summary"] = summary[:1000]
+
+    probs = data.get("probabilities") or {}
+    if not isinstance(probs, dict):
+        probs = {}
+
+    def _clamp_pct(x: Any) -> int:
+        try:
+            v = int(x)
+        except Exception:
+            v = 0
+        return max(0, min(100, v))
+
+    out["probabilities"] = (
+        {
+            "lpa_12": _clamp_pct(probs.get("lpa_12")),
+            "lpa_24": _clamp_pct(probs.get("lpa_24")),
+            "lpa_48": _clamp_pct(probs.get("lpa_48")),
+        }
+        if mode_clean == "job"
+        else {"lpa_12": 0, "lpa_24": 0, "lpa_48": 0}
+    )
+
+    missing = data.get("missing_skills") or []
+    if not isinstance(missing, list):
+        missing = []
+    out["missing_skills"] = [str(x)[:80] for x in missing][:15]
+
+    # Phases (primary for UI + Weekly Coach)
+    raw_phases = data.get("phases") or []
+    phases: List[Dict[str, Any]] = []
+    if isinstance(raw_phases, list):
+        for idx, ph in enumerate(raw_phases, start=1):
+            if not isinstance(ph, dict):
+                continue
+            label = str(ph.get("label") or "").strip()
+            if not label:
+                label = f"Phase {idx}"
+            items = ph.get("items") or []
+            if not isinstance(items, list):
+                items = []
+            items_clean = [str(x).strip() for x in items if str(x).strip()]
+            phases.append(
+                {
+                    "label": label[:160],
+                    "items": items_clean[:10],
+                }
+            )
+
+    # Fallback mapping from legacy plan_core if phases missing
+    if not phases:
+        plan = data.get("plan_core") or {}
+        if not isinstance(plan, dict):
+            plan = {}
+
+        def _coerce_str_list(val, limit: int) -> List[str]:
+            if not isinstance(val, list):
+                return []
+            items = [str(x).strip() for x in val if str(x).strip()]
+            return items[:limit]
+
+        weeks_30 = _coerce_str_list(plan.get("weeks_30"), 6)
+        weeks_60 = _coerce_str_list(plan.get("weeks_60"), 6)
+        weeks_90 = _coerce_str_list(plan.get("weeks_90"), 6)
+
+        if weeks_30 or weeks_60 or weeks_90:
+            phases = [
+                {"label": "Phase 1", "items": weeks_30},
+                {"label": "Phase 2", "items": weeks_60},
+                {"label": "Phase 3", "items": weeks_90},
+            ]
+
+    if not phases:
+        phases = [{"label": "Phase 1", "items": []}]
+
+    out["phases"] = phases
+
+    # Optional legacy plan_core preserved (mostly empty, for backward compat if needed)
+    plan = data.get("plan_core") or {}
+    if not isinstance(plan, dict):
+        plan = {}
+    out["plan_core"] = plan
+
+    res = data.get("resources") or {}
+    if not isinstance(res, dict):
+        res = {}
+
+    def _coerce_str_list(val, limit: int) -> List[str]:
+        if not isinstance(val, list):
+            return []
+        items = [str(x).strip() for x in val if str(x).strip()]
+        return items[:limit]
+
+    out["resources"] = {
+        "tutorials": _coerce_str_list(res.get("tutorials"), 10),
+        "mini_projects": _coerce_str_list(res.get("mini_projects"), 8),
+        "resume_bullets": _coerce_str_list(res.get("resume_bullets"), 10),
+        "linkedin_actions": _coerce_str_list(res.get("linkedin_actions"), 12),
+    }
+
+    sx = data.get("startup_extras") or {}
+    if not isinstance(sx, dict):
+        sx = {}
+    clean_sx: Dict[str, Any] = {}
+    for k, v in sx.items():
+        key = str(k)[:40]
+        if isinstance(v, str):
+            clean_sx[key] = v[:800]
+        elif isinstance(v, list):
+            clean_sx[key] = [str(x)[:200] for x in v[:15]]
+        else:
+            clean_sx[key] = v
+    out["startup_extras"] = clean_sx
+
+    # Echo input (for Coach integration)
+    input_block = data.get("input") or {}
+    if not isinstance(input_block, dict):
+        input_block = {}
+    clean_input: Dict[str, Any] = {}
+    for k, v in input_block.items():
+        key = str(k)[:60]
+        if isinstance(v, str):
+            clean_input[key] = v[:400]
+        else:
+            clean_input[key] = v
+    out["input"] = clean_input
+
+    meta = data.get("meta") or {}
+    if not isinstance(meta, dict):
+        meta = {}
+    out["meta"] = meta
+
+    return out
+
+
+def _normalize_for_template(data: Dict[str, Any]) -> Dict[str, Any]:
+  # fit_overview items: ensure "category" + "match" + "comment"
+  fo = data.get("fit_overview")
+  if isinstance(fo, list):
+      for item in fo:
+          if not isinstance(item, dict):
+              continue
+          item["category"] = (
+              item.get("category")
+              or item.get("name")
+              or item.get("area")
+              or "Technical Skills"
+          )
+          if "match" not in item and "score" in item:
+              try:
+                  item["match"] = int(item["score"])
+              except Exception:
+                  item["match"] = 0
+          item["match"] = int(item.get("match") or 0)
+          item["comment"] = item.get("comment", "")
+
+  # resume_ats defaults
+  ra = data.get("resume_ats") or {}
+  if isinstance(ra, dict):
+      ra.setdefault("resume_ats_score", data.get("ats_score", 0))
+      ra.setdefault("blockers", [])
+      ra.setdefault("warnings", [])
+      ra.setdefault(
+          "keyword_coverage",
+          {"required_keywords": [], "present_keywords": [], "missing_keywords": []},
+      )
+      ra.setdefault("resume_rewrite_actions", [])
+      ra.setdefault("exact_phrases_to_add", [])
+      data["resume_ats"] = ra
+
+  # learning_links: drop empty; forbid "Resource" without url
+  ll = data.get("learning_links")
+  if isinstance(ll, list):
+      cleaned = []
+      for item in ll:
+          if isinstance(item, dict):
+              label = (item.get("label") or "").strip()
+              url = (item.get("url") or "").strip()
+              why = (item.get("why") or "").strip()
+              if url.startswith("http") and label and label.lower() != "resource":
+                  cleaned.append(
+                      {"label": label, "url": url, "why": why or "Good primer."}
+                  )
+      data["learning_links"] = cleaned
+
+  # interview_qa: ensure keys exist
+  iqa = data.get("interview_qa")
+  if isinstance(iqa, list):
+      fixed: List[Dict[str, Any]] = []
+      for qa in iqa:
+          if isinstance(qa, dict):
+              qa["q"] = qa.get("q") or qa.get("question") or ""
+              qa.setdefault("a_outline", [])
+              qa.setdefault("why_it_matters", "")
+              qa.setdefault("followup", "")
+              fixed.append(qa)
+      data["interview_qa"] = fixed
+
+  # helper chips + counts for UI
+  if "detected_keywords" not in data and isinstance(data.get("skill_table"), list):
+      kw = []
+      for row in data["skill_table"]:
+          if isinstance(row, dict) and "skill" in row:
+              kw.append(str(row["skill"]))
+      data["detected_keywords"] = kw
+      data["matched_count"] = sum(
+          1
+          for r in data["skill_table"]
+          if isinstance(r, dict) and r.get("status") == "Matched"
+      )
+      data["missing_count"] = sum(
+          1
+          for r in data["skill_table"]
+          if isinstance(r, dict) and r.get("status") == "Missing"
+      )
+
+  # role_intel defaults
+  ri = data.get("role_intel") or {}
+  if isinstance(ri, dict):
+      ri.setdefault("seniority", "Not specified")
+      ri.setdefault("difficulty", "Not specified")
+      ri.setdefault("salary_band", "Varies by company — check latest bands for similar roles in your region.")
+      ri.setdefault("geo_focus", "Not specified")
+      ri.setdefault("market_notes", "")
+      ri.setdefault("typical_companies", [])
+      data["role_intel"] = ri
+
+  data.setdefault("report_tier", "CareerAI Deep Evaluation")
+  data.setdefault("resume_missing", False)
+  return data
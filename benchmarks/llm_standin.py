@@ -0,0 +1,405 @@
+# benchmarks/llm_standin.py
+"""
+Local OpenAI-compatible stand-in for load tests.
+
+Serves POST /v1/chat/completions by replaying recorded responses
+(benchmarks/fixtures/recorded/*.json) instead of calling OpenAI, with a
+configurable latency model:
+
+    delay = TTFT + completion_tokens / token_rate      (x --time-scale)
+
+    TTFT        lognormal, median --ttft-ms, shape --ttft-sigma
+    token_rate  normal, mean --tokens-per-s, sd --tokens-per-s-sd
+                (floored at 1 token/s)
+
+The fixture is chosen by the X-CareerAI-Feature header that
+modules/common/llm.chat_completion sends. Names match exactly, by
+prefix (dream_planner -> dream_planner_job / _startup, rotating), or
+with a "_repair" suffix stripped. Usage is recomputed per request:
+prompt_tokens come from the actual messages. cached_tokens simulate
+OpenAI prefix caching on the first message (>= 1024 tokens, 128-token
+blocks, --cache-ttl-s).
+
+Optional fault injection: --error-rate returns --error-status (429 adds
+Retry-After) so client retries and fallbacks can be exercised.
+
+Run standalone:
+    python -m benchmarks.llm_standin --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=standin flask run
+
+or in-process via `start_standin(...)` (benchmarks/bench_flows.py does).
+Also serves GET /v1/models, /healthz and /stats (per-feature counters).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from modules.common.llm import FEATURE_HEADER  # noqa: E402
+from modules.common.prompt_budget import count_message_tokens, count_tokens  # noqa: E402
+
+logger = logging.getLogger("llm_standin")
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "recorded"
+
+# OpenAI only caches prompts of at least 1024 tokens, in 128-token increments.
+_CACHE_MIN_TOKENS = 1024
+_CACHE_BLOCK = 128
+
+
+@dataclass
+class LatencyModel:
+    ttft_ms: float = 450.0
+    ttft_sigma: float = 0.35
+    tokens_per_s: float = 70.0
+    tokens_per_s_sd: float = 15.0
+    time_scale: float = 1.0
+
+    def sample(self, completion_tokens: int, rnd: random.Random) -> float:
+        """Seconds to wait before answering."""
+        ttft = self.ttft_ms * (math.exp(rnd.gauss(0.0, self.ttft_sigma)) if self.ttft_sigma else 1.0)
+        rate = max(1.0, rnd.gauss(self.tokens_per_s, self.tokens_per_s_sd) if self.tokens_per_s_sd else self.tokens_per_s)
+        return max(0.0, (ttft / 1000.0 + completion_tokens / rate) * self.time_scale)
+
+
+@dataclass
+class Recording:
+    feature: str
+    content: str
+    completion_tokens: int
+
+
+@dataclass
+class StandinStats:
+    calls: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    unmatched: int = 0
+    delay_s_total: Dict[str, float] = field(default_factory=dict)
+    cached_tokens: Dict[str, int] = field(default_factory=dict)
+    prompt_tokens: Dict[str, int] = field(default_factory=dict)
+
+
+def load_recordings(directory: Path = FIXTURES_DIR) -> Dict[str, List[Recording]]:
+    out: Dict[str, List[Recording]] = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+        feature = doc.get("feature") or path.stem
+        usage = doc.get("usage") or {}
+        content = doc.get("content") or ""
+        completion = int(usage.get("completion_tokens") or count_tokens(content))
+        out.setdefault(path.stem, []).append(Recording(feature, content, completion))
+    return out
+
+
+class Standin:
+    """Fixture lookup, latency sampling, prefix-cache simulation and counters."""
+
+    def __init__(
+        self,
+        recordings: Dict[str, List[Recording]],
+        latency: LatencyModel,
+        *,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        cache_ttl_s: float = 300.0,
+        seed: Optional[int] = None,
+    ):
+        self.recordings = recordings
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.cache_ttl_s = cache_ttl_s
+        self.stats = StandinStats()
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._rotation: Dict[str, int] = {}
+        self._prefix_seen: Dict[str, float] = {}
+
+    # ---- selection ----
+
+    def _candidates(self, feature: str) -> List[Recording]:
+        if feature in self.recordings:
+            return self.recordings[feature]
+        if feature.endswith("_repair"):
+            return self._candidates(feature[: -len("_repair")])
+        return [
+            rec
+            for name, recs in sorted(self.recordings.items())
+            if name.startswith(feature)
+            for rec in recs
+        ]
+
+    def pick(self, feature: str) -> Optional[Recording]:
+        recs = self._candidates(feature)
+        if not recs:
+            return None
+        with self._lock:
+            i = self._rotation.get(feature, 0)
+            self._rotation[feature] = i + 1
+        return recs[i % len(recs)]
+
+    # ---- usage ----
+
+    def cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        if not messages:
+            return 0
+        first = messages[0].get("content") or ""
+        if not isinstance(first, str):
+            first = json.dumps(first, ensure_ascii=False)
+        tokens = count_tokens(first)
+        if tokens < _CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha256(first.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            seen = self._prefix_seen.get(key)
+            self._prefix_seen[key] = now
+        if seen is None or now - seen > self.cache_ttl_s:
+            return 0
+        return (tokens // _CACHE_BLOCK) * _CACHE_BLOCK
+
+    # ---- request handling ----
+
+    def complete(self, feature: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], float]:
+        """(status, payload, delay_s) for one chat completion request."""
+        if body.get("stream"):
+            return 400, _error("stream=true is not supported by the stand-in"), 0.0
+
+        with self._lock:
+            fail = self.error_rate > 0 and self._rnd.random() < self.error_rate
+            rnd_state = self._rnd.random()
+        if fail:
+            with self._lock:
+                self.stats.errors[feature] = self.stats.errors.get(feature, 0) + 1
+            return self.error_status, _error("injected failure", "rate_limit_exceeded"), 0.0
+
+        rec = self.pick(feature)
+        if rec is None:
+            with self._lock:
+                self.stats.unmatched += 1
+            return 404, _error(f"no recording for feature {feature!r}"), 0.0
+
+        messages = body.get("messages") or []
+        prompt_tokens = count_message_tokens(messages)
+        cached = self.cached_tokens(messages)
+        delay = self.latency.sample(rec.completion_tokens, random.Random(rnd_state))
+
+        with self._lock:
+            st = self.stats
+            st.calls[feature] = st.calls.get(feature, 0) + 1
+            st.delay_s_total[feature] = st.delay_s_total.get(feature, 0.0) + delay
+            st.prompt_tokens[feature] = st.prompt_tokens.get(feature, 0) + prompt_tokens
+            st.cached_tokens[feature] = st.cached_tokens.get(feature, 0) + cached
+
+        payload = {
+            "id": "chatcmpl-standin-" + uuid.uuid4().hex[:20],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": rec.content, "refusal": None},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": rec.completion_tokens,
+                "total_tokens": prompt_tokens + rec.completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+            "system_fingerprint": "standin",
+        }
+        return 200, payload, delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            st = self.stats
+            return {
+                "calls": dict(st.calls),
+                "errors": dict(st.errors),
+                "unmatched": st.unmatched,
+                "prompt_tokens": dict(st.prompt_tokens),
+                "cached_tokens": dict(st.cached_tokens),
+                "mean_delay_ms": {
+                    k: round(st.delay_s_total[k] / n * 1000.0, 1) for k, n in st.calls.items() if n
+                },
+            }
+
+
+def _error(message: str, code: str = "invalid_request_error") -> Dict[str, Any]:
+    return {"error": {"message": message, "type": code, "param": None, "code": code}}
+
+
+# ---------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "CareerAIStandin/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def standin(self) -> Standin:
+        return self.server.standin  # type: ignore[attr-defined]
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # route through logging
+        logger.debug("%s " + fmt, self.address_string(), *args)
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/healthz":
+            self._send(200, {"ok": True})
+        elif path == "/stats":
+            self._send(200, self.standin.snapshot())
+        elif path.endswith("/models"):
+            models = [{"id": m, "object": "model", "owned_by": "standin"} for m in ("gpt-4o", "gpt-4o-mini")]
+            self._send(200, {"object": "list", "data": models})
+        else:
+            self._send(404, _error(f"unknown path {path}"))
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except Exception:
+            self._send(400, _error("invalid JSON body"))
+            return
+        if not self.path.split("?", 1)[0].rstrip("/").endswith("/chat/completions"):
+            self._send(404, _error(f"unknown path {self.path}"))
+            return
+
+        feature = (self.headers.get(FEATURE_HEADER) or "").strip() or "unknown"
+        status, payload, delay = self.standin.complete(feature, body)
+        if delay:
+            time.sleep(delay)
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self._send(status, payload, headers)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # OpenAI clients keep connections alive; many concurrent users need a deep backlog.
+    request_queue_size = 256
+
+    def __init__(self, address: Tuple[str, int], standin: Standin):
+        super().__init__(address, _Handler)
+        self.standin = standin
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_standin(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    *,
+    latency: Optional[LatencyModel] = None,
+    fixtures: Path = FIXTURES_DIR,
+    error_rate: float = 0.0,
+    error_status: int = 429,
+    cache_ttl_s: float = 300.0,
+    seed: Optional[int] = None,
+) -> StandinServer:
+    """Start the stand-in on a background thread (port 0 = any free port)."""
+    standin = Standin(
+        load_recordings(fixtures),
+        latency or LatencyModel(),
+        error_rate=error_rate,
+        error_status=error_status,
+        cache_ttl_s=cache_ttl_s,
+        seed=seed,
+    )
+    server = StandinServer((host, port), standin)
+    threading.Thread(target=server.serve_forever, name="llm-standin", daemon=True).start()
+    logger.info("LLM stand-in listening on %s (%d recordings)", server.base_url, len(standin.recordings))
+    return server
+
+
+def add_latency_args(ap: argparse.ArgumentParser) -> None:
+    """Latency / fault flags shared with bench_flows.py."""
+    d = LatencyModel()
+    ap.add_argument("--ttft-ms", type=float, default=d.ttft_ms, help="median time to first token")
+    ap.add_argument("--ttft-sigma", type=float, default=d.ttft_sigma, help="lognormal shape (0 = fixed)")
+    ap.add_argument("--tokens-per-s", type=float, default=d.tokens_per_s)
+    ap.add_argument("--tokens-per-s-sd", type=float, default=d.tokens_per_s_sd)
+    ap.add_argument("--time-scale", type=float, default=d.time_scale, help="multiply every delay (0 = instant)")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", type=int, default=429)
+    ap.add_argument("--cache-ttl-s", type=float, default=300.0)
+    ap.add_argument("--seed", type=int, default=None)
+
+
+def latency_from_args(args: argparse.Namespace) -> LatencyModel:
+    return LatencyModel(
+        ttft_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_s=args.tokens_per_s,
+        tokens_per_s_sd=args.tokens_per_s_sd,
+        time_scale=args.time_scale,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="OpenAI-compatible recorded-response stand-in")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    add_latency_args(ap)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    server = start_standin(
+        args.host,
+        args.port,
+        latency=latency_from_args(args),
+        fixtures=args.fixtures,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        cache_ttl_s=args.cache_ttl_s,
+        seed=args.seed,
+    )
+    print(f"OPENAI_BASE_URL={server.base_url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -81,9 +81,12 @@ def _cost(input_toks: int, output_toks: int, deep: bool) -> Dict[str, float]:
 
 
 def _truncate(text: str, max_chars: int = MAX_INPUT_CHARS) -> str:
+    # Budgeted in tokens (max_chars / 4) after cheap whitespace/duplicate compaction.
     if not text:
         return ""
-    return text if len(text) <= max_chars else text[:max_chars]
+    from modules.common.prompt_budget import compact_text, fit_to_tokens
+
+    return fit_to_tokens(compact_text(text), max(1, max_chars // 4))
 
 
 def _call_openai(
@@ -146,16 +149,11 @@ def _call_openai(
 
 
 def extract_text_from_file(file_path: str) -> str:
-    p = (file_path or "").lower()
+    # Bounded (time/page/char budgets) and digest-cached; see modules/resume/utils.py
     try:
-        if p.endswith(".pdf") and PdfReader:
-            reader = PdfReader(file_path)
-            return "\n".join((page.extract_text() or "") for page in reader.pages)
-        if p.endswith(".docx") and Document:
-            doc = Document(file_path)
-            return "\n".join(par.text for par in doc.paragraphs)
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        from modules.resume.utils import extract_text_from_path
+
+        return extract_text_from_path(file_path)
     except Exception as e:  # pragma: no cover
         logger.error(f"file parse failed {file_path}: {e}")
         return ""
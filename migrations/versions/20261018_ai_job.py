@@ -0,0 +1,75 @@
+"""ai_job table for background AI runs (idempotent)
+
+Revision ID: 20261018_ai_job
+Revises: 20261018_llm_batch
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_ai_job"
+down_revision: Union[str, Sequence[str], None] = "20261018_llm_batch"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "ai_job" not in tables:
+        op.create_table(
+            "ai_job",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("user.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("kind", sa.String(length=40), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default="queued"),
+            sa.Column("feature_key", sa.String(length=64), nullable=False),
+            sa.Column("currency", sa.String(length=10), nullable=False, server_default="silver"),
+            sa.Column("amount", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("run_id", sa.String(length=64), nullable=True),
+            sa.Column("refunded", sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column("rq_job_id", sa.String(length=64), nullable=True),
+            sa.Column("args_json", sa.Text(), nullable=False, server_default="{}"),
+            sa.Column("result_json", sa.Text(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("record_id", sa.Integer(), nullable=True),
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_ai_job_user_id", "ai_job", ["user_id"])
+        op.create_index("ix_ai_job_kind", "ai_job", ["kind"])
+        op.create_index("ix_ai_job_status", "ai_job", ["status"])
+        op.create_index("ix_ai_job_rq_job_id", "ai_job", ["rq_job_id"])
+        op.create_index("ix_ai_job_user_created", "ai_job", ["user_id", "created_at"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "ai_job" in tables:
+        op.drop_table("ai_job")
@@ -0,0 +1,137 @@
+"""compress write-once AI blobs (dream plan_json, coach plan_json, jobpack
+jd_text) into header-tagged zlib/zstd bytes; TOAST lz4 for JSONB payloads
+on Postgres (idempotent, resumable)
+
+Revision ID: 20261018_compressed_blobs
+Revises: 20261018_jsonb_payloads
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+from modules.common import blobcodec
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_compressed_blobs"
+down_revision: Union[str, Sequence[str], None] = "20261018_jsonb_payloads"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column) stored through models.CompressedText
+BLOBS = [
+    ("dream_plan_snapshot", "plan_json"),
+    ("coach_saved_plan", "plan_json"),
+    ("jobpack_report", "jd_text"),
+]
+# JSONB payloads stay queryable; Postgres compresses them itself
+TOAST_LZ4 = [
+    ("jobpack_report", "analysis"),
+    ("skillmap_snapshot", "skills_json"),
+    ("internship_record", "results_json"),
+    ("portfolio_idea_run", "suggestions_json"),
+]
+BATCH = 200
+
+
+def _rewrite(bind, table: str, column: str, convert):
+    """
+    Keyset-paged pass applying convert(value) -> new value or None (skip).
+    Rows already in the target form are skipped, so an interrupted run can
+    simply be repeated.
+    """
+    # untyped: values go to/come from the driver as-is (str, bytes or memoryview)
+    t = sa.table(table, sa.column("id", sa.Integer), sa.column(column))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(t.c.id, t.c[column]).where(t.c.id > last_id).order_by(t.c.id).limit(BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        for rid, value in rows:
+            last_id = rid
+            new = convert(value)
+            if new is not None:
+                bind.execute(sa.update(t).where(t.c.id == rid).values({column: new}))
+
+
+def _compress(value):
+    if value is None or blobcodec.is_encoded(value):
+        return None
+    return blobcodec.encode(blobcodec.decode(value))
+
+
+def _decompress_to_bytes(value):
+    # Postgres: still bytea here, converted to text by the ALTER below
+    if not blobcodec.is_encoded(value):
+        return None
+    return blobcodec.decode(value).encode("utf-8")
+
+
+def _decompress_to_text(value):
+    if not blobcodec.is_encoded(value):
+        return None
+    return blobcodec.decode(value)
+
+
+def _has_lz4(bind) -> bool:
+    try:
+        row = bind.execute(
+            sa.text("SELECT enumvals::text FROM pg_settings WHERE name = 'default_toast_compression'")
+        ).first()
+    except Exception:
+        return False
+    return bool(row and "lz4" in (row[0] or ""))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+    is_pg = bind.dialect.name == "postgresql"
+
+    for table, column in BLOBS:
+        if table not in tables:
+            continue
+        cols = {c["name"]: c for c in inspector.get_columns(table)}
+        if column not in cols:
+            continue
+        if is_pg and not isinstance(cols[column]["type"], sa.LargeBinary):
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE bytea "
+                f"USING convert_to({column}::text, 'UTF8')"
+            )
+        # SQLite keeps the declared TEXT affinity; BLOB values are stored as-is
+        _rewrite(bind, table, column, _compress)
+
+    if is_pg and _has_lz4(bind):
+        for table, column in TOAST_LZ4:
+            if table in tables:
+                op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET COMPRESSION lz4")
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+    is_pg = bind.dialect.name == "postgresql"
+
+    for table, column in BLOBS:
+        if table not in tables:
+            continue
+        cols = {c["name"]: c for c in inspector.get_columns(table)}
+        if column not in cols:
+            continue
+        _rewrite(bind, table, column, _decompress_to_bytes if is_pg else _decompress_to_text)
+        if is_pg and isinstance(cols[column]["type"], sa.LargeBinary):
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE text "
+                f"USING convert_from({column}, 'UTF8')"
+            )
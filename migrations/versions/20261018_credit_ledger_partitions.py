@@ -0,0 +1,185 @@
+"""credit_daily_rollup (backfilled from the ledger) and, on Postgres,
+credit_transaction as a monthly range-partitioned table (idempotent)
+
+Revision ID: 20261018_credit_ledger_partitions
+Revises: 20261018_retention_archive
+Create Date: 2026-10-18
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+from modules.credits.ledger import (
+    LEDGER_DEFAULT_PARTITION,
+    LEDGER_PARTITION_MONTHS_AHEAD,
+    add_months,
+    is_partitioned,
+    month_start,
+    partition_name,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_credit_ledger_partitions"
+down_revision: Union[str, Sequence[str], None] = "20261018_retention_archive"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH = 5000
+OLD = "credit_transaction_unpartitioned"
+
+# (name, columns) recreated on the partitioned parent (cascade to partitions)
+LEDGER_INDEXES = [
+    ("ix_credit_transaction_user_id", "user_id"),
+    ("ix_credit_transaction_university_id", "university_id"),
+    ("ix_credit_transaction_feature", "feature"),
+    ("ix_credit_transaction_tx_type", "tx_type"),
+    ("ix_credit_transaction_run_id", "run_id"),
+    ("ix_credit_transaction_created_at", "created_at"),
+]
+
+
+def _create_rollup(bind):
+    op.create_table(
+        "credit_daily_rollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("wallet_type", sa.String(length=32), nullable=False),
+        sa.Column("wallet_id", sa.Integer(), nullable=False),
+        sa.Column("currency", sa.String(length=16), nullable=False),
+        sa.Column("tx_type", sa.String(length=32), nullable=False),
+        sa.Column("amount", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("tx_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.UniqueConstraint(
+            "day", "wallet_type", "wallet_id", "currency", "tx_type",
+            name="uq_credit_daily_rollup_key",
+        ),
+    )
+    op.create_index(
+        "ix_credit_daily_rollup_wallet_day", "credit_daily_rollup", ["wallet_type", "wallet_id", "day"]
+    )
+    op.create_index("ix_credit_daily_rollup_day", "credit_daily_rollup", ["day"])
+
+
+def _backfill_rollup(bind):
+    """One GROUP BY pass over the ledger (same wallet keys as models._rollup_credit_transaction)."""
+    tx = sa.table(
+        "credit_transaction",
+        sa.column("user_id", sa.Integer),
+        sa.column("university_id", sa.Integer),
+        sa.column("wallet_type", sa.String),
+        sa.column("currency", sa.String),
+        sa.column("tx_type", sa.String),
+        sa.column("amount", sa.Integer),
+        sa.column("created_at", sa.DateTime),
+    )
+    rollup = sa.table(
+        "credit_daily_rollup",
+        *[sa.column(c) for c in ("day", "wallet_type", "wallet_id", "currency", "tx_type", "amount", "tx_count")],
+    )
+    is_uni = sa.and_(tx.c.wallet_type == "university", tx.c.university_id.isnot(None))
+    day = sa.cast(tx.c.created_at, sa.Date) if bind.dialect.name == "postgresql" else sa.func.date(tx.c.created_at)
+    wallet_type = sa.case((is_uni, sa.literal("university")), else_=sa.literal("personal"))
+    wallet_id = sa.case((is_uni, tx.c.university_id), else_=tx.c.user_id)
+    sel = sa.select(
+        day, wallet_type, wallet_id, tx.c.currency, tx.c.tx_type,
+        sa.func.sum(tx.c.amount), sa.func.count(),
+    ).group_by(day, wallet_type, wallet_id, tx.c.currency, tx.c.tx_type)
+    bind.execute(
+        rollup.insert().from_select(
+            ["day", "wallet_type", "wallet_id", "currency", "tx_type", "amount", "tx_count"], sel
+        )
+    )
+
+
+def _partition(bind):
+    """Swap credit_transaction for a partitioned copy with the same rows and ids."""
+    seq = bind.execute(sa.text("SELECT pg_get_serial_sequence('credit_transaction', 'id')")).scalar()
+    first = bind.execute(sa.text("SELECT min(created_at) FROM credit_transaction")).scalar()
+
+    op.execute(f"ALTER TABLE credit_transaction RENAME TO {OLD}")
+    op.execute(
+        f"CREATE TABLE credit_transaction (LIKE {OLD} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+    if seq:
+        # keep the id sequence when the old table is dropped
+        op.execute(f"ALTER SEQUENCE {seq} OWNED BY credit_transaction.id")
+    op.execute(f"CREATE TABLE {LEDGER_DEFAULT_PARTITION} PARTITION OF credit_transaction DEFAULT")
+
+    month = month_start(first.date() if first else date.today())
+    last = add_months(month_start(date.today()), LEDGER_PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF credit_transaction "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    lo, hi = bind.execute(sa.text(f"SELECT min(id), max(id) FROM {OLD}")).first()
+    if lo is not None:
+        for start in range(lo, hi + 1, BATCH):
+            bind.execute(
+                sa.text(f"INSERT INTO credit_transaction SELECT * FROM {OLD} WHERE id >= :a AND id < :b"),
+                {"a": start, "b": start + BATCH},
+            )
+    op.execute(f"DROP TABLE {OLD}")
+
+    # the partition key must be part of the primary key
+    op.execute("ALTER TABLE credit_transaction ADD CONSTRAINT credit_transaction_pkey PRIMARY KEY (id, created_at)")
+    _add_foreign_keys()
+    for name, col in LEDGER_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON credit_transaction ({col})")
+
+
+def _add_foreign_keys():
+    op.execute(
+        'ALTER TABLE credit_transaction ADD CONSTRAINT credit_transaction_user_id_fkey '
+        'FOREIGN KEY (user_id) REFERENCES "user"(id) ON DELETE CASCADE'
+    )
+    op.execute(
+        "ALTER TABLE credit_transaction ADD CONSTRAINT credit_transaction_university_id_fkey "
+        "FOREIGN KEY (university_id) REFERENCES university(id) ON DELETE SET NULL"
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+    if "credit_transaction" not in tables:
+        return
+
+    if "credit_daily_rollup" not in tables:
+        _create_rollup(bind)
+        _backfill_rollup(bind)
+
+    if bind.dialect.name == "postgresql" and not is_partitioned(bind):
+        _partition(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if bind.dialect.name == "postgresql" and "credit_transaction" in tables and is_partitioned(bind):
+        seq = bind.execute(sa.text("SELECT pg_get_serial_sequence('credit_transaction', 'id')")).scalar()
+        op.execute(
+            f"CREATE TABLE {OLD} (LIKE credit_transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        op.execute(f"INSERT INTO {OLD} SELECT * FROM credit_transaction")
+        if seq:
+            op.execute(f"ALTER SEQUENCE {seq} OWNED BY {OLD}.id")
+        op.execute("DROP TABLE credit_transaction CASCADE")  # partitions go with it
+        op.execute(f"ALTER TABLE {OLD} RENAME TO credit_transaction")
+        op.execute("ALTER TABLE credit_transaction ADD CONSTRAINT credit_transaction_pkey PRIMARY KEY (id)")
+        _add_foreign_keys()
+        for name, col in LEDGER_INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON credit_transaction ({col})")
+
+    if "credit_daily_rollup" in tables:
+        op.drop_table("credit_daily_rollup")
@@ -0,0 +1,136 @@
+"""status/progress/job_id/error/updated_at columns on jobpack_report and
+dream_plan_snapshot, backfilled from the _status keys in their JSON (idempotent)
+
+Revision ID: 20261018_job_status_columns
+Revises: 20261018_ai_job
+Create Date: 2026-10-18
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_job_status_columns"
+down_revision: Union[str, Sequence[str], None] = "20261018_ai_job"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> column holding the JSON blob that used to carry _status
+TABLES = {
+    "jobpack_report": "analysis",
+    "dream_plan_snapshot": "plan_json",
+}
+STATUSES = ("queued", "processing", "completed", "failed")
+BATCH = 500
+
+
+def _columns():
+    return [
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="completed"),
+        sa.Column("progress", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("job_id", sa.String(length=64), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def _backfill(bind, table: str, blob_col: str):
+    """Copy _status/_job_id/error out of the JSON blobs, keyset-paged by id."""
+    t = sa.table(
+        table,
+        sa.column("id", sa.Integer),
+        sa.column(blob_col, sa.Text),
+        sa.column("created_at", sa.DateTime),
+        sa.column("status", sa.String),
+        sa.column("progress", sa.Integer),
+        sa.column("job_id", sa.String),
+        sa.column("error", sa.Text),
+        sa.column("updated_at", sa.DateTime),
+    )
+    blob = t.c[blob_col]
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(t.c.id, blob, t.c.created_at)
+            .where(t.c.id > last_id)
+            .order_by(t.c.id)
+            .limit(BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        for rid, raw, created_at in rows:
+            last_id = rid
+            values = {"updated_at": created_at}
+            data = {}
+            if raw and "_status" in raw:
+                try:
+                    data = json.loads(raw)
+                except Exception:
+                    data = {}
+            if isinstance(data, dict):
+                status = str(data.get("_status") or "completed").lower()
+                if status in STATUSES:
+                    values["status"] = status
+                    values["progress"] = 100 if status in ("completed", "failed") else 0
+                meta = data.get("_meta") if isinstance(data.get("_meta"), dict) else {}
+                job_id = data.get("_job_id") or meta.get("job_id")
+                if job_id:
+                    values["job_id"] = str(job_id)[:64]
+                if status == "failed":
+                    values["error"] = str(data.get("_error") or data.get("error") or "")[:2000] or None
+            if "status" not in values:
+                values["progress"] = 100
+            bind.execute(sa.update(t).where(t.c.id == rid).values(**values))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, blob_col in TABLES.items():
+        if table not in tables:
+            continue
+        existing = [col["name"] for col in inspector.get_columns(table)]
+        missing = [c for c in _columns() if c.name not in existing]
+        if missing:
+            with op.batch_alter_table(table) as batch_op:
+                for col in missing:
+                    batch_op.add_column(col)
+
+        indexes = {ix["name"] for ix in inspector.get_indexes(table)}
+        for col in ("status", "job_id"):
+            name = f"ix_{table}_{col}"
+            if name not in indexes:
+                op.create_index(name, table, [col])
+
+        if "status" not in existing:
+            _backfill(bind, table, blob_col)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table in TABLES:
+        if table not in tables:
+            continue
+        indexes = {ix["name"] for ix in inspector.get_indexes(table)}
+        for col in ("status", "job_id"):
+            name = f"ix_{table}_{col}"
+            if name in indexes:
+                op.drop_index(name, table_name=table)
+
+        existing = [col["name"] for col in inspector.get_columns(table)]
+        drop = [c.name for c in _columns() if c.name in existing]
+        if drop:
+            with op.batch_alter_table(table) as batch_op:
+                for name in drop:
+                    batch_op.drop_column(name)
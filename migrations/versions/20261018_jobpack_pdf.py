@@ -0,0 +1,55 @@
+"""jobpack_pdf: cached Deep Evaluation PDFs (idempotent)
+
+Revision ID: 20261018_jobpack_pdf
+Revises: 20261018_credit_ledger_partitions
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_jobpack_pdf"
+down_revision: Union[str, Sequence[str], None] = "20261018_credit_ledger_partitions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "jobpack_pdf" not in tables:
+        op.create_table(
+            "jobpack_pdf",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "report_id",
+                sa.Integer(),
+                sa.ForeignKey("jobpack_report.id", ondelete="CASCADE"),
+                nullable=False,
+                unique=True,
+            ),
+            sa.Column("analysis_digest", sa.String(length=64), nullable=False),
+            sa.Column("template_version", sa.String(length=16), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("pdf", sa.LargeBinary(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "jobpack_pdf" in tables:
+        op.drop_table("jobpack_pdf")
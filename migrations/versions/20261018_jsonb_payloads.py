@@ -0,0 +1,107 @@
+"""AI payload columns -> JSONB (+ GIN jsonb_path_ops) on Postgres (idempotent)
+
+The payload columns stay TEXT on SQLite (models.JSONText); this revision is
+a no-op there.
+
+Revision ID: 20261018_jsonb_payloads
+Revises: 20261018_list_summary_columns
+Create Date: 2026-10-18
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_jsonb_payloads"
+down_revision: Union[str, Sequence[str], None] = "20261018_list_summary_columns"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, nullable, GIN index name or None)
+PAYLOADS = [
+    ("jobpack_report", "analysis", True, "ix_jobpack_report_analysis_gin"),
+    ("skillmap_snapshot", "skills_json", True, "ix_skillmap_snapshot_skills_gin"),
+    ("internship_record", "results_json", True, "ix_internship_record_results_gin"),
+    ("dream_plan_snapshot", "plan_json", False, None),
+    ("portfolio_idea_run", "suggestions_json", True, None),
+]
+BATCH = 500
+
+
+def _clean(bind, table: str, column: str, nullable: bool):
+    """
+    Make every value castable to jsonb: blank -> NULL (or '{}'), text that
+    is not JSON -> a JSON string (what models.JSONText writes for it).
+    """
+    t = sa.table(table, sa.column("id", sa.Integer), sa.column(column, sa.Text))
+    col = t.c[column]
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(t.c.id, col).where(t.c.id > last_id).order_by(t.c.id).limit(BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        for rid, raw in rows:
+            last_id = rid
+            if raw is None:
+                continue
+            if not raw.strip():
+                fixed = None if nullable else "{}"
+            else:
+                try:
+                    json.loads(raw)
+                    continue
+                except ValueError:
+                    fixed = json.dumps(raw)
+            bind.execute(sa.update(t).where(t.c.id == rid).values({column: fixed}))
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, column, nullable, gin in PAYLOADS:
+        if table not in tables:
+            continue
+        cols = {c["name"]: c for c in inspector.get_columns(table)}
+        if column not in cols:
+            continue
+        if not isinstance(cols[column]["type"], JSONB):
+            _clean(bind, table, column, nullable)
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb"
+            )
+        if gin and gin not in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS {gin} ON {table} USING gin ({column} jsonb_path_ops)"
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, column, _nullable, gin in PAYLOADS:
+        if table not in tables:
+            continue
+        if gin:
+            op.execute(f"DROP INDEX IF EXISTS {gin}")
+        cols = {c["name"]: c for c in inspector.get_columns(table)}
+        if column in cols and isinstance(cols[column]["type"], JSONB):
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE text USING {column}::text"
+            )
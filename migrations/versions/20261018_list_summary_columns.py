@@ -0,0 +1,146 @@
+"""summary columns for history/list pages, backfilled from the JSON blobs
+(jobpack_report.ats_score/report_tier, internship_record.mode,
+skillmap_snapshot.input_preview, portfolio_idea_run.idea_titles) (idempotent)
+
+Revision ID: 20261018_list_summary_columns
+Revises: 20261018_job_status_columns
+Create Date: 2026-10-18
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_list_summary_columns"
+down_revision: Union[str, Sequence[str], None] = "20261018_job_status_columns"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH = 500
+
+
+def _jobpack_summary(raw):
+    data = json.loads(raw) if raw else {}
+    if not isinstance(data, dict):
+        return {}
+    try:
+        score = int(float(data.get("ats_score")))
+    except (TypeError, ValueError):
+        score = None
+    return {
+        "ats_score": score,
+        "report_tier": (str(data.get("report_tier") or "")[:64]) or None,
+    }
+
+
+def _internship_summary(raw):
+    data = json.loads(raw) if raw else {}
+    mode = data.get("mode") if isinstance(data, dict) else None
+    return {"mode": str(mode)[:16] if mode else None}
+
+
+def _skillmap_summary(raw):
+    return {"input_preview": (raw or "")[:160] or None}
+
+
+def _idea_titles(raw):
+    data = json.loads(raw) if raw else []
+    titles = []
+    if isinstance(data, list):
+        for it in data[:3]:
+            if isinstance(it, dict) and it.get("title"):
+                titles.append(str(it["title"])[:120])
+    return {"idea_titles": titles}
+
+
+# table -> (source column, [(new column, type)], summary fn)
+SUMMARIES = {
+    "jobpack_report": (
+        "analysis",
+        [
+            ("ats_score", sa.Integer()),
+            ("report_tier", sa.String(length=64)),
+        ],
+        _jobpack_summary,
+    ),
+    "internship_record": (
+        "results_json",
+        [("mode", sa.String(length=16))],
+        _internship_summary,
+    ),
+    "skillmap_snapshot": (
+        "input_text",
+        [("input_preview", sa.String(length=200))],
+        _skillmap_summary,
+    ),
+    "portfolio_idea_run": (
+        "suggestions_json",
+        [("idea_titles", sa.JSON())],
+        _idea_titles,
+    ),
+}
+
+
+def _backfill(bind, table: str, source: str, columns, fn):
+    """Keyset-paged by id so long tables are read a batch at a time."""
+    t = sa.table(
+        table,
+        sa.column("id", sa.Integer),
+        sa.column(source, sa.Text),
+        *[sa.column(name, type_) for name, type_ in columns],
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(t.c.id, t.c[source]).where(t.c.id > last_id).order_by(t.c.id).limit(BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        for rid, raw in rows:
+            last_id = rid
+            try:
+                values = fn(raw)
+            except Exception:
+                continue
+            if values:
+                bind.execute(sa.update(t).where(t.c.id == rid).values(**values))
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, (source, columns, fn) in SUMMARIES.items():
+        if table not in tables:
+            continue
+        existing = [col["name"] for col in inspector.get_columns(table)]
+        missing = [(name, type_) for name, type_ in columns if name not in existing]
+        if not missing:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for name, type_ in missing:
+                batch_op.add_column(sa.Column(name, type_, nullable=True))
+        _backfill(bind, table, source, columns, fn)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, (_source, columns, _fn) in SUMMARIES.items():
+        if table not in tables:
+            continue
+        existing = [col["name"] for col in inspector.get_columns(table)]
+        drop = [name for name, _type in columns if name in existing]
+        if drop:
+            with op.batch_alter_table(table) as batch_op:
+                for name in drop:
+                    batch_op.drop_column(name)
@@ -0,0 +1,113 @@
+"""llm_batch + llm_batch_item tables for the batch LLM engine (idempotent)
+
+Revision ID: 20261018_llm_batch
+Revises: 20261018_user_profile_version
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_llm_batch"
+down_revision: Union[str, Sequence[str], None] = "20261018_user_profile_version"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "llm_batch" not in tables:
+        op.create_table(
+            "llm_batch",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("kind", sa.String(length=40), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+            sa.Column("backend", sa.String(length=20), nullable=False, server_default="openai"),
+            sa.Column("provider_batch_id", sa.String(length=100), nullable=True),
+            sa.Column("input_file_id", sa.String(length=100), nullable=True),
+            sa.Column("output_file_id", sa.String(length=100), nullable=True),
+            sa.Column("error_file_id", sa.String(length=100), nullable=True),
+            sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("applied", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("params", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column(
+                "created_by_user_id",
+                sa.Integer(),
+                sa.ForeignKey("user.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.Column("submitted_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_llm_batch_kind", "llm_batch", ["kind"])
+        op.create_index("ix_llm_batch_status", "llm_batch", ["status"])
+        op.create_index("ix_llm_batch_provider_batch_id", "llm_batch", ["provider_batch_id"])
+
+    if "llm_batch_item" not in tables:
+        op.create_table(
+            "llm_batch_item",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "batch_id",
+                sa.Integer(),
+                sa.ForeignKey("llm_batch.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("custom_id", sa.String(length=64), nullable=False),
+            sa.Column(
+                "user_id",
+                sa.Integer(),
+                sa.ForeignKey("user.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+            sa.Column("args_json", sa.Text(), nullable=False, server_default="{}"),
+            sa.Column("request_json", sa.Text(), nullable=False, server_default="{}"),
+            sa.Column("response_json", sa.Text(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.UniqueConstraint("batch_id", "custom_id", name="uq_llm_batch_item_custom_id"),
+        )
+        op.create_index("ix_llm_batch_item_batch_id", "llm_batch_item", ["batch_id"])
+        op.create_index("ix_llm_batch_item_user_id", "llm_batch_item", ["user_id"])
+        op.create_index("ix_llm_batch_item_status", "llm_batch_item", ["status"])
+        op.create_index(
+            "ix_llm_batch_item_batch_status", "llm_batch_item", ["batch_id", "status"]
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = inspect(bind).get_table_names()
+
+    if "llm_batch_item" in tables:
+        op.drop_table("llm_batch_item")
+    if "llm_batch" in tables:
+        op.drop_table("llm_batch")
@@ -0,0 +1,54 @@
+"""portfolio_page: stored sanitized HTML + updated_at for the cached public view (idempotent)
+
+Revision ID: 20261018_portfolio_html
+Revises: 20261018_jobpack_pdf
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_portfolio_html"
+down_revision: Union[str, Sequence[str], None] = "20261018_jobpack_pdf"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ("content_html", sa.Text()),
+    ("html_version", sa.String(length=16)),
+    ("updated_at", sa.DateTime()),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = inspect(bind)
+    if "portfolio_page" not in insp.get_table_names():
+        return
+
+    existing = {c["name"] for c in insp.get_columns("portfolio_page")}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            op.add_column("portfolio_page", sa.Column(name, type_, nullable=True))
+
+    # content_html is filled on first public view (it needs the markdown renderer)
+    op.execute("UPDATE portfolio_page SET updated_at = created_at WHERE updated_at IS NULL")
+
+
+def downgrade():
+    bind = op.get_bind()
+    insp = inspect(bind)
+    if "portfolio_page" not in insp.get_table_names():
+        return
+
+    existing = {c["name"] for c in insp.get_columns("portfolio_page")}
+    with op.batch_alter_table("portfolio_page") as batch:
+        for name, _ in reversed(COLUMNS):
+            if name in existing:
+                batch.drop_column(name)
@@ -0,0 +1,87 @@
+"""resume_asset.content_hash + user.current_resume_id pointer (idempotent)
+
+Revision ID: 20261018_resume_content_hash
+Revises: 1c34256633b2
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_resume_content_hash"
+down_revision: Union[str, Sequence[str], None] = "1c34256633b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    ra_cols = [c["name"] for c in inspector.get_columns("resume_asset")]
+    ra_idx = [i["name"] for i in inspector.get_indexes("resume_asset")]
+    user_cols = [c["name"] for c in inspector.get_columns("user")]
+
+    if "content_hash" not in ra_cols:
+        with op.batch_alter_table("resume_asset") as batch_op:
+            batch_op.add_column(sa.Column("content_hash", sa.String(64), nullable=True))
+    if "ix_resume_asset_content_hash" not in ra_idx:
+        op.create_index("ix_resume_asset_content_hash", "resume_asset", ["content_hash"])
+    if "ix_resume_asset_user_hash" not in ra_idx:
+        op.create_index("ix_resume_asset_user_hash", "resume_asset", ["user_id", "content_hash"])
+
+    if "current_resume_id" not in user_cols:
+        with op.batch_alter_table("user") as batch_op:
+            batch_op.add_column(sa.Column("current_resume_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(
+                "fk_user_current_resume_id",
+                "resume_asset",
+                ["current_resume_id"],
+                ["id"],
+                ondelete="SET NULL",
+            )
+
+    # Backfill: point every user at their latest resume (same ordering the
+    # features used to compute on every request).
+    print("Backfilling user.current_resume_id ...")
+    op.execute(
+        sa.text(
+            """
+            UPDATE "user" SET current_resume_id = (
+                SELECT ra.id FROM resume_asset ra
+                WHERE ra.user_id = "user".id
+                ORDER BY ra.created_at DESC, ra.id DESC
+                LIMIT 1
+            )
+            WHERE current_resume_id IS NULL
+            """
+        )
+    )
+    print("✓ current_resume_id backfilled")
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    user_cols = [c["name"] for c in inspector.get_columns("user")]
+    if "current_resume_id" in user_cols:
+        with op.batch_alter_table("user") as batch_op:
+            batch_op.drop_constraint("fk_user_current_resume_id", type_="foreignkey")
+            batch_op.drop_column("current_resume_id")
+
+    ra_idx = [i["name"] for i in inspector.get_indexes("resume_asset")]
+    if "ix_resume_asset_user_hash" in ra_idx:
+        op.drop_index("ix_resume_asset_user_hash", table_name="resume_asset")
+    if "ix_resume_asset_content_hash" in ra_idx:
+        op.drop_index("ix_resume_asset_content_hash", table_name="resume_asset")
+
+    ra_cols = [c["name"] for c in inspector.get_columns("resume_asset")]
+    if "content_hash" in ra_cols:
+        with op.batch_alter_table("resume_asset") as batch_op:
+            batch_op.drop_column("content_hash")
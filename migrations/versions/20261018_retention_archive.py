@@ -0,0 +1,81 @@
+"""archived_record table for the retention engine, plus indexes on the
+columns its policies age rows by (idempotent)
+
+Revision ID: 20261018_retention_archive
+Revises: 20261018_compressed_blobs
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_retention_archive"
+down_revision: Union[str, Sequence[str], None] = "20261018_compressed_blobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column) scanned by modules/retention policies
+AGE_INDEXES = [
+    ("otp_request", "expires_at"),
+    ("jobpack_report", "created_at"),
+    ("skillmap_snapshot", "created_at"),
+    ("dream_plan_snapshot", "created_at"),
+    ("admin_action_log", "created_at"),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    if "archived_record" not in tables:
+        op.create_table(
+            "archived_record",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("source_table", sa.String(length=64), nullable=False),
+            sa.Column("source_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column(
+                "archived_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("CURRENT_TIMESTAMP"),
+            ),
+            sa.Column("payload", sa.LargeBinary(), nullable=False),
+            sa.UniqueConstraint("source_table", "source_id", name="uq_archived_record_source"),
+        )
+        op.create_index("ix_archived_record_user_id", "archived_record", ["user_id"])
+        op.create_index(
+            "ix_archived_record_table_created", "archived_record", ["source_table", "created_at"]
+        )
+
+    for table, column in AGE_INDEXES:
+        if table not in tables:
+            continue
+        name = f"ix_{table}_{column}"
+        if name not in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    for table, column in AGE_INDEXES:
+        if table not in tables:
+            continue
+        name = f"ix_{table}_{column}"
+        if name in {ix["name"] for ix in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
+
+    if "archived_record" in tables:
+        op.drop_table("archived_record")
@@ -0,0 +1,41 @@
+"""user.profile_version counter for cached profile snapshots (idempotent)
+
+Revision ID: 20261018_user_profile_version
+Revises: 20261018_resume_content_hash
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261018_user_profile_version"
+down_revision: Union[str, Sequence[str], None] = "20261018_resume_content_hash"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columns = [col["name"] for col in inspector.get_columns("user")]
+    if "profile_version" not in columns:
+        with op.batch_alter_table("user") as batch_op:
+            batch_op.add_column(
+                sa.Column("profile_version", sa.Integer(), nullable=False, server_default="0")
+            )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columns = [col["name"] for col in inspector.get_columns("user")]
+    if "profile_version" in columns:
+        with op.batch_alter_table("user") as batch_op:
+            batch_op.drop_column("profile_version")
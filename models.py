@@ -1,16 +1,75 @@
+import json
 from datetime import date, datetime
 
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Index, UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint, event, inspect, select
+from sqlalchemy.types import TypeDecorator
 from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Date, ForeignKey, JSON, LargeBinary
+from sqlalchemy.orm import deferred, object_session, relationship
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from modules.common import blobcodec
 
 db = SQLAlchemy()
 
 
+class JSONText(TypeDecorator):
+    """
+    AI result payload column. Python code keeps reading/writing JSON *text*
+    (json.loads / json.dumps as before); storage is JSONB on Postgres, so
+    analytics can query it in SQL (modules/common/jsonsql.py), and TEXT on
+    SQLite.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import JSONB
+
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name != "postgresql" or not isinstance(value, str):
+            return value
+        if not value.strip():
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value  # not JSON: stored as a JSON string, read back unchanged
+
+    def process_result_value(self, value, dialect):
+        if dialect.name != "postgresql" or value is None or isinstance(value, str):
+            return value
+        return json.dumps(value, ensure_ascii=False)
+
+
+class CompressedText(TypeDecorator):
+    """
+    Large write-once text (Dream/Coach plan JSON, JD text): a str in Python,
+    stored zlib/zstd-compressed with a small header (modules/common/blobcodec.py).
+    Rows written before compression are read back unchanged.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or blobcodec.is_encoded(value):
+            return value
+        return blobcodec.encode(value)
+
+    def process_result_value(self, value, dialect):
+        return blobcodec.decode(value)
+
+
 # ---------------------------------------------------------------------
 # Tenancy
 # ---------------------------------------------------------------------
@@ -218,6 +277,82 @@ class CreditTransaction(db.Model):
         )
 
 
+class CreditDailyRollup(db.Model):
+    """
+    Per-wallet, per-day totals of CreditTransaction, kept in step by the
+    after_insert listener below (same transaction as the ledger row).
+    Usage stats and admin totals sum these instead of the ledger, so
+    they stay O(days) and survive ledger retention.
+
+    wallet_type "university" -> wallet_id = university.id
+    wallet_type "personal"   -> wallet_id = user.id
+    """
+    __tablename__ = "credit_daily_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # UTC
+    wallet_type = db.Column(db.String(32), nullable=False)
+    wallet_id = db.Column(db.Integer, nullable=False)
+    currency = db.Column(db.String(16), nullable=False)
+    tx_type = db.Column(db.String(32), nullable=False)
+
+    amount = db.Column(db.BigInteger, nullable=False, default=0)
+    tx_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "wallet_type", "wallet_id", "currency", "tx_type",
+            name="uq_credit_daily_rollup_key",
+        ),
+        Index("ix_credit_daily_rollup_wallet_day", "wallet_type", "wallet_id", "day"),
+        Index("ix_credit_daily_rollup_day", "day"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<CreditDailyRollup {self.day} {self.wallet_type}:{self.wallet_id} "
+            f"{self.tx_type} {self.currency}={self.amount}>"
+        )
+
+
+@event.listens_for(CreditTransaction, "after_insert")
+def _rollup_credit_transaction(mapper, connection, target):
+    if target.wallet_type == "university" and target.university_id:
+        wallet_type, wallet_id = "university", target.university_id
+    else:
+        wallet_type, wallet_id = "personal", target.user_id
+    key = {
+        "day": (target.created_at or datetime.utcnow()).date(),
+        "wallet_type": wallet_type,
+        "wallet_id": wallet_id,
+        "currency": target.currency,
+        "tx_type": target.tx_type,
+    }
+    amount = int(target.amount or 0)
+    t = CreditDailyRollup.__table__
+
+    if connection.dialect.name in ("postgresql", "sqlite"):
+        if connection.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(t).values(**key, amount=amount, tx_count=1)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(key),
+                set_={"amount": t.c.amount + stmt.excluded.amount, "tx_count": t.c.tx_count + 1},
+            )
+        )
+        return
+
+    match = [t.c[k] == v for k, v in key.items()]
+    updated = connection.execute(
+        t.update().where(*match).values(amount=t.c.amount + amount, tx_count=t.c.tx_count + 1)
+    )
+    if not updated.rowcount:
+        connection.execute(t.insert().values(**key, amount=amount, tx_count=1))
+
+
 # ---------------------------------------------------------------------
 # Users
 # ---------------------------------------------------------------------
@@ -283,6 +418,23 @@ class User(UserMixin, db.Model):
         index=True,
     )
 
+    # Pointer to the resume the AI features should read (latest upload).
+    # Avoids an ORDER BY created_at DESC LIMIT 1 on resume_asset per feature call.
+    current_resume_id = db.Column(
+        db.Integer,
+        db.ForeignKey(
+            "resume_asset.id",
+            ondelete="SET NULL",
+            use_alter=True,
+            name="fk_user_current_resume_id",
+        ),
+        nullable=True,
+    )
+
+    # Bumped on every profile / resume / project write (see listeners at the
+    # bottom of this module); keys the cross-request profile snapshot cache.
+    profile_version = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # helpers
@@ -342,7 +494,7 @@ class OTPRequest(db.Model):
     email = db.Column(db.String(255), nullable=False, index=True)
     code = db.Column(db.String(6), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     used = db.Column(db.Boolean, nullable=False, default=False)
     ip_address = db.Column(db.String(64), nullable=True)
 
@@ -483,9 +635,17 @@ class PortfolioPage(db.Model):
         nullable=False,
     )
     title = db.Column(db.String(200), nullable=False)
-    content_md = db.Column(db.Text, nullable=True)
+    # Large text columns are deferred: list pages never fetch them, detail
+    # pages load them on first access (one extra SELECT per row).
+    content_md = deferred(db.Column(db.Text, nullable=True))
+    # Sanitized HTML of content_md, written on publish (modules/portfolio/render.py);
+    # html_version records the renderer that produced it.
+    content_html = deferred(db.Column(db.Text, nullable=True))
+    html_version = db.Column(db.String(16), nullable=True)
     is_public = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Last content/visibility change: Last-Modified and ETag of the public view
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=True)
     # NEW: metadata for locking, tier, suggestion_count, timestamps, etc.
     meta_json = db.Column(db.JSON, default=dict)
 
@@ -527,7 +687,9 @@ class PortfolioIdeaRun(db.Model):
     preferred_stack = db.Column(db.JSON, default=list)  # ["Python","Flask","Postgres"]
 
     # Suggestions JSON (same structure that comes back from generate_project_suggestions)
-    suggestions_json = db.Column(db.Text, nullable=True)
+    suggestions_json = deferred(db.Column(JSONText, nullable=True))
+    # Summary for the history page: titles of the first few ideas
+    idea_titles = db.Column(db.JSON, default=list)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
@@ -557,19 +719,71 @@ class JobPackReport(db.Model):
     )
     job_title = db.Column(db.String(200), nullable=True)
     company = db.Column(db.String(200), nullable=True)
-    jd_text = db.Column(db.Text, nullable=True)
-    analysis = db.Column(db.Text, nullable=True)  # JSON as text (SQLite friendly)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Deferred (loaded together on first access): history/admin lists never fetch them
+    jd_text = deferred(db.Column(CompressedText, nullable=True), group="payload")
+    analysis = deferred(
+        db.Column(JSONText, nullable=True), group="payload"
+    )  # JSON text in Python; JSONB on Postgres
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Summary copied out of analysis when the run completes
+    ats_score = db.Column(db.Integer, nullable=True)
+    report_tier = db.Column(db.String(64), nullable=True)
+
+    # Background run state, kept out of the analysis JSON so pollers and
+    # history pages never parse it: queued | processing | completed | failed
+    status = db.Column(
+        db.String(20), nullable=False, default="completed", server_default="completed", index=True
+    )
+    progress = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # 0-100
+    job_id = db.Column(db.String(64), nullable=True, index=True)  # RQ job id
+    error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True
+    )
 
     user = db.relationship(
         "User",
         backref=db.backref("jobpack_reports", lazy=True, cascade="all, delete-orphan"),
     )
 
+    __table_args__ = (
+        Index(
+            "ix_jobpack_report_analysis_gin",
+            "analysis",
+            postgresql_using="gin",
+            postgresql_ops={"analysis": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<JobPackReport {self.id} u={self.user_id} {self.job_title}>"
 
 
+class JobPackPdf(db.Model):
+    """
+    Rendered Deep Evaluation PDF for one report (modules/jobpack/pdf.py).
+    Valid while analysis_digest/template_version match the report.
+    """
+    __tablename__ = "jobpack_pdf"
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(
+        db.Integer,
+        db.ForeignKey("jobpack_report.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    analysis_digest = db.Column(db.String(64), nullable=False)  # sha256 of analysis
+    template_version = db.Column(db.String(16), nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    pdf = deferred(db.Column(LargeBinary, nullable=False))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<JobPackPdf {self.id} r={self.report_id} v{self.template_version} {self.size}B>"
+
+
 # ---------------------------------------------------------------------
 # Internship Finder (paste-only results)
 # ---------------------------------------------------------------------
@@ -585,7 +799,8 @@ class InternshipRecord(db.Model):
     )
     role = db.Column(db.String(120), nullable=True)
     location = db.Column(db.String(120), nullable=True)
-    results_json = db.Column(db.Text, nullable=True)
+    results_json = deferred(db.Column(JSONText, nullable=True))
+    mode = db.Column(db.String(16), nullable=True)  # "free" | "pro" (history badge)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     user = db.relationship(
@@ -595,6 +810,15 @@ class InternshipRecord(db.Model):
         ),
     )
 
+    __table_args__ = (
+        Index(
+            "ix_internship_record_results_gin",
+            "results_json",
+            postgresql_using="gin",
+            postgresql_ops={"results_json": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<InternshipRecord {self.id} u={self.user_id} {self.role or ''}>"
 
@@ -649,9 +873,10 @@ class SkillMapSnapshot(db.Model):
     source_title = db.Column(
         db.String(200), nullable=True
     )  # e.g., "Backend Engineer @ X"
-    input_text = db.Column(db.Text, nullable=True)  # pasted JD or text
-    skills_json = db.Column(db.Text, nullable=True)  # JSON as text
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    input_text = deferred(db.Column(db.Text, nullable=True))  # pasted JD or text
+    skills_json = deferred(db.Column(JSONText, nullable=True))  # JSON as text (JSONB on Postgres)
+    input_preview = db.Column(db.String(200), nullable=True)  # first 160 chars of input_text
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     user = db.relationship(
         "User",
@@ -660,6 +885,15 @@ class SkillMapSnapshot(db.Model):
         ),
     )
 
+    __table_args__ = (
+        Index(
+            "ix_skillmap_snapshot_skills_gin",
+            "skills_json",
+            postgresql_using="gin",
+            postgresql_ops={"skills_json": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def __repr__(self):
         return f"<SkillMapSnapshot {self.id} u={self.user_id}>"
 
@@ -705,13 +939,21 @@ class ResumeAsset(db.Model):
     )
     filename = db.Column(db.String(255), nullable=True)
     text = db.Column(db.Text, nullable=True)
+    # SHA-256 of the uploaded file bytes; re-uploading the same file reuses the row
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # user.current_resume_id also links these tables, so name the FK explicitly.
     user = db.relationship(
         "User",
+        foreign_keys=[user_id],
         backref=db.backref("resume_assets", lazy=True, cascade="all, delete-orphan"),
     )
 
+    __table_args__ = (
+        db.Index("ix_resume_asset_user_hash", "user_id", "content_hash"),
+    )
+
     def __repr__(self):
         return f"<ResumeAsset {self.id} u={self.user_id} {self.filename or ''}>"
 
@@ -735,13 +977,26 @@ class DreamPlanSnapshot(db.Model):
     # Convenience label for UI, e.g. "Dream Job: Data Analyst, 8–12 LPA"
     plan_title = db.Column(db.String(255), nullable=True)
 
-    # JSON-encoded Dream Plan dictionary (usually the plan_view from dream/routes.py)
-    plan_json = db.Column(db.Text, nullable=False)
+    # JSON-encoded Dream Plan dictionary (usually the plan_view from dream/routes.py),
+    # stored compressed
+    plan_json = deferred(db.Column(CompressedText, nullable=False))
 
     # Copy of meta.inputs_digest (if available) for tying to credit logs / coach sessions
     inputs_digest = db.Column(db.String(128), nullable=True, index=True)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    # Background generation state (see JobPackReport): queued | processing |
+    # completed | failed. plan_json only ever holds the plan itself.
+    status = db.Column(
+        db.String(20), nullable=False, default="completed", server_default="completed", index=True
+    )
+    progress = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # 0-100
+    job_id = db.Column(db.String(64), nullable=True, index=True)  # RQ job id
+    error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True
+    )
 
     user = db.relationship(
         "User",
@@ -1411,7 +1666,7 @@ class AdminActionLog(db.Model):
     # {"before": {...}, "after": {...}, "notes": "..."}
     meta_json = db.Column(db.JSON, nullable=True, default=dict)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     performed_by = db.relationship(
         "User",
@@ -1795,7 +2050,7 @@ class CoachSavedPlan(db.Model):
     )
 
     title = db.Column(db.String(255), nullable=True)
-    plan_json = db.Column(db.Text, nullable=False, default="{}")
+    plan_json = db.Column(CompressedText, nullable=False, default="{}")
     locked_at = db.Column(db.DateTime, nullable=True)
 
     # Legacy only (you hard-delete now)
@@ -1823,3 +2078,264 @@ class CoachSavedPlan(db.Model):
 
     def __repr__(self):
         return f"<CoachSavedPlan {self.id} u={self.user_id} {self.path_type} deleted={self.is_deleted}>"
+
+
+# ---------------------------------------------------------------------
+# LLM batches (bulk / scheduled regeneration, see modules/batch)
+# ---------------------------------------------------------------------
+class LLMBatch(db.Model):
+    __tablename__ = "llm_batch"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # "skillmap" | "coach" | "resume_parse"
+    kind = db.Column(db.String(40), nullable=False, index=True)
+
+    # pending -> submitted -> downloaded -> done  (or failed / cancelled)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)
+
+    # "openai" (Batch API) or "local" (sequential calls, dev/tests)
+    backend = db.Column(db.String(20), nullable=False, default="openai")
+    provider_batch_id = db.Column(db.String(100), nullable=True, index=True)
+    input_file_id = db.Column(db.String(100), nullable=True)
+    output_file_id = db.Column(db.String(100), nullable=True)
+    error_file_id = db.Column(db.String(100), nullable=True)
+
+    # Progress counters (items)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    applied = db.Column(db.Integer, nullable=False, default=0)
+
+    params = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    created_by_user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    submitted_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    items = db.relationship(
+        "LLMBatchItem",
+        backref="batch",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+    )
+
+    def progress(self) -> dict:
+        done = (self.applied or 0) + (self.failed or 0)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total or 0,
+            "completed": self.completed or 0,
+            "failed": self.failed or 0,
+            "applied": self.applied or 0,
+            "percent": int(100 * done / self.total) if self.total else 100,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"<LLMBatch {self.id} {self.kind} {self.status} {self.applied}/{self.total}>"
+
+
+class LLMBatchItem(db.Model):
+    __tablename__ = "llm_batch_item"
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(
+        db.Integer,
+        db.ForeignKey("llm_batch.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    custom_id = db.Column(db.String(64), nullable=False)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # pending -> succeeded -> applied  (or failed)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)
+
+    # Generator kwargs (replayed on apply) and the captured request body
+    args_json = db.Column(db.Text, nullable=False, default="{}")
+    request_json = db.Column(db.Text, nullable=False, default="{}")
+    # Provider response body, stored before apply (checkpoint)
+    response_json = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint("batch_id", "custom_id", name="uq_llm_batch_item_custom_id"),
+        Index("ix_llm_batch_item_batch_status", "batch_id", "status"),
+    )
+
+    def __repr__(self):
+        return f"<LLMBatchItem {self.id} b={self.batch_id} u={self.user_id} {self.status}>"
+
+
+# ---------------------------------------------------------------------
+# Background AI jobs (Skill Mapper, Internships, Referral, Portfolio ideas;
+# see modules/ai_jobs)
+# ---------------------------------------------------------------------
+class AIJob(db.Model):
+    __tablename__ = "ai_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # "skillmap" | "internship" | "referral" | "portfolio_ideas"
+    kind = db.Column(db.String(40), nullable=False, index=True)
+
+    # queued -> processing -> completed  (or failed)
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)
+
+    # Credits reserved before enqueue (refunded once if the job fails)
+    feature_key = db.Column(db.String(64), nullable=False)
+    currency = db.Column(db.String(10), nullable=False, default="silver")
+    amount = db.Column(db.Integer, nullable=False, default=0)
+    run_id = db.Column(db.String(64), nullable=True)
+    refunded = db.Column(db.Boolean, nullable=False, default=False)
+
+    rq_job_id = db.Column(db.String(64), nullable=True, index=True)
+
+    # Handler inputs / output (JSON text)
+    args_json = db.Column(db.Text, nullable=False, default="{}")
+    result_json = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Row the handler persisted (SkillMapSnapshot, InternshipRecord, ...)
+    record_id = db.Column(db.Integer, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ai_job_user_created", "user_id", "created_at"),
+    )
+
+    @property
+    def args(self) -> dict:
+        try:
+            data = json.loads(self.args_json or "{}")
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @property
+    def result(self) -> dict:
+        try:
+            data = json.loads(self.result_json or "{}")
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def __repr__(self):
+        return f"<AIJob {self.id} {self.kind} u={self.user_id} {self.status}>"
+
+
+# ---------------------------------------------------------------------
+# Retention archive (cold rows moved out of hot tables; see modules/retention)
+# ---------------------------------------------------------------------
+class ArchivedRecord(db.Model):
+    __tablename__ = "archived_record"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Where the row came from ("jobpack_report", 1234)
+    source_table = db.Column(db.String(64), nullable=False)
+    source_id = db.Column(db.Integer, nullable=False)
+
+    # Owner at archive time (no FK: archives outlive account deletion rules)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
+
+    # Source row's age column (created_at / expires_at)
+    created_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # The full row as JSON ({column: value}), stored compressed
+    payload = deferred(db.Column(CompressedText, nullable=False))
+
+    __table_args__ = (
+        UniqueConstraint("source_table", "source_id", name="uq_archived_record_source"),
+        Index("ix_archived_record_table_created", "source_table", "created_at"),
+    )
+
+    @property
+    def row(self) -> dict:
+        try:
+            data = json.loads(self.payload or "{}")
+        except Exception:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def __repr__(self):
+        return f"<ArchivedRecord {self.id} {self.source_table}:{self.source_id}>"
+
+
+# ---------------------------------------------------------------------
+# Profile version counter (invalidates cached profile snapshots)
+# ---------------------------------------------------------------------
+def _bump_profile_version(mapper, connection, target):
+    user_id = getattr(target, "user_id", None)
+    if not user_id:
+        return
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(profile_version=users.c.profile_version + 1)
+    )
+
+    # The UPDATE bypasses the ORM: bring a loaded User up to date so
+    # snapshots taken later in this session are keyed on the new version.
+    session = object_session(target)
+    user = session.identity_map.get(identity_key(User, user_id)) if session is not None else None
+    if user is not None and "profile_version" in user.__dict__:
+        version = connection.execute(
+            select(users.c.profile_version).where(users.c.id == user_id)
+        ).scalar()
+        set_committed_value(user, "profile_version", version)
+
+    try:
+        from modules.common.profile_loader import forget_request_snapshot
+
+        forget_request_snapshot(user_id)
+    except Exception:
+        pass
+
+
+for _model in (UserProfile, ResumeAsset, Project):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, _bump_profile_version)
+
+
+@event.listens_for(User, "before_update")
+def _bump_profile_version_on_resume_switch(mapper, connection, target):
+    # Switching back to an already-stored resume writes no ResumeAsset row.
+    if inspect(target).attrs.current_resume_id.history.has_changes():
+        target.profile_version = User.profile_version + 1
+
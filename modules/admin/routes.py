@@ -20,15 +20,17 @@ from flask import (
     g,
     make_response,
     send_file,
+    jsonify,
 )
 from flask_login import current_user, login_required
-from sqlalchemy import func, and_
+from sqlalchemy import case, func, and_
 
 from models import (
     User,
     University,
     UniversityWallet,
     CreditTransaction,
+    CreditDailyRollup,
     UniversityDeal,
     VoucherCampaign,
     VoucherRedemption,
@@ -44,7 +46,9 @@ from models import (
     db,
 )
 
+from modules.common import jsonsql
 from modules.credits import engine as credits_engine
+from modules.credits import ledger
 
 admin_bp = Blueprint("admin", __name__, template_folder="../../templates/admin")
 
@@ -411,6 +415,30 @@ def _apply_date_filter(qry, col, start_dt, end_dt):
         qry = qry.filter(col <= end_dt)
     return qry
 
+
+def _latest_per_user(qry, model, blob_col, limit: int) -> list:
+    """
+    Newest row per user among the newest `limit` rows of qry, as
+    (id, user_id, <blob>) rows, newest first. Only ids are scanned; the
+    (deferred) blob is fetched for the chosen rows alone.
+    """
+    latest: dict[int, int] = {}
+    scan = qry.with_entities(model.id, model.user_id).order_by(model.created_at.desc()).limit(limit)
+    for rid, uid in scan:
+        latest.setdefault(uid, rid)
+
+    ids = list(latest.values())
+    rows = []
+    for i in range(0, len(ids), 500):
+        rows.extend(
+            db.session.query(model.id, model.user_id, blob_col)
+            .filter(model.id.in_(ids[i : i + 500]))
+            .all()
+        )
+    order = {rid: n for n, rid in enumerate(ids)}
+    rows.sort(key=lambda r: order[r.id])
+    return rows
+
 # -----------------------------
 # Dean-friendly extraction helpers (single source)
 # -----------------------------
@@ -506,33 +534,36 @@ def dashboard():
     user_q = User.query
     uni_q = University.query
     tx_q = CreditTransaction.query
+    # Totals come from the per-wallet daily rollups, not the ledger
+    rollup_q = CreditDailyRollup.query
 
     if not _is_global_admin():
         if tenant is not None:
             user_q = user_q.filter(User.university_id == tenant.id)
             tx_q = tx_q.join(User, CreditTransaction.user_id == User.id).filter(User.university_id == tenant.id)
+            rollup_q = rollup_q.filter(ledger.tenant_scope(tenant.id))
             uni_q = uni_q.filter(University.id == tenant.id)
         else:
             user_q = user_q.filter(User.id == -1)
             uni_q = uni_q.filter(University.id == -1)
             tx_q = tx_q.filter(CreditTransaction.id == -1)
+            rollup_q = rollup_q.filter(CreditDailyRollup.id == -1)
 
     total_users = user_q.count()
     total_universities = uni_q.count()
-    total_transactions = tx_q.count()
 
-    debit_sum = (
-        tx_q.filter(CreditTransaction.tx_type == "debit")
-        .with_entities(func.coalesce(func.sum(CreditTransaction.amount), 0))
-        .scalar()
-        or 0
-    )
-    credit_sum = (
-        tx_q.filter(CreditTransaction.tx_type.in_(["credit", "refund"]))
-        .with_entities(func.coalesce(func.sum(CreditTransaction.amount), 0))
-        .scalar()
-        or 0
-    )
+    total_transactions, debit_sum, credit_sum = rollup_q.with_entities(
+        func.coalesce(func.sum(CreditDailyRollup.tx_count), 0),
+        func.coalesce(
+            func.sum(case((CreditDailyRollup.tx_type == "debit", CreditDailyRollup.amount), else_=0)), 0
+        ),
+        func.coalesce(
+            func.sum(
+                case((CreditDailyRollup.tx_type.in_(["credit", "refund"]), CreditDailyRollup.amount), else_=0)
+            ),
+            0,
+        ),
+    ).one()
 
     recent_txs = tx_q.order_by(CreditTransaction.created_at.desc()).limit(10).all()
 
@@ -1563,7 +1594,13 @@ def analytics():
     }
 
     skill_counts: dict[str, int] = {}
-    skill_snapshots = sm_q.order_by(SkillMapSnapshot.created_at.desc()).limit(600).all()
+    # Project just the blob: skills_json is deferred on the model
+    skill_snapshots = (
+        sm_q.with_entities(SkillMapSnapshot.skills_json)
+        .order_by(SkillMapSnapshot.created_at.desc())
+        .limit(600)
+        .all()
+    )
     for snap in skill_snapshots:
         if not snap.skills_json:
             continue
@@ -1685,13 +1722,8 @@ def analytics():
     if student_ids:
         jp_scan = JobPackReport.query.filter(JobPackReport.user_id.in_(student_ids))
         jp_scan = _apply_date_filter(jp_scan, JobPackReport.created_at, start_dt, end_dt)
-        jp_scan = jp_scan.order_by(JobPackReport.created_at.desc()).limit(2000).all()
 
-        seen_users: set[int] = set()
-        for r in jp_scan:
-            if r.user_id in seen_users:
-                continue
-            seen_users.add(r.user_id)
+        for r in _latest_per_user(jp_scan, JobPackReport, JobPackReport.analysis, 2000):
             students_with_jobpack.add(r.user_id)
 
             try:
@@ -1775,13 +1807,8 @@ def analytics():
     if student_ids:
         sm_scan = SkillMapSnapshot.query.filter(SkillMapSnapshot.user_id.in_(student_ids))
         sm_scan = _apply_date_filter(sm_scan, SkillMapSnapshot.created_at, start_dt, end_dt)
-        sm_scan = sm_scan.order_by(SkillMapSnapshot.created_at.desc()).limit(2000).all()
 
-        seen_users_sm: set[int] = set()
-        for snap in sm_scan:
-            if snap.user_id in seen_users_sm:
-                continue
-            seen_users_sm.add(snap.user_id)
+        for snap in _latest_per_user(sm_scan, SkillMapSnapshot, SkillMapSnapshot.skills_json, 2000):
             students_with_skillmap.add(snap.user_id)
 
             if not snap.skills_json:
@@ -2001,14 +2028,8 @@ def analytics_export():
     if student_ids:
         jp_scan = JobPackReport.query.filter(JobPackReport.user_id.in_(student_ids))
         jp_scan = _apply_date_filter(jp_scan, JobPackReport.created_at, start_dt, end_dt)
-        jp_scan = jp_scan.order_by(JobPackReport.created_at.desc()).limit(3000).all()
-
-        seen_users: set[int] = set()
-        for r in jp_scan:
-            if r.user_id in seen_users:
-                continue
-            seen_users.add(r.user_id)
 
+        for r in _latest_per_user(jp_scan, JobPackReport, JobPackReport.analysis, 3000):
             try:
                 payload = json.loads(r.analysis or "{}")
             except Exception:
@@ -2584,14 +2605,7 @@ def strategy():
     gap_mentions: dict[str, int] = defaultdict(int)
     students_with_snapshots: set[int] = set()
 
-    snaps = sm_q.order_by(SkillMapSnapshot.created_at.desc()).limit(2000).all()
-    seen_users: set[int] = set()
-
-    for snap in snaps:
-        if snap.user_id in seen_users:
-            continue
-        seen_users.add(snap.user_id)
-
+    for snap in _latest_per_user(sm_q, SkillMapSnapshot, SkillMapSnapshot.skills_json, 2000):
         if not snap.skills_json:
             continue
         try:
@@ -2633,35 +2647,18 @@ def strategy():
     if end_dt:
         jp_q = jp_q.filter(JobPackReport.created_at <= end_dt)
 
-    blocker_counts: dict[str, int] = defaultdict(int)
-    warning_counts: dict[str, int] = defaultdict(int)
-    missing_kw_counts: dict[str, int] = defaultdict(int)
-
-    reports = jp_q.order_by(JobPackReport.created_at.desc()).limit(2000).all()
-    seen_users_jp: set[int] = set()
-
-    for r in reports:
-        if r.user_id in seen_users_jp:
-            continue
-        seen_users_jp.add(r.user_id)
-
-        try:
-            payload = json.loads(r.analysis or "{}")
-        except Exception:
-            payload = {}
-
-        issues = _extract_resume_issues(payload if isinstance(payload, dict) else {})
+    # Newest report per student, aggregated inside the database (JSONB on Postgres)
+    latest_jp = JobPackReport.id.in_(
+        jp_q.with_entities(func.max(JobPackReport.id)).group_by(JobPackReport.user_id)
+    )
 
-        for b in set(issues["blockers"]):
-            blocker_counts[b] += 1
-        for w in set(issues["warnings"]):
-            warning_counts[w] += 1
-        for k in set(issues["missing_keywords"]):
-            missing_kw_counts[k] += 1
+    def _top_issues(*keys: str, limit: int) -> list[dict]:
+        rows = jsonsql.top_elements(JobPackReport.analysis, keys, where=latest_jp, limit=limit)
+        return [{"text": t, "count": c} for t, c in rows]
 
-    top_blockers = [{"text": t, "count": int(c)} for t, c in sorted(blocker_counts.items(), key=lambda kv: kv[1], reverse=True)[:10]]
-    top_warnings = [{"text": t, "count": int(c)} for t, c in sorted(warning_counts.items(), key=lambda kv: kv[1], reverse=True)[:10]]
-    top_missing_keywords = [{"text": t, "count": int(c)} for t, c in sorted(missing_kw_counts.items(), key=lambda kv: kv[1], reverse=True)[:12]]
+    top_blockers = _top_issues("resume_ats", "blockers", limit=10)
+    top_warnings = _top_issues("resume_ats", "warnings", limit=10)
+    top_missing_keywords = _top_issues("resume_ats", "keyword_coverage", "missing_keywords", limit=12)
 
     watchlist = []
     for u in sorted(students, key=lambda x: int(getattr(x, "ready_score", 0) or 0)):
@@ -2732,3 +2729,90 @@ def strategy():
             "job_ready": job_ready,
         },
     )
+
+
+# ---------------------------------------------------------------------
+# Admin · LLM batches (bulk regeneration, see modules/batch)
+# ---------------------------------------------------------------------
+@admin_bp.route("/batches", methods=["GET"], endpoint="batches")
+@login_required
+def batches():
+    if not _is_admin_user() or not _is_global_admin():
+        return jsonify({"ok": False, "error": "Only global admins can view batches."}), 403
+
+    from models import LLMBatch
+
+    rows = LLMBatch.query.order_by(LLMBatch.id.desc()).limit(50).all()
+    return jsonify({"ok": True, "batches": [b.progress() for b in rows]})
+
+
+@admin_bp.route("/batches", methods=["POST"], endpoint="batch_create")
+@login_required
+def batch_create():
+    """
+    Create a batch and queue its first step on the bulk queue.
+
+    JSON or form: kind (skillmap | coach | resume_parse), optional
+    user_ids, university_id, limit, backend and kind params
+    (pro_mode, region_sector, path_type, force).
+    """
+    if not _is_admin_user() or not _is_global_admin():
+        return jsonify({"ok": False, "error": "Only global admins can run batches."}), 403
+
+    from modules.batch import engine
+    from modules.batch.tasks import enqueue_batch_step
+
+    payload = request.get_json(silent=True) or request.form.to_dict()
+    kind = (payload.get("kind") or "").strip()
+    params = {
+        k: payload[k]
+        for k in ("user_ids", "university_id", "limit", "pro_mode", "region_sector", "path_type", "force")
+        if payload.get(k) not in (None, "")
+    }
+    if isinstance(params.get("user_ids"), str):
+        params["user_ids"] = [int(u) for u in params["user_ids"].split(",") if u.strip().isdigit()]
+
+    try:
+        batch = engine.create_batch(
+            kind,
+            params=params,
+            created_by_user_id=current_user.id,
+            backend=(payload.get("backend") or None),
+        )
+    except engine.BatchError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    _log_admin_action("llm_batch_create", meta={"batch_id": batch.id, "kind": batch.kind, "params": params})
+    db.session.commit()
+
+    try:
+        job_id = enqueue_batch_step(batch.id, user_id=current_user.id)
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"Batch saved but not queued: {e}", "batch": batch.progress()}), 503
+    return jsonify({"ok": True, "job_id": job_id, "batch": batch.progress()}), 202
+
+
+@admin_bp.route("/batches/<int:batch_id>", methods=["GET"], endpoint="batch_status")
+@login_required
+def batch_status(batch_id: int):
+    if not _is_admin_user() or not _is_global_admin():
+        return jsonify({"ok": False, "error": "Only global admins can view batches."}), 403
+
+    from models import LLMBatch
+
+    batch = LLMBatch.query.get_or_404(batch_id)
+    return jsonify({"ok": True, "batch": batch.progress()})
+
+
+@admin_bp.route("/batches/<int:batch_id>/advance", methods=["POST"], endpoint="batch_advance")
+@login_required
+def batch_advance(batch_id: int):
+    if not _is_admin_user() or not _is_global_admin():
+        return jsonify({"ok": False, "error": "Only global admins can run batches."}), 403
+
+    from models import LLMBatch
+    from modules.batch.tasks import enqueue_batch_step
+
+    batch = LLMBatch.query.get_or_404(batch_id)
+    job_id = enqueue_batch_step(batch.id, user_id=current_user.id)
+    return jsonify({"ok": True, "job_id": job_id, "batch": batch.progress()}), 202
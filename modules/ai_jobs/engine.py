@@ -0,0 +1,295 @@
+# modules/ai_jobs/engine.py
+"""
+Background AI jobs: one lifecycle for every AI feature that used to call
+the model inside the web request.
+
+Job Pack, Dream and Coach have their own RQ tasks. Skill Mapper,
+Internship Analyzer, Referral Trainer and the Portfolio wizard share this
+one instead:
+
+    start()    route side: AIJob row + credit deduction in one
+               transaction, then enqueue (credits are refunded if the
+               enqueue fails)
+    execute()  worker side: run the kind's handler, store its result
+               (and whatever rows it wrote) in one commit; on error mark
+               the job failed and refund the reserved credits once
+    status()   polled by templates/ai_jobs/processing.html through
+               /ai-jobs/<id>/status; also fails + refunds jobs whose RQ
+               job died with its worker
+
+A kind is a handler `fn(job, user) -> dict` (job.args holds the route's
+inputs) plus the endpoint that renders a finished job. Handlers live in
+the feature's own tasks.py and are imported lazily by dotted path, like
+the batch kinds.
+
+AI_JOBS_ASYNC=0 runs execute() inline in the request (local development
+without Redis / a worker); the user flow is otherwise the same.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import update
+
+from models import AIJob, User, db
+from modules.credits.engine import (
+    deduct_free,
+    deduct_pro,
+    get_feature_cost_amount,
+    refund,
+)
+
+logger = logging.getLogger("ai_jobs")
+
+AI_JOBS_ASYNC = os.getenv("AI_JOBS_ASYNC", "1").strip() not in ("0", "false", "False")
+# A queued/processing job whose RQ job has vanished this long is failed + refunded
+AI_JOB_LOST_S = int(os.getenv("AI_JOB_LOST_S", "1800"))
+
+TERMINAL = ("completed", "failed")
+
+
+class AIJobError(Exception):
+    """The job could not be started (credits, enqueue); nothing stays deducted."""
+
+
+@dataclass(frozen=True)
+class AIJobKind:
+    name: str
+    handler: str  # "module.path:function"
+    result_endpoint: str  # url_for(endpoint, job_id=...) renders a completed job
+    title: str
+
+
+KINDS: Dict[str, AIJobKind] = {
+    k.name: k
+    for k in (
+        AIJobKind(
+            "skillmap",
+            "modules.skillmapper.tasks:run_skillmap",
+            "skillmapper.job_result",
+            "Skill Mapper",
+        ),
+        AIJobKind(
+            "internship",
+            "modules.internships.tasks:run_internship_analysis",
+            "internships.job_result",
+            "Internship Analyzer",
+        ),
+        AIJobKind(
+            "referral",
+            "modules.referral.tasks:run_referral_messages",
+            "referral.job_result",
+            "Referral Trainer",
+        ),
+        AIJobKind(
+            "portfolio_ideas",
+            "modules.portfolio.tasks:run_project_suggestions",
+            "portfolio.wizard_result",
+            "Portfolio ideas",
+        ),
+    )
+}
+
+
+def get_kind(name: str) -> AIJobKind:
+    try:
+        return KINDS[name]
+    except KeyError:
+        raise AIJobError(f"unknown AI job kind: {name}") from None
+
+
+def _handler(kind: AIJobKind) -> Callable[[AIJob, User], Dict[str, Any]]:
+    mod_name, _, attr = kind.handler.partition(":")
+    return getattr(importlib.import_module(mod_name), attr)
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+# ---------------------------------------------------------------------
+# Route side
+# ---------------------------------------------------------------------
+
+
+def start(
+    user: User,
+    kind: str,
+    *,
+    feature_key: str,
+    currency: str,
+    args: Dict[str, Any],
+) -> AIJob:
+    """
+    Reserve credits and queue the job. Raises AIJobError when the credits
+    cannot be deducted or the job cannot be queued (then refunded).
+    """
+    get_kind(kind)
+    job = AIJob(
+        user_id=user.id,
+        kind=kind,
+        status="queued",
+        feature_key=feature_key,
+        currency=currency,
+        amount=get_feature_cost_amount(feature_key, currency),  # type: ignore[arg-type]
+        run_id=f"aijob_{kind}_{uuid.uuid4().hex[:12]}",
+        args_json=_dumps(args),
+    )
+    db.session.add(job)
+    db.session.flush()
+
+    deduct = deduct_pro if currency == "gold" else deduct_free
+    if not deduct(user, feature_key, run_id=job.run_id, commit=False):
+        db.session.rollback()
+        raise AIJobError("credits could not be reserved")
+    db.session.commit()
+
+    if not AI_JOBS_ASYNC:
+        execute(job.id)
+        return job
+
+    try:
+        from modules.ai_jobs.tasks import enqueue_ai_job
+
+        job.rq_job_id = enqueue_ai_job(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("ai_job id=%s enqueue failed", job.id)
+        fail(job, f"enqueue failed: {e.__class__.__name__}")
+        raise AIJobError("job could not be queued") from e
+
+    logger.info("ai_job.start id=%s kind=%s user=%s rq=%s", job.id, kind, user.id, job.rq_job_id)
+    return job
+
+
+def get_for_user(job_id: int, user_id: int) -> Optional[AIJob]:
+    return AIJob.query.filter_by(id=job_id, user_id=user_id).first()
+
+
+def result_url(job: AIJob) -> str:
+    from flask import url_for
+
+    return url_for(get_kind(job.kind).result_endpoint, job_id=job.id)
+
+
+def status(job: AIJob, *, include_result: bool = False) -> Dict[str, Any]:
+    """
+    JSON for the processing page (refunds jobs lost with their worker).
+    include_result adds the handler's output once completed (JSON API callers).
+    """
+    if job.status not in TERMINAL and _lost(job):
+        fail(job, "The job was lost by the worker. Please try again.")
+
+    out: Dict[str, Any] = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "refunded": bool(job.refunded),
+    }
+    if job.status == "completed":
+        out["result_url"] = result_url(job)
+        if include_result:
+            out["result"] = job.result
+    elif job.status == "failed":
+        out["error"] = job.error or "Generation failed."
+    return out
+
+
+def _lost(job: AIJob) -> bool:
+    if not job.rq_job_id:
+        return False
+    try:
+        from modules.ai_jobs.tasks import rq_status
+
+        rq = rq_status(job.rq_job_id)
+    except Exception:
+        return False  # Redis down: cannot tell, keep waiting
+    if rq in ("failed", "stopped", "canceled"):
+        return True
+    if rq == "not_found":
+        age = datetime.utcnow() - (job.updated_at or job.created_at)
+        return age > timedelta(seconds=AI_JOB_LOST_S)
+    return False
+
+
+# ---------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------
+
+
+def execute(job_id: int) -> Dict[str, Any]:
+    """Run one job to completion (needs an app context). Safe to retry."""
+    job = db.session.get(AIJob, job_id)
+    if job is None:
+        return {"ok": False, "error": "job not found"}
+    if job.status in TERMINAL:
+        return {"ok": job.status == "completed", "status": job.status}
+
+    user = db.session.get(User, job.user_id)
+    if user is None:
+        return {"ok": False, "error": "user not found"}
+
+    job.status = "processing"
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        result = _handler(get_kind(job.kind))(job, user)
+        job.result_json = _dumps(result if isinstance(result, dict) else {"data": result})
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("ai_job id=%s kind=%s failed", job_id, job.kind)
+        fail(job, f"{e.__class__.__name__}: {e}")
+        return {"ok": False, "error": job.error}
+
+    logger.info("ai_job.done id=%s kind=%s", job.id, job.kind)
+    return {"ok": True, "id": job.id, "record_id": job.record_id}
+
+
+def fail(job: AIJob, error: str) -> None:
+    """Mark the job failed and give the reserved credits back (once)."""
+    job.status = "failed"
+    job.error = (error or "")[:2000]
+    job.finished_at = datetime.utcnow()
+    user = db.session.get(User, job.user_id) if not job.refunded and job.amount > 0 else None
+    if user is not None:
+        try:
+            with db.session.begin_nested():
+                # The worker and the status poll can fail the same job at
+                # once: claim the refund in the row, and refund only if
+                # this call flipped it.
+                claimed = db.session.execute(
+                    update(AIJob)
+                    .where(AIJob.id == job.id, AIJob.refunded.is_(False))
+                    .values(refunded=True)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if claimed:
+                    refund(
+                        user,
+                        job.feature_key,
+                        currency=job.currency,  # type: ignore[arg-type]
+                        amount=job.amount,
+                        run_id=job.run_id,
+                        commit=False,
+                    )
+            job.refunded = True
+        except Exception:
+            logger.exception("ai_job id=%s refund failed", job.id)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("ai_job id=%s could not be marked failed", job.id)
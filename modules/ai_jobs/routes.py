@@ -0,0 +1,47 @@
+# modules/ai_jobs/routes.py
+"""
+Waiting page + status polling for background AI jobs.
+
+Feature routes redirect here after engine.start(). The page polls
+/ai-jobs/<id>/status and moves on to the feature's result page once the
+job is completed. Refreshing is safe: nothing is re-run. JSON API callers
+poll the same status URL with ?result=1 to get the output itself.
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, abort, current_app, jsonify, redirect, render_template, request
+from flask_login import current_user, login_required
+
+from modules.ai_jobs import engine
+
+ai_jobs_bp = Blueprint("ai_jobs", __name__, template_folder="../../templates/ai_jobs")
+
+
+@ai_jobs_bp.route("/<int:job_id>", methods=["GET"], endpoint="wait")
+@login_required
+def wait(job_id: int):
+    job = engine.get_for_user(job_id, current_user.id)
+    if job is None:
+        abort(404)
+    if job.status == "completed":
+        return redirect(engine.result_url(job))
+    return render_template(
+        "ai_jobs/processing.html",
+        job=job,
+        title=engine.get_kind(job.kind).title,
+        status=engine.status(job),
+    )
+
+
+@ai_jobs_bp.route("/<int:job_id>/status", methods=["GET"], endpoint="status")
+@login_required
+def status(job_id: int):
+    job = engine.get_for_user(job_id, current_user.id)
+    if job is None:
+        return jsonify({"status": "not_found"}), 404
+    try:
+        return jsonify(engine.status(job, include_result=request.args.get("result") == "1")), 200
+    except Exception as e:
+        current_app.logger.exception("ai_jobs status error: %s", e)
+        return jsonify({"status": "error"}), 200
@@ -0,0 +1,62 @@
+# modules/ai_jobs/tasks.py
+"""
+RQ entry point for background AI jobs (see modules/ai_jobs/engine.py).
+
+Jobs go through modules.common.scheduling like Job Pack and Dream, so
+they get the same per-class queues and tenant fair share.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict
+
+from redis import Redis
+
+from modules.common import scheduling
+from modules.common.query_stats import track_queries
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+AI_JOB_TIMEOUT = int(os.getenv("AI_JOB_TIMEOUT", "300"))
+
+
+def _redis() -> Redis:
+    return Redis.from_url(REDIS_URL)
+
+
+def enqueue_ai_job(job) -> str:
+    """Queue execute(job.id). Returns the RQ job id."""
+    rq_job = scheduling.enqueue(
+        _redis(),
+        process_ai_job,
+        user_id=job.user_id,
+        feature_key=job.feature_key,
+        currency=job.currency,
+        kwargs=dict(ai_job_id=job.id),
+        job_timeout=AI_JOB_TIMEOUT,
+        result_ttl=int(os.getenv("RQ_RESULT_TTL", "500")),
+        failure_ttl=int(os.getenv("RQ_FAILURE_TTL", "3600")),
+    )
+    return rq_job.id
+
+
+def process_ai_job(*, ai_job_id: int) -> Dict[str, Any]:
+    from modules.jobpack.tasks import _load_flask_app
+
+    app = _load_flask_app()
+    with app.app_context(), track_queries("job:process_ai_job"):
+        from modules.ai_jobs import engine
+
+        return engine.execute(ai_job_id)
+
+
+def rq_status(rq_job_id: str) -> str:
+    """queued/started/finished/failed/..., or "not_found"."""
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Job
+
+    try:
+        job = Job.fetch(rq_job_id, connection=_redis())
+    except NoSuchJobError:
+        return "not_found"
+    return str(getattr(job.get_status(), "value", job.get_status()))
@@ -0,0 +1,63 @@
+# modules/assets/__main__.py
+"""
+Command line for the static asset pipeline (deploy build step).
+
+    python -m modules.assets build      # static/ -> static/dist/ + manifest.json
+    python -m modules.assets clean      # remove static/dist/ (serve files as-is)
+    python -m modules.assets status
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.assets", description="Static asset pipeline")
+    ap.add_argument("--static-root", type=Path, help="default: the repo's static/")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="fingerprint + precompress static files")
+    sub.add_parser("clean", help="remove the build output")
+    sub.add_parser("status", help="print the current manifest summary")
+
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from modules.assets import pipeline
+
+    if args.cmd == "build":
+        assets = pipeline.build(args.static_root)["assets"]
+        raw = sum(a["size"] for a in assets.values())
+        print(
+            json.dumps(
+                {
+                    "files": len(assets),
+                    "bytes": raw,
+                    "gzip": sum("gzip" in a["encodings"] for a in assets.values()),
+                    "br": sum("br" in a["encodings"] for a in assets.values()),
+                    "brotli_available": pipeline._brotli is not None,
+                }
+            )
+        )
+        return 0
+
+    if args.cmd == "clean":
+        print("removed" if pipeline.clean(args.static_root) else "nothing to remove")
+        return 0
+
+    assets = pipeline.load_manifest(args.static_root)
+    if not assets:
+        print("no manifest (run: python -m modules.assets build)")
+        return 1
+    for rel, a in sorted(assets.items()):
+        print(f"{rel:<40} {a['path']:<52} {','.join(a['encodings']) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
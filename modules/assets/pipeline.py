@@ -0,0 +1,207 @@
+# modules/assets/pipeline.py
+"""
+Static asset pipeline: fingerprinted, precompressed, cached forever.
+
+Build step (deploy time, from the repo root):
+
+    python -m modules.assets build
+
+copies every file under static/ to static/dist/ with a content hash in its
+name (css/glass.css -> dist/css/glass.3f9a0c12de.css), writes .gz (and
+.br when the optional `brotli` package is installed) next to text
+assets, and records the mapping in static/dist/manifest.json.
+
+At runtime init_assets(app):
+
+    - rewrites url_for("static", filename=...) to the fingerprinted path,
+      so templates stay unchanged and a new build busts every cache
+    - serves fingerprinted files with Cache-Control: public,
+      max-age=31536000, immutable, picking the .br / .gz copy the client
+      accepts (Vary: Accept-Encoding)
+    - serves anything else (no manifest, unknown file) as Flask would
+
+With no manifest (dev, or a build that was skipped) nothing changes.
+STATIC_FINGERPRINT=0 turns the rewrite off even when a manifest exists.
+
+The static and favicon endpoints also skip the DB-backed before_request
+hooks in app.py (STATIC_ENDPOINTS).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:  # optional: smaller than gzip for text assets
+    import brotli as _brotli
+except Exception:  # pragma: no cover
+    _brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = Path(__file__).resolve().parents[2] / "static"
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+STATIC_FINGERPRINT = os.getenv("STATIC_FINGERPRINT", "1").strip().lower() not in ("0", "false", "no")
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", str(365 * 24 * 3600)))
+FAVICON_MAX_AGE = int(os.getenv("FAVICON_MAX_AGE", str(24 * 3600)))
+
+HASH_LEN = 10
+# Worth precompressing; images other than SVG are already compressed.
+COMPRESSIBLE = {".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico"}
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# ---------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def _hashed_name(rel: str, digest: str) -> str:
+    p = Path(rel)
+    return p.with_name(f"{p.stem}.{digest}{p.suffix}").as_posix()
+
+
+def _sources(static_root: Path) -> List[Path]:
+    out = []
+    for path in sorted(static_root.rglob("*")):
+        rel = path.relative_to(static_root)
+        if not path.is_file() or rel.parts[0] == DIST_DIR or any(p.startswith(".") for p in rel.parts):
+            continue
+        out.append(path)
+    return out
+
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    out = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if _brotli is not None:
+        out["br"] = _brotli.compress(data, quality=11)
+    return out
+
+
+def build(static_root: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Rebuild static/dist/ from scratch and return the manifest. The
+    manifest is written last, so a half-finished build is never used.
+    """
+    static_root = Path(static_root or STATIC_ROOT)
+    dist = static_root / DIST_DIR
+    if dist.exists():
+        shutil.rmtree(dist)
+
+    assets: Dict[str, Dict[str, Any]] = {}
+    for src in _sources(static_root):
+        rel = src.relative_to(static_root).as_posix()
+        data = src.read_bytes()
+        hashed = _hashed_name(rel, _fingerprint(data))
+        target = dist / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        encodings = []
+        if src.suffix.lower() in COMPRESSIBLE:
+            packed = _compress(data)
+            for name, suffix in ENCODINGS:
+                blob = packed.get(name)
+                if blob is not None and len(blob) < len(data):
+                    target.with_name(target.name + suffix).write_bytes(blob)
+                    encodings.append(name)
+
+        assets[rel] = {"path": f"{DIST_DIR}/{hashed}", "size": len(data), "encodings": encodings}
+
+    manifest = {"version": MANIFEST_VERSION, "assets": assets}
+    dist.mkdir(parents=True, exist_ok=True)
+    tmp = dist / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, dist / MANIFEST_NAME)
+    logger.info("assets: built %s files into %s", len(assets), dist)
+    return manifest
+
+
+def clean(static_root: Optional[Path] = None) -> bool:
+    dist = Path(static_root or STATIC_ROOT) / DIST_DIR
+    if not dist.exists():
+        return False
+    shutil.rmtree(dist)
+    return True
+
+
+def load_manifest(static_root: Optional[Path] = None) -> Dict[str, Any]:
+    path = Path(static_root or STATIC_ROOT) / DIST_DIR / MANIFEST_NAME
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        logger.exception("assets: unreadable manifest %s, serving unfingerprinted files", path)
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning("assets: manifest version %r not supported, ignoring", manifest.get("version"))
+        return {}
+    return manifest.get("assets") or {}
+
+
+# ---------------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------------
+def _accepted(accept_encodings, encodings) -> Optional[tuple]:
+    for name, suffix in ENCODINGS:
+        if name in encodings and accept_encodings[name]:
+            return name, suffix
+    return None
+
+
+def init_assets(app) -> None:
+    """Manifest-aware url_for("static") and static view (see module docstring)."""
+    from flask import request, send_from_directory
+
+    static_root = Path(app.static_folder)
+    assets = load_manifest(static_root) if STATIC_FINGERPRINT else {}
+    # fingerprinted path -> available encodings
+    served = {a["path"]: tuple(a.get("encodings") or ()) for a in assets.values()}
+    app.extensions["assets"] = {"manifest": assets, "served": served}
+
+    if assets:
+        logger.info("assets: %s fingerprinted files from %s", len(assets), static_root / DIST_DIR)
+
+        @app.url_defaults
+        def _fingerprint_static_urls(endpoint, values):
+            if endpoint == "static":
+                entry = assets.get(values.get("filename"))
+                if entry is not None:
+                    values["filename"] = entry["path"]
+
+    default_static = app.view_functions["static"]
+
+    def static(filename):
+        encodings = served.get(filename)
+        if encodings is None:
+            return default_static(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        picked = _accepted(request.accept_encodings, encodings)
+        name = filename + picked[1] if picked else filename
+        resp = send_from_directory(
+            app.static_folder, name, mimetype=mimetype, max_age=STATIC_IMMUTABLE_MAX_AGE
+        )
+        if picked:
+            resp.headers["Content-Encoding"] = picked[0]
+        if encodings:
+            resp.vary.add("Accept-Encoding")
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+        return resp
+
+    app.view_functions["static"] = static
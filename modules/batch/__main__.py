@@ -0,0 +1,108 @@
+# modules/batch/__main__.py
+"""
+Command line for LLM batches (cron / ops).
+
+    python -m modules.batch create skillmap --university-id 3 --limit 500
+    python -m modules.batch create coach --param path_type=job --wait
+    python -m modules.batch create resume_parse --backend local --wait
+    python -m modules.batch advance --all        # cron, e.g. every 10 min
+    python -m modules.batch status 12
+    python -m modules.batch cancel 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _params(args: argparse.Namespace) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if args.user_ids:
+        params["user_ids"] = [int(u) for u in args.user_ids.split(",") if u.strip()]
+    if args.university_id:
+        params["university_id"] = args.university_id
+    if args.limit:
+        params["limit"] = args.limit
+    for pair in args.param or []:
+        key, _, value = pair.partition("=")
+        params[key.strip()] = json.loads(value) if value[:1] in "[{0123456789tfn" else value
+    return params
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.batch", description="LLM batch runs")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    c = sub.add_parser("create", help="create a batch and advance it once")
+    c.add_argument("kind")
+    c.add_argument("--user-ids", help="comma-separated user ids")
+    c.add_argument("--university-id", type=int)
+    c.add_argument("--limit", type=int)
+    c.add_argument("--param", action="append", help="extra kind param, key=value (repeatable)")
+    c.add_argument("--backend", choices=("openai", "local"))
+    c.add_argument("--wait", action="store_true", help="poll until the batch is finished")
+    c.add_argument("--poll-s", type=float, default=60.0)
+
+    a = sub.add_parser("advance", help="advance one batch, or every active one")
+    a.add_argument("batch_id", nargs="?", type=int)
+    a.add_argument("--all", action="store_true")
+
+    s = sub.add_parser("status")
+    s.add_argument("batch_id", nargs="?", type=int)
+
+    x = sub.add_parser("cancel")
+    x.add_argument("batch_id", type=int)
+
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from modules.jobpack.tasks import _load_flask_app
+
+    app = _load_flask_app()
+    with app.app_context():
+        from models import LLMBatch, db
+        from modules.batch import engine
+
+        def _get(batch_id: int) -> LLMBatch:
+            batch = db.session.get(LLMBatch, batch_id)
+            if batch is None:
+                ap.error(f"batch {batch_id} not found")
+            return batch
+
+        if args.cmd == "create":
+            batch = engine.create_batch(args.kind, params=_params(args), backend=args.backend)
+            progress = engine.advance(batch)
+            while args.wait and progress["status"] not in engine.TERMINAL:
+                time.sleep(args.poll_s)
+                progress = engine.advance(batch)
+            print(json.dumps(progress))
+        elif args.cmd == "advance":
+            batches = engine.active_batches() if args.all else [_get(args.batch_id)]
+            rc = 0
+            for batch in batches:
+                try:
+                    print(json.dumps(engine.advance(batch)))
+                except Exception as e:  # keep going; the next run retries
+                    db.session.rollback()
+                    logging.getLogger("llm_batch").exception("llm_batch id=%s step failed", batch.id)
+                    print(json.dumps({"id": batch.id, "error": str(e)}))
+                    rc = 1
+            return rc
+        elif args.cmd == "status":
+            batches = [_get(args.batch_id)] if args.batch_id else LLMBatch.query.order_by(LLMBatch.id.desc()).limit(20)
+            for batch in batches:
+                print(json.dumps(batch.progress()))
+        elif args.cmd == "cancel":
+            batch = _get(args.batch_id)
+            engine.cancel(batch)
+            print(json.dumps(batch.progress()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
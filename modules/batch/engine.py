@@ -0,0 +1,437 @@
+# modules/batch/engine.py
+"""
+Batch execution for bulk, latency-insensitive LLM work.
+
+Admin-triggered or scheduled runs (re-running skill maps for a cohort,
+coach plans at month rollover, resume parse backfills) do not need
+answers within seconds. Sending them one at a time through the
+interactive path ties up workers and pays full price. Here the requests
+are collected and submitted through the OpenAI Batch API instead (half
+price, separate rate limits, results within the 24h window). The results
+are then written back into the same rows the live features write.
+
+A batch (LLMBatch, one row per item in LLMBatchItem) moves through:
+
+    pending     targets selected, request bodies captured (see kinds.py)
+    submitted   JSONL uploaded, provider batch created
+    downloaded  provider finished; every item has a response or an error
+    done        every item applied (or failed / skipped)
+    failed / cancelled
+
+`advance(batch)` moves a batch as far as it can without waiting and is
+safe to call repeatedly. Every step is checkpointed in the database:
+items are committed in chunks while they are built, responses are stored
+per item before anything is applied, and applied items are marked in
+the same transaction as the rows they wrote. A crashed or redeployed
+worker resumes where the last commit left off.
+
+Backends (LLM_BATCH_BACKEND):
+    openai  Files + Batches API (production)
+    local   runs each request through chat.completions.create at submit
+            time and writes the same output JSONL under
+            LLM_BATCH_LOCAL_DIR. Point OPENAI_BASE_URL at
+            benchmarks/llm_standin.py to run batches without OpenAI.
+
+Progress: LLMBatch.progress() (also served by the admin batch routes and
+`python -m modules.batch status`), plus one `llm_batch` log line per step.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from models import LLMBatch, LLMBatchItem, db
+from modules.batch.kinds import KINDS, get_kind
+from modules.common.llm import FEATURE_HEADER, CapturedRequest, capture_requests, replay_response
+
+logger = logging.getLogger("llm_batch")
+
+LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND", "openai")
+LLM_BATCH_COMPLETION_WINDOW = os.getenv("LLM_BATCH_COMPLETION_WINDOW", "24h")
+# Items per commit while building, downloading and applying
+LLM_BATCH_CHUNK = int(os.getenv("LLM_BATCH_CHUNK", "100"))
+LLM_BATCH_LOCAL_DIR = Path(os.getenv("LLM_BATCH_LOCAL_DIR", "instance/llm_batches"))
+
+_ENDPOINT = "/v1/chat/completions"
+
+# Provider states that will not change any more
+_PROVIDER_FINAL = {"completed", "failed", "expired", "cancelled"}
+
+TERMINAL = {"done", "failed", "cancelled"}
+
+
+class BatchError(RuntimeError):
+    """A batch cannot be created or advanced (bad kind, provider error)."""
+
+
+# ---------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------
+
+Request = Tuple[str, str, Dict[str, Any]]  # (custom_id, feature, body)
+
+
+class OpenAIBatchBackend:
+    name = "openai"
+
+    def __init__(self, client: Any = None):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+
+    def submit(self, requests: List[Request], *, metadata: Dict[str, str]) -> Tuple[str, str]:
+        lines = [
+            json.dumps({"custom_id": cid, "method": "POST", "url": _ENDPOINT, "body": body}, ensure_ascii=False)
+            for cid, _feature, body in requests
+        ]
+        upload = self.client.files.create(
+            file=("batch.jsonl", ("\n".join(lines) + "\n").encode("utf-8")),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=_ENDPOINT,
+            completion_window=LLM_BATCH_COMPLETION_WINDOW,
+            metadata=metadata,
+        )
+        return batch.id, upload.id
+
+    def status(self, provider_id: str) -> Dict[str, Any]:
+        b = self.client.batches.retrieve(provider_id)
+        counts = getattr(b, "request_counts", None)
+        return {
+            "status": b.status,
+            "completed": int(getattr(counts, "completed", 0) or 0),
+            "failed": int(getattr(counts, "failed", 0) or 0),
+            "output_file_id": b.output_file_id,
+            "error_file_id": b.error_file_id,
+        }
+
+    def results(self, file_id: str) -> Iterator[Dict[str, Any]]:
+        text = self.client.files.content(file_id).text
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+class LocalBatchBackend:
+    """Batch API stand-in: sequential live calls, output in the Batch API format."""
+
+    name = "local"
+
+    def __init__(self, client: Any = None, directory: Optional[Path] = None):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI()
+        self.client = client
+        self.directory = Path(directory or LLM_BATCH_LOCAL_DIR)
+
+    def _path(self, file_id: str) -> Path:
+        return self.directory / f"{file_id}.jsonl"
+
+    def submit(self, requests: List[Request], *, metadata: Dict[str, str]) -> Tuple[str, str]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        provider_id = f"local-{uuid.uuid4().hex[:16]}"
+        completed = failed = 0
+        with open(self._path(provider_id), "w", encoding="utf-8") as out:
+            for cid, feature, body in requests:
+                line: Dict[str, Any] = {"id": f"{provider_id}-{cid}", "custom_id": cid, "response": None, "error": None}
+                try:
+                    resp = self.client.chat.completions.create(extra_headers={FEATURE_HEADER: feature}, **body)
+                    line["response"] = {"status_code": 200, "body": resp.model_dump(mode="json")}
+                    completed += 1
+                except Exception as e:
+                    line["error"] = {"code": e.__class__.__name__, "message": str(e)[:500]}
+                    failed += 1
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        with open(self._path(provider_id + ".status"), "w", encoding="utf-8") as f:
+            json.dump({"completed": completed, "failed": failed}, f)
+        return provider_id, provider_id
+
+    def status(self, provider_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(provider_id + ".status"), encoding="utf-8") as f:
+                counts = json.load(f)
+        except FileNotFoundError:
+            return {"status": "expired", "completed": 0, "failed": 0, "output_file_id": None, "error_file_id": None}
+        return {"status": "completed", "output_file_id": provider_id, "error_file_id": None, **counts}
+
+    def results(self, file_id: str) -> Iterator[Dict[str, Any]]:
+        with open(self._path(file_id), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_backend(name: str, client: Any = None):
+    if name == "local":
+        return LocalBatchBackend(client)
+    if name == "openai":
+        return OpenAIBatchBackend(client)
+    raise BatchError(f"unknown batch backend {name!r}")
+
+
+# ---------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------
+
+
+def create_batch(
+    kind: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    created_by_user_id: Optional[int] = None,
+    backend: Optional[str] = None,
+) -> LLMBatch:
+    """Insert a pending batch. Targets are selected by the first advance()."""
+    if get_kind(kind) is None:
+        raise BatchError(f"unknown batch kind {kind!r} (known: {', '.join(sorted(KINDS))})")
+    batch = LLMBatch(
+        kind=get_kind(kind).name,
+        status="pending",
+        backend=backend or LLM_BATCH_BACKEND,
+        params=params or {},
+        created_by_user_id=created_by_user_id,
+    )
+    db.session.add(batch)
+    db.session.commit()
+    _log(batch, "created")
+    return batch
+
+
+def build_items(batch: LLMBatch) -> int:
+    """Select targets and capture one request per target. Resumable."""
+    kind = get_kind(batch.kind)
+    existing = {cid for (cid,) in db.session.query(LLMBatchItem.custom_id).filter_by(batch_id=batch.id)}
+
+    added = 0
+    for user_id, kwargs, context in kind.select(dict(batch.params or {})):
+        custom_id = f"{batch.kind}-{user_id}"
+        if custom_id in existing:
+            continue
+        body = _capture(kind, kwargs)
+        if body is None:
+            continue
+        db.session.add(
+            LLMBatchItem(
+                batch_id=batch.id,
+                custom_id=custom_id,
+                user_id=user_id,
+                status="pending",
+                args_json=json.dumps({"kwargs": kwargs, "context": context}, ensure_ascii=False, default=str),
+                request_json=json.dumps(body, ensure_ascii=False, default=str),
+            )
+        )
+        existing.add(custom_id)
+        added += 1
+        if added % LLM_BATCH_CHUNK == 0:
+            batch.total = len(existing)
+            db.session.commit()
+
+    batch.total = len(existing)
+    db.session.commit()
+    return added
+
+
+def _capture(kind, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The request the live generator would send ({feature, body}), or None if it makes no call."""
+    try:
+        with capture_requests():
+            kind.generate(**kwargs)
+    except CapturedRequest as captured:
+        return {"feature": captured.feature, "body": captured.body}
+    return None
+
+
+def submit(batch: LLMBatch, *, client: Any = None) -> None:
+    items = batch.items.filter_by(status="pending").order_by(LLMBatchItem.id).all()
+    if not items:
+        batch.status = "done"
+        batch.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    requests: List[Request] = []
+    for item in items:
+        req = json.loads(item.request_json)
+        requests.append((item.custom_id, req["feature"], req["body"]))
+
+    backend = get_backend(batch.backend, client)
+    provider_id, input_file_id = backend.submit(
+        requests, metadata={"careerai_batch_id": str(batch.id), "kind": batch.kind}
+    )
+    batch.provider_batch_id = provider_id
+    batch.input_file_id = input_file_id
+    batch.status = "submitted"
+    batch.submitted_at = datetime.utcnow()
+    db.session.commit()
+
+
+def poll(batch: LLMBatch, *, client: Any = None) -> bool:
+    """Refresh provider progress; download results once it is final. True when downloaded."""
+    backend = get_backend(batch.backend, client)
+    st = backend.status(batch.provider_batch_id)
+    batch.completed = st["completed"]
+    batch.failed = st["failed"]
+    if st["status"] not in _PROVIDER_FINAL:
+        db.session.commit()
+        return False
+
+    batch.output_file_id = st.get("output_file_id")
+    batch.error_file_id = st.get("error_file_id")
+    if st["status"] != "completed":
+        batch.error = f"provider batch {st['status']}"
+    db.session.commit()
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            _store_results(batch, backend.results(file_id))
+
+    # Anything the provider never answered (expired / cancelled batch).
+    for item in batch.items.filter_by(status="pending"):
+        item.status = "failed"
+        item.error = f"no result (provider status {st['status']})"
+    batch.status = "downloaded"
+    _recount(batch)
+    db.session.commit()
+    return True
+
+
+def _store_results(batch: LLMBatch, lines: Iterator[Dict[str, Any]]) -> None:
+    pending = {item.custom_id: item for item in batch.items.filter_by(status="pending")}
+    n = 0
+    for line in lines:
+        item = pending.pop(line.get("custom_id"), None)
+        if item is None:  # already stored by an earlier, interrupted download
+            continue
+        response = line.get("response") or {}
+        if line.get("error") or int(response.get("status_code") or 0) != 200:
+            item.status = "failed"
+            item.error = json.dumps(line.get("error") or response.get("body"), ensure_ascii=False)[:2000]
+        else:
+            item.status = "succeeded"
+            item.response_json = json.dumps(response.get("body"), ensure_ascii=False)
+        n += 1
+        if n % LLM_BATCH_CHUNK == 0:
+            db.session.commit()
+    db.session.commit()
+
+
+def apply(batch: LLMBatch, *, limit: Optional[int] = None) -> int:
+    """Write results into the feature rows, one commit per chunk. Resumable."""
+    from openai.types.chat import ChatCompletion
+
+    kind = get_kind(batch.kind)
+    done = 0
+    while limit is None or done < limit:
+        chunk = (
+            batch.items.filter_by(status="succeeded")
+            .order_by(LLMBatchItem.id)
+            .limit(min(LLM_BATCH_CHUNK, limit - done) if limit else LLM_BATCH_CHUNK)
+            .all()
+        )
+        if not chunk:
+            break
+        for item in chunk:
+            args = json.loads(item.args_json or "{}")
+            try:
+                with db.session.begin_nested():
+                    resp = ChatCompletion.model_validate_json(item.response_json)
+                    with replay_response(resp):
+                        result, ok = kind.generate(**args.get("kwargs", {}))
+                    if not ok:
+                        raise ValueError("generator fell back on the batch result")
+                    applied = kind.apply(item.user_id, args.get("kwargs", {}), args.get("context", {}), result)
+                item.status = "applied" if applied else "skipped"
+            except Exception as e:
+                logger.warning("llm_batch item %s failed to apply: %s", item.custom_id, e)
+                item.status = "failed"
+                item.error = f"apply: {e.__class__.__name__}: {e}"[:2000]
+        _recount(batch)
+        db.session.commit()
+        done += len(chunk)
+        _log(batch, "applied chunk")
+
+    if not batch.items.filter_by(status="succeeded").count():
+        batch.status = "done"
+        batch.finished_at = datetime.utcnow()
+        db.session.commit()
+    return done
+
+
+def _recount(batch: LLMBatch) -> None:
+    counts = dict(
+        db.session.query(LLMBatchItem.status, func.count(LLMBatchItem.id))
+        .filter(LLMBatchItem.batch_id == batch.id)
+        .group_by(LLMBatchItem.status)
+        .all()
+    )
+    batch.failed = counts.get("failed", 0)
+    batch.applied = counts.get("applied", 0) + counts.get("skipped", 0)
+    batch.completed = counts.get("succeeded", 0) + batch.applied
+
+
+def advance(batch: LLMBatch, *, client: Any = None) -> Dict[str, Any]:
+    """
+    Move the batch as far as possible without waiting on the provider.
+
+    Errors are recorded on the batch (status failed) only for steps that
+    cannot be retried; provider/network errors propagate so the caller
+    (RQ job, cron) simply tries again later.
+    """
+    if batch.status == "pending":
+        build_items(batch)
+        _log(batch, "built")
+        submit(batch, client=client)
+        _log(batch, "submitted")
+    if batch.status == "submitted":
+        if not poll(batch, client=client):
+            _log(batch, "waiting")
+            return batch.progress()
+        _log(batch, "downloaded")
+    if batch.status == "downloaded":
+        apply(batch)
+        _log(batch, "finished")
+    return batch.progress()
+
+
+def cancel(batch: LLMBatch, *, client: Any = None) -> None:
+    if batch.status in TERMINAL:
+        return
+    if batch.status == "submitted" and batch.backend == "openai" and batch.provider_batch_id:
+        get_backend("openai", client).client.batches.cancel(batch.provider_batch_id)
+    batch.status = "cancelled"
+    batch.finished_at = datetime.utcnow()
+    db.session.commit()
+    _log(batch, "cancelled")
+
+
+def active_batches() -> List[LLMBatch]:
+    return LLMBatch.query.filter(LLMBatch.status.notin_(TERMINAL)).order_by(LLMBatch.id).all()
+
+
+def _log(batch: LLMBatch, event: str) -> None:
+    p = batch.progress()
+    logger.info(
+        "llm_batch id=%s kind=%s event=%s status=%s total=%d completed=%d failed=%d applied=%d (%d%%)",
+        p["id"],
+        p["kind"],
+        event,
+        p["status"],
+        p["total"],
+        p["completed"],
+        p["failed"],
+        p["applied"],
+        p["percent"],
+    )
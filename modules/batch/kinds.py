@@ -0,0 +1,375 @@
+# modules/batch/kinds.py
+"""
+Workloads the batch engine knows how to run.
+
+Each kind has three parts:
+
+- select(params) -> [(user_id, kwargs, context)]: the cohort, and for
+  each user the keyword arguments of the normal generator. `context`
+  holds what apply() needs besides the result (ids, digests).
+- generate(**kwargs) -> (result, ok): the unchanged live generator.
+  The engine calls it once under llm.capture_requests() to get the
+  request body, and again under llm.replay_response() with the batch
+  result, so parsing, validation and fallbacks are the live ones.
+- apply(user_id, kwargs, context, result) -> bool: writes the rows.
+  Returns False when the item no longer applies (skipped).
+
+Admin bulk runs are not billed: no credits are deducted or refunded.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import undefer
+
+from models import (
+    DailyCoachSession,
+    DailyCoachTask,
+    DreamPlanSnapshot,
+    ResumeAsset,
+    SkillMapSnapshot,
+    User,
+    UserProfile,
+    db,
+)
+
+# OpenAI accepts up to 50,000 requests per batch.
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "50000"))
+
+Target = Tuple[int, Dict[str, Any], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class BatchKind:
+    name: str
+    select: Callable[[Dict[str, Any]], List[Target]]
+    generate: Callable[..., Tuple[Any, bool]]
+    apply: Callable[[int, Dict[str, Any], Dict[str, Any], Any], bool]
+
+
+def _user_query(params: Dict[str, Any]):
+    """Users narrowed by the common params: user_ids, university_id."""
+    q = User.query
+    user_ids = params.get("user_ids")
+    if user_ids:
+        q = q.filter(User.id.in_([int(u) for u in user_ids]))
+    if params.get("university_id"):
+        q = q.filter(User.university_id == int(params["university_id"]))
+    return q
+
+
+def _limit(params: Dict[str, Any]) -> int:
+    return max(1, min(int(params.get("limit") or LLM_BATCH_MAX_ITEMS), LLM_BATCH_MAX_ITEMS))
+
+
+def _profiles_by_user(user_ids: List[int]) -> Dict[int, UserProfile]:
+    if not user_ids:
+        return {}
+    rows = UserProfile.query.filter(UserProfile.user_id.in_(user_ids)).all()
+    return {p.user_id: p for p in rows}
+
+
+def _resume_texts(users: List[User]) -> Dict[int, str]:
+    """Current resume text per user: the pointer when set, else the latest upload."""
+    out: Dict[int, str] = {}
+    pointed = {u.current_resume_id: u.id for u in users if u.current_resume_id}
+    if pointed:
+        for asset in ResumeAsset.query.filter(ResumeAsset.id.in_(list(pointed))).all():
+            if asset.user_id == pointed.get(asset.id):
+                out[asset.user_id] = asset.text or ""
+    rest = [u.id for u in users if u.id not in out]
+    if rest:
+        latest = (
+            db.session.query(ResumeAsset.user_id, func.max(ResumeAsset.id))
+            .filter(ResumeAsset.user_id.in_(rest))
+            .group_by(ResumeAsset.user_id)
+            .all()
+        )
+        ids = [asset_id for _, asset_id in latest]
+        if ids:
+            for asset in ResumeAsset.query.filter(ResumeAsset.id.in_(ids)).all():
+                out[asset.user_id] = asset.text or ""
+    return out
+
+
+# ---------------------------------------------------------------------
+# Skill Mapper: re-run skill maps for a cohort -> SkillMapSnapshot
+# ---------------------------------------------------------------------
+
+
+def _skillmap_select(params: Dict[str, Any]) -> List[Target]:
+    from modules.skillmapper.routes import MAX_RESUME_TEXT, _profile_json
+
+    pro_mode = bool(params.get("pro_mode", False))
+    region = (params.get("region_sector") or "").strip() or "India · early-career tech roles"
+
+    users = _user_query(params).order_by(User.id).limit(_limit(params)).all()
+    resumes = _resume_texts(users)
+    profiles = _profiles_by_user([u.id for u in users])
+
+    targets: List[Target] = []
+    for user in users:
+        resume_text = (resumes.get(user.id) or "")[:MAX_RESUME_TEXT]
+        profile = _profile_json(user.id) if user.id in profiles else {}
+        if not profile and not resume_text:
+            continue
+        kwargs = {
+            "pro_mode": pro_mode,
+            "profile_json": profile or None,
+            "resume_text": resume_text,
+            "hints": {
+                "region_sector": region,
+                "use_profile": bool(profile),
+                "focus": "current_snapshot",
+            },
+        }
+        targets.append((user.id, kwargs, {"region": region}))
+    return targets
+
+
+def _skillmap_generate(**kwargs: Any) -> Tuple[Any, bool]:
+    from modules.common.ai import generate_skillmap
+
+    return generate_skillmap(return_source=True, **kwargs)
+
+
+def _skillmap_apply(user_id: int, kwargs: Dict[str, Any], context: Dict[str, Any], data: Any) -> bool:
+    from modules.skillmapper.routes import _normalize_roles, json_dumps_safe
+
+    data = _normalize_roles(data) if isinstance(data, dict) else {}
+    input_text = (
+        f"profile={'on' if kwargs.get('profile_json') else 'off'}; "
+        f"region={context.get('region') or 'India-default'}"
+    )
+    db.session.add(
+        SkillMapSnapshot(
+            user_id=user_id,
+            source_title="Skill Mapper (batch)",
+            input_text=input_text,
+            input_preview=input_text[:160],
+            skills_json=json_dumps_safe(data),
+            created_at=datetime.utcnow(),
+        )
+    )
+    return True
+
+
+# ---------------------------------------------------------------------
+# Weekly Coach: next month's first week at month rollover
+# -> DailyCoachSession + DailyCoachTask
+# ---------------------------------------------------------------------
+
+
+def _month_cycle_id(user_id: int, path_type: str, day: date) -> str:
+    return f"user_{user_id}_path_{path_type}_month_{day.year}_{day.month:02d}"
+
+
+def _coach_select(params: Dict[str, Any]) -> List[Target]:
+    path_type = (params.get("path_type") or "job").strip().lower()
+    if path_type not in ("job", "startup"):
+        path_type = "job"
+    today = date.fromisoformat(params["session_date"]) if params.get("session_date") else date.today()
+    prev = date(today.year - 1, 12, 1) if today.month == 1 else date(today.year, today.month - 1, 1)
+    prev_suffix = f"_path_{path_type}_month_{prev.year}_{prev.month:02d}"
+    cur_suffix = f"_path_{path_type}_month_{today.year}_{today.month:02d}"
+
+    # Users who coached last month and have not started this month yet.
+    had_prev = (
+        db.session.query(DailyCoachSession.user_id)
+        .filter(DailyCoachSession.month_cycle_id.like(f"%{prev_suffix}"))
+        .distinct()
+    )
+    has_cur = (
+        db.session.query(DailyCoachSession.user_id)
+        .filter(DailyCoachSession.month_cycle_id.like(f"%{cur_suffix}"))
+        .distinct()
+    )
+    user_ids = [
+        u.id
+        for u in _user_query(params)
+        .filter(User.id.in_(had_prev), ~User.id.in_(has_cur))
+        .with_entities(User.id)
+        .order_by(User.id)
+        .limit(_limit(params))
+    ]
+    if not user_ids:
+        return []
+
+    # Latest Dream Plan per user (one query).
+    latest_ids = (
+        db.session.query(func.max(DreamPlanSnapshot.id))
+        .filter(DreamPlanSnapshot.user_id.in_(user_ids), DreamPlanSnapshot.path_type == path_type)
+        .group_by(DreamPlanSnapshot.user_id)
+    )
+    snapshots = {
+        s.user_id: s
+        for s in DreamPlanSnapshot.query.filter(DreamPlanSnapshot.id.in_(latest_ids))
+        .options(undefer(DreamPlanSnapshot.plan_json))
+        .all()
+    }
+
+    # Last month's sessions with task counts, for difficulty adjustment.
+    history_rows = (
+        db.session.query(
+            DailyCoachSession.user_id,
+            DailyCoachSession.session_date,
+            DailyCoachSession.day_index,
+            func.count(DailyCoachTask.id),
+            func.sum(case((DailyCoachTask.is_done.is_(True), 1), else_=0)),
+        )
+        .outerjoin(DailyCoachTask, DailyCoachTask.session_id == DailyCoachSession.id)
+        .filter(
+            DailyCoachSession.user_id.in_(user_ids),
+            DailyCoachSession.month_cycle_id.like(f"%{prev_suffix}"),
+        )
+        .group_by(DailyCoachSession.id)
+        .order_by(DailyCoachSession.session_date)
+        .all()
+    )
+    history: Dict[int, List[Dict[str, Any]]] = {}
+    for uid, session_date, day_index, total, done in history_rows:
+        history.setdefault(uid, []).append(
+            {
+                "session_date": session_date.isoformat() if session_date else None,
+                "day_index": day_index,
+                "tasks_total": int(total or 0),
+                "tasks_done": int(done or 0),
+            }
+        )
+
+    targets: List[Target] = []
+    for uid in user_ids:
+        snap = snapshots.get(uid)
+        try:
+            dream_plan = json.loads(snap.plan_json) if snap and snap.plan_json else {}
+        except Exception:
+            dream_plan = {}
+        kwargs = {
+            "path_type": path_type,
+            "dream_plan": dream_plan,
+            "progress_history": history.get(uid, []),
+            "session_date": today.isoformat(),
+            "day_index": 1,
+        }
+        context = {
+            "month_cycle_id": _month_cycle_id(uid, path_type, today),
+            "plan_digest": snap.inputs_digest if snap else None,
+            "plan_title": snap.plan_title if snap else None,
+        }
+        targets.append((uid, kwargs, context))
+    return targets
+
+
+def _coach_generate(**kwargs: Any) -> Tuple[Any, bool]:
+    from modules.common.ai import generate_daily_coach_plan
+
+    return generate_daily_coach_plan(return_source=True, **kwargs)
+
+
+def _coach_apply(user_id: int, kwargs: Dict[str, Any], context: Dict[str, Any], plan: Any) -> bool:
+    month_cycle_id = context["month_cycle_id"]
+    # The user may have started a plan by hand since the batch was built.
+    if DailyCoachSession.query.filter_by(user_id=user_id, month_cycle_id=month_cycle_id).first():
+        return False
+
+    plan = plan if isinstance(plan, dict) else {}
+    session = DailyCoachSession(
+        user_id=user_id,
+        path_type=kwargs["path_type"],
+        session_date=date.fromisoformat(kwargs["session_date"]),
+        day_index=1,
+        month_cycle_id=month_cycle_id,
+        plan_digest=context.get("plan_digest"),
+        plan_title=context.get("plan_title"),
+        is_closed=False,
+        ai_note=plan.get("ai_note") or "",
+        daily_tasks_completed=0,
+        weekly_task_completed=False,
+        progress_percent=0,
+    )
+    db.session.add(session)
+    db.session.flush()
+
+    for idx, task in enumerate(plan.get("tasks") or []):
+        minutes = task.get("suggested_minutes")
+        db.session.add(
+            DailyCoachTask(
+                session_id=session.id,
+                task_type="weekly",
+                week_number=1,
+                day_number=None,
+                title=task.get("title") or f"Task {idx + 1}",
+                detail=task.get("detail") or "",
+                category=task.get("category") or "general",
+                sort_order=task.get("sort_order") if isinstance(task.get("sort_order"), int) else idx,
+                estimated_minutes=minutes,
+                estimated_time_minutes=int(minutes or 10),
+                tips=task.get("guide"),
+                tags=task.get("tags") or None,
+                milestone_title=task.get("milestone_title"),
+                milestone_step=task.get("milestone_step"),
+                is_done=False,
+            )
+        )
+    return True
+
+
+# ---------------------------------------------------------------------
+# Resume parse backfill -> UserProfile
+# ---------------------------------------------------------------------
+
+
+def _resume_parse_select(params: Dict[str, Any]) -> List[Target]:
+    users = _user_query(params).filter(
+        User.id.in_(db.session.query(ResumeAsset.user_id).distinct())
+    )
+    if not params.get("force"):
+        # Backfill only: profiles that were never filled from a resume.
+        filled = db.session.query(UserProfile.user_id).filter(
+            UserProfile.full_name.isnot(None), UserProfile.headline.isnot(None)
+        )
+        users = users.filter(~User.id.in_(filled))
+    users = users.order_by(User.id).limit(_limit(params)).all()
+
+    texts = _resume_texts(users)
+    return [(u.id, {"resume_text": texts[u.id]}, {}) for u in users if (texts.get(u.id) or "").strip()]
+
+
+def _resume_parse_generate(**kwargs: Any) -> Tuple[Any, bool]:
+    from modules.resume.parser import parse_resume_to_profile
+
+    parsed = parse_resume_to_profile(**kwargs)
+    return parsed, parsed is not None
+
+
+def _resume_parse_apply(user_id: int, kwargs: Dict[str, Any], context: Dict[str, Any], parsed: Any) -> bool:
+    from modules.settings.routes import _merge_parsed_profile
+
+    prof = UserProfile.query.filter_by(user_id=user_id).first()
+    if prof is None:
+        prof = UserProfile(user_id=user_id)
+        db.session.add(prof)
+    changed = _merge_parsed_profile(prof, parsed or {})
+    if changed:
+        prof.updated_at = datetime.utcnow()
+    return changed
+
+
+KINDS: Dict[str, BatchKind] = {
+    k.name: k
+    for k in (
+        BatchKind("skillmap", _skillmap_select, _skillmap_generate, _skillmap_apply),
+        BatchKind("coach", _coach_select, _coach_generate, _coach_apply),
+        BatchKind("resume_parse", _resume_parse_select, _resume_parse_generate, _resume_parse_apply),
+    )
+}
+
+
+def get_kind(name: str) -> Optional[BatchKind]:
+    return KINDS.get((name or "").strip().lower())
@@ -0,0 +1,74 @@
+# modules/batch/tasks.py
+"""
+RQ entry point for LLM batches.
+
+`enqueue_batch_step(batch_id)` queues one `advance()` on the bulk queue.
+Building a large cohort and applying thousands of results can take
+minutes, so this never runs inside a request. A batch that is still
+waiting on the provider after the step is picked up again by the next
+step. Admins can trigger one from the batch routes, and a cron can run
+`python -m modules.batch advance --all`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from redis import Redis
+
+from modules.common import scheduling
+from modules.common.query_stats import track_queries
+
+logger = logging.getLogger("llm_batch")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+LLM_BATCH_JOB_TIMEOUT = int(os.getenv("LLM_BATCH_JOB_TIMEOUT", "3600"))
+
+_LOCK = "llm_batch:lock:{}"
+
+
+def _redis() -> Redis:
+    return Redis.from_url(REDIS_URL)
+
+
+def enqueue_batch_step(batch_id: int, *, user_id: Optional[int] = None) -> str:
+    """Queue one advance() of the batch on the bulk queue. Returns the RQ job id."""
+    job = scheduling.enqueue(
+        _redis(),
+        process_batch_step,
+        user_id=user_id or 0,
+        job_class="bulk",
+        kwargs=dict(batch_id=batch_id),
+        job_timeout=LLM_BATCH_JOB_TIMEOUT,
+        result_ttl=int(os.getenv("RQ_RESULT_TTL", "500")),
+        failure_ttl=int(os.getenv("RQ_FAILURE_TTL", "3600")),
+    )
+    return job.id
+
+
+def process_batch_step(*, batch_id: int) -> Dict[str, Any]:
+    from modules.jobpack.tasks import _load_flask_app
+
+    app = _load_flask_app()
+    conn = _redis()
+    # One step per batch at a time (admin clicks + cron may overlap).
+    if not conn.set(_LOCK.format(batch_id), "1", nx=True, ex=LLM_BATCH_JOB_TIMEOUT):
+        return {"ok": False, "error": "batch step already running"}
+    try:
+        with app.app_context(), track_queries("job:process_batch_step"):
+            from models import LLMBatch, db
+            from modules.batch import engine
+
+            batch = db.session.get(LLMBatch, batch_id)
+            if batch is None:
+                return {"ok": False, "error": "batch not found"}
+            try:
+                return {"ok": True, **engine.advance(batch)}
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("llm_batch id=%s step failed", batch_id)
+                return {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+    finally:
+        conn.delete(_LOCK.format(batch_id))
@@ -37,6 +37,7 @@ from flask import (
     abort,
 )
 from flask_login import current_user, login_required
+from sqlalchemy.orm import undefer
 
 from models import (
     DailyCoachSession,
@@ -448,6 +449,7 @@ def _auto_promote_locked_snapshots(user_id: int, path_type: str):
 
         recent = (
             DreamPlanSnapshot.query.filter_by(user_id=user_id, path_type=path_type)
+            .options(undefer(DreamPlanSnapshot.plan_json))
             .order_by(DreamPlanSnapshot.created_at.desc())
             .limit(10)
             .all()
@@ -23,6 +23,8 @@ from rq import Queue, get_current_job
 
 from models import db, DailyCoachSession, DailyCoachTask, User
 from modules.common.ai import generate_daily_coach_plan
+from modules.common import scheduling
+from modules.common.query_stats import track_queries
 from modules.credits.engine import refund
 
 
@@ -165,12 +167,12 @@ def enqueue_coach_generation(
     Enqueue 28-day coach generation task.
     Returns the RQ job_id (string).
     """
-    q = get_queue(DEFAULT_QUEUE_NAME)
-
     from modules.coach.tasks import process_coach_generation
 
-    job = q.enqueue(
+    job = scheduling.enqueue(
+        _redis(),
         process_coach_generation,
+        user_id=user_id,
         kwargs=dict(
             user_id=user_id,
             path_type=path_type,
@@ -209,7 +211,7 @@ def process_coach_generation(
     app = _load_flask_app()
     job = get_current_job()
 
-    with app.app_context():
+    with app.app_context(), track_queries("job:process_coach_generation"):
         user = User.query.filter_by(id=user_id).first()
 
         if not user:
@@ -6,6 +6,24 @@ from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime, timezone
 
+from modules.common.llm import chat_completion, extract_usage, layout_messages
+from modules.common.schemas import (
+    validate_daily_coach,
+    validate_dream_plan,
+    validate_dualtrack_month,
+    validate_portfolio_free,
+    validate_portfolio_pro,
+    validate_skillmap,
+)
+from modules.common.structured import record_fallback, structured_completion, structured_schema
+from modules.common.prompt_budget import (
+    PromptSection,
+    assemble_sections,
+    compact_schema,
+    compact_text,
+    fit_to_tokens,
+)
+
 # -------------------------------------------------------------------
 # Config (env-driven)
 # -------------------------------------------------------------------
@@ -37,15 +55,6 @@ def _inputs_digest(obj: Any) -> str:
         return "sha256:na"
 
 
-def _to_sentence(text: str) -> str:
-    text = (text or "").strip()
-    if not text:
-        return ""
-    if not text.endswith((".", "!", "?")):
-        text = text + "."
-    return text
-
-
 # -------------------------------------------------------------------
 # Portfolio Builder (free & pro) JSON schemas + prompts
 # -------------------------------------------------------------------
@@ -131,6 +140,10 @@ PORTFOLIO_PRO_JSON_SCHEMA = r"""
 }
 """
 
+# Minified once at import (schemas are sent on every call)
+PORTFOLIO_FREE_JSON_SCHEMA_COMPACT = compact_schema(PORTFOLIO_FREE_JSON_SCHEMA)
+PORTFOLIO_PRO_JSON_SCHEMA_COMPACT = compact_schema(PORTFOLIO_PRO_JSON_SCHEMA)
+
 PORTFOLIO_FREE_PROMPT = """\
 You are PortfolioBuilderFree, a friendly early-career project coach for a Flask web app.
 
@@ -211,47 +224,9 @@ Return JSON only.
 """
 
 
-def _light_validate_portfolio_free(data: Any) -> Dict[str, Any]:
-    if not isinstance(data, dict):
-        return {"mode": "free", "ideas": [], "meta": {}}
-    ideas = data.get("ideas") or []
-    if not isinstance(ideas, list):
-        ideas = []
-    if ideas:
-        i = ideas[0]
-        i["title"] = (i.get("title") or "Portfolio Project")[:120]
-        i["why"] = _to_sentence(i.get("why") or "")
-        i["what"] = [(str(x)[:110]) for x in (i.get("what") or [])][:6]
-        i["milestones"] = [(str(x)[:110]) for x in (i.get("milestones") or [])][:3]
-        i["resume_bullets"] = [(str(x)[:160]) for x in (i.get("resume_bullets") or [])][:3]
-        i["stack"] = [(str(x)[:32]) for x in (i.get("stack") or [])][:4]
-        ideas = [i]
-    meta = data.get("meta") or {}
-    return {"mode": "free", "ideas": ideas, "meta": meta}
-
-
-def _light_validate_portfolio_pro(data: Any) -> Dict[str, Any]:
-    if not isinstance(data, dict):
-        return {"mode": "pro", "ideas": [], "meta": {}}
-    ideas = data.get("ideas") or []
-    if not isinstance(ideas, list):
-        ideas = []
-    out = []
-    for i in ideas[:3]:
-        i = dict(i)
-        i["title"] = (i.get("title") or "Portfolio Project")[:120]
-        i["why"] = _to_sentence(i.get("why") or "")
-        i["what"] = [(str(x)[:120]) for x in (i.get("what") or [])][:6]
-        i["milestones"] = [(str(x)[:120]) for x in (i.get("milestones") or [])][:6]
-        i["rubric"] = [(str(x)[:120]) for x in (i.get("rubric") or [])][:6]
-        i["risks"] = [(str(x)[:120]) for x in (i.get("risks") or [])][:4]
-        i["stretch_goals"] = [(str(x)[:120]) for x in (i.get("stretch_goals") or [])][:4]
-        i["resume_bullets"] = [(str(x)[:160]) for x in (i.get("resume_bullets") or [])][:5]
-        i["stack"] = [(str(x)[:32]) for x in (i.get("stack") or [])][:10]
-        i["mentor_note"] = (i.get("mentor_note") or "")[:260]
-        out.append(i)
-    meta = data.get("meta") or {}
-    return {"mode": "pro", "ideas": out, "meta": meta}
+# Output shapes are in modules/common/schemas.py (compiled validators).
+_light_validate_portfolio_free = validate_portfolio_free
+_light_validate_portfolio_pro = validate_portfolio_pro
 
 
 def generate_portfolio_idea(
@@ -273,25 +248,37 @@ def generate_portfolio_idea(
     skills_json = skills_json or {}
 
     prompt_template = PORTFOLIO_PRO_PROMPT if pro_mode else PORTFOLIO_FREE_PROMPT
-    schema = PORTFOLIO_PRO_JSON_SCHEMA if pro_mode else PORTFOLIO_FREE_JSON_SCHEMA
-
-    prompt = prompt_template.format(
-        freshness=FRESHNESS_NOTE,
-        profile_json=json.dumps(profile_json, ensure_ascii=False),
-        skills_json=json.dumps(skills_json, ensure_ascii=False),
-        extra_text=(extra_text or "")[:2000],
-        json_schema=schema,
+    schema = PORTFOLIO_PRO_JSON_SCHEMA_COMPACT if pro_mode else PORTFOLIO_FREE_JSON_SCHEMA_COMPACT
+    feature = "portfolio_idea_pro" if pro_mode else "portfolio_idea_free"
+
+    parts = assemble_sections(
+        feature,
+        [
+            PromptSection("profile", profile_json, kind="json", priority=80, min_tokens=300),
+            PromptSection("skills", skills_json, kind="json", priority=70, min_tokens=100),
+            PromptSection("extra", extra_text or "", priority=60),
+        ],
+    )
+
+    messages = layout_messages(
+        prompt_template,
+        system="You output ONLY JSON matching the schema.",
+        static={"freshness": FRESHNESS_NOTE, "json_schema": schema},
+        dynamic={
+            "profile_json": parts["profile"],
+            "skills_json": parts["skills"],
+            "extra_text": parts["extra"],
+        },
     )
 
     used_live_ai = False
 
     try:
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            feature,
+            client=client,
             model=OPENAI_MODEL_DEEP if pro_mode else OPENAI_MODEL_FAST,
-            messages=[
-                {"role": "system", "content": "You output ONLY JSON matching the schema."},
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.5 if pro_mode else 0.6,
             max_tokens=1800 if pro_mode else 1200,
             response_format={"type": "json_object"},
@@ -466,6 +453,8 @@ INTERNSHIP_JSON_SCHEMA = r"""
 }
 """
 
+INTERNSHIP_JSON_SCHEMA_COMPACT = compact_schema(INTERNSHIP_JSON_SCHEMA)
+
 PRO_INTERNSHIP_ANALYZER_PROMPT = """\
 You are InternshipAnalyzer, a Pro career coach.
 Return ONLY valid JSON matching the schema.
@@ -496,33 +485,40 @@ def generate_internship_analysis(
     *,
     internship_text: str,
     profile_json: Optional[Dict[str, Any]] = None,
+    pro_mode: bool = True,
     return_source: bool = False,
 ) -> Dict[str, Any] | Tuple[Dict[str, Any], bool]:
-    """Deep Internship Analyzer (Pro)."""
+    """Internship Analyzer: Pro runs on the deep model, Free on the fast one."""
     from openai import OpenAI
 
     client = OpenAI()
     profile_json = profile_json or {}
 
     internship_text = (internship_text or "").strip()
-    if len(internship_text) > 12000:
-        internship_text = internship_text[:12000]
-
-    prompt = PRO_INTERNSHIP_ANALYZER_PROMPT.format(
-        freshness=FRESHNESS_NOTE,
-        internship_text=internship_text,
-        profile_json=json.dumps(profile_json, ensure_ascii=False),
-        json_schema=INTERNSHIP_JSON_SCHEMA,
+
+    parts = assemble_sections(
+        "internship_analyzer",
+        [
+            PromptSection("jd", internship_text, max_tokens=3000, priority=90, min_tokens=600),
+            PromptSection("profile", profile_json, kind="json", priority=70, min_tokens=300),
+        ],
+    )
+    internship_text = parts["jd"]
+
+    messages = layout_messages(
+        PRO_INTERNSHIP_ANALYZER_PROMPT,
+        system="You output ONLY JSON matching the schema.",
+        static={"freshness": FRESHNESS_NOTE, "json_schema": INTERNSHIP_JSON_SCHEMA_COMPACT},
+        dynamic={"internship_text": internship_text, "profile_json": parts["profile"]},
     )
 
     used_live_ai = False
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL_DEEP,
-            messages=[
-                {"role": "system", "content": "You output ONLY JSON matching the schema."},
-                {"role": "user", "content": prompt},
-            ],
+        resp = chat_completion(
+            "internship_analyzer",
+            client=client,
+            model=OPENAI_MODEL_DEEP if pro_mode else OPENAI_MODEL_FAST,
+            messages=messages,
             temperature=0.5,
             max_tokens=1600,
             response_format={"type": "json_object"},
@@ -533,7 +529,7 @@ def generate_internship_analysis(
     except Exception:
         # Fallback minimal
         data = {
-            "mode": "pro",
+            "mode": "pro" if pro_mode else "free",
             "skill_growth": [],
             "skill_enhancement": [],
             "new_paths": [],
@@ -562,7 +558,7 @@ def generate_internship_analysis(
         resume_boost = []
 
     clean = {
-        "mode": "pro",
+        "mode": "pro" if pro_mode else "free",
         "skill_growth": [str(x)[:160] for x in skill_growth][:10],
         "skill_enhancement": [str(x)[:160] for x in skill_enhancement][:10],
         "new_paths": [str(x)[:160] for x in new_paths][:10],
@@ -740,38 +736,9 @@ Where:
 """
 
 
-def _build_skillmapper_prompt(
-    *,
-    pro_mode: bool,
-    profile_json: Optional[Dict[str, Any]] = None,
-    resume_text: str = "",
-    free_text_skills: str = "",
-    hints: Optional[Dict[str, Any]] = None,
-) -> str:
-    profile_json = profile_json or {}
-    hints = hints or {}
-    region_focus = hints.get("region_focus") or hints.get("region_sector") or "India · early-career tech roles"
-    focus = hints.get("focus") or "current_snapshot"
-    target_domain = hints.get("target_domain") or ""
-    path_type = hints.get("path_type") or "job"
-
-    persona = "You are SkillMapper, a career path coach."
-    if path_type == "startup":
-        persona = "You are SkillMapperStartup, a startup path coach for students/freshers."
-    elif path_type == "freelance":
-        persona = "You are SkillMapperFreelance, a freelance income path coach for students/freshers."
-
-    resume_excerpt = (resume_text or "").strip()
-    if len(resume_excerpt) > 12000:
-        resume_excerpt = resume_excerpt[:12000]
-
-    free_text_skills = (free_text_skills or "").strip()
-    if len(free_text_skills) > 4000:
-        free_text_skills = free_text_skills[:4000]
+SKILLMAPPER_PROMPT = """{persona}
 
-    prompt = f"""{persona}
-
-Freshness: {FRESHNESS_NOTE}
+Freshness: {freshness}
 
 CONTEXT:
 - The user is a student or early-career technologist.
@@ -780,10 +747,10 @@ CONTEXT:
 - Your ROLE/STEP/SUMMARY lines should be crisp and readable so they look awesome in a large-font UI.
 
 PROFILE_JSON:
-{json.dumps(profile_json, ensure_ascii=False)}
+{profile_json}
 
 RESUME_TEXT (excerpt, may be noisy):
-{resume_excerpt}
+{resume_text}
 
 FREE_TEXT_SKILLS (optional extra info from user):
 {free_text_skills}
@@ -811,10 +778,65 @@ If path_type == "freelance":
 - Salary_band can be phrased as typical monthly/side income bands instead of CTC.
 
 FORMAT:
+
+{output_format}
+
+Remember: Only output ROLE|, STEPS|, SUMMARY| lines. No other text.
 """
-    prompt += "\n\n" + SIMPLE_SKILLMAPPER_OUTPUT_FORMAT
-    prompt += "\n\nRemember: Only output ROLE|, STEPS|, SUMMARY| lines. No other text."
-    return prompt
+
+
+def _build_skillmapper_messages(
+    *,
+    pro_mode: bool,
+    profile_json: Optional[Dict[str, Any]] = None,
+    resume_text: str = "",
+    free_text_skills: str = "",
+    hints: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, str]]:
+    profile_json = profile_json or {}
+    hints = hints or {}
+    region_focus = hints.get("region_focus") or hints.get("region_sector") or "India · early-career tech roles"
+    focus = hints.get("focus") or "current_snapshot"
+    target_domain = hints.get("target_domain") or ""
+    path_type = hints.get("path_type") or "job"
+
+    persona = "You are SkillMapper, a career path coach."
+    if path_type == "startup":
+        persona = "You are SkillMapperStartup, a startup path coach for students/freshers."
+    elif path_type == "freelance":
+        persona = "You are SkillMapperFreelance, a freelance income path coach for students/freshers."
+
+    parts = assemble_sections(
+        "skill_mapper_pro" if pro_mode else "skill_mapper_free",
+        [
+            PromptSection("resume", resume_text or "", max_tokens=3000, priority=80, min_tokens=600),
+            PromptSection("extra", free_text_skills or "", max_tokens=1000, priority=70),
+            PromptSection("profile", profile_json, kind="json", priority=90, min_tokens=300),
+        ],
+    )
+    resume_excerpt = parts["resume"]
+    free_text_skills = parts["extra"]
+    profile_text = parts["profile"]
+
+    return layout_messages(
+        SKILLMAPPER_PROMPT,
+        system="You follow the instructions exactly and output ONLY the specified line format.",
+        static={
+            "persona": persona,
+            "freshness": FRESHNESS_NOTE,
+            "pro_mode": pro_mode,
+            "path_type": path_type,
+            "output_format": SIMPLE_SKILLMAPPER_OUTPUT_FORMAT,
+        },
+        dynamic={
+            "profile_json": profile_text,
+            "resume_text": resume_excerpt,
+            "free_text_skills": free_text_skills,
+            "region_focus": region_focus,
+            "focus": focus,
+            "target_domain": target_domain,
+        },
+    )
 
 
 def _parse_skillmapper_text(raw: str) -> Dict[str, Any]:
@@ -887,63 +909,7 @@ def _parse_skillmapper_text(raw: str) -> Dict[str, Any]:
     }
 
 
-def _light_validate_skillmap(data: Dict[str, Any]) -> Dict[str, Any]:
-    if not isinstance(data, dict):
-        return {
-            "mode": "free",
-            "roles": [],
-            "top_roles": [],
-            "hiring_now": [],
-            "market_insights": {},
-            "learning_paths": [],
-            "next_steps": [],
-            "impact_summary": "",
-            "call_to_action": "",
-            "meta": {},
-        }
-
-    roles = data.get("roles") or []
-    if not isinstance(roles, list):
-        roles = []
-    cleaned_roles = []
-    for r in roles[:6]:
-        r = dict(r)
-        r["title"] = (r.get("title") or r.get("role_title") or "Role")[:80]
-        r["level"] = (r.get("level") or r.get("seniority") or "Entry-level")[:60]
-        try:
-            ms = int(r.get("match_score") or r.get("fit_score") or 0)
-        except Exception:
-            ms = 0
-        r["match_score"] = max(0, min(100, ms))
-        r["why_fit"] = (r.get("why_fit") or r.get("summary") or "")[:400]
-        r["skills"] = [(str(x)[:40]) for x in (r.get("skills") or [])][:12]
-        r["gaps"] = [(str(x)[:40]) for x in (r.get("gaps") or [])][:12]
-        r["micro_projects"] = [(str(x)[:120]) for x in (r.get("micro_projects") or [])][:8]
-        r["salary"] = (r.get("salary") or "")[:120]
-        r["region"] = (r.get("region") or "")[:120]
-        cleaned_roles.append(r)
-
-    next_steps = data.get("next_steps") or []
-    if not isinstance(next_steps, list):
-        next_steps = []
-    next_steps = [(str(x)[:240]) for x in next_steps][:12]
-
-    impact_summary = (data.get("impact_summary") or "")[:800]
-    call_to_action = (data.get("call_to_action") or impact_summary)[:800]
-
-    out = {
-        "mode": data.get("mode") or "free",
-        "roles": cleaned_roles,
-        "top_roles": cleaned_roles[:3],
-        "hiring_now": data.get("hiring_now") or [],
-        "market_insights": data.get("market_insights") or {},
-        "learning_paths": data.get("learning_paths") or [],
-        "next_steps": next_steps,
-        "impact_summary": impact_summary,
-        "call_to_action": call_to_action,
-        "meta": data.get("meta") or {},
-    }
-    return out
+_light_validate_skillmap = validate_skillmap
 
 
 def generate_skillmap(
@@ -965,7 +931,7 @@ def generate_skillmap(
     profile_json = profile_json or {}
     hints = hints or {}
 
-    prompt = _build_skillmapper_prompt(
+    messages = _build_skillmapper_messages(
         pro_mode=pro_mode,
         profile_json=profile_json,
         resume_text=resume_text,
@@ -976,15 +942,11 @@ def generate_skillmap(
     used_live_ai = False
 
     try:
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            "skill_mapper_pro" if pro_mode else "skill_mapper_free",
+            client=client,
             model=OPENAI_MODEL_DEEP if pro_mode else OPENAI_MODEL_FAST,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You follow the instructions exactly and output ONLY the specified line format.",
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.45 if pro_mode else 0.6,
             max_tokens=1200 if pro_mode else 900,
         )
@@ -1080,7 +1042,7 @@ def generate_referral_messages(
 
     c = {k: (v or "").strip() for k, v in (contact or {}).items()}
     p = {k: (v or "").strip() for k, v in (profile or {}).items()}
-    p["job_description"] = p.get("job_description", "")[:2500]
+    p["job_description"] = fit_to_tokens(compact_text(p.get("job_description", "")), 650)
 
     prompt = f"""
 You are ReferralTrainer, a polite, concise outreach-message generator.
@@ -1113,16 +1075,20 @@ Return JSON ONLY:
 }}
 """
 
+    messages = [
+        {
+            "role": "system",
+            "content": "You output ONLY valid JSON with warm/cold/follow outreach messages."
+        },
+        {"role": "user", "content": prompt},
+    ]
+
     try:
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            "referral_trainer_free",
+            client=client,
             model=OPENAI_MODEL_FAST,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You output ONLY valid JSON with warm/cold/follow outreach messages."
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.55,
             max_tokens=600,
             response_format={"type": "json_object"},
@@ -1158,298 +1124,31 @@ Return JSON ONLY:
 # -------------------------------------------------------------------
 def _light_validate_daily_coach(data: Any) -> Dict[str, Any]:
     """
-    Defensive validation so UI never explodes if the model returns odd JSON.
-
-    Expected shape (minimum):
-      {
-        "session_date": "2025-12-04",
-        "day_index": 7,                # interpreted as "week index" in Weekly Coach
-        "ai_note": "...short coaching note...",
-        "tasks": [
-          {
-            "id": 1,
-            "title": "Finish SQL joins tutorial",
-            "detail": "Do 20 practice questions on joins & aggregations.",
-            "category": "skills",
-            "sort_order": 1,
-            "suggested_minutes": 45,
-            "guide": "extra coaching note",
-            "tags": ["sql", "practice"],
-            "phase_label": "Phase 2 · Weeks 5–8 · Projects + practice",
-            "week_index": 5,
-            "difficulty": "medium",
-            "project_label": "Game Portfolio Project",
-            "milestone_title": "Implement core gameplay loop",
-            "milestone_step": "Code basic player movement & collision",
-            "is_done": false
-          },
-          ...
-        ],
-        "meta": {...}
-      }
-
-    NOTE:
-    - This validator is intentionally tolerant:
-      - Missing fields are filled with safe defaults.
-      - Extra fields are ignored by the DB layer and only used by UI.
+    Defensive validation so UI never explodes if the model returns odd JSON
+    (see schemas.CoachSession for the shape). Missing fields get safe
+    defaults; meta is stamped here.
     """
-    if not isinstance(data, dict):
-        data = {}
-
-    session_date = data.get("session_date") or ""
-    day_index = data.get("day_index")
-    ai_note = data.get("ai_note") or ""
-    tasks = data.get("tasks") or []
-    meta = data.get("meta") or {}
-
-    clean_tasks: List[Dict[str, Any]] = []
-    if isinstance(tasks, list):
-        for idx, t in enumerate(tasks, start=1):
-            if not isinstance(t, dict):
-                continue
-
-            title = (t.get("title") or "").strip()
-            if not title:
-                continue
-
-            sort_order_raw = t.get("sort_order")
-            sort_order = sort_order_raw if isinstance(sort_order_raw, int) else idx
-
-            suggested_raw = t.get("suggested_minutes")
-            suggested_minutes = suggested_raw if isinstance(suggested_raw, int) else None
-
-            guide = (t.get("guide") or "").strip()
-            tags_val = t.get("tags") or []
-            if isinstance(tags_val, list):
-                tags = [str(x)[:32] for x in tags_val[:8] if str(x).strip()]
-            else:
-                tags = []
-
-            phase_label = (t.get("phase_label") or "").strip()[:80]
-            week_index_val = t.get("week_index")
-            week_index = week_index_val if isinstance(week_index_val, int) else None
-
-            difficulty = (t.get("difficulty") or "").strip()[:32]
-            project_label = (t.get("project_label") or "").strip()[:255]
-            milestone_title = (t.get("milestone_title") or "").strip()[:255]
-            milestone_step = (t.get("milestone_step") or "").strip()[:255]
-
-            clean_tasks.append(
-                {
-                    "id": t.get("id") or idx,
-                    "title": title[:255],
-                    "detail": (t.get("detail") or "").strip(),
-                    "category": (t.get("category") or "").strip()[:64],
-                    "sort_order": sort_order,
-                    "suggested_minutes": suggested_minutes,
-                    "guide": guide[:400],
-                    "tags": tags,
-                    # Per-task roadmap hints
-                    "phase_label": phase_label,
-                    "week_index": week_index,
-                    # Project / milestone awareness (P3)
-                    "difficulty": difficulty,
-                    "project_label": project_label,
-                    "milestone_title": milestone_title,
-                    "milestone_step": milestone_step,
-                    # UI state
-                    "is_done": bool(t.get("is_done", False)),
-                }
-            )
-
-    if not isinstance(meta, dict):
-        meta = {}
+    out = validate_daily_coach(data)
+    meta = out["meta"]
     if "generated_at_utc" not in meta:
         meta["generated_at_utc"] = _utc_now_iso()
     if "inputs_digest" not in meta:
         meta["inputs_digest"] = _inputs_digest({"source": "weekly_coach"})
-
-    if isinstance(day_index, int):
-        safe_day_index = day_index
-    else:
-        safe_day_index = None
-
-    return {
-        "session_date": str(session_date),
-        "day_index": safe_day_index,
-        "ai_note": ai_note.strip()[:1200],
-        "tasks": clean_tasks,
-        "meta": meta,
-    }
+    return out
 
 def _light_validate_dualtrack_month(data: Any) -> Dict[str, Any]:
     """
-    Defensive validator for 28-day dual-track month plan.
-
-    Normalizes:
-    - month_cycle: str
-    - ai_note: str
-    - weeks: exactly 4 entries (week_number 1..4)
-      - each with daily_tasks (7 items day=1..7) + weekly_task
+    Defensive validator for 28-day dual-track month plan: exactly 4 weeks,
+    each with 7 daily tasks + one weekly task (see schemas.MonthPlan).
     """
-    if not isinstance(data, dict):
-        data = {}
-
-    month_cycle = str(data.get("month_cycle") or "").strip()[:64]
-    ai_note = str(data.get("ai_note") or "").strip()[:1600]
-    weeks_raw = data.get("weeks") or []
-    meta = data.get("meta") or {}
-
-    if not isinstance(meta, dict):
-        meta = {}
-
-    # helper clamps
-    def _clamp_int(v: Any, lo: int, hi: int, default: int) -> int:
-        try:
-            x = int(v)
-        except Exception:
-            return default
-        return max(lo, min(hi, x))
-
-    def _clean_category(cat: Any) -> str:
-        c = str(cat or "").strip().lower()
-        allowed = {"skills", "projects", "career_capital", "planning", "mindset", "wellbeing"}
-        return c if c in allowed else "skills"
-
-    def _clean_difficulty(d: Any, default: str = "easy") -> str:
-        v = str(d or "").strip().lower()
-        allowed = {"easy", "medium", "hard"}
-        return v if v in allowed else default
-
-    def _clean_tags(tags_val: Any) -> List[str]:
-        if not isinstance(tags_val, list):
-            return []
-        out = []
-        for x in tags_val[:6]:
-            s = str(x).strip()
-            if s:
-                out.append(s[:32])
-        return out
-
-    # Normalize weeks by mapping week_number => week payload
-    week_map: Dict[int, Dict[str, Any]] = {}
-    if isinstance(weeks_raw, list):
-        for w in weeks_raw:
-            if not isinstance(w, dict):
-                continue
-            wn = w.get("week_number")
-            try:
-                wn_int = int(wn)
-            except Exception:
-                continue
-            if wn_int < 1 or wn_int > 4:
-                continue
-            week_map[wn_int] = w
-
-    clean_weeks: List[Dict[str, Any]] = []
-
-    for wn in range(1, 5):
-        w = week_map.get(wn) or {}
-        week_note = str(w.get("week_note") or f"Week {wn} focus.").strip()[:1200]
-
-        # daily tasks
-        dailies_raw = w.get("daily_tasks") or []
-        day_map: Dict[int, Dict[str, Any]] = {}
-        if isinstance(dailies_raw, list):
-            for t in dailies_raw:
-                if not isinstance(t, dict):
-                    continue
-                try:
-                    day = int(t.get("day"))
-                except Exception:
-                    continue
-                if 1 <= day <= 7:
-                    day_map[day] = t
-
-        daily_tasks: List[Dict[str, Any]] = []
-        for day in range(1, 8):
-            t = day_map.get(day) or {}
-            title = str(t.get("title") or f"Day {day} task").strip()[:255]
-            detail = str(t.get("detail") or "").strip()[:1200]
-            category = _clean_category(t.get("category"))
-            est = _clamp_int(t.get("estimated_minutes"), 5, 60, 10)
-            # For dailies, prefer 5-20 (but keep within schema 5-60)
-            if est > 20:
-                est = 20
-            difficulty = _clean_difficulty(t.get("difficulty"), default="easy")
-            tags = _clean_tags(t.get("tags"))
-
-            week_index_val = t.get("week_index")
-            if not isinstance(week_index_val, int):
-                week_index_val = wn
-
-            daily_tasks.append(
-                {
-                    "day": day,
-                    "title": title,
-                    "detail": detail,
-                    "category": category,
-                    "estimated_minutes": est,
-                    "difficulty": difficulty,
-                    "tags": tags,
-                    "phase_label": str(t.get("phase_label") or "").strip()[:160],
-                    "week_index": week_index_val,
-                    "project_label": str(t.get("project_label") or "").strip()[:255],
-                    "milestone_title": str(t.get("milestone_title") or "").strip()[:255],
-                    "milestone_step": str(t.get("milestone_step") or "").strip()[:255],
-                }
-            )
-
-        # weekly task
-        weekly_raw = w.get("weekly_task") or {}
-        if not isinstance(weekly_raw, dict):
-            weekly_raw = {}
-
-        weekly_title = str(weekly_raw.get("title") or f"Week {wn} milestone").strip()[:255]
-        weekly_detail = str(weekly_raw.get("detail") or "").strip()[:1800]
-        weekly_category = _clean_category(weekly_raw.get("category"))
-        weekly_est = _clamp_int(weekly_raw.get("estimated_minutes"), 90, 480, 240)
-        badge = str(weekly_raw.get("milestone_badge") or f"Week {wn} Master").strip()[:64]
-        deliverable = str(weekly_raw.get("deliverable") or "").strip()[:255]
-        if not deliverable:
-            deliverable = "Shipped weekly artifact + README proof"
-
-        weekly_week_index = weekly_raw.get("week_index")
-        if not isinstance(weekly_week_index, int):
-            weekly_week_index = wn
-
-        weekly_task = {
-            "title": weekly_title,
-            "detail": weekly_detail,
-            "category": weekly_category,
-            "estimated_minutes": weekly_est,
-            "milestone_badge": badge,
-            "phase_label": str(weekly_raw.get("phase_label") or "").strip()[:160],
-            "week_index": weekly_week_index,
-            "project_label": str(weekly_raw.get("project_label") or "").strip()[:255],
-            "milestone_title": str(weekly_raw.get("milestone_title") or "").strip()[:255],
-            "milestone_step": str(weekly_raw.get("milestone_step") or "").strip()[:255],
-            "deliverable": deliverable,
-        }
-
-        clean_weeks.append(
-            {
-                "week_number": wn,
-                "week_note": week_note,
-                "daily_tasks": daily_tasks,
-                "weekly_task": weekly_task,
-            }
-        )
-
-    # meta defaults
+    out = validate_dualtrack_month(data)
+    meta = out["meta"]
     if "generated_at_utc" not in meta:
         meta["generated_at_utc"] = _utc_now_iso()
     if "inputs_digest" not in meta:
         meta["inputs_digest"] = _inputs_digest({"source": "dualtrack_month"})
     meta.setdefault("career_ai_version", CAREER_AI_VERSION)
-
-    return {
-        "month_cycle": month_cycle,
-        "ai_note": ai_note,
-        "weeks": clean_weeks,
-        "meta": meta,
-    }
-
+    return out
 
 
 def _extract_coach_roadmap(path_type: str, dream_plan: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -1864,6 +1563,9 @@ DUALTRACK_MONTH_JSON_SCHEMA = r"""\
 """
 
 
+DUALTRACK_MONTH_JSON_SCHEMA_COMPACT = compact_schema(DUALTRACK_MONTH_JSON_SCHEMA)
+
+
 DUALTRACK_MONTH_PROMPT = """\
 You are CareerAI Coach for a Flask web app.
 Return ONLY valid JSON matching the schema below.
@@ -1987,23 +1689,31 @@ def generate_dualtrack_month_plan(
         # still allow generation; validator will keep it but routes should pass proper id
         month_cycle = "month_cycle_unknown"
 
-    prompt = DUALTRACK_MONTH_PROMPT.format(
-        freshness=FRESHNESS_NOTE,
-        path_type=pt,
-        target_lpa=tlpa,
-        month_cycle=month_cycle,
-        dream_plan_json=json.dumps(dp, ensure_ascii=False, indent=2)[:18000],
-        json_schema=DUALTRACK_MONTH_JSON_SCHEMA,
+    # Minified JSON (no more slicing pretty-printed JSON mid-object).
+    parts = assemble_sections(
+        "daily_coach_month",
+        [PromptSection("plan", dp, kind="json", priority=90, min_tokens=1000)],
+    )
+
+    messages = layout_messages(
+        DUALTRACK_MONTH_PROMPT,
+        system="You output ONLY valid JSON matching the schema.",
+        static={
+            "freshness": FRESHNESS_NOTE,
+            "path_type": pt,
+            "target_lpa": tlpa,
+            "json_schema": DUALTRACK_MONTH_JSON_SCHEMA_COMPACT,
+        },
+        dynamic={"month_cycle": month_cycle, "dream_plan_json": parts["plan"]},
     )
 
     try:
         client = OpenAI()
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            "daily_coach_month",
+            client=client,
             model=OPENAI_MODEL_DEEP,
-            messages=[
-                {"role": "system", "content": "You output ONLY valid JSON matching the schema."},
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.45,
             max_tokens=2600,
             response_format={"type": "json_object"},
@@ -2110,31 +1820,215 @@ def generate_dualtrack_month_plan(
 
 
 
-def generate_daily_coach_plan(
-    *,
-    path_type: str,
-    dream_plan: Dict[str, Any] | None,
-    progress_history: List[Dict[str, Any]] | None = None,
-    session_date: str | None = None,
-    day_index: int | None = None,
-    return_source: bool = False,
-) -> Dict[str, Any] | Tuple[Dict[str, Any], bool]:
-    """
-    Coach engine (used both for "Daily" and the upgraded Weekly Coach UI).
+DAILY_COACH_JSON_SCHEMA = r"""\
+{
+  "type": "object",
+  "required": ["session_date", "ai_note", "tasks", "meta"],
+  "additionalProperties": false,
+  "properties": {
+    "session_date": { "type": "string", "minLength": 4, "maxLength": 32 },
+    "day_index": { "type": ["integer", "null"] },
+    "ai_note": { "type": "string", "minLength": 5, "maxLength": 1200 },
+    "tasks": {
+      "type": "array",
+      "minItems": 3,
+      "maxItems": 8,
+      "items": {
+        "type": "object",
+        "additionalProperties": false,
+        "required": ["title"],
+        "properties": {
+          "id": { "type": ["integer", "null"] },
+          "title": { "type": "string", "minLength": 3, "maxLength": 255 },
+          "detail": { "type": "string" },
+          "category": { "type": "string", "minLength": 0, "maxLength": 64 },
+          "sort_order": { "type": ["integer", "null"] },
+          "suggested_minutes": { "type": ["integer", "null"] },
+          "guide": { "type": "string" },
+          "tags": {
+            "type": "array",
+            "items": { "type": "string" }
+          },
+          "phase_label": { "type": "string" },
+          "week_index": { "type": ["integer", "null"] },
+          "difficulty": { "type": "string" },
+          "project_label": { "type": "string" },
+          "milestone_title": { "type": "string" },
+          "milestone_step": { "type": "string" },
+          "is_done": { "type": "boolean" }
+        }
+      }
+    },
+    "meta": {
+      "type": "object",
+      "additionalProperties": true,
+      "required": ["generated_at_utc", "inputs_digest"],
+      "properties": {
+        "generated_at_utc": { "type": "string" },
+        "inputs_digest": { "type": "string" },
+        "path_type": { "type": "string" },
+        "career_ai_version": { "type": "string" }
+      }
+    }
+  }
+}
+"""
 
-    Inputs:
-      - path_type: "job" | "startup"
-      - dream_plan: full dict returned by Dream Planner *or* the processed `plan_view`.
-        - If provided, we read its phases + resources and build a week-by-week roadmap.
-        - If None, we still generate a reasonable generic checklist.
-        - For P3, routes may enrich this with `selected_projects` / `projects` including milestones.
-      - progress_history: list of past sessions with basic stats (can be empty).
-        - S4 uses this to adjust intensity and difficulty.
-      - session_date: string representation for "today" (e.g. '2025-12-04')
-      - day_index: optional day/week number within the broader roadmap (Weekly Coach treats this as week_index).
-      - return_source: if True, returns (plan_dict, used_live_ai: bool)
+DAILY_COACH_JSON_SCHEMA_COMPACT = compact_schema(DAILY_COACH_JSON_SCHEMA)
 
-    Output shape (after validation):
+# Static instructions first; per-session values are filled in (or referenced,
+# in prefix layout) by layout_messages().
+DAILY_COACH_PROMPT = """\
+\
+You are designing a realistic {execution_scope}-SIZED checklist for a student.
+
+session_date: {session_date}
+path_type: {path_type}
+current_index (interpret as week_index for Weekly Coach): {current_index}
+
+phase_label_for_this_week: {phase_label}
+week_theme_for_this_week: {week_theme}
+
+Dream Plan context (simplified JSON; may have phases or be empty):
+{plan_json}
+
+Recent progress history (last 10 sessions, may be empty):
+{history_json}
+
+INTERPRETATION RULES (S4):
+
+- Treat "day_index" as a flexible index:
+  - In Weekly Coach mode it is the WEEK number inside their roadmap (Week 1, Week 2, ...).
+- Use the phase + week_roadmap information:
+  - week_roadmap[week_index] tells you which PHASE they are in and the main theme.
+  - Make tasks that clearly ladder up to that week's theme.
+- Use the progress analysis to adjust intensity:
+  - intensity_hint: "{intensity_hint}"
+  - avg_completion_ratio (0–1): {avg_completion}
+  - Heuristic:
+    - "light"   → student struggles to finish tasks; keep plan gentle and focused.
+    - "normal"  → student is doing okay; keep balanced intensity.
+    - "intense" → student completes almost everything; you may push slightly harder.
+
+PROJECT CONTEXT (P3):
+
+- project_context.projects is an array of selected projects (if any).
+- Each project has:
+  - id          (internal DB id, MAY be null — do not invent values),
+  - title       (short project name),
+  - week_start  (when this project roughly starts in the roadmap, MAY be null),
+  - week_end    (when this project roughly ends, MAY be null),
+  - milestones: [{{ title, detail, week_hint }}].
+- For the CURRENT week_index:
+  - Prefer milestones whose week_hint matches or is close to this week_index.
+  - If week_start/week_end define a range and the current week is inside that range,
+    it's valid to schedule progress for that project this week.
+- DO NOT fabricate project IDs or new projects.
+- You MAY reference project titles and milestone titles inside tasks, e.g.:
+  - project_label: "Game Portfolio Project"
+  - milestone_title: "Implement core gameplay loop"
+  - milestone_step: "Code basic player movement & collision"
+
+TASK DESIGN RULES (very important):
+
+- Create 3–8 tasks total.
+- Each task must be small enough to do in 15–60 minutes.
+- Every task must have:
+  - "title": short, very clear action.
+  - "detail": 1–3 sentences of EXACT instructions (what to open, what to practice, what to write, what to ship).
+  - "category": one of ["skills", "projects", "career_capital", "planning", "mindset", "wellbeing"].
+  - "suggested_minutes": integer between 15 and 60 (roughly).
+  - "guide": an extra micro-coaching note (1–2 sentences) that explains HOW to approach the task.
+  - Optional "tags": 2–4 short labels like ["sql", "joins"], ["unity", "movement"].
+  - Optional "difficulty": one of ["easy", "medium", "hard"].
+  - Optional "project_label", "milestone_title", "milestone_step" if the task advances a project milestone.
+- Mix tasks across:
+  - skills / learning (practice, tutorials, problem sets),
+  - project or portfolio builds (feature implementation, refactor, bugfix, polish),
+  - career capital (resume, LinkedIn, outreach, applications),
+  - optional light wellbeing (short walk, breathing, journaling — MAX 1 task).
+- If intensity_hint = "light":
+  - 3–5 tasks only.
+  - Prefer "easy" and "medium" tasks.
+  - Focus on momentum and small wins.
+- If intensity_hint = "normal":
+  - 4–6 tasks.
+  - Mostly "medium" tasks, at most 1 "hard" task (like a mini-project step or mock interview).
+- If intensity_hint = "intense":
+  - 5–8 tasks.
+  - You MAY include up to 2 "hard" tasks but keep them well-scoped.
+
+PROJECT TASKS (P3 specifics):
+
+- If project_context.projects is non-empty:
+  - Ensure at least 1–3 tasks this week are clearly marked as "projects" category.
+  - These project tasks should:
+    - reference project_label,
+    - reference a concrete milestone_title where possible,
+    - optionally include milestone_step as a fine-grained action.
+  - The details should describe REAL engineering steps:
+    - e.g. implement a module, refactor a component, debug a feature, write tests, connect an API, design DB schema, etc.
+- Do NOT create vague project tasks like "work on project for 1 hour".
+  - Instead: "Implement player jump mechanic with basic gravity and collision checks".
+
+SKILL & CAREER TASKS (depth, not fluff):
+
+- Avoid shallow tasks like "watch any video on topic X".
+- Prefer:
+  - build a small function / component / script,
+  - solve 10 focused problems,
+  - write a short reflection or summary,
+  - improve 1–2 bullets on resume/LinkedIn,
+  - send 1–3 targeted outreach / networking messages.
+- For resume/LinkedIn:
+  - NEVER tell them to rewrite the full resume.
+  - Ask for specific micro-changes (e.g. rewrite ONE bullet, add ONE project, adjust headline).
+
+COACH NOTE ("ai_note"):
+
+- Short pep-talk + tactical instructions for THIS week.
+- Tone: honest, encouraging, specific.
+- Mention:
+  - which phase they are in (if that info exists),
+  - what this week is primarily about (ONE main theme),
+  - how to approach consistency given the intensity_hint.
+- Example structure:
+  - 1–2 sentences acknowledging their current phase and time horizon,
+  - 1 sentence about the main focus this week,
+  - 1–2 sentences with concrete advice on how many days to touch their plan
+    and what to do if they fall behind.
+
+You MUST output ONLY a JSON object that matches this JSON Schema:
+
+{json_schema}
+"""
+
+
+def generate_daily_coach_plan(
+    *,
+    path_type: str,
+    dream_plan: Dict[str, Any] | None,
+    progress_history: List[Dict[str, Any]] | None = None,
+    session_date: str | None = None,
+    day_index: int | None = None,
+    return_source: bool = False,
+) -> Dict[str, Any] | Tuple[Dict[str, Any], bool]:
+    """
+    Coach engine (used both for "Daily" and the upgraded Weekly Coach UI).
+
+    Inputs:
+      - path_type: "job" | "startup"
+      - dream_plan: full dict returned by Dream Planner *or* the processed `plan_view`.
+        - If provided, we read its phases + resources and build a week-by-week roadmap.
+        - If None, we still generate a reasonable generic checklist.
+        - For P3, routes may enrich this with `selected_projects` / `projects` including milestones.
+      - progress_history: list of past sessions with basic stats (can be empty).
+        - S4 uses this to adjust intensity and difficulty.
+      - session_date: string representation for "today" (e.g. '2025-12-04')
+      - day_index: optional day/week number within the broader roadmap (Weekly Coach treats this as week_index).
+      - return_source: if True, returns (plan_dict, used_live_ai: bool)
+
+    Output shape (after validation):
       {
         "session_date": "2025-12-04",
         "day_index": 7,
@@ -2246,60 +2140,6 @@ def generate_daily_coach_plan(
         "analysis": history_analysis,
     }
 
-    schema = r"""\
-{
-  "type": "object",
-  "required": ["session_date", "ai_note", "tasks", "meta"],
-  "additionalProperties": false,
-  "properties": {
-    "session_date": { "type": "string", "minLength": 4, "maxLength": 32 },
-    "day_index": { "type": ["integer", "null"] },
-    "ai_note": { "type": "string", "minLength": 5, "maxLength": 1200 },
-    "tasks": {
-      "type": "array",
-      "minItems": 3,
-      "maxItems": 8,
-      "items": {
-        "type": "object",
-        "additionalProperties": false,
-        "required": ["title"],
-        "properties": {
-          "id": { "type": ["integer", "null"] },
-          "title": { "type": "string", "minLength": 3, "maxLength": 255 },
-          "detail": { "type": "string" },
-          "category": { "type": "string", "minLength": 0, "maxLength": 64 },
-          "sort_order": { "type": ["integer", "null"] },
-          "suggested_minutes": { "type": ["integer", "null"] },
-          "guide": { "type": "string" },
-          "tags": {
-            "type": "array",
-            "items": { "type": "string" }
-          },
-          "phase_label": { "type": "string" },
-          "week_index": { "type": ["integer", "null"] },
-          "difficulty": { "type": "string" },
-          "project_label": { "type": "string" },
-          "milestone_title": { "type": "string" },
-          "milestone_step": { "type": "string" },
-          "is_done": { "type": "boolean" }
-        }
-      }
-    },
-    "meta": {
-      "type": "object",
-      "additionalProperties": true,
-      "required": ["generated_at_utc", "inputs_digest"],
-      "properties": {
-        "generated_at_utc": { "type": "string" },
-        "inputs_digest": { "type": "string" },
-        "path_type": { "type": "string" },
-        "career_ai_version": { "type": "string" }
-      }
-    }
-  }
-}
-"""
-
     # High-level explanation text for the model
     execution_scope = "WEEK"  # current Flask UI is a Weekly Coach; we still keep daily-compatible wording
 
@@ -2311,145 +2151,43 @@ def generate_daily_coach_plan(
         cr = max(0.0, min(1.0, float(avg_completion_ratio)))
         completion_str = f"{cr:.2f}"
 
-    user_prompt = f"""\
-You are designing a realistic {execution_scope}-SIZED checklist for a student.
-
-session_date: {today_str}
-path_type: {pt}
-current_index (interpret as week_index for Weekly Coach): {current_index}
-
-phase_label_for_this_week: {current_phase_label}
-week_theme_for_this_week: {current_week_theme}
-
-Dream Plan context (simplified JSON; may have phases or be empty):
-{json.dumps(plan_json, ensure_ascii=False, indent=2)}
-
-Recent progress history (last 10 sessions, may be empty):
-{json.dumps(history_json, ensure_ascii=False, indent=2)}
-
-INTERPRETATION RULES (S4):
-
-- Treat "day_index" as a flexible index:
-  - In Weekly Coach mode it is the WEEK number inside their roadmap (Week 1, Week 2, ...).
-- Use the phase + week_roadmap information:
-  - week_roadmap[week_index] tells you which PHASE they are in and the main theme.
-  - Make tasks that clearly ladder up to that week's theme.
-- Use the progress analysis to adjust intensity:
-  - intensity_hint: "{intensity_hint}"
-  - avg_completion_ratio (0–1): {completion_str}
-  - Heuristic:
-    - "light"   → student struggles to finish tasks; keep plan gentle and focused.
-    - "normal"  → student is doing okay; keep balanced intensity.
-    - "intense" → student completes almost everything; you may push slightly harder.
-
-PROJECT CONTEXT (P3):
-
-- project_context.projects is an array of selected projects (if any).
-- Each project has:
-  - id          (internal DB id, MAY be null — do not invent values),
-  - title       (short project name),
-  - week_start  (when this project roughly starts in the roadmap, MAY be null),
-  - week_end    (when this project roughly ends, MAY be null),
-  - milestones: [{{ title, detail, week_hint }}].
-- For the CURRENT week_index:
-  - Prefer milestones whose week_hint matches or is close to this week_index.
-  - If week_start/week_end define a range and the current week is inside that range,
-    it's valid to schedule progress for that project this week.
-- DO NOT fabricate project IDs or new projects.
-- You MAY reference project titles and milestone titles inside tasks, e.g.:
-  - project_label: "Game Portfolio Project"
-  - milestone_title: "Implement core gameplay loop"
-  - milestone_step: "Code basic player movement & collision"
-
-TASK DESIGN RULES (very important):
-
-- Create 3–8 tasks total.
-- Each task must be small enough to do in 15–60 minutes.
-- Every task must have:
-  - "title": short, very clear action.
-  - "detail": 1–3 sentences of EXACT instructions (what to open, what to practice, what to write, what to ship).
-  - "category": one of ["skills", "projects", "career_capital", "planning", "mindset", "wellbeing"].
-  - "suggested_minutes": integer between 15 and 60 (roughly).
-  - "guide": an extra micro-coaching note (1–2 sentences) that explains HOW to approach the task.
-  - Optional "tags": 2–4 short labels like ["sql", "joins"], ["unity", "movement"].
-  - Optional "difficulty": one of ["easy", "medium", "hard"].
-  - Optional "project_label", "milestone_title", "milestone_step" if the task advances a project milestone.
-- Mix tasks across:
-  - skills / learning (practice, tutorials, problem sets),
-  - project or portfolio builds (feature implementation, refactor, bugfix, polish),
-  - career capital (resume, LinkedIn, outreach, applications),
-  - optional light wellbeing (short walk, breathing, journaling — MAX 1 task).
-- If intensity_hint = "light":
-  - 3–5 tasks only.
-  - Prefer "easy" and "medium" tasks.
-  - Focus on momentum and small wins.
-- If intensity_hint = "normal":
-  - 4–6 tasks.
-  - Mostly "medium" tasks, at most 1 "hard" task (like a mini-project step or mock interview).
-- If intensity_hint = "intense":
-  - 5–8 tasks.
-  - You MAY include up to 2 "hard" tasks but keep them well-scoped.
-
-PROJECT TASKS (P3 specifics):
-
-- If project_context.projects is non-empty:
-  - Ensure at least 1–3 tasks this week are clearly marked as "projects" category.
-  - These project tasks should:
-    - reference project_label,
-    - reference a concrete milestone_title where possible,
-    - optionally include milestone_step as a fine-grained action.
-  - The details should describe REAL engineering steps:
-    - e.g. implement a module, refactor a component, debug a feature, write tests, connect an API, design DB schema, etc.
-- Do NOT create vague project tasks like "work on project for 1 hour".
-  - Instead: "Implement player jump mechanic with basic gravity and collision checks".
-
-SKILL & CAREER TASKS (depth, not fluff):
-
-- Avoid shallow tasks like "watch any video on topic X".
-- Prefer:
-  - build a small function / component / script,
-  - solve 10 focused problems,
-  - write a short reflection or summary,
-  - improve 1–2 bullets on resume/LinkedIn,
-  - send 1–3 targeted outreach / networking messages.
-- For resume/LinkedIn:
-  - NEVER tell them to rewrite the full resume.
-  - Ask for specific micro-changes (e.g. rewrite ONE bullet, add ONE project, adjust headline).
-
-COACH NOTE ("ai_note"):
-
-- Short pep-talk + tactical instructions for THIS week.
-- Tone: honest, encouraging, specific.
-- Mention:
-  - which phase they are in (if that info exists),
-  - what this week is primarily about (ONE main theme),
-  - how to approach consistency given the intensity_hint.
-- Example structure:
-  - 1–2 sentences acknowledging their current phase and time horizon,
-  - 1 sentence about the main focus this week,
-  - 1–2 sentences with concrete advice on how many days to touch their plan
-    and what to do if they fall behind.
+    parts = assemble_sections(
+        "daily_coach",
+        [
+            PromptSection("plan", plan_json, kind="json", priority=90, min_tokens=800),
+            PromptSection("history", history_json, kind="json", priority=60, min_tokens=150),
+        ],
+    )
 
-You MUST output ONLY a JSON object that matches this JSON Schema:
+    messages = layout_messages(
+        DAILY_COACH_PROMPT,
+        system=header,
+        static={
+            "execution_scope": execution_scope,
+            "path_type": pt,
+            "json_schema": DAILY_COACH_JSON_SCHEMA_COMPACT,
+        },
+        dynamic={
+            "session_date": today_str,
+            "current_index": current_index,
+            "phase_label": current_phase_label,
+            "week_theme": current_week_theme,
+            "plan_json": parts["plan"],
+            "history_json": parts["history"],
+            "intensity_hint": intensity_hint,
+            "avg_completion": completion_str,
+        },
+    )
 
-{schema}
-"""
 
     try:
         client = OpenAI()
 
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            "daily_coach",
+            client=client,
             model=OPENAI_MODEL_DEEP,
-            messages=[
-                {
-                    "role": "system",
-                    "content": header,
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt,
-                },
-            ],
+            messages=messages,
             temperature=0.45,
             max_tokens=1400,
             response_format={"type": "json_object"},
@@ -2667,6 +2405,9 @@ DREAM_PLANNER_JSON_SCHEMA = r"""\
 """
 
 
+DREAM_PLANNER_JSON_SCHEMA_COMPACT = compact_schema(DREAM_PLANNER_JSON_SCHEMA)
+
+
 DREAM_PLANNER_PROMPT = """\
 You are DreamPlanner, the *deep* Pro-only career coach for a Flask web app.
 
@@ -2811,148 +2552,7 @@ Respond with JSON only.
 
 def _light_validate_dream_plan(data: Any, mode: str) -> Dict[str, Any]:
     """Keep Dream Planner payload UI-friendly and robust."""
-    if not isinstance(data, dict):
-        data = {}
-
-    out: Dict[str, Any] = {}
-
-    mode_clean = "startup" if (mode or "").lower() == "startup" else "job"
-    out["mode"] = mode_clean
-
-    summary = str(data.get("summary") or "")
-    out["summary"] = summary[:1000]
-
-    probs = data.get("probabilities") or {}
-    if not isinstance(probs, dict):
-        probs = {}
-
-    def _clamp_pct(x: Any) -> int:
-        try:
-            v = int(x)
-        except Exception:
-            v = 0
-        return max(0, min(100, v))
-
-    out["probabilities"] = (
-        {
-            "lpa_12": _clamp_pct(probs.get("lpa_12")),
-            "lpa_24": _clamp_pct(probs.get("lpa_24")),
-            "lpa_48": _clamp_pct(probs.get("lpa_48")),
-        }
-        if mode_clean == "job"
-        else {"lpa_12": 0, "lpa_24": 0, "lpa_48": 0}
-    )
-
-    missing = data.get("missing_skills") or []
-    if not isinstance(missing, list):
-        missing = []
-    out["missing_skills"] = [str(x)[:80] for x in missing][:15]
-
-    # Phases (primary for UI + Weekly Coach)
-    raw_phases = data.get("phases") or []
-    phases: List[Dict[str, Any]] = []
-    if isinstance(raw_phases, list):
-        for idx, ph in enumerate(raw_phases, start=1):
-            if not isinstance(ph, dict):
-                continue
-            label = str(ph.get("label") or "").strip()
-            if not label:
-                label = f"Phase {idx}"
-            items = ph.get("items") or []
-            if not isinstance(items, list):
-                items = []
-            items_clean = [str(x).strip() for x in items if str(x).strip()]
-            phases.append(
-                {
-                    "label": label[:160],
-                    "items": items_clean[:10],
-                }
-            )
-
-    # Fallback mapping from legacy plan_core if phases missing
-    if not phases:
-        plan = data.get("plan_core") or {}
-        if not isinstance(plan, dict):
-            plan = {}
-
-        def _coerce_str_list(val, limit: int) -> List[str]:
-            if not isinstance(val, list):
-                return []
-            items = [str(x).strip() for x in val if str(x).strip()]
-            return items[:limit]
-
-        weeks_30 = _coerce_str_list(plan.get("weeks_30"), 6)
-        weeks_60 = _coerce_str_list(plan.get("weeks_60"), 6)
-        weeks_90 = _coerce_str_list(plan.get("weeks_90"), 6)
-
-        if weeks_30 or weeks_60 or weeks_90:
-            phases = [
-                {"label": "Phase 1", "items": weeks_30},
-                {"label": "Phase 2", "items": weeks_60},
-                {"label": "Phase 3", "items": weeks_90},
-            ]
-
-    if not phases:
-        phases = [{"label": "Phase 1", "items": []}]
-
-    out["phases"] = phases
-
-    # Optional legacy plan_core preserved (mostly empty, for backward compat if needed)
-    plan = data.get("plan_core") or {}
-    if not isinstance(plan, dict):
-        plan = {}
-    out["plan_core"] = plan
-
-    res = data.get("resources") or {}
-    if not isinstance(res, dict):
-        res = {}
-
-    def _coerce_str_list(val, limit: int) -> List[str]:
-        if not isinstance(val, list):
-            return []
-        items = [str(x).strip() for x in val if str(x).strip()]
-        return items[:limit]
-
-    out["resources"] = {
-        "tutorials": _coerce_str_list(res.get("tutorials"), 10),
-        "mini_projects": _coerce_str_list(res.get("mini_projects"), 8),
-        "resume_bullets": _coerce_str_list(res.get("resume_bullets"), 10),
-        "linkedin_actions": _coerce_str_list(res.get("linkedin_actions"), 12),
-    }
-
-    sx = data.get("startup_extras") or {}
-    if not isinstance(sx, dict):
-        sx = {}
-    clean_sx: Dict[str, Any] = {}
-    for k, v in sx.items():
-        key = str(k)[:40]
-        if isinstance(v, str):
-            clean_sx[key] = v[:800]
-        elif isinstance(v, list):
-            clean_sx[key] = [str(x)[:200] for x in v[:15]]
-        else:
-            clean_sx[key] = v
-    out["startup_extras"] = clean_sx
-
-    # Echo input (for Coach integration)
-    input_block = data.get("input") or {}
-    if not isinstance(input_block, dict):
-        input_block = {}
-    clean_input: Dict[str, Any] = {}
-    for k, v in input_block.items():
-        key = str(k)[:60]
-        if isinstance(v, str):
-            clean_input[key] = v[:400]
-        else:
-            clean_input[key] = v
-    out["input"] = clean_input
-
-    meta = data.get("meta") or {}
-    if not isinstance(meta, dict):
-        meta = {}
-    out["meta"] = meta
-
-    return out
+    return validate_dream_plan(data, mode)
 
 
 def generate_dream_plan(
@@ -2984,7 +2584,15 @@ def generate_dream_plan(
 
     profile_json = profile_json or {}
     skills_json = skills_json or {}
-    resume_excerpt = (resume_text or "").strip()[:2500]
+    parts = assemble_sections(
+        "dream_planner",
+        [
+            PromptSection("resume", resume_text or "", max_tokens=700, priority=70, min_tokens=250),
+            PromptSection("profile", profile_json, kind="json", priority=90, min_tokens=300),
+            PromptSection("skills", skills_json, kind="json", priority=80, min_tokens=100),
+        ],
+    )
+    resume_excerpt = parts["resume"]
 
     target_role = str(inputs.get("target_role") or "").strip()
     target_salary_lpa = str(inputs.get("target_salary_lpa") or "").strip()
@@ -3002,33 +2610,35 @@ def generate_dream_plan(
     used_live_ai = False
 
     try:
-        prompt = DREAM_PLANNER_PROMPT.format(
-            freshness=FRESHNESS_NOTE,
-            mode=mode_clean,
-            target_role=target_role or "Software Engineer",
-            target_salary_lpa=target_salary_lpa or "12",
-            timeline_months=timeline_months,
-            hours_per_day=hours_per_day,
-            company_preferences=company_prefs or "Open to any good engineering culture.",
-            startup_theme=startup_theme or "Not specified",
-            startup_budget_range=startup_budget_range or "Low budget / bootstrapped",
-            startup_timeline_months=startup_timeline_months,
-            startup_notes=startup_notes or "No extra notes.",
-            profile_json=json.dumps(profile_json, ensure_ascii=False),
-            skills_json=json.dumps(skills_json, ensure_ascii=False),
-            resume_excerpt=resume_excerpt,
-            json_schema=DREAM_PLANNER_JSON_SCHEMA,
+        messages = layout_messages(
+            DREAM_PLANNER_PROMPT,
+            system="You output ONLY valid JSON that exactly matches the provided schema.",
+            static={
+                "freshness": FRESHNESS_NOTE,
+                "mode": mode_clean,
+                "json_schema": DREAM_PLANNER_JSON_SCHEMA_COMPACT,
+            },
+            dynamic={
+                "target_role": target_role or "Software Engineer",
+                "target_salary_lpa": target_salary_lpa or "12",
+                "timeline_months": timeline_months,
+                "hours_per_day": hours_per_day,
+                "company_preferences": company_prefs or "Open to any good engineering culture.",
+                "startup_theme": startup_theme or "Not specified",
+                "startup_budget_range": startup_budget_range or "Low budget / bootstrapped",
+                "startup_timeline_months": startup_timeline_months,
+                "startup_notes": startup_notes or "No extra notes.",
+                "profile_json": parts["profile"],
+                "skills_json": parts["skills"],
+                "resume_excerpt": resume_excerpt,
+            },
         )
 
-        resp = client.chat.completions.create(
+        resp = chat_completion(
+            "dream_planner",
+            client=client,
             model=OPENAI_MODEL_DEEP,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You output ONLY valid JSON that exactly matches the provided schema.",
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.45,
             max_tokens=2400,
             response_format={"type": "json_object"},
@@ -3116,171 +2726,147 @@ def generate_dream_plan(
             "plan_core": {
                 "focus_30": "",
                 "focus_60": "",
-                "focus_90": "",
-                "weeks_30": [],
-                "weeks_60": [],
-                "weeks_90": [],
-            },
-            "resources": {
-                "tutorials": [],
-                "mini_projects": [],
-                "resume_bullets": [],
-                "linkedin_actions": [],
-            },
-            "startup_extras": {},
-            "input": fallback_input,
-            "meta": {
-                "generated_at_utc": _utc_now_iso(),
-                "inputs_digest": _inputs_digest(
-                    {"error": True, "mode": mode_clean}
-                ),
-                "version": CAREER_AI_VERSION,
-            },
-        }
-        clean = _light_validate_dream_plan(fallback, mode_clean)
-        return (clean, False) if return_source else clean
-
-
-from openai import OpenAI
-
-
-def generate_sync_plan(
-    *,
-    job_title: str,
-    target_lpa: str,  # "3", "6", "12", or "24"
-    timeline: str,  # "28_days" or "3_months"
-    profile_json: Dict[str, Any],
-    skills_json: Dict[str, Any],
-    resume_text: str,
-    extra_context: str = "",
-    return_source: bool = False,
-) -> Dict[str, Any] | Tuple[Dict[str, Any], bool]:
-    """
-    Generate unified Dream Plan + Coach Execution Plan.
-    
-    This is the NEW SYNC FUNCTION that powers the Dream→Coach loop.
-    
-    Args:
-        job_title: Target role (e.g., "Full Stack Developer")
-        target_lpa: "3", "6", "12", or "24"
-        timeline: "28_days" or "3_months"
-        profile_json: User's profile data
-        skills_json: User's current skills
-        resume_text: Resume content
-        extra_context: Additional user input
-        return_source: If True, return (plan, used_live_ai)
-    
-    Returns:
-        {
-          "analysis": {
-            "probabilities": {"3": 80, "6": 40, "12": 10, "24": 1},
-            "projected_probabilities": {"3": 95, "6": 70, "12": 35, "24": 5},
-            "bold_truth": "...",
-            "missing_skills": [...]
-          },
-          "projects": [
-            {
-              "title": "E-commerce Backend API",
-              "description": "...",
-              "tech_stack": ["Node.js", "Express", "MongoDB", "JWT"],
-              "estimated_hours": 40,
-              "lpa_tier": "12",
-              "deliverables": [...]
-            }
-          ],
-          "coach_plan": {
-            "total_weeks": 4 or 12,
-            "weeks": [
-              {
-                "week_num": 1,
-                "theme": "Foundation",
-                "daily_tasks": [
-                  {"day": 1, "title": "...", "minutes": 15, "category": "networking"},
-                  {"day": 2, "title": "...", "minutes": 15, "category": "dsa"}
-                ],
-                "weekly_tasks": [
-                  {
-                    "title": "Learn Express.js Fundamentals",
-                    "category": "Learn",
-                    "description": "...",
-                    "estimated_hours": 8,
-                    "tips": "Focus on middleware patterns. Use Express.js official docs.",
-                    "skill_tags": ["Express.js", "Node.js"],
-                    "deliverables": [...]
-                  },
-                  {
-                    "title": "Build Authentication API",
-                    "category": "Build",
-                    "description": "...",
-                    "estimated_hours": 12,
-                    "tips": "Use bcrypt for hashing. Implement JWT refresh tokens.",
-                    "skill_tags": ["JWT", "bcrypt", "Authentication"],
-                    "deliverables": [...]
-                  },
-                  {
-                    "title": "Document API Endpoints",
-                    "category": "Document",
-                    "description": "...",
-                    "estimated_hours": 4,
-                    "tips": "Use Postman for testing, create README with examples.",
-                    "skill_tags": ["API Documentation", "Technical Writing"],
-                    "deliverables": [...]
-                  }
-                ]
-              }
-            ]
-          },
-          "meta": {
-            "generated_at": "...",
-            "model_used": "...",
-            "version": "sync_v1"
-          }
+                "focus_90": "",
+                "weeks_30": [],
+                "weeks_60": [],
+                "weeks_90": [],
+            },
+            "resources": {
+                "tutorials": [],
+                "mini_projects": [],
+                "resume_bullets": [],
+                "linkedin_actions": [],
+            },
+            "startup_extras": {},
+            "input": fallback_input,
+            "meta": {
+                "generated_at_utc": _utc_now_iso(),
+                "inputs_digest": _inputs_digest(
+                    {"error": True, "mode": mode_clean}
+                ),
+                "version": CAREER_AI_VERSION,
+            },
         }
-    """
-    
-    # Determine if we're in mock mode
-    mock_mode = os.getenv("MOCK", "0") == "1"
-    
-    if mock_mode:
-        return _generate_mock_sync_plan(
-            job_title=job_title,
-            target_lpa=target_lpa,
-            timeline=timeline,
-            return_source=return_source,
-        )
-    
-    # Real AI call
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    # Determine weeks
-    total_weeks = 4 if timeline == "28_days" else 12
-    num_projects = 1 if timeline == "28_days" else 2
-    
-    # Build context from profile + resume
-    current_skills = []
-    if skills_json and isinstance(skills_json, dict):
-        skills_list = skills_json.get("skills", [])
-        if isinstance(skills_list, list):
-            for s in skills_list:
-                if isinstance(s, dict):
-                    current_skills.append(s.get("name", ""))
-                elif isinstance(s, str):
-                    current_skills.append(s)
-    
-    current_skills_text = ", ".join(current_skills) if current_skills else "No skills listed"
-    
-    education_text = "Not specified"
-    if profile_json and isinstance(profile_json, dict):
-        edu = profile_json.get("education", [])
-        if isinstance(edu, list) and len(edu) > 0:
-            first_edu = edu[0]
-            if isinstance(first_edu, dict):
-                degree = first_edu.get("degree", "")
-                institution = first_edu.get("institution", "")
-                education_text = f"{degree} at {institution}" if degree and institution else education_text
-    
-    # Build the unified prompt
-    system_prompt = f"""You are CareerAI's Senior Career Counselor with 15+ years experience placing students in tech roles.
+        clean = _light_validate_dream_plan(fallback, mode_clean)
+        return (clean, False) if return_source else clean
+
+
+from openai import OpenAI
+
+
+_SYNC_DAILY_TASK = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["day", "title", "description", "minutes", "category"],
+    "properties": {
+        "day": {"type": "integer"},
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "minutes": {"type": "integer"},
+        "category": {"type": "string", "enum": ["networking", "dsa", "learning", "job_search"]},
+    },
+}
+
+_SYNC_WEEKLY_TASK = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["title", "category", "description", "estimated_hours", "tips", "skill_tags", "deliverables"],
+    "properties": {
+        "title": {"type": "string"},
+        "category": {"type": "string", "enum": ["Learn", "Build", "Document"]},
+        "description": {"type": "string"},
+        "estimated_hours": {"type": "integer"},
+        "tips": {"type": "string", "minLength": 5},
+        "skill_tags": {"type": "array", "items": {"type": "string"}},
+        "deliverables": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+_SYNC_PROBABILITIES = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["3", "6", "12", "24"],
+    "properties": {
+        k: {"type": "integer", "minimum": 0, "maximum": 100} for k in ("3", "6", "12", "24")
+    },
+}
+
+# Machine-readable form of the OUTPUT FORMAT section of SYNC_PLAN_PROMPT.
+SYNC_PLAN_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["analysis", "projects", "coach_plan", "meta"],
+    "properties": {
+        "analysis": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["probabilities", "projected_probabilities", "bold_truth", "missing_skills"],
+            "properties": {
+                "probabilities": _SYNC_PROBABILITIES,
+                "projected_probabilities": _SYNC_PROBABILITIES,
+                "bold_truth": {"type": "string", "minLength": 10},
+                "missing_skills": {"type": "array", "items": {"type": "string"}},
+            },
+        },
+        "projects": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["title", "description", "tech_stack", "estimated_hours", "lpa_tier", "deliverables"],
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "tech_stack": {"type": "array", "items": {"type": "string"}},
+                    "estimated_hours": {"type": "integer"},
+                    "lpa_tier": {"type": "string"},
+                    "deliverables": {"type": "array", "items": {"type": "string"}},
+                },
+            },
+        },
+        "coach_plan": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["total_weeks", "weeks"],
+            "properties": {
+                "total_weeks": {"type": "integer"},
+                "weeks": {
+                    "type": "array",
+                    "minItems": 1,
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["week_num", "theme", "daily_tasks", "weekly_tasks"],
+                        "properties": {
+                            "week_num": {"type": "integer"},
+                            "theme": {"type": "string"},
+                            "daily_tasks": {"type": "array", "items": _SYNC_DAILY_TASK},
+                            "weekly_tasks": {"type": "array", "items": _SYNC_WEEKLY_TASK},
+                        },
+                    },
+                },
+            },
+        },
+        "meta": {
+            "type": "object",
+            "additionalProperties": True,
+            "required": ["model_used", "version", "target_role", "target_lpa", "timeline"],
+            "properties": {
+                "generated_at": {"type": "string"},
+                "model_used": {"type": "string"},
+                "version": {"type": "string"},
+                "target_role": {"type": "string"},
+                "target_lpa": {"type": "string"},
+                "timeline": {"type": "string"},
+            },
+        },
+    },
+}
+
+SYNC_PLAN_STRUCTURED = structured_schema("sync_plan", SYNC_PLAN_JSON_SCHEMA)
+
+SYNC_PLAN_SYSTEM_PROMPT = """You are CareerAI's Senior Career Counselor with 15+ years experience placing students in tech roles.
 
 Your mission: Create a BRUTALLY HONEST career plan that maximizes placement probability.
 
@@ -3293,19 +2879,21 @@ Core principles:
 
 You MUST return ONLY valid JSON matching the schema provided. NO markdown, NO preamble, NO code blocks."""
 
-    user_prompt = f"""# STUDENT PROFILE
+# Profile fields come first in the text but are per-user; in prefix layout
+# they are referenced from the static block and sent last.
+SYNC_PLAN_PROMPT = """# STUDENT PROFILE
 
 **Target Role:** {job_title}
 **Target Package:** {target_lpa}+ LPA
-**Timeline:** {timeline.replace('_', ' ').title()} ({total_weeks} weeks)
-**Current Skills:** {current_skills_text}
-**Education:** {education_text}
+**Timeline:** {timeline_label} ({total_weeks} weeks)
+**Current Skills:** {current_skills}
+**Education:** {education}
 
 **Resume Summary:**
-{resume_text[:1000] if resume_text else "No resume provided"}
+{resume_summary}
 
 **Additional Context:**
-{extra_context if extra_context else "None"}
+{extra_context}
 
 ---
 
@@ -3478,7 +3066,7 @@ Return ONLY this JSON structure:
     ]
   }},
   "meta": {{
-    "generated_at": "{datetime.utcnow().isoformat()}Z",
+    "generated_at": "<ISO-8601 UTC timestamp>",
     "model_used": "gpt-4o",
     "version": "sync_v1",
     "target_role": "{job_title}",
@@ -3496,52 +3084,195 @@ CRITICAL RULES:
 6. Be brutally honest in probabilities and bold_truth
 """
 
+
+def generate_sync_plan(
+    *,
+    job_title: str,
+    target_lpa: str,  # "3", "6", "12", or "24"
+    timeline: str,  # "28_days" or "3_months"
+    profile_json: Dict[str, Any],
+    skills_json: Dict[str, Any],
+    resume_text: str,
+    extra_context: str = "",
+    return_source: bool = False,
+) -> Dict[str, Any] | Tuple[Dict[str, Any], bool]:
+    """
+    Generate unified Dream Plan + Coach Execution Plan.
+    
+    This is the NEW SYNC FUNCTION that powers the Dream→Coach loop.
+    
+    Args:
+        job_title: Target role (e.g., "Full Stack Developer")
+        target_lpa: "3", "6", "12", or "24"
+        timeline: "28_days" or "3_months"
+        profile_json: User's profile data
+        skills_json: User's current skills
+        resume_text: Resume content
+        extra_context: Additional user input
+        return_source: If True, return (plan, used_live_ai)
+    
+    Returns:
+        {
+          "analysis": {
+            "probabilities": {"3": 80, "6": 40, "12": 10, "24": 1},
+            "projected_probabilities": {"3": 95, "6": 70, "12": 35, "24": 5},
+            "bold_truth": "...",
+            "missing_skills": [...]
+          },
+          "projects": [
+            {
+              "title": "E-commerce Backend API",
+              "description": "...",
+              "tech_stack": ["Node.js", "Express", "MongoDB", "JWT"],
+              "estimated_hours": 40,
+              "lpa_tier": "12",
+              "deliverables": [...]
+            }
+          ],
+          "coach_plan": {
+            "total_weeks": 4 or 12,
+            "weeks": [
+              {
+                "week_num": 1,
+                "theme": "Foundation",
+                "daily_tasks": [
+                  {"day": 1, "title": "...", "minutes": 15, "category": "networking"},
+                  {"day": 2, "title": "...", "minutes": 15, "category": "dsa"}
+                ],
+                "weekly_tasks": [
+                  {
+                    "title": "Learn Express.js Fundamentals",
+                    "category": "Learn",
+                    "description": "...",
+                    "estimated_hours": 8,
+                    "tips": "Focus on middleware patterns. Use Express.js official docs.",
+                    "skill_tags": ["Express.js", "Node.js"],
+                    "deliverables": [...]
+                  },
+                  {
+                    "title": "Build Authentication API",
+                    "category": "Build",
+                    "description": "...",
+                    "estimated_hours": 12,
+                    "tips": "Use bcrypt for hashing. Implement JWT refresh tokens.",
+                    "skill_tags": ["JWT", "bcrypt", "Authentication"],
+                    "deliverables": [...]
+                  },
+                  {
+                    "title": "Document API Endpoints",
+                    "category": "Document",
+                    "description": "...",
+                    "estimated_hours": 4,
+                    "tips": "Use Postman for testing, create README with examples.",
+                    "skill_tags": ["API Documentation", "Technical Writing"],
+                    "deliverables": [...]
+                  }
+                ]
+              }
+            ]
+          },
+          "meta": {
+            "generated_at": "...",
+            "model_used": "...",
+            "version": "sync_v1"
+          }
+        }
+    """
+    
+    # Determine if we're in mock mode
+    mock_mode = os.getenv("MOCK", "0") == "1"
+    
+    if mock_mode:
+        return _generate_mock_sync_plan(
+            job_title=job_title,
+            target_lpa=target_lpa,
+            timeline=timeline,
+            return_source=return_source,
+        )
+    
+    # Real AI call
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    # Determine weeks
+    total_weeks = 4 if timeline == "28_days" else 12
+    num_projects = 1 if timeline == "28_days" else 2
+    
+    # Build context from profile + resume
+    current_skills = []
+    if skills_json and isinstance(skills_json, dict):
+        skills_list = skills_json.get("skills", [])
+        if isinstance(skills_list, list):
+            for s in skills_list:
+                if isinstance(s, dict):
+                    current_skills.append(s.get("name", ""))
+                elif isinstance(s, str):
+                    current_skills.append(s)
+    
+    current_skills_text = ", ".join(current_skills) if current_skills else "No skills listed"
+    
+    education_text = "Not specified"
+    if profile_json and isinstance(profile_json, dict):
+        edu = profile_json.get("education", [])
+        if isinstance(edu, list) and len(edu) > 0:
+            first_edu = edu[0]
+            if isinstance(first_edu, dict):
+                degree = first_edu.get("degree", "")
+                institution = first_edu.get("institution", "")
+                education_text = f"{degree} at {institution}" if degree and institution else education_text
+    
+    # Build the unified prompt
+    messages = layout_messages(
+        SYNC_PLAN_PROMPT,
+        system=SYNC_PLAN_SYSTEM_PROMPT,
+        static={
+            "target_lpa": target_lpa,
+            "timeline": timeline,
+            "timeline_label": timeline.replace("_", " ").title(),
+            "total_weeks": total_weeks,
+            "num_projects": num_projects,
+        },
+        dynamic={
+            "job_title": job_title,
+            "current_skills": current_skills_text,
+            "education": education_text,
+            "resume_summary": fit_to_tokens(compact_text(resume_text), 300) if resume_text else "No resume provided",
+            "extra_context": extra_context if extra_context else "None",
+        },
+    )
+
+
     try:
-        response = client.chat.completions.create(
+        result = structured_completion(
+            "dream_sync_plan",
+            SYNC_PLAN_STRUCTURED,
+            client=client,
             model=os.getenv("SYNC_PLAN_MODEL", "gpt-4o"),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
             temperature=0.7,
             max_tokens=8000,  # Large output for full plan
         )
+        response = result.response
+        plan_dict = result.data
         
-        raw_content = response.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if raw_content.startswith("```json"):
-            raw_content = raw_content[7:]
-        if raw_content.startswith("```"):
-            raw_content = raw_content[3:]
-        if raw_content.endswith("```"):
-            raw_content = raw_content[:-3]
-        
-        raw_content = raw_content.strip()
-        
-        # Parse JSON
-        plan_dict = json.loads(raw_content)
-        
-        # Validate structure
-        if not isinstance(plan_dict, dict):
-            raise ValueError("AI returned non-dict")
-        
+        # Validate structure (minor schema drift is tolerated; missing sections are not)
         required_keys = ["analysis", "projects", "coach_plan", "meta"]
         for key in required_keys:
-            if key not in plan_dict:
+            if not isinstance(plan_dict.get(key), (dict, list)):
                 raise ValueError(f"Missing required key: {key}")
         
-        # Add metadata
+        # Add metadata (timestamp is stamped here so the prompt stays cacheable)
+        plan_dict["meta"]["generated_at"] = datetime.utcnow().isoformat() + "Z"
         plan_dict["meta"]["used_live_ai"] = True
         plan_dict["meta"]["tokens_used"] = response.usage.total_tokens if response.usage else 0
+        plan_dict["meta"]["cached_tokens"] = extract_usage(response)["cached_tokens"]
         
         if return_source:
             return plan_dict, True
         return plan_dict
         
     except Exception as e:
-        # Fallback to mock on error
-        print(f"AI sync plan failed: {e}. Using mock.")
+        # Fallback to mock on error (counted + logged, see get_structured_stats)
+        record_fallback("dream_sync_plan", str(e))
         return _generate_mock_sync_plan(
             job_title=job_title,
             target_lpa=target_lpa,
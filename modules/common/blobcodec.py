@@ -0,0 +1,94 @@
+# modules/common/blobcodec.py
+"""
+Compression for large, opaque AI payloads (models.CompressedText).
+
+Dream sync plans, Coach saved plans and Job Pack JD text are written once
+and only ever read back whole. They are stored compressed with a 4-byte
+header:
+
+    b"\\x00CZ" + codec    codec: b"z" zlib, b"s" zstd, b"r" raw UTF-8
+
+The NUL byte never starts JSON or UTF-8 text, so legacy uncompressed rows
+(str, or bytes without the header) are recognised and returned unchanged.
+The migration rewrites them in place.
+
+BLOB_CODEC picks the codec for new writes: "zlib" (stdlib, the default)
+or "zstd". zstd needs the optional `zstandard` package and falls back to
+zlib when it is missing. Payloads shorter than BLOB_COMPRESS_MIN_BYTES
+are stored raw, because compressing them would not pay for the header.
+Reads handle every codec, whatever BLOB_CODEC is set to.
+
+Payloads queried in SQL (Job Pack analysis, skill maps, internship
+results) stay JSONB instead; Postgres TOAST compresses them.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Optional, Union
+
+try:  # optional: faster, better ratio
+    import zstandard as _zstd
+except Exception:  # pragma: no cover
+    _zstd = None
+
+MAGIC = b"\x00CZ"
+RAW, ZLIB, ZSTD = b"r", b"z", b"s"
+
+BLOB_CODEC = os.getenv("BLOB_CODEC", "zlib").strip().lower()
+BLOB_COMPRESS_MIN_BYTES = int(os.getenv("BLOB_COMPRESS_MIN_BYTES", "256"))
+BLOB_ZLIB_LEVEL = int(os.getenv("BLOB_ZLIB_LEVEL", "6"))
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "6"))
+
+
+class BlobCodecError(ValueError):
+    """A stored payload cannot be decoded (unknown codec / zstd missing)."""
+
+
+def _codec() -> bytes:
+    if BLOB_CODEC == "zstd" and _zstd is not None:
+        return ZSTD
+    return ZLIB
+
+
+def is_encoded(value: Union[bytes, bytearray, memoryview, str, None]) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:3]) == MAGIC
+
+
+def encode(text: str, *, codec: Optional[bytes] = None) -> bytes:
+    """str -> header + payload (raw when small or when compression does not help)."""
+    data = text.encode("utf-8")
+    if len(data) < BLOB_COMPRESS_MIN_BYTES:
+        return MAGIC + RAW + data
+
+    codec = codec or _codec()
+    if codec == ZSTD and _zstd is not None:
+        packed = _zstd.ZstdCompressor(level=BLOB_ZSTD_LEVEL).compress(data)
+    else:
+        codec = ZLIB
+        packed = zlib.compress(data, BLOB_ZLIB_LEVEL)
+
+    if len(packed) >= len(data):
+        return MAGIC + RAW + data
+    return MAGIC + codec + packed
+
+
+def decode(value: Union[bytes, bytearray, memoryview, str, None]) -> Optional[str]:
+    """Stored value -> str. Legacy plain text (str or headerless bytes) passes through."""
+    if value is None or isinstance(value, str):
+        return value
+    data = bytes(value)
+    if data[:3] != MAGIC:
+        return data.decode("utf-8")
+
+    codec, body = data[3:4], data[4:]
+    if codec == RAW:
+        return body.decode("utf-8")
+    if codec == ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if codec == ZSTD:
+        if _zstd is None:
+            raise BlobCodecError("payload is zstd-compressed but `zstandard` is not installed")
+        return _zstd.ZstdDecompressor().decompress(body).decode("utf-8")
+    raise BlobCodecError(f"unknown blob codec {codec!r}")
@@ -0,0 +1,157 @@
+# modules/common/jsonsql.py
+"""
+SQL expressions over the AI payload columns (models.JSONText).
+
+The payloads are JSONB on Postgres, with jsonb_path_ops GIN indexes on
+jobpack_report.analysis, skillmap_snapshot.skills_json and
+internship_record.results_json. On SQLite they are TEXT, and the json1
+functions stand in. Analytics can filter and aggregate in the database
+with these helpers instead of json.loads-ing every row in Python:
+
+    value(JobPackReport.analysis, "report_tier")            text scalar
+    number(JobPackReport.analysis, "ats_score")             float scalar
+    contains(SkillMapSnapshot.skills_json, ["missing_skills"], "SQL")
+                                                            membership
+    elements(JobPackReport.analysis, "resume_ats", "blockers")
+                                                            table-valued (.c.value)
+
+Paths are plain key sequences. A path that is missing, or that points at
+the wrong JSON type, yields NULL or no rows; it never raises. Rows whose
+text is not valid JSON (legacy SQLite data) are treated as {}.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Sequence
+
+from sqlalchemy import Float, String, and_, case, cast, exists, func, literal, literal_column, select, true
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models import db
+
+
+def _is_pg() -> bool:
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def _sqlite_path(keys: Sequence[str]) -> str:
+    return "$" + "".join(f'."{k}"' for k in keys)
+
+
+def _sqlite_doc(col):
+    # json1 raises on malformed JSON; fall back to an empty object
+    return case((func.json_valid(col) == 1, col), else_=literal("{}"))
+
+
+def value(col, *keys: str):
+    """Scalar at keys as text (NULL when missing)."""
+    if _is_pg():
+        return func.jsonb_extract_path_text(col, *keys)
+    return cast(func.json_extract(_sqlite_doc(col), _sqlite_path(keys)), String)
+
+
+def number(col, *keys: str):
+    """Numeric scalar at keys (NULL when missing or not a number)."""
+    if _is_pg():
+        node = func.jsonb_extract_path(col, *keys)
+        return case(
+            (func.jsonb_typeof(node) == "number", cast(func.jsonb_extract_path_text(col, *keys), Float)),
+            else_=None,
+        )
+    path = _sqlite_path(keys)
+    doc = _sqlite_doc(col)
+    return case(
+        (func.json_type(doc, path).in_(("integer", "real")), cast(func.json_extract(doc, path), Float)),
+        else_=None,
+    )
+
+
+def contains(col, keys: Sequence[str], item: Any):
+    """True when the array at keys contains item (uses the GIN index on Postgres)."""
+    if _is_pg():
+        doc: Any = [item]
+        for k in reversed(list(keys)):
+            doc = {k: doc}
+        return col.op("@>", return_type=db.Boolean)(cast(literal(json.dumps(doc)), JSONB))
+    each = func.json_each(_sqlite_doc(col), _sqlite_path(keys)).table_valued("value", "type")
+    return exists(
+        select(literal(1)).select_from(each).where(and_(each.c.type != "object", each.c.value == item))
+    )
+
+
+def elements(col, *keys: str):
+    """
+    Table-valued function yielding the text of each element of the array
+    at keys. Join it to col's table: select_from(T).join(elements(...), true()).
+    """
+    if _is_pg():
+        node = func.jsonb_extract_path(col, *keys)
+        arr = case((func.jsonb_typeof(node) == "array", node), else_=cast(literal("[]"), JSONB))
+        return func.jsonb_array_elements_text(arr).table_valued("value")
+    path = _sqlite_path(keys)
+    doc = _sqlite_doc(col)
+    arr = case((func.json_type(doc, path) == "array", func.json_extract(doc, path)), else_=literal("[]"))
+    return func.json_each(arr).table_valued("value")
+
+
+def _string_elements(col, keys: Sequence[str]):
+    """(table-valued, element text, is-a-string condition) for the array at keys."""
+    if _is_pg():
+        node = func.jsonb_extract_path(col, *keys)
+        arr = case((func.jsonb_typeof(node) == "array", node), else_=cast(literal("[]"), JSONB))
+        elems = func.jsonb_array_elements(arr).table_valued("value")
+        text = elems.c.value.op("#>>")(literal_column("'{}'::text[]"))  # unquoted string
+        return elems, text, func.jsonb_typeof(elems.c.value) == "string"
+    path = _sqlite_path(keys)
+    doc = _sqlite_doc(col)
+    arr = case((func.json_type(doc, path) == "array", func.json_extract(doc, path)), else_=literal("[]"))
+    elems = func.json_each(arr).table_valued("value", "type")
+    return elems, cast(elems.c.value, String), elems.c.type == "text"
+
+
+def _collapse_ws(text):
+    """SQL for " ".join(text.split()) where the dialect allows it."""
+    if _is_pg():
+        return func.btrim(func.regexp_replace(text, r"\s+", " ", "g"))
+    # json1 has no regex: map the usual whitespace to spaces; top_elements
+    # collapses the runs in Python
+    for ch in ("\n", "\r", "\t"):
+        text = func.replace(text, ch, " ")
+    return func.trim(text)
+
+
+def top_elements(col, keys: Sequence[str], *, where=None, limit: int = 10):
+    """
+    [(element_text, rows_containing_it)] over col's table, most common
+    first. Only string elements count, with whitespace collapsed (" ".join
+    (s.split())), and duplicates inside one row count once. `where` filters
+    the rows, e.g. T.id.in_(subquery).
+    """
+    table = col.class_ if hasattr(col, "class_") else col.table
+    pk = table.id
+    elems, text, is_string = _string_elements(col, keys)
+    val = _collapse_ws(text)
+    if not _is_pg():
+        # finish the whitespace collapse in Python, counting each row once
+        stmt = select(pk, val).select_from(table).join(elems, true()).where(is_string, val != "").distinct()
+        if where is not None:
+            stmt = stmt.where(where)
+        rows: dict = {}
+        for row_id, v in db.session.execute(stmt).all():
+            rows.setdefault(" ".join(str(v).split()), set()).add(row_id)
+        counts = sorted(((v, len(ids)) for v, ids in rows.items()), key=lambda kv: kv[1], reverse=True)
+        return counts[:limit]
+
+    stmt = (
+        select(val.label("value"), func.count(pk.distinct()).label("n"))
+        .select_from(table)
+        .join(elems, true())
+        .where(is_string, val != "")
+        .group_by(val)
+        .order_by(func.count(pk.distinct()).desc())
+        .limit(limit)
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return [(v, int(n)) for v, n in db.session.execute(stmt).all()]
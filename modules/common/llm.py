@@ -0,0 +1,378 @@
+# modules/common/llm.py
+"""
+Chat-completion plumbing shared by the AI generators.
+
+Prompt layout
+-------------
+Provider-side prompt caching (OpenAI caches the longest identical prompt
+prefix, from 1024 tokens up) only helps when requests share a long common
+prefix. Our templates interpolate per-user data into the middle of the
+instructions and schema, so no two requests ever do.
+
+With PROMPT_LAYOUT=prefix (default) `layout_messages()` renders a template
+with only its *static* fields (freshness note, schema, mode, ...) into a
+leading system message. Per-user fields become <field> references, and
+their values go into the final user message. PROMPT_LAYOUT=inline keeps
+the legacy single interpolated user prompt (useful for A/B comparison).
+
+Usage accounting
+----------------
+`chat_completion()` wraps client.chat.completions.create. It times the
+call and records prompt/completion/cached token counts per feature
+(usage.prompt_tokens_details.cached_tokens), so the cache hit rate and
+its latency effect can be measured per layout. The same numbers, plus
+errors and estimated cost, go to the Prometheus metrics in
+modules/common/metrics.py.
+
+Coalescing
+----------
+Identical concurrent calls (same feature, model, messages and params)
+are made once. See modules/common/singleflight.py. Callers that receive a
+shared response are counted as "coalesced" and spend no tokens.
+
+Batch capture / replay
+----------------------
+The batch engine (modules/batch) runs the unchanged generators twice.
+Inside `capture_requests()`, chat_completion raises CapturedRequest with
+the request body instead of calling the provider. Inside
+`replay_response(resp)`, the first chat_completion returns the batch
+result, so the generator's own parsing, validation and fallbacks apply
+to it exactly as they do live.
+
+Resilience
+----------
+Every live call goes through the circuit breaker in
+modules/common/resilience.py: while a model's breaker is open the call
+is routed to its fallback model, or fails at once with CircuitOpenError
+so the caller's fallback answers without waiting on a sick provider.
+Latency-sensitive features can additionally be hedged (LLM_HEDGE=1).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import string
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from modules.common import resilience, singleflight
+from modules.common.metrics import observe_llm_call
+from modules.common.prompt_budget import log_prompt_size
+
+logger = logging.getLogger("llm")
+
+# "prefix" (static system block first, user data last) | "inline" (legacy)
+PROMPT_LAYOUT = (os.getenv("PROMPT_LAYOUT", "prefix") or "prefix").strip().lower()
+
+# Request header naming the calling feature (ignored by OpenAI itself).
+FEATURE_HEADER = "X-CareerAI-Feature"
+
+# Call options that do not change the completion (left out of the coalescing key)
+_TRANSPORT_KWARGS = ("extra_headers", "timeout")
+
+_PREFIX_NOTE = (
+    "Values written as <name> above are provided in the user message, "
+    "each wrapped in <name>...</name> tags."
+)
+
+
+# ---------------------------------------------------------------------
+# Prompt layout
+# ---------------------------------------------------------------------
+
+
+@lru_cache(maxsize=256)
+def template_fields(template: str) -> Tuple[str, ...]:
+    """Named .format() fields of `template`, in order of first appearance."""
+    seen: List[str] = []
+    for _literal, field_name, _spec, _conv in string.Formatter().parse(template):
+        if field_name and field_name not in seen:
+            seen.append(field_name)
+    return tuple(seen)
+
+
+@lru_cache(maxsize=256)
+def _render_static(
+    template: str,
+    static_items: Tuple[Tuple[str, str], ...],
+    system: str,
+) -> str:
+    """System block for a template: static values inline, dynamic ones as references."""
+    static = dict(static_items)
+    values = {
+        name: static[name] if name in static else f"<{name}>"
+        for name in template_fields(template)
+    }
+    body = template.format(**values).strip()
+    parts = [p for p in (system.strip(), body, _PREFIX_NOTE) if p]
+    return "\n\n".join(parts)
+
+
+def layout_messages(
+    template: str,
+    *,
+    static: Dict[str, Any],
+    dynamic: Dict[str, Any],
+    system: str = "",
+    layout: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """
+    Build chat messages for a .format() template.
+
+    static:  values shared by many requests (schema, freshness, mode, ...)
+    dynamic: per-user values (profile, resume, JD, form inputs, ...)
+
+    Every template field must appear in exactly one of the two dicts.
+    """
+    layout = (layout or PROMPT_LAYOUT).lower()
+    if layout != "prefix":
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": template.format(**static, **dynamic)})
+        return messages
+
+    static_items = tuple(sorted((k, str(v)) for k, v in static.items()))
+    system_block = _render_static(template, static_items, system or "")
+
+    user_parts = []
+    for name in template_fields(template):
+        if name in dynamic:
+            user_parts.append(f"<{name}>\n{dynamic[name]}\n</{name}>")
+    return [
+        {"role": "system", "content": system_block},
+        {"role": "user", "content": "\n\n".join(user_parts)},
+    ]
+
+
+# ---------------------------------------------------------------------
+# Usage accounting
+# ---------------------------------------------------------------------
+
+_usage: Dict[str, Dict[str, float]] = {}
+_usage_lock = threading.Lock()
+
+
+def extract_usage(resp: Any) -> Dict[str, int]:
+    """prompt/completion/cached token counts from an OpenAI response (0 when absent)."""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return {
+        "prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+        "completion_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
+        "cached_tokens": int(cached or 0),
+    }
+
+
+def record_usage(feature: str, model: str, usage: Dict[str, int], latency_ms: float) -> None:
+    with _usage_lock:
+        st = _usage.setdefault(
+            feature,
+            {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cached_tokens": 0,
+                "latency_ms_total": 0.0,
+                "cached_calls": 0,
+                "cached_latency_ms_total": 0.0,
+            },
+        )
+        st["calls"] += 1
+        st["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        st["completion_tokens"] += usage.get("completion_tokens", 0)
+        st["cached_tokens"] += usage.get("cached_tokens", 0)
+        st["latency_ms_total"] += latency_ms
+        if usage.get("cached_tokens", 0) > 0:
+            st["cached_calls"] += 1
+            st["cached_latency_ms_total"] += latency_ms
+    logger.info(
+        "llm.usage feature=%s model=%s layout=%s prompt=%d cached=%d completion=%d latency_ms=%.0f",
+        feature,
+        model,
+        PROMPT_LAYOUT,
+        usage.get("prompt_tokens", 0),
+        usage.get("cached_tokens", 0),
+        usage.get("completion_tokens", 0),
+        latency_ms,
+    )
+
+
+def get_usage_stats() -> Dict[str, Dict[str, float]]:
+    """Per-feature usage counters for this process, with cache hit ratio."""
+    with _usage_lock:
+        out = {k: dict(v) for k, v in _usage.items()}
+    for st in out.values():
+        prompt = st.get("prompt_tokens") or 0
+        st["cache_hit_ratio"] = round(st["cached_tokens"] / prompt, 4) if prompt else 0.0
+        st["layout"] = PROMPT_LAYOUT
+    return out
+
+
+def record_batched(feature: str, model: str, usage: Dict[str, int]) -> None:
+    """Usage of a result that came from a batch (no latency to record)."""
+    with _usage_lock:
+        st = _usage.setdefault(feature, {"calls": 0})
+        st["batched_calls"] = st.get("batched_calls", 0) + 1
+        st["batched_prompt_tokens"] = st.get("batched_prompt_tokens", 0) + usage.get("prompt_tokens", 0)
+        st["batched_completion_tokens"] = st.get("batched_completion_tokens", 0) + usage.get(
+            "completion_tokens", 0
+        )
+    logger.info(
+        "llm.batched feature=%s model=%s prompt=%d completion=%d",
+        feature,
+        model,
+        usage.get("prompt_tokens", 0),
+        usage.get("completion_tokens", 0),
+    )
+
+
+def record_coalesced(feature: str) -> None:
+    with _usage_lock:
+        st = _usage.setdefault(feature, {"calls": 0})
+        st["coalesced"] = st.get("coalesced", 0) + 1
+    logger.info("llm.coalesced feature=%s", feature)
+
+
+# ---------------------------------------------------------------------
+# Batch capture / replay
+# ---------------------------------------------------------------------
+
+
+class CapturedRequest(BaseException):
+    """
+    Raised by chat_completion inside capture_requests().
+
+    A BaseException so the generators' `except Exception` fallbacks let
+    it through.
+    """
+
+    def __init__(self, feature: str, body: Dict[str, Any]):
+        super().__init__(feature)
+        self.feature = feature
+        self.body = body
+
+
+@dataclass
+class _BatchMode:
+    capture: bool
+    response: Any = None
+
+
+_batch_mode: ContextVar[Optional[_BatchMode]] = ContextVar("llm_batch_mode", default=None)
+
+
+@contextmanager
+def capture_requests() -> Iterator[None]:
+    token = _batch_mode.set(_BatchMode(capture=True))
+    try:
+        yield
+    finally:
+        _batch_mode.reset(token)
+
+
+@contextmanager
+def replay_response(resp: Any) -> Iterator[None]:
+    """The next chat_completion returns `resp`; later calls go to the provider."""
+    token = _batch_mode.set(_BatchMode(capture=False, response=resp))
+    try:
+        yield
+    finally:
+        _batch_mode.reset(token)
+
+
+def capturing() -> bool:
+    mode = _batch_mode.get()
+    return mode is not None and mode.capture
+
+
+def _dump_response(resp: Any) -> Optional[str]:
+    dump = getattr(resp, "model_dump_json", None)
+    return dump() if callable(dump) else None
+
+
+def _load_response(raw: str) -> Any:
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate_json(raw)
+
+
+def chat_completion(
+    feature: str,
+    *,
+    messages: List[Dict[str, Any]],
+    model: str,
+    client: Any = None,
+    coalesce: bool = True,
+    **kwargs: Any,
+) -> Any:
+    """
+    client.chat.completions.create with prompt-size logging, usage
+    accounting, single-flight coalescing of identical concurrent
+    calls (coalesce=False opts out) and the circuit breaker / hedging of
+    modules.common.resilience. Exceptions propagate (CircuitOpenError
+    when the model's breaker is open); callers keep their own fallbacks.
+    """
+    if client is None:
+        from openai import OpenAI
+
+        client = OpenAI()
+
+    # Lets proxies / the local stand-in (benchmarks/llm_standin.py) attribute calls.
+    kwargs["extra_headers"] = {FEATURE_HEADER: feature, **(kwargs.get("extra_headers") or {})}
+
+    params = {k: v for k, v in kwargs.items() if k not in _TRANSPORT_KWARGS}
+    mode = _batch_mode.get()
+    if mode is not None:
+        if mode.capture:
+            raise CapturedRequest(feature, {"model": model, "messages": messages, **params})
+        if mode.response is not None:
+            resp, mode.response = mode.response, None
+            record_batched(feature, model, extract_usage(resp))
+            return resp
+
+    log_prompt_size(feature, messages)
+    model = resilience.route(model)
+
+    def _create() -> Any:
+        return client.chat.completions.create(model=model, messages=messages, **kwargs)
+
+    def _call() -> Any:
+        started = time.perf_counter()
+        try:
+            resp = resilience.hedged(feature, model, _create)
+        except Exception as e:
+            latency_s = time.perf_counter() - started
+            observe_llm_call(feature, model, latency_s, ok=False)
+            resilience.record(model, ok=not resilience.is_failure(e), latency_s=latency_s)
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        resilience.record(model, ok=True, latency_s=latency_ms / 1000.0)
+        resilience.observe_latency(feature, model, latency_ms / 1000.0)
+        try:
+            usage = extract_usage(resp)
+            record_usage(feature, model, usage, latency_ms)
+            observe_llm_call(feature, model, latency_ms / 1000.0, usage)
+        except Exception:  # accounting must never break a generation
+            logger.debug("llm usage accounting failed", exc_info=True)
+        return resp
+
+    if not coalesce:
+        return _call()
+
+    key = singleflight.inputs_key("chat", feature, model, messages, params)
+    resp, shared = singleflight.run(
+        key, _call, feature=feature, dumps=_dump_response, loads=_load_response
+    )
+    if shared:
+        record_coalesced(feature)
+    return resp
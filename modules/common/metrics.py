@@ -0,0 +1,416 @@
+# modules/common/metrics.py
+"""
+Prometheus metrics for the web app, the RQ worker and LLM calls.
+
+Web (`init_metrics(app)` in create_app):
+- careerai_http_request_duration_seconds{endpoint,method}  histogram
+- careerai_http_requests_total{endpoint,method,status}     counter
+- GET /metrics: needs `Authorization: Bearer $METRICS_TOKEN`. With no
+  token set it is refused (403) unless app.debug is on or
+  METRICS_PUBLIC=1 (only for an app port that is not internet-facing)
+- scrape-time collectors for RQ queue depth / oldest job age per queue
+  and SQLAlchemy pool usage
+
+LLM (`observe_llm_call`, called by modules.common.llm.chat_completion):
+- careerai_llm_request_duration_seconds{feature,model}     histogram
+- careerai_llm_requests_total{feature,model,outcome}        counter (ok|error)
+- careerai_llm_tokens_total{feature,model,kind}             counter (prompt|completion|cached)
+- careerai_llm_cost_usd_total{feature,model}                counter
+- careerai_singleflight_total{feature,role}                 counter (leader|follower|timeout)
+- careerai_llm_breaker_total{model,event}                   counter (opened|closed|rerouted|rejected|hedged|hedge_won)
+
+Worker (`MetricsWorker` + `start_worker_exporter(port)` in worker.py):
+- careerai_rq_job_wait_seconds{queue,task,job_class}        histogram (enqueue -> start)
+- careerai_rq_job_duration_seconds{queue,task,status}       histogram
+
+Multi-process: under gunicorn with several workers, and for LLM calls made
+inside forked RQ work horses, set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory (wiped on deploy). Samples are then aggregated across
+processes at scrape time. Without it each process only reports its own
+samples, and LLM metrics from worker jobs are lost with the horse.
+
+prometheus_client is optional: without it every function here is a no-op
+and /metrics answers 503.
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from rq import Worker
+
+# Optional dependency (guarded)
+try:
+    import prometheus_client  # pip install prometheus-client
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+    from prometheus_client.core import GaugeMetricFamily
+except Exception:  # pragma: no cover
+    prometheus_client = None  # type: ignore
+
+logger = logging.getLogger("metrics")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1" and prometheus_client is not None
+METRICS_TOKEN = (os.getenv("METRICS_TOKEN") or "").strip()
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0") == "1"
+METRICS_QUEUES = [
+    q.strip()
+    for q in (
+        os.getenv("METRICS_RQ_QUEUES")
+        or "careerai_priority,careerai_queue,careerai_free,careerai_bulk"
+    ).split(",")
+    if q.strip()
+]
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+# Per-1K token prices by tier (same env knobs as helpers._cost)
+PRICE_IN_PER_1K = float(os.getenv("PRICE_IN_PER_1K", "0.005"))
+PRICE_OUT_PER_1K = float(os.getenv("PRICE_OUT_PER_1K", "0.015"))
+PRICE_IN_PER_1K_DEEP = float(os.getenv("PRICE_IN_PER_1K_DEEP", "0.01"))
+PRICE_OUT_PER_1K_DEEP = float(os.getenv("PRICE_OUT_PER_1K_DEEP", "0.03"))
+OPENAI_MODEL_DEEP = os.getenv("OPENAI_MODEL_DEEP", "gpt-4o")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_JOB_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+
+
+if METRICS_ENABLED:
+    HTTP_LATENCY = Histogram(
+        "careerai_http_request_duration_seconds",
+        "Request latency by endpoint",
+        ["endpoint", "method"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    HTTP_REQUESTS = Counter(
+        "careerai_http_requests_total",
+        "Requests by endpoint and status",
+        ["endpoint", "method", "status"],
+    )
+    LLM_LATENCY = Histogram(
+        "careerai_llm_request_duration_seconds",
+        "Chat completion latency by feature",
+        ["feature", "model"],
+        buckets=_LLM_BUCKETS,
+    )
+    LLM_REQUESTS = Counter(
+        "careerai_llm_requests_total",
+        "Chat completion calls by feature and outcome",
+        ["feature", "model", "outcome"],
+    )
+    LLM_TOKENS = Counter(
+        "careerai_llm_tokens_total",
+        "Tokens by feature (prompt / completion / cached prompt)",
+        ["feature", "model", "kind"],
+    )
+    LLM_COST = Counter(
+        "careerai_llm_cost_usd_total",
+        "Estimated LLM spend in USD by feature",
+        ["feature", "model"],
+    )
+    SINGLEFLIGHT = Counter(
+        "careerai_singleflight_total",
+        "Coalesced LLM calls by role (followers reused a leader's result)",
+        ["feature", "role"],
+    )
+    LLM_BREAKER = Counter(
+        "careerai_llm_breaker_total",
+        "Circuit breaker and hedging events by model (modules.common.resilience)",
+        ["model", "event"],
+    )
+    JOB_WAIT = Histogram(
+        "careerai_rq_job_wait_seconds",
+        "Time from enqueue to start of execution",
+        ["queue", "task", "job_class"],
+        buckets=_JOB_BUCKETS,
+    )
+    JOB_DURATION = Histogram(
+        "careerai_rq_job_duration_seconds",
+        "Job execution time by final status",
+        ["queue", "task", "status"],
+        buckets=_JOB_BUCKETS,
+    )
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Spend estimate with the deep/fast per-1K prices used by helpers._cost."""
+    deep = (model or "") == OPENAI_MODEL_DEEP
+    pin = PRICE_IN_PER_1K_DEEP if deep else PRICE_IN_PER_1K
+    pout = PRICE_OUT_PER_1K_DEEP if deep else PRICE_OUT_PER_1K
+    return (prompt_tokens / 1000.0) * pin + (completion_tokens / 1000.0) * pout
+
+
+# ---------------------------------------------------------------------
+# LLM calls
+# ---------------------------------------------------------------------
+
+
+def observe_llm_call(
+    feature: str,
+    model: str,
+    latency_s: float,
+    usage: Optional[Dict[str, int]] = None,
+    *,
+    ok: bool = True,
+) -> None:
+    if not METRICS_ENABLED:
+        return
+    try:
+        LLM_LATENCY.labels(feature, model).observe(latency_s)
+        LLM_REQUESTS.labels(feature, model, "ok" if ok else "error").inc()
+        if usage:
+            prompt = int(usage.get("prompt_tokens", 0) or 0)
+            completion = int(usage.get("completion_tokens", 0) or 0)
+            LLM_TOKENS.labels(feature, model, "prompt").inc(prompt)
+            LLM_TOKENS.labels(feature, model, "completion").inc(completion)
+            LLM_TOKENS.labels(feature, model, "cached").inc(int(usage.get("cached_tokens", 0) or 0))
+            LLM_COST.labels(feature, model).inc(estimate_cost_usd(model, prompt, completion))
+    except Exception:  # metrics must never break a generation
+        logger.debug("llm metrics failed", exc_info=True)
+
+
+def observe_singleflight(feature: str, role: str) -> None:
+    if not METRICS_ENABLED:
+        return
+    try:
+        SINGLEFLIGHT.labels(feature or "-", role).inc()
+    except Exception:
+        logger.debug("singleflight metrics failed", exc_info=True)
+
+
+def observe_breaker(model: str, event: str) -> None:
+    if not METRICS_ENABLED:
+        return
+    try:
+        LLM_BREAKER.labels(model or "-", event).inc()
+    except Exception:
+        logger.debug("breaker metrics failed", exc_info=True)
+
+
+# ---------------------------------------------------------------------
+# Scrape-time collectors
+# ---------------------------------------------------------------------
+
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class QueueCollector:
+    """Depth, registry sizes and oldest waiting job age per RQ queue."""
+
+    def __init__(self, redis_url: str, queue_names: Iterable[str]):
+        self.redis_url = redis_url
+        self.queue_names = list(queue_names)
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            from redis import Redis
+
+            self._conn = Redis.from_url(self.redis_url, socket_timeout=2, socket_connect_timeout=2)
+        return self._conn
+
+    def collect(self):
+        depth = GaugeMetricFamily("careerai_rq_queue_depth", "Jobs waiting per queue", labels=["queue"])
+        jobs = GaugeMetricFamily(
+            "careerai_rq_jobs", "Jobs per queue registry", labels=["queue", "state"]
+        )
+        oldest = GaugeMetricFamily(
+            "careerai_rq_oldest_job_age_seconds",
+            "Age of the oldest waiting job per queue",
+            labels=["queue"],
+        )
+        up = GaugeMetricFamily("careerai_rq_up", "1 if Redis answered the last scrape")
+        try:
+            from rq import Queue
+
+            conn = self._connection()
+            now = datetime.now(timezone.utc)
+            for name in self.queue_names:
+                q = Queue(name, connection=conn)
+                depth.add_metric([name], q.count)
+                jobs.add_metric([name, "started"], q.started_job_registry.count)
+                jobs.add_metric([name, "failed"], q.failed_job_registry.count)
+                jobs.add_metric([name, "deferred"], q.deferred_job_registry.count)
+                jobs.add_metric([name, "scheduled"], q.scheduled_job_registry.count)
+                age = 0.0
+                head = q.get_job_ids(0, 1)
+                if head:
+                    job = q.fetch_job(head[0])
+                    enqueued = _utc(getattr(job, "enqueued_at", None)) if job else None
+                    if enqueued:
+                        age = max(0.0, (now - enqueued).total_seconds())
+                oldest.add_metric([name], age)
+            up.add_metric([], 1)
+        except Exception as e:
+            logger.debug("queue metrics unavailable: %s", e)
+            up.add_metric([], 0)
+        yield up
+        yield depth
+        yield jobs
+        yield oldest
+
+
+class PoolCollector:
+    """SQLAlchemy connection pool usage of the Flask-SQLAlchemy engine."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "careerai_db_pool_connections", "DB pool connections by state", labels=["state"]
+        )
+        try:
+            from models import db
+
+            with self.app.app_context():
+                pool = db.engine.pool
+            for state, fn in (
+                ("size", "size"),
+                ("checked_out", "checkedout"),
+                ("checked_in", "checkedin"),
+                ("overflow", "overflow"),
+            ):
+                if hasattr(pool, fn):
+                    gauge.add_metric([state], float(getattr(pool, fn)()))
+        except Exception as e:
+            logger.debug("pool metrics unavailable: %s", e)
+        yield gauge
+
+
+def _registry(extra_collectors: List[Any]):
+    """Registry to render: a multi-process aggregate, or the process default."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    for collector in extra_collectors:
+        try:
+            registry.register(collector)
+        except ValueError:  # already registered by an earlier create_app()
+            logger.debug("collector %s already registered", type(collector).__name__)
+    return registry
+
+
+# ---------------------------------------------------------------------
+# Flask integration
+# ---------------------------------------------------------------------
+
+
+def init_metrics(app) -> None:
+    """Request latency hooks plus the /metrics endpoint."""
+    from flask import Response, abort, g, request
+
+    if not METRICS_ENABLED:
+
+        @app.route("/metrics", endpoint="metrics")
+        def metrics_unavailable():
+            return Response("prometheus_client not installed\n", status=503, mimetype="text/plain")
+
+        return
+
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    registry = _registry([QueueCollector(redis_url, METRICS_QUEUES), PoolCollector(app)])
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(response):
+        started = g.get("_metrics_started")
+        endpoint = request.endpoint or "unmatched"
+        if started is not None and endpoint != "metrics":
+            try:
+                HTTP_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+                HTTP_REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+            except Exception:
+                logger.debug("request metrics failed", exc_info=True)
+        return response
+
+    if not METRICS_TOKEN and not (METRICS_PUBLIC or app.debug):
+        logger.warning("METRICS_TOKEN not set: /metrics is disabled (set it, or METRICS_PUBLIC=1)")
+
+    @app.route("/metrics", endpoint="metrics")
+    def metrics():
+        if METRICS_TOKEN:
+            auth = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth.encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+                abort(401)
+        elif not (METRICS_PUBLIC or app.debug):
+            abort(403)
+        payload = prometheus_client.generate_latest(registry)
+        return Response(payload, mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+# ---------------------------------------------------------------------
+# Worker exporter
+# ---------------------------------------------------------------------
+
+
+def start_worker_exporter(port: int, *, redis_url: Optional[str] = None) -> bool:
+    """Serve worker metrics (and queue gauges) on :port. False when unavailable."""
+    if not METRICS_ENABLED or not port:
+        return False
+    from prometheus_client import start_http_server
+
+    collectors: List[Any] = []
+    if redis_url:
+        collectors.append(QueueCollector(redis_url, METRICS_QUEUES))
+    start_http_server(port, registry=_registry(collectors))
+    logger.info("worker metrics exporter on :%d", port)
+    return True
+
+
+def _task_name(job) -> str:
+    return (getattr(job, "func_name", None) or "unknown").rsplit(".", 1)[-1]
+
+
+class MetricsWorker(Worker):
+    """rq Worker that records job wait and run time in the parent process."""
+
+    _last_horse_pid = 0
+
+    def fork_work_horse(self, job, queue):
+        super().fork_work_horse(job, queue)
+        self._last_horse_pid = self.horse_pid
+
+    def execute_job(self, job, queue):
+        if not METRICS_ENABLED:
+            return super().execute_job(job, queue)
+
+        task = _task_name(job)
+        job_class = (job.meta or {}).get("sched_class") or "unclassified"
+        enqueued = _utc(getattr(job, "enqueued_at", None))
+        if enqueued is not None:
+            wait = (datetime.now(timezone.utc) - enqueued).total_seconds()
+            JOB_WAIT.labels(queue.name, task, job_class).observe(max(0.0, wait))
+
+        started = time.perf_counter()
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            try:
+                status = job.get_status(refresh=True)
+                status = getattr(status, "value", status) or "unknown"
+            except Exception:
+                status = "unknown"
+            JOB_DURATION.labels(queue.name, task, str(status)).observe(
+                time.perf_counter() - started
+            )
+            if MULTIPROC_DIR and self._last_horse_pid:
+                from prometheus_client import multiprocess
+
+                multiprocess.mark_process_dead(self._last_horse_pid)
+                self._last_horse_pid = 0
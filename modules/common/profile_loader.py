@@ -1,11 +1,21 @@
 # modules/common/profile_loader.py
 
 from __future__ import annotations
-from typing import Any, Dict, List
 
-from models import UserProfile, ResumeAsset, Project, db  # db kept for future extension
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, Dict, List, Tuple
 
-MAX_TEXT = 6000
+from flask import g, has_app_context
+
+from models import UserProfile, ResumeAsset, Project, db
+from modules.common.prompt_budget import compact_text, fit_to_tokens
+
+MAX_TEXT = 6000  # legacy char cap; resume text is now budgeted in tokens
+RESUME_TEXT_TOKENS = int(os.getenv("PROFILE_RESUME_TEXT_TOKENS", "1500"))
 
 
 def _coerce_skill_names(skills_any: Any) -> List[str]:
@@ -19,7 +29,33 @@ def _coerce_skill_names(skills_any: Any) -> List[str]:
     return out
 
 
-def _profile_to_resume_text(profile: UserProfile | None) -> str:
+def _project_items(user, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    The user's first `limit` projects as plain dicts (title, short_desc,
+    tech_stack). Queried rather than read from user.projects, which can be
+    a stale collection when a Project was written by user_id.
+    """
+    user_id = getattr(user, "id", None)
+    if not user_id:
+        return []
+    try:
+        projects = Project.query.filter_by(user_id=user_id).order_by(Project.id).limit(limit).all()
+    except Exception:
+        return []
+    out: List[Dict[str, Any]] = []
+    for p in projects:
+        stack = p.tech_stack or []
+        out.append(
+            {
+                "title": p.title or "",
+                "short_desc": p.short_desc or "",
+                "tech_stack": [str(t) for t in stack] if isinstance(stack, list) else [],
+            }
+        )
+    return out
+
+
+def _profile_to_resume_text(profile: UserProfile | None, projects: List[Dict[str, Any]] | None = None) -> str:
     if not profile:
         return ""
 
@@ -58,19 +94,17 @@ def _profile_to_resume_text(profile: UserProfile | None) -> str:
                     lines.append(f"  • {b.strip()}")
 
     # Projects
-    user = getattr(profile, "user", None)
-    projects = getattr(user, "projects", []) if user else []
+    if projects is None:
+        projects = _project_items(getattr(profile, "user", None))
     if projects:
         lines.append("")
         lines.append("Projects:")
-        for p in projects[:5]:
-            title = getattr(p, "title", "")
-            desc = getattr(p, "short_desc", "")
-            stack = ", ".join(getattr(p, "tech_stack", []) or [])
-            if title:
-                lines.append(f"- {title}")
-            if desc:
-                lines.append(f"  • {desc}")
+        for p in projects:
+            stack = ", ".join(p["tech_stack"])
+            if p["title"]:
+                lines.append(f"- {p['title']}")
+            if p["short_desc"]:
+                lines.append(f"  • {p['short_desc']}")
             if stack:
                 lines.append(f"  • Stack: {stack}")
 
@@ -89,40 +123,84 @@ def _profile_to_resume_text(profile: UserProfile | None) -> str:
             if line:
                 lines.append(" - " + line)
 
-    return "\n".join(lines)[:MAX_TEXT]
+    return fit_to_tokens("\n".join(lines), RESUME_TEXT_TOKENS)
 
 
-def get_profile_resume_text(user) -> str:
+def get_current_resume_asset(user) -> ResumeAsset | None:
     """
-    Prefer latest ResumeAsset text; fall back to synthesized text from UserProfile.
-    This is the main 'resume' input for all AI features.
+    The user's current resume (latest upload).
+
+    Reads through user.current_resume_id (a primary-key lookup served from the
+    session identity map when already loaded); only users that predate the
+    pointer fall back to the ORDER BY created_at DESC query.
     """
+    if not user or not getattr(user, "id", None):
+        return None
+
+    rid = getattr(user, "current_resume_id", None)
+    if rid:
+        asset = db.session.get(ResumeAsset, rid)
+        if asset is not None and asset.user_id == user.id:
+            return asset
+
+    return (
+        ResumeAsset.query.filter(ResumeAsset.user_id == user.id)
+        .order_by(ResumeAsset.created_at.desc())
+        .first()
+    )
+
+
+def set_current_resume(user, asset: ResumeAsset) -> None:
+    """Point the user at `asset` (caller commits)."""
+    if user is None or asset is None:
+        return
+    if asset.id is None:
+        db.session.flush()
+    user.current_resume_id = asset.id
+
+
+def get_current_resume_text(user) -> str:
+    """Raw extracted text of the current resume ('' if none)."""
     try:
-        asset = (
-            ResumeAsset.query.filter(ResumeAsset.user_id == user.id)
-            .order_by(ResumeAsset.created_at.desc())
-            .first()
-        )
+        asset = get_current_resume_asset(user)
+        return (asset.text or "") if asset else ""
+    except Exception:
+        return ""
+
+
+def _resolve_resume_text(user, projects: List[Dict[str, Any]] | None = None) -> str:
+    try:
+        asset = get_current_resume_asset(user)
         if asset and asset.text:
-            return asset.text[:MAX_TEXT]
+            return fit_to_tokens(compact_text(asset.text), RESUME_TEXT_TOKENS)
     except Exception:
         # best-effort; don't break the feature
         pass
 
     profile = getattr(user, "profile", None)
-    return _profile_to_resume_text(profile)
+    return _profile_to_resume_text(profile, projects)
+
 
+def get_profile_resume_text(user) -> str:
+    """
+    Prefer latest ResumeAsset text; fall back to synthesized text from UserProfile.
+    This is the main 'resume' input for all AI features.
+    """
+    return get_profile_snapshot(user).resume_text
 
-def load_profile_snapshot(user) -> Dict[str, Any]:
+
+def _build_snapshot_data(user) -> Dict[str, Any]:
     """
-    Unified snapshot for all features.
+    Unified snapshot fields for all features.
     - resume_text: main text we send to AI
     - fields: full_name, headline, summary, etc
+    - projects: first 5 projects (title, short_desc, tech_stack)
     - profile_strength_score: rough completion %
     - missing_sections: ['skills', 'experience', ...]
     """
     profile: UserProfile | None = getattr(user, "profile", None)
-    resume_text = get_profile_resume_text(user)
+    projects = _project_items(user)
+    resume_text = _resolve_resume_text(user, projects)
 
     data: Dict[str, Any] = {
         "resume_text": resume_text,
@@ -135,7 +213,7 @@ def load_profile_snapshot(user) -> Dict[str, Any]:
         "experience": getattr(profile, "experience", []) if profile else [],
         "certifications": getattr(profile, "certifications", []) if profile else [],
         "links": getattr(profile, "links", {}) if profile else {},
-        "raw_profile": profile,
+        "projects": projects,
     }
 
     # Basic profile strength heuristic
@@ -169,3 +247,142 @@ def load_profile_snapshot(user) -> Dict[str, Any]:
     data["missing_sections"] = missing
 
     return data
+
+
+# ---------------------------------------------------------------------
+# Snapshot service
+#
+# Features used to rebuild the snapshot independently (resume query, lazy
+# profile + projects loads, synthesized text) several times per request.
+# Snapshots are now memoized per request on flask.g and across requests in
+# a small LRU, both keyed on (user_id, user.profile_version). Model
+# listeners bump the version on every profile / resume / project write
+# (projects are part of the snapshot and of the synthesized resume text)
+# and on a current-resume switch, so a write earlier in the same request
+# is never served from the memo.
+# ---------------------------------------------------------------------
+
+SNAPSHOT_CACHE_SIZE = int(os.getenv("PROFILE_SNAPSHOT_CACHE_SIZE", "512"))
+
+_snapshot_cache: "OrderedDict[Tuple[int, int], ProfileSnapshot]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    """
+    Immutable, cache-safe view of a user's profile for AI features.
+
+    Nested lists/dicts are frozen (tuples / read-only mappings); use
+    to_dict() for a mutable, JSON-friendly copy. Supports .get() / [] so
+    existing dict-style callers and templates keep working.
+    """
+
+    user_id: int
+    version: int
+    resume_text: str = ""
+    full_name: str = ""
+    headline: str = ""
+    summary: str = ""
+    location: str = ""
+    skills: Any = ()
+    education: Any = ()
+    experience: Any = ()
+    certifications: Any = ()
+    links: Any = field(default_factory=lambda: MappingProxyType({}))
+    projects: Any = ()
+    profile_strength_score: int = 0
+    missing_sections: Tuple[str, ...] = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: _thaw(getattr(self, f.name)) for f in fields(self)}
+
+
+def _request_memo() -> Dict[Tuple[int, int], ProfileSnapshot] | None:
+    if not has_app_context():
+        return None
+    memo = g.get("_profile_snapshots")
+    if memo is None:
+        memo = {}
+        g._profile_snapshots = memo
+    return memo
+
+
+def forget_request_snapshot(user_id: int) -> None:
+    """Drop the per-request memo for user_id (called on profile writes)."""
+    memo = _request_memo()
+    if memo is not None:
+        for key in [k for k in memo if k[0] == user_id]:
+            del memo[key]
+
+
+def get_profile_snapshot(user) -> ProfileSnapshot:
+    """Memoized ProfileSnapshot for `user` (per request + cross-request)."""
+    user_id = getattr(user, "id", None)
+    if not user_id:
+        return ProfileSnapshot(user_id=0, version=0)
+
+    version = int(getattr(user, "profile_version", 0) or 0)
+    key = (user_id, version)
+    memo = _request_memo()
+    if memo is not None and key in memo:
+        return memo[key]
+
+    with _snapshot_lock:
+        snap = _snapshot_cache.get(key)
+        if snap is not None:
+            _snapshot_cache.move_to_end(key)
+
+    if snap is None:
+        data = _build_snapshot_data(user)
+        snap = ProfileSnapshot(
+            user_id=user_id,
+            version=version,
+            **{k: _freeze(v) for k, v in data.items()},
+        )
+        if SNAPSHOT_CACHE_SIZE > 0:
+            with _snapshot_lock:
+                _snapshot_cache[key] = snap
+                _snapshot_cache.move_to_end(key)
+                while len(_snapshot_cache) > SNAPSHOT_CACHE_SIZE:
+                    _snapshot_cache.popitem(last=False)
+
+    if memo is not None:
+        memo[key] = snap
+    return snap
+
+
+def load_profile_snapshot(user) -> ProfileSnapshot:
+    """
+    Unified snapshot for all features.
+    - resume_text: main text we send to AI
+    - fields: full_name, headline, summary, etc
+    - profile_strength_score: rough completion %
+    - missing_sections: ['skills', 'experience', ...]
+    """
+    return get_profile_snapshot(user)
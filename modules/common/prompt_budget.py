@@ -0,0 +1,304 @@
+# modules/common/prompt_budget.py
+"""
+Token-budgeted prompt assembly.
+
+Replaces the scattered character slicing (resume_text[:12000], [:4000],
+MAX_TEXT=6000, ...) with one place that:
+
+- counts tokens with a local tokenizer (tiktoken when available; falls
+  back to the ~4 chars/token approximation used elsewhere in the app),
+- compacts sections cheaply first (whitespace, duplicate lines, empty
+  JSON values, minified schemas) so trimming rarely has to cut signal,
+- gives every section (JD, resume, profile, schema, ...) its own token
+  budget plus a priority, and shrinks/drops the lowest-priority sections
+  first when the whole prompt is over budget,
+- logs prompt size per feature and keeps in-process counters.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+# Optional local tokenizer (guarded)
+try:
+    import tiktoken  # pip install tiktoken
+except Exception:  # pragma: no cover
+    tiktoken = None  # type: ignore
+
+logger = logging.getLogger("prompt_budget")
+
+# Default token encoding (gpt-4o / gpt-4o-mini family)
+TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "o200k_base")
+
+# Per-section defaults (tokens). Features may override per call.
+SECTION_BUDGETS: Dict[str, int] = {
+    "jd": int(os.getenv("PROMPT_BUDGET_JD", "1200")),
+    "resume": int(os.getenv("PROMPT_BUDGET_RESUME", "1500")),
+    "profile": int(os.getenv("PROMPT_BUDGET_PROFILE", "900")),
+    "skills": int(os.getenv("PROMPT_BUDGET_SKILLS", "400")),
+    "extra": int(os.getenv("PROMPT_BUDGET_EXTRA", "500")),
+    "plan": int(os.getenv("PROMPT_BUDGET_PLAN", "4500")),
+    "history": int(os.getenv("PROMPT_BUDGET_HISTORY", "900")),
+    "schema": int(os.getenv("PROMPT_BUDGET_SCHEMA", "2500")),
+}
+
+# Whole-prompt ceiling for the variable (user-data) part of a prompt.
+DEFAULT_INPUT_BUDGET = int(os.getenv("PROMPT_INPUT_BUDGET_TOKENS", "6000"))
+
+
+# ---------------------------------------------------------------------
+# Token counting
+# ---------------------------------------------------------------------
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Load the tokenizer once; remember failures (e.g. offline BPE download)."""
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed or tiktoken is None:
+        return _encoding
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                _encoding_failed = True
+                logger.warning("tiktoken unavailable (%s); using approximate token counts.", e)
+    return _encoding
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text or "") / 4)) if text else 0
+
+
+def count_tokens(text: str) -> int:
+    """Token count for `text` (exact with tiktoken, approximate otherwise)."""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is None:
+        return approx_tokens(text)
+    try:
+        return len(enc.encode(text, disallowed_special=()))
+    except Exception:
+        return approx_tokens(text)
+
+
+def count_message_tokens(messages: Iterable[Dict[str, Any]]) -> int:
+    """Tokens for a chat message list (content + small per-message overhead)."""
+    total = 0
+    for m in messages or []:
+        content = m.get("content") or ""
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        total += count_tokens(content) + 4
+    return total + 2 if total else 0
+
+
+# ---------------------------------------------------------------------
+# Condensers (cheap, signal-preserving)
+# ---------------------------------------------------------------------
+
+_WS_RUN = re.compile(r"[ \t\f\v]+")
+_BLANK_RUN = re.compile(r"\n{3,}")
+
+
+def compact_text(text: str) -> str:
+    """Collapse whitespace runs and drop repeated lines (PDF headers/footers)."""
+    if not text:
+        return ""
+    seen = set()
+    out: List[str] = []
+    for line in str(text).replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = _WS_RUN.sub(" ", line).strip()
+        if line:
+            key = line.lower()
+            # Keep short lines (bullets like "Python") even if repeated.
+            if len(key) > 24 and key in seen:
+                continue
+            seen.add(key)
+        out.append(line)
+    return _BLANK_RUN.sub("\n\n", "\n".join(out)).strip()
+
+
+def _prune_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {k: _prune_empty(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        pruned = [_prune_empty(v) for v in value]
+        return [v for v in pruned if v not in (None, "", [], {})]
+    return value
+
+
+def compact_json(value: Any) -> str:
+    """Minified JSON with empty values removed (profile/plan payloads)."""
+    if value is None:
+        return "{}"
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            return compact_text(value)
+    return json.dumps(_prune_empty(value), ensure_ascii=False, separators=(",", ":"))
+
+
+def compact_schema(schema_text: str) -> str:
+    """Minify a JSON-schema string once (call at import time)."""
+    raw = (schema_text or "").strip()
+    if raw.startswith("\\"):
+        # r\"\"\"\\ ... schemas keep the line-continuation backslash.
+        raw = raw[1:].strip()
+    try:
+        return json.dumps(json.loads(raw), ensure_ascii=False, separators=(",", ":"))
+    except Exception:
+        return raw
+
+
+def fit_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim `text` to at most `max_tokens`, cutting on a whitespace boundary."""
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _get_encoding()
+    if enc is not None:
+        try:
+            cut = enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+        except Exception:
+            cut = text[: max_tokens * 4]
+    else:
+        cut = text[: max_tokens * 4]
+    # Avoid ending mid-word when a boundary is close.
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) * 0.8:
+        cut = cut[:boundary]
+    return cut.rstrip()
+
+
+# ---------------------------------------------------------------------
+# Section assembly
+# ---------------------------------------------------------------------
+
+
+@dataclass
+class PromptSection:
+    """
+    One variable part of a prompt.
+
+    priority: higher survives longer when the prompt is over budget.
+    min_tokens: floor when shrinking (0 means the section may be dropped).
+    kind: "text" (compact_text) | "json" (compact_json) | "raw" (as-is).
+    """
+
+    name: str
+    content: Any
+    max_tokens: Optional[int] = None
+    priority: int = 50
+    min_tokens: int = 0
+    kind: str = "text"
+
+
+def _condense(section: PromptSection) -> str:
+    if section.kind == "json":
+        return compact_json(section.content)
+    if section.kind == "raw":
+        return "" if section.content is None else str(section.content)
+    return compact_text("" if section.content is None else str(section.content))
+
+
+def assemble_sections(
+    feature: str,
+    sections: List[PromptSection],
+    total_tokens: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Condense, cap and (if needed) shrink sections to fit `total_tokens`.
+    Returns {section_name: text}; dropped sections map to "".
+    """
+    total_budget = DEFAULT_INPUT_BUDGET if total_tokens is None else total_tokens
+
+    texts: Dict[str, str] = {}
+    sizes: Dict[str, int] = {}
+    raw_sizes: Dict[str, int] = {}
+    for s in sections:
+        text = _condense(s)
+        raw_sizes[s.name] = count_tokens(text)
+        cap = s.max_tokens if s.max_tokens is not None else SECTION_BUDGETS.get(s.name)
+        if cap is not None and s.kind != "raw":
+            text = fit_to_tokens(text, cap)
+        texts[s.name] = text
+        sizes[s.name] = count_tokens(text)
+
+    overflow = sum(sizes.values()) - total_budget
+    if overflow > 0:
+        for s in sorted(sections, key=lambda x: x.priority):
+            if overflow <= 0:
+                break
+            if s.kind == "raw":
+                continue
+            current = sizes[s.name]
+            target = max(s.min_tokens, current - overflow)
+            if target >= current:
+                continue
+            texts[s.name] = fit_to_tokens(texts[s.name], target) if target > 0 else ""
+            new_size = count_tokens(texts[s.name])
+            overflow -= current - new_size
+            sizes[s.name] = new_size
+
+    _record(feature, sum(sizes.values()), sum(raw_sizes.values()))
+    logger.info(
+        "prompt.sections feature=%s tokens=%d budget=%d raw=%d %s",
+        feature,
+        sum(sizes.values()),
+        total_budget,
+        sum(raw_sizes.values()),
+        " ".join(f"{k}={v}" for k, v in sizes.items()),
+    )
+    return texts
+
+
+# ---------------------------------------------------------------------
+# Per-feature prompt size stats
+# ---------------------------------------------------------------------
+
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(feature: str, tokens: int, raw_tokens: int) -> None:
+    with _stats_lock:
+        st = _stats.setdefault(
+            feature, {"calls": 0, "section_tokens": 0, "saved_tokens": 0, "prompt_tokens": 0}
+        )
+        st["calls"] += 1
+        st["section_tokens"] += tokens
+        st["saved_tokens"] += max(0, raw_tokens - tokens)
+
+
+def log_prompt_size(feature: str, messages: List[Dict[str, Any]]) -> int:
+    """Log the final prompt size for a feature; returns the token count."""
+    tokens = count_message_tokens(messages)
+    with _stats_lock:
+        st = _stats.setdefault(
+            feature, {"calls": 0, "section_tokens": 0, "saved_tokens": 0, "prompt_tokens": 0}
+        )
+        st["prompt_tokens"] += tokens
+    logger.info("prompt.size feature=%s tokens=%d messages=%d", feature, tokens, len(messages or []))
+    return tokens
+
+
+def get_prompt_stats() -> Dict[str, Dict[str, int]]:
+    """Snapshot of per-feature prompt counters (this process)."""
+    with _stats_lock:
+        return {k: dict(v) for k, v in _stats.items()}
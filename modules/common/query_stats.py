@@ -0,0 +1,217 @@
+# modules/common/query_stats.py
+"""
+Per-request / per-job SQL query accounting.
+
+SQLAlchemy cursor events count every statement and its DB time against
+the active scope: one Flask request (registered by `init_query_stats`)
+or one RQ job (`with track_queries("job:<name>")` inside the task).
+
+At the end of a scope:
+
+- statements repeated at least QUERY_STATS_REPEAT times with identical
+  SQL (bound parameters excluded) are flagged as likely N+1 patterns,
+- one `query_stats` log line is written: INFO normally, WARNING when
+  a repeat is flagged or the count exceeds QUERY_STATS_WARN,
+- for requests, with QUERY_STATS_HEADER=1 (or app.debug), the response
+  gets an X-Query-Stats header plus a Server-Timing "db" entry.
+
+QUERY_STATS=0 turns all of it off (the listeners are not installed).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("query_stats")
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS", "1") == "1"
+# Identical statements per scope before they are flagged as N+1
+QUERY_STATS_REPEAT = int(os.getenv("QUERY_STATS_REPEAT", "5"))
+# Statement count per scope that raises the log line to WARNING
+QUERY_STATS_WARN = int(os.getenv("QUERY_STATS_WARN", "40"))
+# Debug response headers (also on whenever app.debug is set)
+QUERY_STATS_HEADER = os.getenv("QUERY_STATS_HEADER", "0") == "1"
+
+HEADER_NAME = "X-Query-Stats"
+
+_WS_RE = re.compile(r"\s+")
+# Expanded IN lists differ only in their placeholder count
+_IN_LIST_RE = re.compile(r"IN \((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+
+_SELECT_LIST_RE = re.compile(r"^SELECT .+? FROM ", re.IGNORECASE)
+
+_START_KEY = "query_stats_start"
+
+
+@dataclass
+class QueryStats:
+    """Statements executed in one scope (a request or a job)."""
+
+    label: str
+    count: int = 0
+    db_ms: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+    started: float = field(default_factory=time.perf_counter)
+    # restores the enclosing scope (if any) on finish()
+    token: Optional[contextvars.Token] = field(default=None, repr=False, compare=False)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.db_ms += elapsed_ms
+        self.statements[normalize_statement(statement)] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(statement, times) for statements run at least `threshold` times."""
+        threshold = QUERY_STATS_REPEAT if threshold is None else threshold
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def header_value(self) -> str:
+        return f"count={self.count}; db_ms={self.db_ms:.1f}; repeated={len(self.repeated())}"
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement text with whitespace collapsed and IN (...) lists folded."""
+    sql = _WS_RE.sub(" ", statement or "").strip()
+    return _IN_LIST_RE.sub("IN (...)", sql)
+
+
+# ---------------------------------------------------------------------
+# Scope tracking
+# ---------------------------------------------------------------------
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "query_stats", default=None
+)
+_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get(_START_KEY)
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0 if starts else 0.0
+    stats.record(statement, elapsed_ms)
+
+
+def install_listeners() -> None:
+    """Attach the cursor listeners to every Engine (idempotent)."""
+    global _listeners_installed
+    if _listeners_installed or not QUERY_STATS_ENABLED:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_installed = True
+
+
+def current() -> Optional[QueryStats]:
+    """Stats of the active scope, if any."""
+    return _current.get()
+
+
+def start(label: str) -> Optional[QueryStats]:
+    """Open a scope; it replaces the active one until finish(stats)."""
+    if not QUERY_STATS_ENABLED:
+        return None
+    install_listeners()
+    stats = QueryStats(label=label)
+    stats.token = _current.set(stats)
+    return stats
+
+
+def finish(stats: Optional[QueryStats], *, status: Optional[int] = None) -> None:
+    """Close a scope, restore the one it interrupted and write its log line."""
+    if stats is None:
+        return
+    token, stats.token = stats.token, None
+    if token is not None and _current.get() is stats:
+        try:
+            _current.reset(token)
+        except ValueError:  # opened in another context
+            _current.set(None)
+    log_stats(stats, status=status)
+
+
+def log_stats(stats: QueryStats, *, status: Optional[int] = None) -> None:
+    repeated = stats.repeated()
+    level = logging.WARNING if repeated or stats.count > QUERY_STATS_WARN else logging.INFO
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        "query_stats scope=%s status=%s queries=%d db_ms=%.1f total_ms=%.0f repeated=%d",
+        stats.label,
+        status if status is not None else "-",
+        stats.count,
+        stats.db_ms,
+        stats.elapsed_ms,
+        len(repeated),
+    )
+    for statement, times in repeated[:3]:
+        short = _SELECT_LIST_RE.sub("SELECT ... FROM ", statement, count=1)
+        logger.log(level, "query_stats possible N+1 x%d: %s", times, short[:200])
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[Optional[QueryStats]]:
+    """Count statements inside the block (used around RQ job bodies)."""
+    stats = start(label)
+    try:
+        yield stats
+    finally:
+        finish(stats)
+
+
+# ---------------------------------------------------------------------
+# Flask integration
+# ---------------------------------------------------------------------
+
+
+def init_query_stats(app) -> None:
+    """Open a scope per request; log it and optionally add debug headers."""
+    if not QUERY_STATS_ENABLED:
+        return
+
+    from flask import g, request
+
+    install_listeners()
+
+    @app.before_request
+    def _query_stats_start():
+        g._query_stats = start(f"{request.method} {request.endpoint or request.path}")
+
+    @app.after_request
+    def _query_stats_headers(response):
+        stats = g.get("_query_stats")
+        g._query_stats_status = response.status_code
+        if stats is not None and (QUERY_STATS_HEADER or app.debug):
+            response.headers[HEADER_NAME] = stats.header_value()
+            response.headers.add(
+                "Server-Timing", f'db;dur={stats.db_ms:.1f};desc="{stats.count} queries"'
+            )
+        return response
+
+    @app.teardown_request
+    def _query_stats_finish(exc):
+        stats = g.pop("_query_stats", None)
+        finish(stats, status=500 if exc is not None else g.get("_query_stats_status"))
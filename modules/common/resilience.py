@@ -0,0 +1,323 @@
+# modules/common/resilience.py
+"""
+Circuit breaker and hedged requests around the OpenAI dependency.
+
+Skill Mapper, Internship Analyzer and Referral Trainer call the model
+synchronously inside web requests. When OpenAI degrades, every gunicorn
+worker that reaches one of them used to block until its timeout, and
+the whole pool could stall. Both mechanisms here are applied by
+modules.common.llm.chat_completion.
+
+Circuit breaker (per model, state shared through Redis)
+    Calls and failures are counted in LLM_CB_BUCKET_S buckets over the
+    last LLM_CB_WINDOW_S. Failures are timeouts, connection errors, 429s,
+    5xx and calls slower than LLM_CB_SLOW_S. When at least
+    LLM_CB_MIN_CALLS calls are in the window and LLM_CB_FAILURE_RATIO of
+    them failed, the breaker opens for LLM_CB_OPEN_S on every process at
+    once. While it is open:
+      - calls to that model are routed to its fallback model
+        (LLM_FALLBACK_MODELS, default gpt-4o=gpt-4o-mini) if that
+        model's breaker is closed, and
+      - otherwise they fail at once with CircuitOpenError. The
+        generators' existing fallbacks take over, in milliseconds
+        instead of after a 60-90 s timeout.
+    When the open period ends, one caller per LLM_CB_PROBE_S is let
+    through as a probe (half-open). A success closes the breaker and a
+    failure opens it again.
+
+Hedged requests (optional, LLM_HEDGE=1)
+    For features listed in LLM_HEDGE_FEATURES, if a call has not
+    returned after the LLM_HEDGE_PERCENTILE latency of recent calls for
+    that feature/model, an identical second request is sent and the
+    first answer wins. This cuts tail latency at the cost of extra
+    tokens on the slowest few percent of calls.
+
+Redis being unavailable never blocks a call: the breaker then lets
+everything through.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+try:
+    import openai
+except Exception:  # pragma: no cover
+    openai = None  # type: ignore
+
+logger = logging.getLogger("resilience")
+
+LLM_CB_ENABLED = os.getenv("LLM_CB", "1") == "1"
+LLM_CB_WINDOW_S = int(os.getenv("LLM_CB_WINDOW_S", "60"))
+LLM_CB_BUCKET_S = int(os.getenv("LLM_CB_BUCKET_S", "10"))
+LLM_CB_MIN_CALLS = int(os.getenv("LLM_CB_MIN_CALLS", "10"))
+LLM_CB_FAILURE_RATIO = float(os.getenv("LLM_CB_FAILURE_RATIO", "0.5"))
+# A call slower than this counts as a failure (seconds)
+LLM_CB_SLOW_S = float(os.getenv("LLM_CB_SLOW_S", "45"))
+LLM_CB_OPEN_S = int(os.getenv("LLM_CB_OPEN_S", "30"))
+LLM_CB_PROBE_S = int(os.getenv("LLM_CB_PROBE_S", "10"))
+
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_FEATURES = {
+    f.strip()
+    for f in os.getenv(
+        "LLM_HEDGE_FEATURES",
+        "skill_mapper_free,skill_mapper_pro,internship_analyzer,referral_trainer_free",
+    ).split(",")
+    if f.strip()
+}
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_S = float(os.getenv("LLM_HEDGE_MIN_S", "2"))
+# Latency samples needed before hedging starts
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_POOL = int(os.getenv("LLM_HEDGE_POOL", "8"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def _parse_fallbacks(raw: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for part in (raw or "").split(","):
+        src, _, dst = part.partition("=")
+        if src.strip() and dst.strip():
+            out[src.strip()] = dst.strip()
+    return out
+
+
+LLM_FALLBACK_MODELS = _parse_fallbacks(os.getenv("LLM_FALLBACK_MODELS", "gpt-4o=gpt-4o-mini"))
+
+_OPEN = "cb:{}:open"
+_PROBE = "cb:{}:probe"
+_PROBE_LOCK = "cb:{}:probe_lock"
+_CALLS = "cb:{}:n:{}"
+_FAILS = "cb:{}:f:{}"
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's breaker is open and no fallback model is available."""
+
+    def __init__(self, model: str):
+        super().__init__(f"LLM circuit open for {model}")
+        self.model = model
+
+
+_conn = None
+_conn_lock = threading.Lock()
+
+
+def _redis():
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None:
+                from redis import Redis
+
+                # Short timeouts: the breaker must never be the slow part.
+                _conn = Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _conn
+
+
+def _observe(model: str, event: str) -> None:
+    try:
+        from modules.common.metrics import observe_breaker
+
+        observe_breaker(model, event)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------
+
+
+def is_failure(exc: BaseException) -> bool:
+    """Errors that say the provider is unhealthy (not that our request was bad)."""
+    if openai is None:
+        return True
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return isinstance(exc, TimeoutError)
+
+
+def _bucket(now: float) -> int:
+    return int(now // LLM_CB_BUCKET_S)
+
+
+def state(model: str, conn: Any = None) -> str:
+    """Breaker state for `model`: closed, open or half_open."""
+    if not LLM_CB_ENABLED:
+        return "closed"
+    try:
+        conn = conn or _redis()
+        if conn.exists(_OPEN.format(model)):
+            return "open"
+        return "half_open" if conn.exists(_PROBE.format(model)) else "closed"
+    except Exception:
+        return "closed"
+
+
+def allow(model: str, conn: Any = None) -> bool:
+    """May a call to `model` go out now? Takes the probe slot when half-open."""
+    if not LLM_CB_ENABLED:
+        return True
+    try:
+        conn = conn or _redis()
+        if conn.exists(_OPEN.format(model)):
+            return False
+        if not conn.exists(_PROBE.format(model)):
+            return True
+        # Half-open: one probe per LLM_CB_PROBE_S, everyone else waits.
+        return bool(conn.set(_PROBE_LOCK.format(model), "1", nx=True, ex=LLM_CB_PROBE_S))
+    except Exception:
+        logger.debug("breaker: redis unavailable, allowing call", exc_info=True)
+        return True
+
+
+def route(model: str, conn: Any = None) -> str:
+    """
+    The model to call instead of `model`: itself when its breaker allows
+    it, else its fallback. Raises CircuitOpenError if neither is usable.
+    """
+    if allow(model, conn):
+        return model
+    fallback = LLM_FALLBACK_MODELS.get(model)
+    if fallback and allow(fallback, conn):
+        _observe(model, "rerouted")
+        logger.warning("breaker.reroute model=%s fallback=%s", model, fallback)
+        return fallback
+    _observe(model, "rejected")
+    raise CircuitOpenError(model)
+
+
+def record(model: str, *, ok: bool, latency_s: float = 0.0, conn: Any = None) -> None:
+    """Count one finished call and open/close the breaker as needed."""
+    if not LLM_CB_ENABLED:
+        return
+    failed = (not ok) or latency_s > LLM_CB_SLOW_S
+    try:
+        conn = conn or _redis()
+        now = time.time()
+        b = _bucket(now)
+        ttl = LLM_CB_WINDOW_S + LLM_CB_BUCKET_S
+        pipe = conn.pipeline()
+        pipe.incr(_CALLS.format(model, b))
+        pipe.expire(_CALLS.format(model, b), ttl)
+        if failed:
+            pipe.incr(_FAILS.format(model, b))
+            pipe.expire(_FAILS.format(model, b), ttl)
+        pipe.execute()
+
+        # Calls that started before the breaker opened still report in;
+        # only a finished probe (half-open) may close it.
+        probing = conn.exists(_PROBE.format(model)) and not conn.exists(_OPEN.format(model))
+        if probing and not failed:
+            _close(conn, model)
+            return
+        if probing and failed:
+            _open(conn, model, reason="probe failed")
+            return
+        if failed and _tripped(conn, model, b):
+            _open(conn, model, reason="failure ratio")
+    except Exception:
+        logger.debug("breaker: record failed", exc_info=True)
+
+
+def _tripped(conn: Any, model: str, bucket: int) -> bool:
+    buckets = range(bucket - LLM_CB_WINDOW_S // LLM_CB_BUCKET_S + 1, bucket + 1)
+    calls = conn.mget([_CALLS.format(model, b) for b in buckets])
+    fails = conn.mget([_FAILS.format(model, b) for b in buckets])
+    n = sum(int(v or 0) for v in calls)
+    f = sum(int(v or 0) for v in fails)
+    return n >= LLM_CB_MIN_CALLS and f >= LLM_CB_FAILURE_RATIO * n
+
+
+def _open(conn: Any, model: str, *, reason: str) -> None:
+    pipe = conn.pipeline()
+    pipe.set(_OPEN.format(model), reason, ex=LLM_CB_OPEN_S)
+    # Half-open marker outlives the open period; the first caller after
+    # it expires is the probe.
+    pipe.set(_PROBE.format(model), "1", ex=LLM_CB_OPEN_S + LLM_CB_PROBE_S)
+    pipe.delete(_PROBE_LOCK.format(model))
+    pipe.execute()
+    _observe(model, "opened")
+    logger.warning("breaker.open model=%s reason=%s for=%ss", model, reason, LLM_CB_OPEN_S)
+
+
+def _close(conn: Any, model: str) -> None:
+    conn.delete(_PROBE.format(model), _PROBE_LOCK.format(model))
+    keys = list(conn.scan_iter(match=f"cb:{model}:[nf]:*", count=100))
+    if keys:
+        conn.delete(*keys)
+    _observe(model, "closed")
+    logger.warning("breaker.close model=%s", model)
+
+
+# ---------------------------------------------------------------------
+# Hedged requests
+# ---------------------------------------------------------------------
+
+_latencies: Dict[Tuple[str, str], Deque[float]] = {}
+_lat_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def observe_latency(feature: str, model: str, latency_s: float) -> None:
+    with _lat_lock:
+        _latencies.setdefault((feature, model), deque(maxlen=200)).append(latency_s)
+
+
+def hedge_delay(feature: str, model: str) -> Optional[float]:
+    """Seconds to wait before hedging this call, or None to not hedge."""
+    if not LLM_HEDGE_ENABLED or feature not in LLM_HEDGE_FEATURES:
+        return None
+    with _lat_lock:
+        samples = sorted(_latencies.get((feature, model)) or ())
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        return None
+    idx = min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE / 100.0))
+    return max(LLM_HEDGE_MIN_S, samples[idx])
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lat_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=LLM_HEDGE_POOL, thread_name_prefix="llm-hedge")
+    return _pool
+
+
+def hedged(feature: str, model: str, fn: Callable[[], Any]) -> Any:
+    """fn(), plus an identical backup call if the first is slower than hedge_delay()."""
+    delay = hedge_delay(feature, model)
+    if delay is None:
+        return fn()
+
+    pool = _executor()
+    first = pool.submit(fn)
+    try:
+        return first.result(timeout=delay)
+    except FuturesTimeout:
+        pass
+
+    _observe(model, "hedged")
+    logger.info("llm.hedge feature=%s model=%s after_s=%.2f", feature, model, delay)
+    second = pool.submit(fn)
+    done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+    for fut in done:
+        if fut.exception() is None:
+            if fut is second:
+                _observe(model, "hedge_won")
+            return fut.result()
+    # The first to finish failed; the other one decides.
+    return pending.pop().result() if pending else first.result()
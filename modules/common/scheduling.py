@@ -0,0 +1,310 @@
+# modules/common/scheduling.py
+"""
+Job classes, weighted queues and per-tenant fair share for RQ jobs.
+
+Every AI job is routed by plan tier and feature cost into a class, one
+RQ queue per class:
+
+    priority  careerai_priority  Gold ⭐ runs (feature costs gold)
+    standard  careerai_queue     Silver 🪙 runs by Pro subscribers
+    free      careerai_free      Silver 🪙 runs by Free users
+    bulk      careerai_bulk      tenants over their fair share, batch work
+
+Workers (`SchedulingWorker`, used by worker.py) do not drain the queues
+in strict order. Before each dequeue the queue order is reshuffled by
+weight (SCHED_WEIGHTS, default priority=6,standard=3,free=2,bulk=1).
+A class therefore gets roughly its weight's share of dequeues while all
+queues are busy, and idle classes cost nothing.
+
+Fair share: each tenant (a university, or the user for individual
+accounts) has its in-flight jobs tracked in Redis. When a tenant already
+has SCHED_TENANT_MIN_JOBS in flight and more than SCHED_TENANT_SHARE of
+all in-flight jobs, its new jobs go to the bulk queue. One university's
+placement drive then cannot crowd out everybody else's runs. Entries
+are removed when the job ends and expire after SCHED_INFLIGHT_TTL
+seconds if a worker dies.
+
+Coalescing: with coalesce_key, a job whose inputs match a queued or
+running job is enqueued as its dependent (see modules.common.singleflight).
+
+Queue wait per class is exported by modules.common.metrics
+(careerai_rq_job_wait_seconds{job_class=...}).
+
+Routing is opt-in. Unless SCHED_ENABLED=1, everything goes to the
+standard queue, which is the queue deployed workers already consume.
+Workers must listen on all four queues before SCHED_ENABLED=1 is set on
+web.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from redis import Redis
+from rq import Queue
+from rq.job import Dependency, Job
+
+from modules.common import singleflight
+from modules.common.metrics import MetricsWorker
+
+logger = logging.getLogger("scheduling")
+
+SCHED_ENABLED = os.getenv("SCHED_ENABLED", "0") == "1"
+
+QUEUE_FOR_CLASS: Dict[str, str] = {
+    "priority": os.getenv("RQ_PRIORITY_QUEUE", "careerai_priority"),
+    "standard": os.getenv("RQ_QUEUE_NAME", "careerai_queue"),
+    "free": os.getenv("RQ_FREE_QUEUE", "careerai_free"),
+    "bulk": os.getenv("RQ_BULK_QUEUE", "careerai_bulk"),
+}
+CLASS_FOR_QUEUE: Dict[str, str] = {q: c for c, q in QUEUE_FOR_CLASS.items()}
+
+# Worker listen order (also the order used when weights are disabled)
+QUEUE_NAMES: List[str] = [QUEUE_FOR_CLASS[c] for c in ("priority", "standard", "free", "bulk")]
+
+SCHED_TENANT_SHARE = float(os.getenv("SCHED_TENANT_SHARE", "0.5"))
+SCHED_TENANT_MIN_JOBS = int(os.getenv("SCHED_TENANT_MIN_JOBS", "10"))
+SCHED_INFLIGHT_TTL = int(os.getenv("SCHED_INFLIGHT_TTL", "3600"))
+
+_INFLIGHT_ALL = "sched:inflight"
+_INFLIGHT_TENANT = "sched:inflight:{}"
+
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    weights = {"priority": 6.0, "standard": 3.0, "free": 2.0, "bulk": 1.0}
+    for part in (raw or "").split(","):
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name in weights:
+            try:
+                weights[name] = max(0.01, float(value))
+            except ValueError:
+                logger.warning("SCHED_WEIGHTS: bad weight for %s: %r", name, value)
+    return weights
+
+
+SCHED_WEIGHTS = _parse_weights(os.getenv("SCHED_WEIGHTS", ""))
+
+
+# ---------------------------------------------------------------------
+# Routing
+# ---------------------------------------------------------------------
+
+
+def classify(
+    *,
+    feature_key: Optional[str] = None,
+    currency: Optional[str] = None,
+    is_pro_user: bool = False,
+) -> str:
+    """
+    Job class for a run.
+
+    Gold runs (explicit currency, or a feature that only costs gold) are
+    "priority". Silver runs are "standard" for Pro subscribers and
+    "free" otherwise.
+    """
+    cur = (currency or "").lower()
+    if not cur and feature_key:
+        from modules.credits.config import FEATURE_COSTS
+
+        cost = FEATURE_COSTS.get(feature_key) or {}
+        if int(cost.get("gold", 0) or 0) > 0 and not int(cost.get("silver", 0) or 0):
+            cur = "gold"
+    if cur == "gold":
+        return "priority"
+    return "standard" if is_pro_user else "free"
+
+
+def tenant_key(user: Any) -> str:
+    """Fair-share bucket: the user's university, else the user themself."""
+    uni_id = getattr(user, "university_id", None)
+    if uni_id:
+        return f"uni:{uni_id}"
+    return f"user:{getattr(user, 'id', 'anon')}"
+
+
+def _load_user(user_id: int):
+    from models import User, db
+
+    # Usually an identity-map hit: the request already loaded current_user.
+    return db.session.get(User, user_id)
+
+
+def _over_share(conn: Redis, tenant: str) -> bool:
+    cutoff = time.time() - SCHED_INFLIGHT_TTL
+    pipe = conn.pipeline()
+    pipe.zremrangebyscore(_INFLIGHT_ALL, "-inf", cutoff)
+    pipe.zremrangebyscore(_INFLIGHT_TENANT.format(tenant), "-inf", cutoff)
+    pipe.zcard(_INFLIGHT_ALL)
+    pipe.zcard(_INFLIGHT_TENANT.format(tenant))
+    _, _, total, mine = pipe.execute()
+    return mine >= SCHED_TENANT_MIN_JOBS and mine > SCHED_TENANT_SHARE * total
+
+
+def _track(conn: Redis, tenant: str, job_id: str) -> None:
+    now = time.time()
+    pipe = conn.pipeline()
+    pipe.zadd(_INFLIGHT_ALL, {job_id: now})
+    pipe.zadd(_INFLIGHT_TENANT.format(tenant), {job_id: now})
+    pipe.expire(_INFLIGHT_TENANT.format(tenant), SCHED_INFLIGHT_TTL)
+    pipe.execute()
+
+
+def release(conn: Redis, job: Job) -> None:
+    """Drop a finished job from the fair-share counters."""
+    tenant = (job.meta or {}).get("sched_tenant")
+    if not tenant:
+        return
+    pipe = conn.pipeline()
+    pipe.zrem(_INFLIGHT_ALL, job.id)
+    pipe.zrem(_INFLIGHT_TENANT.format(tenant), job.id)
+    pipe.execute()
+
+
+def enqueue(
+    conn: Redis,
+    func: Callable[..., Any],
+    *,
+    user_id: int,
+    feature_key: Optional[str] = None,
+    currency: Optional[str] = None,
+    job_class: Optional[str] = None,
+    coalesce_key: Optional[str] = None,
+    **enqueue_kwargs: Any,
+) -> Job:
+    """
+    Queue.enqueue on the queue for this run's class.
+
+    enqueue_kwargs go to Queue.enqueue unchanged (kwargs=, job_timeout=, ...).
+    coalesce_key (singleflight.inputs_key of the generation inputs) makes
+    the job wait for an identical in-flight job, so it reuses that job's
+    LLM result instead of repeating the call.
+    Scheduling failures (Redis hiccups, missing user) never block the
+    enqueue. The job then goes to the class queue without fair-share
+    accounting.
+    """
+    if coalesce_key:
+        _coalesce(conn, coalesce_key, enqueue_kwargs)
+
+    if not SCHED_ENABLED:
+        job = Queue(QUEUE_FOR_CLASS["standard"], connection=conn).enqueue(func, **enqueue_kwargs)
+        _claim(conn, coalesce_key, job, enqueue_kwargs)
+        return job
+
+    user = None
+    try:
+        user = _load_user(user_id)
+    except Exception:
+        logger.debug("scheduling: user %s not loadable", user_id, exc_info=True)
+
+    klass = job_class or classify(
+        feature_key=feature_key,
+        currency=currency,
+        is_pro_user=bool(getattr(user, "is_pro", False)),
+    )
+    tenant = tenant_key(user) if user is not None else f"user:{user_id}"
+
+    demoted = False
+    try:
+        if klass != "bulk" and _over_share(conn, tenant):
+            demoted = True
+            klass = "bulk"
+    except Exception:
+        logger.debug("scheduling: fair-share check failed", exc_info=True)
+
+    meta = dict(enqueue_kwargs.pop("meta", None) or {})
+    meta.update(
+        {
+            "sched_class": klass,
+            "sched_tenant": tenant,
+            "sched_feature": feature_key,
+            "sched_demoted": demoted,
+        }
+    )
+    job = Queue(QUEUE_FOR_CLASS[klass], connection=conn).enqueue(func, meta=meta, **enqueue_kwargs)
+
+    try:
+        _track(conn, tenant, job.id)
+    except Exception:
+        logger.debug("scheduling: in-flight tracking failed", exc_info=True)
+    _claim(conn, coalesce_key, job, enqueue_kwargs)
+
+    logger.info(
+        "sched.enqueue job=%s class=%s tenant=%s feature=%s demoted=%s coalesced_with=%s",
+        job.id,
+        klass,
+        tenant,
+        feature_key or "-",
+        demoted,
+        (job.meta or {}).get("coalesced_with") or "-",
+    )
+    return job
+
+
+def _coalesce(conn: Redis, key: str, enqueue_kwargs: Dict[str, Any]) -> None:
+    """Make the job a dependent of an identical in-flight job, if there is one."""
+    try:
+        leader = singleflight.leader_job(conn, key)
+    except Exception:
+        logger.debug("scheduling: coalescing lookup failed", exc_info=True)
+        return
+    if not leader or enqueue_kwargs.get("depends_on"):
+        return
+    # allow_failure: a failed leader must not strand the follower; it then
+    # runs on its own. enqueue_at_front: it has already waited its turn.
+    enqueue_kwargs["depends_on"] = Dependency(
+        jobs=[leader], allow_failure=True, enqueue_at_front=True
+    )
+    meta = dict(enqueue_kwargs.get("meta") or {})
+    meta["coalesced_with"] = leader
+    enqueue_kwargs["meta"] = meta
+
+
+def _claim(conn: Redis, key: Optional[str], job: Job, enqueue_kwargs: Dict[str, Any]) -> None:
+    if not key or (job.meta or {}).get("coalesced_with"):
+        return
+    try:
+        singleflight.claim_job(conn, key, job.id, enqueue_kwargs.get("job_timeout") or 600)
+    except Exception:
+        logger.debug("scheduling: coalescing claim failed", exc_info=True)
+
+
+# ---------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------
+
+
+def weighted_order(names: List[str], weights: Dict[str, float], rnd=random) -> List[str]:
+    """
+    Random queue order where a queue comes first with probability
+    proportional to its class weight (Efraimidis–Spirakis keys).
+    """
+
+    def key(name: str) -> float:
+        w = weights.get(CLASS_FOR_QUEUE.get(name, ""), 1.0)
+        return rnd.random() ** (1.0 / w)
+
+    return sorted(names, key=key, reverse=True)
+
+
+class SchedulingWorker(MetricsWorker):
+    """Weighted dequeue across class queues; releases fair-share slots."""
+
+    def reorder_queues(self, reference_queue):
+        by_name = {q.name: q for q in self._ordered_queues}
+        order = weighted_order(list(by_name), SCHED_WEIGHTS)
+        self._ordered_queues = [by_name[n] for n in order]
+
+    def execute_job(self, job, queue):
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            try:
+                release(self.connection, job)
+            except Exception:
+                logger.debug("scheduling: release failed for %s", job.id, exc_info=True)
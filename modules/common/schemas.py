@@ -0,0 +1,1062 @@
+# modules/common/schemas.py
+"""
+Declarative output schemas for the AI generators, compiled to plain Python.
+
+These replace the hand-written `_light_validate_*` walkers in
+modules/common/ai.py and `_normalize_for_template` in the job pack
+analyzer. Each shape validates *and* coerces in a single pass: clipping
+strings and lists, clamping numbers, filling defaults and dropping
+malformed items, so templates always receive the shape they expect.
+
+A shape is a TypedDict (so type checkers, and callers, see the output
+type). Each field's coercion is a spec in its Annotated[...] metadata:
+
+    Text       str: falsy -> default, str(), optional strip, clip
+    StrList    List[str]: non-list -> [], items str()-ed, clipped, capped
+    Clamped    int() or default, clamped to [lo, hi]
+    Choice     lower-cased enum string with a default
+    Sentence   stripped text ending in . ! or ?
+    OptInt     exact int or a default (None)
+    Or         `value or fallback`
+    DictOr     dict or {}
+    Const      fixed value
+    Default    value as given; default only when the key is absent
+    Call       arbitrary function (escape hatch)
+    Items      list of a nested shape
+    Nested     one nested shape
+
+A field whose annotation is a shape (or List[shape]) and has no spec is
+validated as Nested() / Items(). Any other field without a spec is kept
+as given (None when absent).
+
+compile_shape() turns a shape into one specialised function at import:
+its source is generated from the specs (every coercion inlined, no
+per-field dispatch, no intermediate objects) and exec'd once. That is
+what makes this layer cheaper than the walkers it replaced; see
+benchmarks/bench_validators.py for the equivalence check and timings.
+
+Closed shapes (the default) return only their declared keys; open shapes
+(extra=True) keep unknown keys. Inputs are never mutated, except by
+normalize_jobpack, which fills the parsed report in place as the
+template normalizer it replaced did.
+
+App-specific stamping (meta.generated_at_utc, inputs_digest, ...) stays
+in ai.py; this module only knows about shapes.
+"""
+
+from __future__ import annotations
+
+import linecache
+from dataclasses import dataclass
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+# ---------------------------------------------------------------------
+# Field specs
+#
+# emit(gen) returns (lines, expr): statements that rework the local `v`
+# (the raw field value) and the expression for the final value.
+# ---------------------------------------------------------------------
+
+
+class _Ctx:
+    def __repr__(self) -> str:
+        return "CTX"
+
+
+# As a fallback value (Or, OptInt) reads the validator's ctx argument,
+# e.g. the position a caller passes for each list item.
+CTX = _Ctx()
+
+
+class Spec:
+    # Zero-arg factory for the raw value when the key is absent (else None)
+    missing: Optional[Callable[[], Any]] = None
+
+    def emit(self, gen: "_Gen") -> Tuple[List[str], str]:
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class Text(Spec):
+    """str: falsy -> default, non-str -> str(), optional strip, clip.
+    fill_blank also applies the default when the value is blank after strip."""
+
+    limit: Optional[int] = None
+    default: str = ""
+    strip: bool = False
+    fill_blank: bool = False
+
+    def emit(self, gen):
+        default = gen.const(self.default)
+        expr = f"(v if type(v) is str else str(v or {default}))"
+        if self.default:
+            expr = f"((v or {default}) if type(v) is str else str(v or {default}))"
+        if self.strip:
+            expr += ".strip()"
+        if self.fill_blank:
+            expr = f"({expr} or {default})"
+        if self.limit is not None:
+            expr += f"[:{self.limit}]"
+        return [], expr
+
+
+@dataclass(frozen=True)
+class StrList(Spec):
+    """List[str]: non-list -> [], items str()-ed and clipped.
+    slice_first caps the raw list before skipping blanks (else after)."""
+
+    item_limit: Optional[int] = None
+    max_items: Optional[int] = None
+    strip: bool = False
+    skip_blank: bool = False
+    slice_first: bool = False
+
+    def emit(self, gen):
+        clip = f"[:{self.item_limit}]" if self.item_limit is not None else ""
+        conv = "str(x).strip()" if self.strip else "str(x)"
+        # str() has no side effects, so without skip_blank slicing first is the same list
+        early = self.slice_first or not self.skip_blank
+        src = f"v[:{self.max_items}]" if early and self.max_items is not None else "v"
+        # Loops rather than comprehensions: on CPython 3.11 a comprehension
+        # costs a function object and a frame, more than these short lists.
+        lines = ["if isinstance(v, list):", "    items = []", f"    for x in {src}:"]
+        if not self.skip_blank:
+            lines.append(f"        items.append({conv}{clip})")
+        else:
+            lines += [
+                f"        s = {conv}",
+                "        if s:" if self.strip else "        if s.strip():",
+                f"            items.append(s{clip})",
+            ]
+            if not early and self.max_items is not None:
+                lines += [f"            if len(items) == {self.max_items}:", "                break"]
+        return lines + ["    v = items", "else:", "    v = []"], "v"
+
+
+@dataclass(frozen=True)
+class Clamped(Spec):
+    """int: int() or `default` on failure, clamped to [lo, hi]."""
+
+    lo: int
+    hi: int
+    default: int
+
+    def emit(self, gen):
+        # None (a missing key) skips the raise/catch in int()
+        return [
+            "if v is None:",
+            f"    v = {self.default!r}",
+            "else:",
+            "    try:",
+            "        v = int(v)",
+            "    except Exception:",
+            f"        v = {self.default!r}",
+            "    else:",
+            f"        if v < {self.lo!r}:",
+            f"            v = {self.lo!r}",
+            f"        elif v > {self.hi!r}:",
+            f"            v = {self.hi!r}",
+        ], "v"
+
+
+@dataclass(frozen=True)
+class Choice(Spec):
+    """Lower-cased enum string with a default for anything unknown."""
+
+    allowed: FrozenSet[str]
+    default: str
+
+    def emit(self, gen):
+        return ['v = str(v or "").strip().lower()'], f"v if v in {gen.ref(self.allowed)} else {gen.const(self.default)}"
+
+
+@dataclass(frozen=True)
+class Sentence(Spec):
+    """Stripped text, with a full stop added unless it ends in . ! or ?"""
+
+    def emit(self, gen):
+        return [
+            'v = str(v or "").strip()',
+            'if v and not v.endswith((".", "!", "?")):',
+            '    v += "."',
+        ], "v"
+
+
+@dataclass(frozen=True, eq=False)
+class OptInt(Spec):
+    """Exact int, else `default` (bools pass through, as before)."""
+
+    default: Any = None
+
+    def emit(self, gen):
+        return [], f"v if isinstance(v, int) else {gen.const(self.default)}"
+
+
+# eq=False on specs holding arbitrary values: typing caches Annotated[...]
+# by metadata equality, and Or(False) == Or(0) would hand one field the
+# other's spec.
+@dataclass(frozen=True, eq=False)
+class Or(Spec):
+    """`value or fallback`: falsy -> `value` (or a fresh factory())."""
+
+    value: Any = None
+    factory: Optional[Callable[[], Any]] = None
+
+    def emit(self, gen):
+        if self.factory is None:
+            fallback = gen.const(self.value)
+        else:
+            fallback = {dict: "{}", list: "[]"}.get(self.factory) or f"{gen.ref(self.factory)}()"
+        return [], f"v or {fallback}"
+
+
+@dataclass(frozen=True)
+class DictOr(Spec):
+    """The value if it is a dict, else {}."""
+
+    def emit(self, gen):
+        return [], "v if isinstance(v, dict) else {}"
+
+
+@dataclass(frozen=True, eq=False)
+class Const(Spec):
+    value: Any
+
+    def emit(self, gen):
+        return [], gen.const(self.value)
+
+
+@dataclass(frozen=True, eq=False)
+class Default(Spec):
+    """Value as given (even None); `value` / factory() only when absent."""
+
+    value: Any = None
+    factory: Optional[Callable[[], Any]] = None
+
+
+@dataclass(frozen=True)
+class Call(Spec):
+    """fn(value); `missing` supplies the value when the key is absent."""
+
+    fn: Callable[[Any], Any]
+    missing: Optional[Callable[[], Any]] = None
+
+    def emit(self, gen):
+        return [], f"{gen.ref(self.fn)}(v)"
+
+
+@dataclass(frozen=True)
+class Items(Spec):
+    """
+    List of a nested shape. Non-dict items are dropped and a non-list
+    becomes [] unless keep_other, which keeps both verbatim (as well as
+    items that fail validation). `pre` reshapes the raw value first.
+    """
+
+    limit: Optional[int] = None
+    pre: Optional[Callable[[Any], Any]] = None
+    keep_other: bool = False
+    missing: Optional[Callable[[], Any]] = None
+
+    def emit(self, gen, validator: str = "") -> Tuple[List[str], str]:
+        lines = [f"v = {gen.ref(self.pre)}(v)"] if self.pre is not None else []
+        cap = f"[:{self.limit}]" if self.limit is not None else ""
+        if self.keep_other:
+            return lines + [
+                "if isinstance(v, list):",
+                "    items = []",
+                f"    for i in v{cap}:",
+                "        if isinstance(i, dict):",
+                "            try:",
+                f"                i = {validator}(i, ctx)",
+                "            except Exception:",
+                "                pass",
+                "        items.append(i)",
+                "    v = items",
+            ], "v"
+        return lines + [
+            "if isinstance(v, list):",
+            "    items = []",
+            f"    for i in v{cap}:",
+            "        if isinstance(i, dict):",
+            f"            items.append({validator}(i, ctx))",
+            "    v = items",
+            "else:",
+            "    v = []",
+        ], "v"
+
+
+@dataclass(frozen=True)
+class Nested(Spec):
+    """
+    One nested shape; a non-dict becomes {} unless keep_other, which keeps
+    it (and a dict that fails validation) verbatim.
+    """
+
+    pre: Optional[Callable[[Any], Any]] = None
+    keep_other: bool = False
+    missing: Optional[Callable[[], Any]] = None
+
+    def emit(self, gen, validator: str = "") -> Tuple[List[str], str]:
+        lines = [f"v = {gen.ref(self.pre)}(v)"] if self.pre is not None else []
+        if self.keep_other:
+            return lines + [
+                "if isinstance(v, dict):",
+                "    try:",
+                f"        v = {validator}(v, ctx)",
+                "    except Exception:",
+                "        pass",
+            ], "v"
+        return lines, f"{validator}(v, ctx)"
+
+
+class Alias:
+    """
+    Fallback keys, read in order while the value is falsy:
+    Annotated[str, Text(80), Alias("role_title")] reads
+    `d.get("title") or d.get("role_title")`.
+    """
+
+    def __init__(self, *keys: str) -> None:
+        self.keys = keys
+
+    def __repr__(self) -> str:
+        return f"Alias{self.keys!r}"
+
+
+# ---------------------------------------------------------------------
+# Compiler
+# ---------------------------------------------------------------------
+
+Hook = Callable[[Dict[str, Any], Any], Dict[str, Any]]
+
+# shape class -> compiled validator
+_COMPILED: Dict[type, Callable[..., Dict[str, Any]]] = {}
+
+
+class _Gen:
+    """Namespace for the generated source (constants, helpers, nested validators)."""
+
+    def __init__(self) -> None:
+        self.ns: Dict[str, Any] = {}
+
+    def ref(self, obj: Any) -> str:
+        for name, val in self.ns.items():
+            if val is obj:
+                return name
+        name = f"_r{len(self.ns)}"
+        self.ns[name] = obj
+        return name
+
+    def const(self, value: Any) -> str:
+        if value is CTX:
+            return "ctx"
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return repr(value)
+        return self.ref(value)
+
+
+def _nested_shape(tp: Any) -> Optional[type]:
+    """The shape in `Shape`, `List[Shape]` or `Union[Shape, Any]`, if any."""
+    if tp in _COMPILED:
+        return tp
+    for arg in get_args(tp):
+        found = _nested_shape(arg)
+        if found is not None:
+            return found
+    return None
+
+
+def _field_spec(tp: Any) -> Tuple[Optional[Spec], Tuple[str, ...], Any]:
+    """(spec, alias keys, base type) from a field annotation."""
+    if get_origin(tp) is Annotated:
+        base, *meta = get_args(tp)
+        specs = [m for m in meta if isinstance(m, Spec)]
+        aliases = [k for m in meta if isinstance(m, Alias) for k in m.keys]
+        return (specs[0] if specs else None), tuple(aliases), base
+    return None, (), tp
+
+
+def _emit_field(gen: _Gen, key: str, tp: Any) -> Tuple[List[str], str, Optional[str]]:
+    """
+    Lines reading d[key] into `v` and coercing it, plus the value
+    expression; or, for fields kept as given, the expression used only
+    when the key is absent.
+    """
+    spec, aliases, base = _field_spec(tp)
+    shape = _nested_shape(base)
+    if spec is None and shape is not None:
+        spec = Items() if get_origin(base) in (list, List) else Nested()
+
+    k = repr(key)
+    missing = getattr(spec, "missing", None)
+    if aliases and (missing is not None or isinstance(spec, Default)):
+        raise TypeError(f"{key}: Alias reads falsy values, it cannot be combined with missing-key defaults")
+
+    if isinstance(spec, Const):
+        return [], spec.emit(gen)[1], None
+    if isinstance(spec, Default):
+        fallback = f"{gen.ref(spec.factory)}()" if spec.factory is not None else gen.const(spec.value)
+        return [], "", fallback
+
+    read = " or ".join(f"d.get({name!r})" for name in (key, *aliases))
+    if spec is None:
+        return ([], read, None) if aliases else ([], "", "None")
+    if missing is not None:
+        read = f"d[{k}] if {k} in d else {gen.ref(missing)}()"
+    lines = [f"v = {read}"]
+
+    if isinstance(spec, (Items, Nested)):
+        if shape is None:
+            raise TypeError(f"{key}: {type(spec).__name__} needs a compiled shape in the annotation")
+        body, expr = spec.emit(gen, gen.ref(_COMPILED[shape]))
+    else:
+        body, expr = spec.emit(gen)
+    return lines + body, expr, None
+
+
+def compile_shape(
+    shape: type,
+    *,
+    extra: bool = False,
+    in_place: bool = False,
+    before: Optional[Hook] = None,
+    after: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Callable[..., Dict[str, Any]]:
+    """
+    Build the validator for a shape: fn(data, ctx=None) -> dict. Anything
+    but a dict validates as {} (every field defaulted).
+
+    Open shapes work on a copy of the input, or with in_place=True on the
+    input itself (for throwaway payloads the caller rebinds anyway).
+
+    before(d, ctx) gets that dict, may modify it and returns the dict to
+    read fields from. after(out) may adjust the
+    result in place. ctx is passed through to hooks and nested shapes.
+    Nested shapes must be compiled first.
+    """
+    hints = get_type_hints(shape, include_extras=True)
+    gen = _Gen()
+    name = f"validate_{shape.__name__}"
+
+    src = [f"def {name}(d, ctx=None):", "    if not isinstance(d, dict):", "        d = {}"]
+    if in_place and not extra:
+        raise TypeError(f"{shape.__name__}: in_place needs an open shape (extra=True)")
+    work = "d" if in_place else "d.copy()"
+    if before is not None:
+        src.append(f"    d = {gen.ref(before)}({work}, ctx)")
+    elif extra and not in_place:
+        src.append("    d = d.copy()")
+
+    values = []
+    for idx, (key, tp) in enumerate(hints.items()):
+        lines, expr, absent = _emit_field(gen, key, tp)
+        src.extend("    " + line for line in lines)
+        k = repr(key)
+        if absent is not None:
+            if extra:
+                src.append(f"    if {k} not in d:")
+                src.append(f"        d[{k}] = {absent}")
+            elif absent == "None":
+                src.append(f"    f{idx} = d.get({k})")
+            else:
+                src.append(f"    f{idx} = d[{k}] if {k} in d else {absent}")
+        elif extra:
+            src.append(f"    d[{k}] = {expr}")
+        else:
+            src.append(f"    f{idx} = {expr}")
+        if not extra:
+            values.append(f"{k}: f{idx}")
+
+    src.append("    out = d" if extra else f"    out = {{{', '.join(values)}}}")
+    if after is not None:
+        src.append(f"    {gen.ref(after)}(out)")
+    src.append("    return out")
+
+    source = "\n".join(src) + "\n"
+    filename = f"<schemas {shape.__name__}>"
+    exec(compile(source, filename, "exec"), gen.ns)
+    # tracebacks and inspect.getsource() show the generated code
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    fn = gen.ns[name]
+    _COMPILED[shape] = fn
+    return fn
+
+
+# ---------------------------------------------------------------------
+# Shared field types
+# ---------------------------------------------------------------------
+
+Meta = Annotated[Dict[str, Any], Or(factory=dict)]
+DictMeta = Annotated[Dict[str, Any], DictOr()]
+MaybeInt = Annotated[Optional[int], OptInt()]
+AnyList = Annotated[List[Any], Or(factory=list)]
+AnyDict = Annotated[Dict[str, Any], Or(factory=dict)]
+Why = Annotated[str, Sentence()]
+ProjectTitle = Annotated[str, Text(120, default="Portfolio Project")]
+Stack = Annotated[List[str], StrList(32, 10)]
+
+# Texts stripped and clipped (coach / month plan)
+Str32 = Annotated[str, Text(32, strip=True)]
+Str64 = Annotated[str, Text(64, strip=True)]
+Str80 = Annotated[str, Text(80, strip=True)]
+Str160 = Annotated[str, Text(160, strip=True)]
+Str255 = Annotated[str, Text(255, strip=True)]
+Str400 = Annotated[str, Text(400, strip=True)]
+Str1200 = Annotated[str, Text(1200, strip=True)]
+Str1600 = Annotated[str, Text(1600, strip=True)]
+Str1800 = Annotated[str, Text(1800, strip=True)]
+
+# Clipped only
+Clip120 = Annotated[str, Text(120)]
+Clip260 = Annotated[str, Text(260)]
+Clip400 = Annotated[str, Text(400)]
+Clip800 = Annotated[str, Text(800)]
+Clip1000 = Annotated[str, Text(1000)]
+Lines110 = Annotated[List[str], StrList(110, 6)]
+Lines120 = Annotated[List[str], StrList(120, 6)]
+Lines120x4 = Annotated[List[str], StrList(120, 4)]
+Skills40 = Annotated[List[str], StrList(40, 12)]
+
+# Non-blank stripped items, capped after filtering (Dream Planner)
+ItemList8 = Annotated[List[str], StrList(None, 8, strip=True, skip_blank=True)]
+ItemList10 = Annotated[List[str], StrList(None, 10, strip=True, skip_blank=True)]
+ItemList12 = Annotated[List[str], StrList(None, 12, strip=True, skip_blank=True)]
+
+
+def _dict_or_empty(v: Any) -> Dict[str, Any]:
+    return v if isinstance(v, dict) else {}
+
+
+# ---------------------------------------------------------------------
+# Portfolio ideas
+# ---------------------------------------------------------------------
+
+
+class PortfolioIdeaFree(TypedDict):
+    title: ProjectTitle
+    why: Why
+    what: Lines110
+    milestones: Annotated[List[str], StrList(110, 3)]
+    resume_bullets: Annotated[List[str], StrList(160, 3)]
+    stack: Annotated[List[str], StrList(32, 4)]
+
+
+class PortfolioIdeaPro(TypedDict):
+    title: ProjectTitle
+    why: Why
+    what: Lines120
+    milestones: Lines120
+    rubric: Lines120
+    risks: Lines120x4
+    stretch_goals: Lines120x4
+    resume_bullets: Annotated[List[str], StrList(160, 5)]
+    stack: Stack
+    mentor_note: Clip260
+
+
+compile_shape(PortfolioIdeaFree, extra=True)
+compile_shape(PortfolioIdeaPro, extra=True)
+
+
+class PortfolioFree(TypedDict):
+    mode: Annotated[str, Const("free")]
+    ideas: Annotated[List[PortfolioIdeaFree], Items(limit=1)]
+    meta: Meta
+
+
+class PortfolioPro(TypedDict):
+    mode: Annotated[str, Const("pro")]
+    ideas: Annotated[List[PortfolioIdeaPro], Items(limit=3)]
+    meta: Meta
+
+
+validate_portfolio_free = compile_shape(PortfolioFree)
+validate_portfolio_pro = compile_shape(PortfolioPro)
+
+
+# ---------------------------------------------------------------------
+# Skill Mapper
+# ---------------------------------------------------------------------
+
+
+class SkillRole(TypedDict):
+    title: Annotated[str, Text(80, default="Role"), Alias("role_title")]
+    level: Annotated[str, Text(60, default="Entry-level"), Alias("seniority")]
+    match_score: Annotated[int, Clamped(0, 100, 0), Alias("fit_score")]
+    why_fit: Annotated[str, Text(400), Alias("summary")]
+    skills: Skills40
+    gaps: Skills40
+    micro_projects: Annotated[List[str], StrList(120, 8)]
+    salary: Clip120
+    region: Clip120
+
+
+compile_shape(SkillRole, extra=True)
+
+
+class SkillMap(TypedDict):
+    mode: Annotated[str, Text(default="free")]
+    roles: Annotated[List[SkillRole], Items(limit=6)]
+    top_roles: Annotated[List[SkillRole], Const(None)]  # roles[:3], set after
+    hiring_now: AnyList
+    market_insights: AnyDict
+    learning_paths: AnyList
+    next_steps: Annotated[List[str], StrList(240, 12)]
+    impact_summary: Clip800
+    call_to_action: Annotated[str, Text(800), Alias("impact_summary")]
+    meta: Meta
+
+
+def _top_roles(out: Dict[str, Any]) -> None:
+    out["top_roles"] = out["roles"][:3]
+
+
+validate_skillmap = compile_shape(SkillMap, after=_top_roles)
+
+
+# ---------------------------------------------------------------------
+# Weekly / daily coach
+# ---------------------------------------------------------------------
+
+
+# ctx is the task's 1-based position in the raw list (see _coach_tasks)
+class CoachTask(TypedDict):
+    id: Annotated[Any, Or(CTX)]
+    title: Str255
+    detail: Annotated[str, Text(strip=True)]
+    category: Str64
+    sort_order: Annotated[int, OptInt(CTX)]
+    suggested_minutes: MaybeInt
+    guide: Str400
+    tags: Annotated[List[str], StrList(32, 8, skip_blank=True, slice_first=True)]
+    # Per-task roadmap hints
+    phase_label: Str80
+    week_index: MaybeInt
+    # Project / milestone awareness (P3)
+    difficulty: Str32
+    project_label: Str255
+    milestone_title: Str255
+    milestone_step: Str255
+    # UI state
+    is_done: Annotated[bool, Call(bool)]
+
+
+_validate_coach_task = compile_shape(CoachTask)
+
+
+def _coach_tasks(v: Any) -> List[Dict[str, Any]]:
+    """Drop untitled/non-dict tasks; position-based id/sort_order defaults."""
+    if not isinstance(v, list):
+        return []
+    out = []
+    for idx, t in enumerate(v, start=1):
+        if isinstance(t, dict):
+            task = _validate_coach_task(t, idx)
+            if task["title"]:
+                out.append(task)
+    return out
+
+
+class CoachSession(TypedDict):
+    session_date: Annotated[str, Text()]
+    day_index: MaybeInt
+    ai_note: Str1200
+    tasks: Annotated[List[CoachTask], Call(_coach_tasks)]
+    meta: DictMeta
+
+
+validate_daily_coach = compile_shape(CoachSession)
+
+
+# ---------------------------------------------------------------------
+# Dual-track 28-day month plan
+# ---------------------------------------------------------------------
+
+_COACH_CATEGORIES = frozenset(
+    {"skills", "projects", "career_capital", "planning", "mindset", "wellbeing"}
+)
+_DIFFICULTIES = frozenset({"easy", "medium", "hard"})
+
+Category = Annotated[str, Choice(_COACH_CATEGORIES, "skills")]
+
+
+class MonthDailyTask(TypedDict):
+    day: int
+    title: Str255
+    detail: Str1200
+    category: Category
+    # Schema allows 5–60; dailies are kept to 5–20.
+    estimated_minutes: Annotated[int, Clamped(5, 20, 10)]
+    difficulty: Annotated[str, Choice(_DIFFICULTIES, "easy")]
+    tags: Annotated[List[str], StrList(32, 6, strip=True, skip_blank=True, slice_first=True)]
+    phase_label: Str160
+    week_index: int
+    project_label: Str255
+    milestone_title: Str255
+    milestone_step: Str255
+
+
+class MonthWeeklyTask(TypedDict):
+    title: Str255
+    detail: Str1800
+    category: Category
+    estimated_minutes: Annotated[int, Clamped(90, 480, 240)]
+    milestone_badge: Str64
+    phase_label: Str160
+    week_index: int
+    project_label: Str255
+    milestone_title: Str255
+    milestone_step: Str255
+    deliverable: Annotated[
+        str, Text(255, strip=True, default="Shipped weekly artifact + README proof", fill_blank=True)
+    ]
+
+
+_validate_month_daily = compile_shape(MonthDailyTask)
+_validate_month_weekly = compile_shape(MonthWeeklyTask)
+
+
+# Built by _month_weeks (week_note is Str1200).
+class MonthWeek(TypedDict):
+    week_number: int
+    week_note: str
+    daily_tasks: List[MonthDailyTask]
+    weekly_task: MonthWeeklyTask
+
+
+def _int_or_none(v: Any) -> Optional[int]:
+    try:
+        return int(v)
+    except Exception:
+        return None
+
+
+def _month_weeks(v: Any) -> List[MonthWeek]:
+    """Exactly weeks 1..4, each with days 1..7 (missing ones defaulted)."""
+    week_map: Dict[int, Dict[str, Any]] = {}
+    if isinstance(v, list):
+        for w in v:
+            if isinstance(w, dict):
+                wn = _int_or_none(w.get("week_number"))
+                if wn is not None and 1 <= wn <= 4:
+                    week_map[wn] = w
+
+    weeks: List[MonthWeek] = []
+    for wn in range(1, 5):
+        w = week_map.get(wn) or {}
+
+        day_map: Dict[int, Dict[str, Any]] = {}
+        dailies = w.get("daily_tasks") or []
+        if isinstance(dailies, list):
+            for t in dailies:
+                if isinstance(t, dict):
+                    day = _int_or_none(t.get("day"))
+                    if day is not None and 1 <= day <= 7:
+                        day_map[day] = t
+
+        daily_tasks = []
+        for day in range(1, 8):
+            t = day_map.get(day) or {}
+            # copy only when a default has to go in before coercion
+            task = _validate_month_daily(t if t.get("title") else {**t, "title": f"Day {day} task"})
+            task["day"] = day
+            if not isinstance(task["week_index"], int):
+                task["week_index"] = wn
+            daily_tasks.append(task)
+
+        weekly = w.get("weekly_task") or {}
+        if not isinstance(weekly, dict):
+            weekly = {}
+        if not (weekly.get("title") and weekly.get("milestone_badge")):
+            weekly = {
+                **weekly,
+                "title": weekly.get("title") or f"Week {wn} milestone",
+                "milestone_badge": weekly.get("milestone_badge") or f"Week {wn} Master",
+            }
+        weekly_task = _validate_month_weekly(weekly)
+        if not isinstance(weekly_task["week_index"], int):
+            weekly_task["week_index"] = wn
+
+        weeks.append(
+            {
+                "week_number": wn,
+                "week_note": str(w.get("week_note") or f"Week {wn} focus.").strip()[:1200],
+                "daily_tasks": daily_tasks,
+                "weekly_task": weekly_task,
+            }
+        )
+    return weeks
+
+
+class MonthPlan(TypedDict):
+    month_cycle: Str64
+    ai_note: Str1600
+    weeks: Annotated[List[MonthWeek], Call(_month_weeks)]
+    meta: DictMeta
+
+
+validate_dualtrack_month = compile_shape(MonthPlan)
+
+
+# ---------------------------------------------------------------------
+# Dream Planner
+# ---------------------------------------------------------------------
+
+Pct = Annotated[int, Clamped(0, 100, 0)]
+
+
+class DreamProbabilities(TypedDict):
+    lpa_12: Pct
+    lpa_24: Pct
+    lpa_48: Pct
+
+
+class DreamPhase(TypedDict):
+    label: Annotated[str, Text(160, strip=True)]  # blank -> "Phase {n}"
+    items: ItemList10
+
+
+class DreamResources(TypedDict):
+    tutorials: ItemList10
+    mini_projects: ItemList8
+    resume_bullets: ItemList10
+    linkedin_actions: ItemList12
+
+
+_validate_dream_probabilities = compile_shape(DreamProbabilities)
+_validate_dream_phase = compile_shape(DreamPhase)
+compile_shape(DreamResources)
+
+
+def _startup_extras(v: Any) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for k, val in _dict_or_empty(v).items():
+        key = str(k)[:40]
+        if isinstance(val, str):
+            out[key] = val[:800]
+        elif isinstance(val, list):
+            out[key] = [str(x)[:200] for x in val[:15]]
+        else:
+            out[key] = val
+    return out
+
+
+def _input_echo(v: Any) -> Dict[str, Any]:
+    return {
+        str(k)[:60]: (val[:400] if isinstance(val, str) else val)
+        for k, val in _dict_or_empty(v).items()
+    }
+
+
+def _plan_core_items(v: Any) -> List[str]:
+    if not isinstance(v, list):
+        return []
+    return [s for x in v if (s := str(x).strip())][:6]
+
+
+def _dream_phases(raw: Any, plan_core: Dict[str, Any]) -> List[DreamPhase]:
+    phases: List[DreamPhase] = []
+    if isinstance(raw, list):
+        for idx, ph in enumerate(raw, start=1):
+            if isinstance(ph, dict):
+                phase = _validate_dream_phase(ph)
+                if not phase["label"]:
+                    phase["label"] = f"Phase {idx}"
+                phases.append(phase)
+    if phases:
+        return phases
+
+    # Fallback mapping from legacy plan_core
+    w30, w60, w90 = (_plan_core_items(plan_core.get(k)) for k in ("weeks_30", "weeks_60", "weeks_90"))
+    if w30 or w60 or w90:
+        return [
+            {"label": "Phase 1", "items": w30},
+            {"label": "Phase 2", "items": w60},
+            {"label": "Phase 3", "items": w90},
+        ]
+    return [{"label": "Phase 1", "items": []}]
+
+
+class DreamPlan(TypedDict):
+    mode: Annotated[str, Const("job")]  # set by validate_dream_plan
+    summary: Clip1000
+    probabilities: DreamProbabilities  # zeros in startup mode
+    missing_skills: Annotated[List[str], StrList(80, 15)]
+    phases: Annotated[List[DreamPhase], Const(None)]  # set by validate_dream_plan
+    plan_core: DictMeta
+    resources: Annotated[DreamResources, Nested(pre=_dict_or_empty)]
+    startup_extras: Annotated[Dict[str, Any], Call(_startup_extras)]
+    input: Annotated[Dict[str, Any], Call(_input_echo)]
+    meta: DictMeta
+
+
+_validate_dream_plan = compile_shape(DreamPlan)
+
+
+def validate_dream_plan(data: Any, mode: str) -> DreamPlan:
+    if not isinstance(data, dict):
+        data = {}
+    out = _validate_dream_plan(data)
+    if str(mode or "").lower() == "startup":
+        out["mode"] = "startup"
+        out["probabilities"] = _validate_dream_probabilities({})
+    out["phases"] = _dream_phases(data.get("phases"), out["plan_core"])
+    return out  # type: ignore[return-value]
+
+
+# ---------------------------------------------------------------------
+# Job Pack report (template normalization)
+# ---------------------------------------------------------------------
+
+
+class FitOverviewItem(TypedDict):
+    category: Annotated[Any, Or("Technical Skills"), Alias("name", "area")]
+    match: int
+    comment: Annotated[Any, Default("")]
+
+
+def _fit_match(item: Dict[str, Any], ctx: Any) -> Dict[str, Any]:
+    if "match" not in item and "score" in item:
+        try:
+            item["match"] = int(item["score"])
+        except Exception:
+            item["match"] = 0
+    # a non-numeric match keeps the item as given (see Items.keep_other)
+    item["match"] = int(item.get("match") or 0)
+    return item
+
+
+compile_shape(FitOverviewItem, extra=True, in_place=True, before=_fit_match)
+
+
+def _empty_coverage() -> Dict[str, List[str]]:
+    return {"required_keywords": [], "present_keywords": [], "missing_keywords": []}
+
+
+class ResumeAts(TypedDict):
+    resume_ats_score: Annotated[Any, Default(0)]
+    blockers: Annotated[Any, Default(factory=list)]
+    warnings: Annotated[Any, Default(factory=list)]
+    keyword_coverage: Annotated[Any, Default(factory=_empty_coverage)]
+    resume_rewrite_actions: Annotated[Any, Default(factory=list)]
+    exact_phrases_to_add: Annotated[Any, Default(factory=list)]
+
+
+class InterviewQA(TypedDict):
+    q: Annotated[Any, Or(""), Alias("question")]
+    a_outline: Annotated[Any, Default(factory=list)]
+    why_it_matters: Annotated[Any, Default("")]
+    followup: Annotated[Any, Default("")]
+
+
+class RoleIntel(TypedDict):
+    seniority: Annotated[Any, Default("Not specified")]
+    difficulty: Annotated[Any, Default("Not specified")]
+    salary_band: Annotated[
+        Any, Default("Varies by company — check latest bands for similar roles in your region.")
+    ]
+    geo_focus: Annotated[Any, Default("Not specified")]
+    market_notes: Annotated[Any, Default("")]
+    typical_companies: Annotated[Any, Default(factory=list)]
+
+
+compile_shape(ResumeAts, extra=True, in_place=True)
+_validate_interview_qa = compile_shape(InterviewQA, extra=True, in_place=True)
+compile_shape(RoleIntel, extra=True, in_place=True)
+
+
+def _learning_links(v: Any) -> Any:
+    """Drop empty links and bare 'Resource' labels; non-lists pass through."""
+    if not isinstance(v, list):
+        return v
+    cleaned = []
+    for item in v:
+        if isinstance(item, dict):
+            label = str(item.get("label") or "").strip()
+            url = str(item.get("url") or "").strip()
+            why = str(item.get("why") or "").strip()
+            if url.startswith("http") and label and label.lower() != "resource":
+                cleaned.append({"label": label, "url": url, "why": why or "Good primer."})
+    return cleaned
+
+
+def _interview_qa(v: Any) -> Any:
+    """Validate dict items, drop the rest; non-lists pass through."""
+    if not isinstance(v, list):
+        return v
+    return [_validate_interview_qa(qa) for qa in v if isinstance(qa, dict)]
+
+
+# Defaults apply only to absent keys; lists/dicts that are present but
+# malformed are kept as given (the templates guard them).
+class JobPackReport(TypedDict):
+    summary: Annotated[Any, Default("")]
+    role_detected: Annotated[Any, Default("")]
+    fit_overview: Annotated[List[FitOverviewItem], Items(keep_other=True, missing=list)]
+    ats_score: Annotated[Any, Default(0)]
+    skill_table: Annotated[Any, Default(factory=list)]
+    rewrite_suggestions: Annotated[Any, Default(factory=list)]
+    next_steps: Annotated[Any, Default(factory=list)]
+    impact_summary: Annotated[Any, Default("")]
+    subscores: Annotated[Any, Default(factory=dict)]
+    resume_ats: Annotated[ResumeAts, Nested(keep_other=True, missing=dict)]
+    learning_links: Annotated[Any, Call(_learning_links, missing=list)]
+    interview_qa: Annotated[List[InterviewQA], Call(_interview_qa, missing=list)]
+    practice_plan: Annotated[Any, Default(factory=list)]
+    application_checklist: Annotated[Any, Default(factory=list)]
+    role_intel: Annotated[RoleIntel, Nested(keep_other=True, missing=dict)]
+    report_tier: Annotated[Any, Default("CareerAI Deep Evaluation")]
+    resume_missing: Annotated[Any, Default(False)]
+
+
+def _jobpack_derived(d: Dict[str, Any], ctx: Any) -> Dict[str, Any]:
+    for key in ("resume_ats", "role_intel"):
+        if key in d:
+            d[key] = d[key] or {}
+    ra = d.get("resume_ats")
+    if isinstance(ra, dict) and "resume_ats_score" not in ra:
+        d["resume_ats"] = {**ra, "resume_ats_score": d.get("ats_score", 0)}
+    elif "resume_ats" not in d:
+        d["resume_ats"] = {"resume_ats_score": d.get("ats_score", 0)}
+
+    # helper chips + counts for UI
+    table = d.get("skill_table")
+    if "detected_keywords" not in d and isinstance(table, list):
+        keywords = []
+        matched = missing = 0
+        for row in table:
+            if isinstance(row, dict):
+                if "skill" in row:
+                    keywords.append(str(row["skill"]))
+                status = row.get("status")
+                if status == "Matched":
+                    matched += 1
+                elif status == "Missing":
+                    missing += 1
+        d["detected_keywords"] = keywords
+        d["matched_count"] = matched
+        d["missing_count"] = missing
+    return d
+
+
+_normalize_jobpack = compile_shape(JobPackReport, extra=True, in_place=True, before=_jobpack_derived)
+
+
+def normalize_jobpack(data: Dict[str, Any]) -> JobPackReport:
+    """Defaults + template normalization for a Job Pack report, one pass (in place)."""
+    return _normalize_jobpack(data)  # type: ignore[return-value]
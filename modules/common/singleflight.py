@@ -0,0 +1,204 @@
+# modules/common/singleflight.py
+"""
+Single-flight coalescing of identical in-flight generations.
+
+A double-submit, or a class pasting the same JD at the same moment, used
+to cost one identical LLM call per submission. Two layers now share the
+work, both keyed on a digest of the inputs:
+
+Gateway (`run`, used by modules.common.llm.chat_completion)
+    The first caller for a key takes a Redis lock and makes the call.
+    Concurrent callers with the same key poll for its result instead of
+    calling the provider. The result is kept only for the handoff:
+    SINGLEFLIGHT_RESULT_TTL (a few seconds) covers followers picking it
+    up on their next poll and job dependents starting right after the
+    leader. It is not a response cache; a request made after that window
+    always gets its own call, however recent the identical one was.
+    If the leader fails, its lock is released and the next caller makes
+    the call itself.
+
+Job enqueue (`leader_job` / `claim_job`, used by scheduling.enqueue)
+    A job whose inputs match a queued or running job becomes an RQ
+    dependent of it. It does not occupy a worker while waiting, and it
+    runs right after the leader, when the gateway result is still fresh.
+
+Only the generation is shared. Every caller keeps its own report row,
+run_id and credit deduction/refund; nothing about callers is stored
+under the shared key.
+
+SINGLEFLIGHT=0 disables both layers. Without Redis every call simply
+runs: after a Redis error the gateway skips single-flight for
+SINGLEFLIGHT_REDIS_COOLDOWN_S instead of paying the connect timeout on
+every call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger("singleflight")
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT", "1") == "1"
+# How long a finished result stays shareable (seconds); handoff only
+SINGLEFLIGHT_RESULT_TTL = int(os.getenv("SINGLEFLIGHT_RESULT_TTL", "10"))
+# Lock lifetime; bounds how long a crashed leader can block followers
+SINGLEFLIGHT_LOCK_TTL = int(os.getenv("SINGLEFLIGHT_LOCK_TTL", "180"))
+# Longest a follower waits before making the call itself
+SINGLEFLIGHT_WAIT_S = float(os.getenv("SINGLEFLIGHT_WAIT_S", "150"))
+SINGLEFLIGHT_POLL_S = float(os.getenv("SINGLEFLIGHT_POLL_S", "0.2"))
+# After a Redis error, calls bypass single-flight for this long (seconds)
+SINGLEFLIGHT_REDIS_COOLDOWN_S = float(os.getenv("SINGLEFLIGHT_REDIS_COOLDOWN_S", "30"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_LOCK = "sf:lock:{}"
+_RESULT = "sf:res:{}"
+_JOB = "sf:job:{}"
+
+_conn = None
+_conn_lock = threading.Lock()
+# time.monotonic() until which Redis is treated as down (this process)
+_down_until = 0.0
+
+
+def _redis():
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None:
+                from redis import Redis
+
+                _conn = Redis.from_url(REDIS_URL, socket_timeout=5, socket_connect_timeout=2)
+    return _conn
+
+
+def _mark_down() -> None:
+    global _down_until
+    _down_until = time.monotonic() + SINGLEFLIGHT_REDIS_COOLDOWN_S
+    logger.warning("singleflight: redis unavailable, bypassing for %ss", SINGLEFLIGHT_REDIS_COOLDOWN_S)
+
+
+def inputs_key(*parts: Any) -> str:
+    """Stable digest of arbitrary JSON-able inputs (full length, unlike _inputs_digest)."""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _observe(feature: str, role: str) -> None:
+    try:
+        from modules.common.metrics import observe_singleflight
+
+        observe_singleflight(feature, role)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------
+# Gateway level
+# ---------------------------------------------------------------------
+
+
+def run(
+    key: str,
+    compute: Callable[[], Any],
+    *,
+    feature: str = "",
+    dumps: Callable[[Any], Optional[str]] = json.dumps,
+    loads: Callable[[str], Any] = json.loads,
+    conn: Any = None,
+) -> Tuple[Any, bool]:
+    """
+    compute() once per key across processes.
+
+    Returns (result, shared). shared is True when the result came from
+    another caller's call. dumps() may return None for results that must
+    not be shared (errors, fallbacks).
+    """
+    if not SINGLEFLIGHT_ENABLED or time.monotonic() < _down_until:
+        return compute(), False
+    try:
+        conn = conn or _redis()
+    except Exception:
+        _mark_down()
+        return compute(), False
+
+    deadline = time.monotonic() + SINGLEFLIGHT_WAIT_S
+    token = uuid.uuid4().hex
+    while True:
+        try:
+            cached = conn.get(_RESULT.format(key))
+            if cached is not None:
+                _observe(feature, "follower")
+                return loads(cached.decode("utf-8") if isinstance(cached, bytes) else cached), True
+            leader = conn.set(_LOCK.format(key), token, nx=True, ex=SINGLEFLIGHT_LOCK_TTL)
+        except Exception:
+            logger.debug("singleflight: redis unavailable", exc_info=True)
+            _mark_down()
+            return compute(), False
+
+        if leader:
+            _observe(feature, "leader")
+            return _lead(conn, key, token, compute, dumps), False
+
+        if time.monotonic() >= deadline:
+            _observe(feature, "timeout")
+            logger.warning("singleflight.timeout feature=%s key=%s", feature, key[:12])
+            return compute(), False
+        time.sleep(SINGLEFLIGHT_POLL_S)
+
+
+def _lead(conn, key: str, token: str, compute: Callable[[], Any], dumps) -> Any:
+    try:
+        result = compute()
+        try:
+            payload = dumps(result)
+            if payload is not None:
+                conn.set(_RESULT.format(key), payload, ex=SINGLEFLIGHT_RESULT_TTL)
+        except Exception:
+            logger.debug("singleflight: result not shareable", exc_info=True)
+        return result
+    finally:
+        try:
+            # Release only our own lock (it may have expired and been re-taken).
+            if (conn.get(_LOCK.format(key)) or b"").decode() == token:
+                conn.delete(_LOCK.format(key))
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------
+# Job enqueue level
+# ---------------------------------------------------------------------
+
+_LIVE_STATUSES = {"queued", "started", "deferred", "scheduled"}
+
+
+def leader_job(conn: Any, key: str) -> Optional[str]:
+    """Id of a queued/running job already working on `key`, if any."""
+    if not SINGLEFLIGHT_ENABLED or not key:
+        return None
+    from rq.job import Job
+
+    job_id = conn.get(_JOB.format(key))
+    if not job_id:
+        return None
+    job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+    try:
+        status = Job.fetch(job_id, connection=conn).get_status()
+    except Exception:
+        return None
+    status = getattr(status, "value", status)
+    return job_id if status in _LIVE_STATUSES else None
+
+
+def claim_job(conn: Any, key: str, job_id: str, ttl: int) -> None:
+    """Record job_id as the in-flight job for `key`."""
+    if SINGLEFLIGHT_ENABLED and key:
+        conn.set(_JOB.format(key), job_id, ex=max(1, int(ttl)))
@@ -0,0 +1,501 @@
+# modules/common/structured.py
+"""
+Structured (schema-constrained) chat completions.
+
+The generators used to ask for response_format={"type": "json_object"},
+then strip ``` fences, regex out the first {...}, and in the job pack
+case issue a second full "repair" completion when the result looked
+wrong. With the provider's json_schema response_format the model is
+constrained to the schema while decoding, so most of that goes away.
+
+- `structured_schema()` converts an existing JSON-schema string once at
+  import: a strict provider copy (every property required, optional
+  ones made nullable, keywords strict mode rejects stripped) plus a
+  compiled validator for the original schema.
+- `structured_completion()` runs the call, parses locally (a tolerant
+  parse counts as a "repair", no extra round-trip), drops the nulls that
+  strict mode introduces for optional fields and validates.
+- Outcomes (ok / repaired / invalid / refusal / format fallback / caller
+  fallback) are counted per feature; `get_structured_stats()` reports
+  the rates.
+
+STRUCTURED_OUTPUTS=0 reverts to plain json_object mode.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from modules.common.llm import capturing, chat_completion
+
+try:
+    from openai import BadRequestError  # openai>=1.0
+except Exception:  # pragma: no cover
+    BadRequestError = None  # type: ignore
+
+logger = logging.getLogger("structured")
+
+STRUCTURED_OUTPUTS = os.getenv("STRUCTURED_OUTPUTS", "1") == "1"
+
+# Keywords strict json_schema mode does not accept; the local validator
+# still enforces them against the original schema.
+_STRICT_UNSUPPORTED = {
+    "minLength",
+    "maxLength",
+    "pattern",
+    "format",
+    "minimum",
+    "maximum",
+    "exclusiveMinimum",
+    "exclusiveMaximum",
+    "multipleOf",
+    "minItems",
+    "maxItems",
+    "uniqueItems",
+    "minProperties",
+    "maxProperties",
+    "patternProperties",
+    "default",
+    "examples",
+}
+
+
+# ---------------------------------------------------------------------
+# Compiled validator
+# ---------------------------------------------------------------------
+
+Check = Callable[[Any, str, List[str]], None]
+
+_TYPE_TESTS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+
+def _types_of(node: Dict[str, Any]) -> List[str]:
+    t = node.get("type")
+    if isinstance(t, str):
+        return [t]
+    if isinstance(t, list):
+        return [x for x in t if isinstance(x, str)]
+    return []
+
+
+def _compile(node: Any) -> Check:
+    """Compile one schema node into a closure; all lookups happen here, once."""
+    if not isinstance(node, dict) or not node:
+        return lambda value, path, errors: None
+
+    checks: List[Check] = []
+    types = _types_of(node)
+
+    if "anyOf" in node:
+        options = [_compile(opt) for opt in node["anyOf"]]
+
+        def check_any(value, path, errors, _options=options):
+            for opt in _options:
+                trial: List[str] = []
+                opt(value, path, trial)
+                if not trial:
+                    return
+            errors.append(f"{path}: does not match any allowed shape")
+
+        checks.append(check_any)
+
+    if "enum" in node:
+        allowed = list(node["enum"])
+
+        def check_enum(value, path, errors, _allowed=allowed):
+            if value not in _allowed:
+                errors.append(f"{path}: {value!r} not in {_allowed}")
+
+        checks.append(check_enum)
+
+    min_len, max_len = node.get("minLength"), node.get("maxLength")
+    pattern = re.compile(node["pattern"]) if node.get("pattern") else None
+    if min_len is not None or max_len is not None or pattern is not None:
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_len is not None and len(value) < min_len:
+                errors.append(f"{path}: shorter than {min_len}")
+            if max_len is not None and len(value) > max_len:
+                errors.append(f"{path}: longer than {max_len}")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{path}: does not match {pattern.pattern}")
+
+        checks.append(check_string)
+
+    minimum, maximum = node.get("minimum"), node.get("maximum")
+    if minimum is not None or maximum is not None:
+
+        def check_range(value, path, errors):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: below {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: above {maximum}")
+
+        checks.append(check_range)
+
+    if "array" in types or "items" in node:
+        item_check = _compile(node.get("items"))
+        min_items, max_items = node.get("minItems"), node.get("maxItems")
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: fewer than {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: more than {max_items} items")
+            for i, item in enumerate(value):
+                item_check(item, f"{path}[{i}]", errors)
+
+        checks.append(check_array)
+
+    if "object" in types or "properties" in node:
+        props = node.get("properties") or {}
+        prop_checks = {k: _compile(v) for k, v in props.items()}
+        required = list(node.get("required") or [])
+        # Optional properties whose schema does not allow null: strict mode
+        # makes them nullable, so a null there just means "absent".
+        droppable = {
+            k
+            for k, v in props.items()
+            if k not in required and "null" not in _types_of(v if isinstance(v, dict) else {})
+        }
+        closed = node.get("additionalProperties") is False
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for k in droppable:
+                if k in value and value[k] is None:
+                    del value[k]
+            for k in required:
+                if k not in value:
+                    errors.append(f"{path}.{k}: required")
+            for k, v in value.items():
+                sub = prop_checks.get(k)
+                if sub is not None:
+                    sub(v, f"{path}.{k}", errors)
+                elif closed:
+                    errors.append(f"{path}.{k}: unexpected property")
+
+        checks.append(check_object)
+
+    type_tests = [_TYPE_TESTS[t] for t in types if t in _TYPE_TESTS]
+
+    def check(value, path, errors):
+        if type_tests and not any(test(value) for test in type_tests):
+            errors.append(f"{path}: expected {'/'.join(types)}")
+            return
+        for c in checks:
+            c(value, path, errors)
+
+    return check
+
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """
+    Compile a JSON schema into `validate(data) -> [error, ...]`.
+
+    Supports the subset our schemas use (type, enum, anyOf, properties,
+    required, additionalProperties=false, items, min/max Length/Items,
+    minimum/maximum, pattern). validate() drops nulls for optional
+    non-nullable properties in place (see structured_schema()).
+    """
+    root = _compile(schema)
+
+    def validate(data: Any) -> List[str]:
+        errors: List[str] = []
+        root(data, "$", errors)
+        return errors
+
+    return validate
+
+
+# ---------------------------------------------------------------------
+# Schema conversion (once, at import)
+# ---------------------------------------------------------------------
+
+
+def _nullable(node: Dict[str, Any]) -> Dict[str, Any]:
+    t = node.get("type")
+    if isinstance(t, str):
+        if t != "null":
+            node["type"] = [t, "null"]
+    elif isinstance(t, list):
+        if "null" not in t:
+            node["type"] = list(t) + ["null"]
+    else:
+        return {"anyOf": [node, {"type": "null"}]}
+    if "enum" in node and None not in node["enum"]:
+        node["enum"] = list(node["enum"]) + [None]
+    return node
+
+
+def _strictify(node: Any) -> Optional[Any]:
+    """Strict-mode copy of a schema node, or None if it cannot be strict."""
+    if not isinstance(node, dict):
+        return node
+    out = {k: v for k, v in node.items() if k not in _STRICT_UNSUPPORTED}
+    types = _types_of(out)
+
+    if "anyOf" in out:
+        options = [_strictify(opt) for opt in out["anyOf"]]
+        if any(opt is None for opt in options):
+            return None
+        out["anyOf"] = options
+
+    if "object" in types:
+        props = out.get("properties")
+        if not props:
+            # Free-form objects cannot be expressed in strict mode.
+            return None
+        required = set(out.get("required") or [])
+        strict_props: Dict[str, Any] = {}
+        for key, child in props.items():
+            sub = _strictify(child)
+            if sub is None:
+                return None
+            if key not in required:
+                sub = _nullable(sub)
+            strict_props[key] = sub
+        out["properties"] = strict_props
+        out["required"] = list(props.keys())
+        out["additionalProperties"] = False
+
+    if "array" in types and "items" in out:
+        items = _strictify(out["items"])
+        if items is None:
+            return None
+        out["items"] = items
+
+    return out
+
+
+def _load_schema(schema: Any) -> Dict[str, Any]:
+    if isinstance(schema, dict):
+        return copy.deepcopy(schema)
+    raw = (schema or "").strip()
+    if raw.startswith("\\"):
+        raw = raw[1:].strip()
+    return json.loads(raw)
+
+
+@dataclass(frozen=True)
+class StructuredSchema:
+    """A JSON schema converted once for provider use and local validation."""
+
+    name: str
+    schema: Dict[str, Any]
+    response_format: Dict[str, Any]
+    strict: bool
+    validate: Callable[[Any], List[str]] = field(repr=False, compare=False)
+
+
+def structured_schema(name: str, schema: Any) -> StructuredSchema:
+    """
+    Build a StructuredSchema from a JSON-schema string or dict.
+
+    Uses a strict json_schema response_format when the schema allows it
+    (no free-form objects); otherwise a non-strict json_schema hint.
+    """
+    original = _load_schema(schema)
+    strict_copy = _strictify(copy.deepcopy(original))
+    strict = strict_copy is not None and "object" in _types_of(original)
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": re.sub(r"[^a-zA-Z0-9_-]", "_", name)[:64],
+            "schema": strict_copy if strict else original,
+            "strict": strict,
+        },
+    }
+    if not strict:
+        logger.info("structured schema %s is not strict-compatible; using a non-strict hint", name)
+    return StructuredSchema(
+        name=name,
+        schema=original,
+        response_format=response_format,
+        strict=strict,
+        validate=compile_validator(original),
+    )
+
+
+# ---------------------------------------------------------------------
+# Outcome accounting
+# ---------------------------------------------------------------------
+
+_OUTCOMES = (
+    "calls",
+    "ok",
+    "repaired",
+    "invalid",
+    "refusals",
+    "format_fallbacks",
+    "fallbacks",
+    "quality_issues",
+)
+
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def record_outcome(feature: str, outcome: str) -> None:
+    with _stats_lock:
+        st = _stats.setdefault(feature, {k: 0 for k in _OUTCOMES})
+        st[outcome] = st.get(outcome, 0) + 1
+
+
+def record_fallback(feature: str, reason: str = "") -> None:
+    """Called by generators that return a canned/mock result instead of model output."""
+    record_outcome(feature, "fallbacks")
+    logger.warning("structured.fallback feature=%s reason=%s", feature, (reason or "")[:200])
+
+
+def get_structured_stats() -> Dict[str, Dict[str, float]]:
+    """Per-feature outcome counts plus repair/invalid/fallback rates."""
+    with _stats_lock:
+        out: Dict[str, Dict[str, float]] = {k: dict(v) for k, v in _stats.items()}
+    for st in out.values():
+        calls = st.get("calls") or 0
+        for key in ("repaired", "invalid", "fallbacks", "format_fallbacks"):
+            st[f"{key}_rate"] = round(st.get(key, 0) / calls, 4) if calls else 0.0
+    return out
+
+
+# ---------------------------------------------------------------------
+# Completion
+# ---------------------------------------------------------------------
+
+
+@dataclass
+class StructuredResult:
+    data: Dict[str, Any]
+    errors: List[str]
+    repaired: bool
+    response: Any = field(default=None, repr=False)
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+class StructuredOutputError(ValueError):
+    """The model output could not be parsed (or the model refused)."""
+
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z0-9]*\s*\n?|\n?```\s*$")
+_OBJECT_RE = re.compile(r"(\{[\s\S]+\})")
+
+
+def parse_json_object(raw: str) -> Tuple[Dict[str, Any], bool]:
+    """json.loads, falling back to fence stripping / {...} extraction. Returns (data, repaired)."""
+    raw = (raw or "").strip()
+    if not raw:
+        raise StructuredOutputError("Empty response from model")
+    try:
+        data = json.loads(raw)
+        repaired = False
+    except json.JSONDecodeError:
+        cleaned = _FENCE_RE.sub("", raw).strip()
+        try:
+            data = json.loads(cleaned)
+        except json.JSONDecodeError:
+            m = _OBJECT_RE.search(cleaned)
+            if not m:
+                raise StructuredOutputError("Model output is not JSON")
+            data = json.loads(m.group(1))
+        repaired = True
+    if not isinstance(data, dict):
+        raise StructuredOutputError("Model output is not a JSON object")
+    return data, repaired
+
+
+# (model, schema name) pairs the provider rejected json_schema for.
+_rejected: set = set()
+_rejected_lock = threading.Lock()
+
+
+def structured_completion(
+    feature: str,
+    spec: StructuredSchema,
+    *,
+    messages: List[Dict[str, Any]],
+    model: str,
+    client: Any = None,
+    **kwargs: Any,
+) -> StructuredResult:
+    """
+    One schema-constrained completion, parsed and validated locally.
+
+    Raises StructuredOutputError (unparseable/refused) or the client's own
+    exception; callers keep their existing fallbacks for those.
+    """
+    if not capturing():
+        record_outcome(feature, "calls")
+    key = (model, spec.name)
+    use_schema = STRUCTURED_OUTPUTS and key not in _rejected
+    response_format = spec.response_format if use_schema else {"type": "json_object"}
+
+    try:
+        resp = chat_completion(
+            feature,
+            client=client,
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            **kwargs,
+        )
+    except Exception as e:
+        if not (use_schema and BadRequestError is not None and isinstance(e, BadRequestError)):
+            raise
+        # Model/deployment without json_schema support: remember and degrade once.
+        with _rejected_lock:
+            _rejected.add(key)
+        record_outcome(feature, "format_fallbacks")
+        logger.warning("json_schema rejected for %s/%s (%s); using json_object", model, spec.name, e)
+        resp = chat_completion(
+            feature,
+            client=client,
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            **kwargs,
+        )
+
+    message = resp.choices[0].message
+    if getattr(message, "refusal", None):
+        record_outcome(feature, "refusals")
+        raise StructuredOutputError(f"Model refused: {message.refusal}")
+
+    data, repaired = parse_json_object(message.content or "")
+    errors = spec.validate(data)
+
+    if errors:
+        record_outcome(feature, "invalid")
+        logger.info(
+            "structured.invalid feature=%s errors=%d first=%s", feature, len(errors), errors[0]
+        )
+    elif repaired:
+        record_outcome(feature, "repaired")
+    else:
+        record_outcome(feature, "ok")
+    return StructuredResult(data=data, errors=errors, repaired=repaired, response=resp)
@@ -0,0 +1,69 @@
+# modules/common/template_context.py
+"""
+Lazy values for the app-wide template context (app.inject_globals).
+
+inject_globals runs for every render_template call, including full pages,
+fragments and error pages. It used to do all of the following each time,
+whether or not the template used any of it:
+
+- build both nav URL maps (~25 url_for calls)
+- read the wallets
+- run the admin role checks
+- look up the user's University
+
+Two helpers now make that work lazy:
+
+    cached_urls(endpoints)  url_for per endpoint, computed once per app
+                            (and script root); "#" for endpoints that
+                            cannot be built
+    lazy(fn)                a proxy that calls fn the first time a
+                            template touches it and reuses the result for
+                            the rest of that render
+
+A template that never prints user_free or checks tenant never pays for
+them. The proxies behave like the values they wrap in Jinja (printing,
+truthiness, comparisons, attribute and item access, filters).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable
+
+from flask import current_app, has_request_context, request, url_for
+from werkzeug.local import LocalProxy
+
+_UNSET = object()
+
+
+def once(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """fn, memoized (the context processor builds fresh ones per render)."""
+    box = [_UNSET]
+
+    def get():
+        if box[0] is _UNSET:
+            box[0] = fn()
+        return box[0]
+
+    return get
+
+
+def lazy(fn: Callable[[], Any]) -> LocalProxy:
+    return LocalProxy(once(fn))
+
+
+def cached_urls(endpoints: Iterable[str]) -> Dict[str, str]:
+    """endpoint -> URL, built once per app and script root."""
+    cache = current_app.extensions.setdefault("template_urls", {})
+    root = request.script_root if has_request_context() else ""
+    urls = cache.setdefault(root, {})
+    out = {}
+    for endpoint in endpoints:
+        url = urls.get(endpoint)
+        if url is None:
+            try:
+                url = url_for(endpoint)
+            except Exception:
+                url = "#"
+            urls[endpoint] = url
+        out[endpoint] = url
+    return out
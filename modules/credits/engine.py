@@ -16,7 +16,7 @@ from typing import Literal, Optional, Dict, Any, Tuple, List
 
 from flask import current_app
 
-from models import User, CreditTransaction, UniversityWallet, db
+from models import User, CreditDailyRollup, CreditTransaction, UniversityWallet, db
 
 
 # Import config if it exists, otherwise use defaults
@@ -596,14 +596,18 @@ def get_university_usage_stats(university_id: int) -> Dict[str, Any]:
 
     wallet = UniversityWallet.query.filter_by(university_id=university_id).first()
 
+    # Daily rollups of the university wallet: O(days), not O(transactions)
     total_debits = db.session.query(
-        CreditTransaction.currency,
-        func.sum(CreditTransaction.amount).label("total")
+        CreditDailyRollup.currency,
+        func.sum(CreditDailyRollup.amount).label("total")
     ).filter(
-        CreditTransaction.university_id == university_id,
-        CreditTransaction.tx_type == "debit"
-    ).group_by(CreditTransaction.currency).all()
+        CreditDailyRollup.wallet_type == "university",
+        CreditDailyRollup.wallet_id == university_id,
+        CreditDailyRollup.tx_type == "debit"
+    ).group_by(CreditDailyRollup.currency).all()
 
+    # Distinct users need the ledger itself; the 30-day window only reads
+    # the newest monthly partitions on Postgres.
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     active_users = db.session.query(
         func.count(func.distinct(CreditTransaction.user_id))
@@ -622,7 +626,7 @@ def get_university_usage_stats(university_id: int) -> Dict[str, Any]:
             "gold_annual_cap": getattr(wallet, "gold_annual_cap", None) if wallet else None,
             "renewal_date": getattr(wallet, "renewal_date", None) if wallet else None,
         },
-        "total_debits": {row.currency: row.total for row in total_debits},
+        "total_debits": {row.currency: int(row.total or 0) for row in total_debits},
         "total_users": int(total_users or 0),
         "active_users_30d": int(active_users or 0),
     }
@@ -0,0 +1,132 @@
+# modules/credits/ledger.py
+"""
+Credit ledger storage: monthly partitions and daily rollups.
+
+On Postgres, credit_transaction is range-partitioned by created_at, one
+partition per calendar month (credit_transaction_YYYY_MM), plus
+credit_transaction_default for anything outside them (see migration
+20261018_credit_ledger_partitions). Queries filtered on created_at only
+touch the months they need, and old months can be archived or dropped
+without bloating the live indexes.
+
+`ensure_partitions()` creates the partitions for the next
+LEDGER_PARTITION_MONTHS_AHEAD months. It runs with the retention cron
+(modules/retention). If rows for a month already landed in the default
+partition, they are moved into the new partition when it is attached.
+On SQLite it does nothing.
+
+Totals come from CreditDailyRollup (models.py) instead of summing the
+ledger. `tenant_scope()` selects the rollup rows that belong to a
+university: its wallet plus the personal wallets of its users.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, text
+
+from models import CreditDailyRollup, User, db
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TABLE = "credit_transaction"
+LEDGER_DEFAULT_PARTITION = "credit_transaction_default"
+LEDGER_PARTITION_MONTHS_AHEAD = int(os.getenv("LEDGER_PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{LEDGER_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = :t AND pg_table_is_visible(c.oid)"
+            ),
+            {"t": LEDGER_TABLE},
+        ).first()
+    )
+
+
+def _existing_partitions(conn) -> set:
+    rows = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :t"
+        ),
+        {"t": LEDGER_TABLE},
+    )
+    return {r[0] for r in rows}
+
+
+def create_month_partition(conn, month: date) -> None:
+    """
+    Create and attach the partition for one month. Rows for that month
+    already sitting in the default partition are moved across first;
+    otherwise ATTACH would fail its check of the default partition.
+    """
+    name = partition_name(month)
+    lo, hi = month.isoformat(), add_months(month, 1).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {LEDGER_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {LEDGER_DEFAULT_PARTITION} "
+            f"WHERE created_at >= :lo AND created_at < :hi RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lo": lo, "hi": hi},
+    )
+    conn.execute(
+        text(f"ALTER TABLE {LEDGER_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')")
+    )
+
+
+def ensure_partitions(*, months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """Create missing partitions from this month to months_ahead. Returns the names created."""
+    bind = db.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return []
+    ahead = LEDGER_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    first = month_start(today or date.today())
+
+    created: List[str] = []
+    with bind.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        existing = _existing_partitions(conn)
+        for i in range(ahead + 1):
+            month = add_months(first, i)
+            if partition_name(month) in existing:
+                continue
+            create_month_partition(conn, month)
+            created.append(partition_name(month))
+    if created:
+        logger.info("ledger partitions created: %s", ", ".join(created))
+    return created
+
+
+def tenant_scope(university_id: int):
+    """Rollup rows of one university: its wallet + its users' personal wallets."""
+    users = select(User.id).where(User.university_id == university_id)
+    return or_(
+        and_(CreditDailyRollup.wallet_type == "university", CreditDailyRollup.wallet_id == university_id),
+        and_(CreditDailyRollup.wallet_type == "personal", CreditDailyRollup.wallet_id.in_(users)),
+    )
@@ -40,10 +40,9 @@ from flask import (
     abort,
 )
 from flask_login import current_user, login_required
-from sqlalchemy import desc
 
-from models import ResumeAsset, UserProfile, DreamPlanSnapshot, db
-from modules.common.profile_loader import load_profile_snapshot
+from models import User, UserProfile, DreamPlanSnapshot, db
+from modules.common.profile_loader import get_current_resume_text, load_profile_snapshot
 from modules.credits.engine import can_afford, deduct_pro
 
 # ✅ Import async tasks
@@ -85,12 +84,8 @@ def _current_is_verified_user() -> bool:
 
 def _latest_resume_text(user_id: int) -> str:
     """Get the latest extracted resume text for richer Dream Planner context."""
-    r = (
-        ResumeAsset.query.filter_by(user_id=user_id)
-        .order_by(desc(ResumeAsset.created_at))
-        .first()
-    )
-    return (r.text or "") if r else ""
+    user = current_user if getattr(current_user, "id", None) == user_id else User.query.get(user_id)
+    return get_current_resume_text(user)
 
 
 def _profile_json(user_id: int) -> dict:
@@ -382,8 +377,9 @@ def index():
                 user_id=current_user.id,
                 path_type=path_type,
                 plan_title=str(plan_title)[:255],
-                plan_json=json.dumps({"_status": "queued", "_run_id": run_id}),
+                plan_json="{}",
                 inputs_digest=None,  # Will be set by worker
+                status="queued",
             )
             db.session.add(snapshot)
             db.session.flush()
@@ -439,12 +435,9 @@ def index():
 
             # Mark snapshot as failed
             try:
-                snapshot.plan_json = json.dumps(
-                    {
-                        "_status": "failed",
-                        "_error": "Failed to enqueue background job",
-                    }
-                )
+                snapshot.status = "failed"
+                snapshot.progress = 100
+                snapshot.error = "Failed to enqueue background job"
                 db.session.commit()
             except Exception:
                 db.session.rollback()
@@ -501,19 +494,14 @@ def processing(snapshot_id):
         return redirect(url_for("dream.index"))
 
     # If already completed, redirect directly to result
-    try:
-        plan_data = json.loads(snapshot.plan_json or "{}")
-        status = plan_data.get("_status", "queued")
-        if status == "completed":
-            return redirect(url_for("dream.result", snapshot_id=snapshot_id))
-        if status == "failed":
-            flash(
-                "Dream Plan generation failed. Your credits were refunded.",
-                "danger",
-            )
-            return redirect(url_for("dream.index", path_type=snapshot.path_type))
-    except Exception:
-        pass
+    if snapshot.status == "completed":
+        return redirect(url_for("dream.result", snapshot_id=snapshot_id))
+    if snapshot.status == "failed":
+        flash(
+            "Dream Plan generation failed. Your credits were refunded.",
+            "danger",
+        )
+        return redirect(url_for("dream.index", path_type=snapshot.path_type))
 
     return render_template(
         "dream/processing.html",
@@ -532,27 +520,29 @@ def status_api(snapshot_id):
     API endpoint for polling job status.
     Returns JSON: { "status": "queued|processing|completed|failed", "error": "..." }
     """
-    snapshot = DreamPlanSnapshot.query.filter_by(
-        id=snapshot_id, user_id=current_user.id
-    ).first()
-
-    if not snapshot:
-        return jsonify({"status": "not_found", "error": "Snapshot not found"}), 404
-
+    # Status columns only: the (large) plan_json is never loaded by pollers
     try:
-        plan_data = json.loads(snapshot.plan_json or "{}")
-        status = plan_data.get("_status", "queued")
+        snapshot = (
+            DreamPlanSnapshot.query.with_entities(
+                DreamPlanSnapshot.status,
+                DreamPlanSnapshot.progress,
+                DreamPlanSnapshot.error,
+            )
+            .filter_by(id=snapshot_id, user_id=current_user.id)
+            .first()
+        )
+
+        if not snapshot:
+            return jsonify({"status": "not_found", "error": "Snapshot not found"}), 404
 
         response = {
-            "status": status,
+            "status": snapshot.status,
+            "progress": snapshot.progress,
             "snapshot_id": snapshot_id,
         }
 
-        if status == "failed":
-            # Use _error if present (matches how we set it elsewhere)
-            response["error"] = plan_data.get(
-                "_error", plan_data.get("error", "Unknown error")
-            )
+        if snapshot.status == "failed":
+            response["error"] = snapshot.error or "Unknown error"
 
         return jsonify(response)
 
@@ -585,8 +575,7 @@ def result(snapshot_id):
         return redirect(url_for("dream.index"))
 
     try:
-        plan_view = json.loads(snapshot.plan_json or "{}")
-        status = plan_view.get("_status", "unknown")
+        status = snapshot.status
 
         if status == "failed":
             flash(
@@ -599,6 +588,8 @@ def result(snapshot_id):
             # Still processing, redirect back to processing page
             return redirect(url_for("dream.processing", snapshot_id=snapshot_id))
 
+        plan_view = json.loads(snapshot.plan_json or "{}")
+
         # Normalize phases for UI (similar to how we normalized coach tasks)
         raw_phases = plan_view.get("phases")
         normalized_phases = _ensure_phases(raw_phases)
@@ -1006,6 +997,8 @@ def plans():
     Show user's Dream Plan history.
     """
     try:
+        # Status lives in its own column and plan_json is deferred, so the
+        # plans themselves are never fetched here
         snapshots = (
             DreamPlanSnapshot.query.filter_by(user_id=current_user.id)
             .order_by(DreamPlanSnapshot.created_at.desc())
@@ -1017,25 +1010,7 @@ def plans():
         snapshots = []
         flash("Could not load your Dream Plans. Please refresh.", "warning")
 
-    # Parse each snapshot to get status
-    plans_data = []
-    for snap in snapshots:
-        try:
-            plan_json = json.loads(snap.plan_json or "{}")
-            status = plan_json.get("_status", "unknown")
-            plans_data.append(
-                {
-                    "snapshot": snap,
-                    "status": status,
-                }
-            )
-        except Exception:
-            plans_data.append(
-                {
-                    "snapshot": snap,
-                    "status": "error",
-                }
-            )
+    plans_data = [{"snapshot": snap, "status": snap.status} for snap in snapshots]
 
     return render_template(
         "dream/plans.html",
@@ -23,6 +23,8 @@ from rq import Queue, get_current_job
 
 from models import db, DreamPlanSnapshot, User
 from modules.common.ai import generate_sync_plan
+from modules.common import scheduling, singleflight
+from modules.common.query_stats import track_queries
 from modules.credits.engine import refund
 
 
@@ -84,24 +86,24 @@ def _safe_json(obj: Any) -> str:
         return "{}"
 
 
-def _mark_snapshot(snapshot: DreamPlanSnapshot, status: str, payload: Optional[Dict[str, Any]] = None):
-    """Store status inside plan_json."""
-    base: Dict[str, Any] = {}
-    try:
-        if snapshot.plan_json:
-            base = json.loads(snapshot.plan_json) if snapshot.plan_json.strip() else {}
-            if not isinstance(base, dict):
-                base = {}
-    except Exception:
-        base = {}
-
-    base["_status"] = status
-    base["_updated_at"] = datetime.utcnow().isoformat()
-
-    if payload:
-        base["_meta"] = payload
-
-    snapshot.plan_json = _safe_json(base)
+def _mark_snapshot(
+    snapshot: DreamPlanSnapshot,
+    status: str,
+    *,
+    job_id: Optional[str] = None,
+    progress: Optional[int] = None,
+    error: Optional[str] = None,
+):
+    """Record a status transition on the snapshot's columns (plan_json is left alone)."""
+    snapshot.status = status
+    if progress is None:
+        progress = 100 if status in ("completed", "failed") else 0
+    snapshot.progress = progress
+    if job_id:
+        snapshot.job_id = job_id
+    if error is not None:
+        snapshot.error = error[:2000]
+    snapshot.updated_at = datetime.utcnow()
 
 
 # ----------------------------
@@ -120,12 +122,17 @@ def enqueue_dream_plan_generation(
     run_id: str,
 ) -> str:
     """Enqueue Dream Plan generation. Returns RQ job_id."""
-    q = get_queue(DEFAULT_QUEUE_NAME)
-
     from modules.dream.tasks import process_dream_plan_generation
 
-    job = q.enqueue(
+    job = scheduling.enqueue(
+        _redis(),
         process_dream_plan_generation,
+        user_id=user_id,
+        feature_key="dream_planner",
+        currency="gold",
+        coalesce_key=singleflight.inputs_key(
+            "dream", path_type, ai_inputs, profile_json, skills_json, resume_text
+        ),
         kwargs=dict(
             user_id=user_id,
             snapshot_id=snapshot_id,
@@ -164,7 +171,7 @@ def process_dream_plan_generation(
     app = _load_flask_app()
     job = get_current_job()
 
-    with app.app_context():
+    with app.app_context(), track_queries("job:process_dream_plan_generation"):
         snapshot = DreamPlanSnapshot.query.filter_by(id=snapshot_id, user_id=user_id).first()
         user = User.query.filter_by(id=user_id).first()
 
@@ -172,7 +179,7 @@ def process_dream_plan_generation(
             return {"ok": False, "error": "Snapshot or user not found"}
 
         try:
-            _mark_snapshot(snapshot, "processing", payload={"job_id": job.id if job else None})
+            _mark_snapshot(snapshot, "processing", job_id=job.id if job else None, progress=10)
             db.session.commit()
         except Exception:
             db.session.rollback()
@@ -423,16 +430,12 @@ def process_dream_plan_generation(
                 
                 # Misc
                 "max_projects": max_projects,
-                
-                # Status
-                "_status": "completed",
-                "_job_id": job.id if job else None,
-                "_completed_at": datetime.utcnow().isoformat(),
             }
             
             # Save
             snapshot.plan_json = _safe_json(plan_view)
             snapshot.plan_title = f"{job_title} ({target_lpa}+ LPA, {timeline_months}mo)"[:255]
+            _mark_snapshot(snapshot, "completed", job_id=job.id if job else None)
             
             # Inputs digest
             try:
@@ -450,12 +453,7 @@ def process_dream_plan_generation(
             tb = traceback.format_exc()
 
             try:
-                snapshot.plan_json = _safe_json({
-                    "_status": "failed",
-                    "_job_id": job.id if job else None,
-                    "_failed_at": datetime.utcnow().isoformat(),
-                    "error": err,
-                })
+                _mark_snapshot(snapshot, "failed", job_id=job.id if job else None, error=err)
                 db.session.commit()
             except Exception:
                 db.session.rollback()
@@ -498,15 +496,28 @@ def get_job_status(job_id: str) -> Dict[str, Any]:
     return out
 
 
-def get_queue_stats() -> Dict[str, int]:
-    """Queue stats for monitoring."""
-    q = get_queue(DEFAULT_QUEUE_NAME)
-    try:
-        return {
-            "queued": q.count,
-            "started": q.started_job_registry.count,
-            "finished": q.finished_job_registry.count,
-            "failed": q.failed_job_registry.count,
-        }
-    except Exception:
-        return {"queued": 0, "started": 0, "finished": 0, "failed": 0}
\ No newline at end of file
+def get_queue_stats() -> Dict[str, Any]:
+    """
+    Queue stats for monitoring, over every scheduling queue (jobs are
+    routed by class, not only to DEFAULT_QUEUE_NAME): totals at the top
+    level plus a per-queue breakdown under "queues".
+    """
+    keys = ("queued", "started", "finished", "failed")
+    totals: Dict[str, Any] = {k: 0 for k in keys}
+    per_queue: Dict[str, Dict[str, int]] = {}
+    for name in scheduling.QUEUE_NAMES:
+        q = get_queue(name)
+        try:
+            stats = {
+                "queued": q.count,
+                "started": q.started_job_registry.count,
+                "finished": q.finished_job_registry.count,
+                "failed": q.failed_job_registry.count,
+            }
+        except Exception:
+            stats = {k: 0 for k in keys}
+        per_queue[name] = stats
+        for k in keys:
+            totals[k] += stats[k]
+    totals["queues"] = per_queue
+    return totals
\ No newline at end of file
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
 import os
-import json
-import uuid
 
 from flask import (
     Blueprint,
+    abort,
     current_app,
     flash,
     redirect,
@@ -15,14 +14,15 @@ from flask import (
 )
 from flask_login import current_user, login_required
 
-from modules.common.ai import generate_internship_analysis  # AI-only
+from modules.ai_jobs import engine as ai_jobs
+from modules.ai_jobs.engine import AIJobError
 from modules.auth.guards import require_verified_email
 
 # Phase 4: central credits engine
-from modules.credits.engine import can_afford, deduct_free, deduct_pro, refund
+from modules.credits.engine import can_afford
 
 # DB + models
-from models import db, InternshipRecord
+from models import InternshipRecord
 
 internships_bp = Blueprint(
     "internships", __name__, template_folder="../../templates/internships"
@@ -58,14 +58,13 @@ def index():
 @require_verified_email
 def analyse():
     """
-    Run Internship Analyzer (Free or Pro).
+    Run Internship Analyzer (Free or Pro) as a background AI job.
 
-    CREDIT FLOW (FIXED):
-    1. Check credits BEFORE AI
-    2. Deduct credits BEFORE AI (reserve them)
-    3. Run AI
-    4. On failure → refund credits
-    5. On success → keep credits (already deducted)
+    CREDIT FLOW:
+    1. Check credits
+    2. Deduct credits and queue the job (modules/ai_jobs)
+    3. Worker runs AI + saves InternshipRecord
+    4. On failure → worker refunds credits
 
     Free mode:
       - Uses Silver 🪙 via central credits engine
@@ -82,242 +81,70 @@ def analyse():
         return redirect(url_for("internships.index"))
 
     is_pro_run = mode == "pro"
-    used_live_ai = False
-    data = None
+    currency = "gold" if is_pro_run else "silver"
 
-    # Generate unique run ID for credit tracking
-    run_id = f"intern_{current_user.id}_{uuid.uuid4().hex[:8]}"
-
-    try:
-        if is_pro_run:
-            # ------------------ Pro mode: Pro plan + Gold ⭐ credits ------------------
-            if not current_user.is_pro:
-                flash(
-                    "Internship Analyzer Pro requires an active Pro ⭐ plan.",
-                    "warning",
-                )
-                return redirect(url_for("billing.index"))
-
-            # ✅ STEP 1: Check Gold credits BEFORE AI
-            if not can_afford(current_user, FEATURE_KEY, currency="gold"):
-                flash(
-                    "Not enough Gold ⭐ credits. Add more in the Coins Shop or "
-                    "adjust your usage.",
-                    "warning",
-                )
-                return redirect(url_for("billing.index"))
-
-            # ✅ STEP 2: Deduct Gold ⭐ BEFORE AI call (reserve credits)
-            try:
-                if not deduct_pro(current_user, FEATURE_KEY, run_id=run_id):
-                    flash(
-                        "We couldn't deduct your Gold ⭐ credits right now. Please try again.",
-                        "danger",
-                    )
-                    return redirect(url_for("internships.index"))
-            except Exception as e:
-                current_app.logger.exception("Internship Pro: deduct_pro failed before AI: %s", e)
-                flash(
-                    "We couldn't process your credits right now. Please try again.",
-                    "danger",
-                )
-                return redirect(url_for("internships.index"))
-
-            # ✅ STEP 3: Run AI (credits already deducted)
-            try:
-                # Try to pull Profile Portal into the prompt (best-effort)
-                profile_dict = {}
-                try:
-                    profile = getattr(current_user, "profile", None)
-                    if profile and hasattr(profile, "to_dict"):
-                        profile_dict = profile.to_dict()
-                except Exception as e:
-                    current_app.logger.warning(
-                        "Internship Analyzer: profile.to_dict() failed: %s", e
-                    )
-                    profile_dict = {}
-
-                data, used_live_ai = generate_internship_analysis(
-                    pro_mode=True,
-                    internship_text=text,
-                    profile_json=profile_dict,
-                    return_source=True,
-                )
-            except Exception as ai_error:
-                # ✅ STEP 4: AI failed → refund credits
-                current_app.logger.exception("Internship Pro: AI call failed: %s", ai_error)
-                try:
-                    refund(
-                        current_user,
-                        feature=FEATURE_KEY,
-                        currency="gold",
-                        amount=None,  # Will use feature cost from config
-                        run_id=run_id,
-                        commit=True,
-                    )
-                    flash(
-                        "Analysis failed. Your Gold ⭐ credits were refunded. Please try again.",
-                        "danger",
-                    )
-                except Exception as refund_error:
-                    current_app.logger.exception("Internship Pro: refund failed: %s", refund_error)
-                    flash(
-                        "Analysis failed. Please contact support if credits were deducted.",
-                        "danger",
-                    )
-                return redirect(url_for("internships.index"))
-
-        else:
-            # ------------------ Free mode: Silver 🪙 credits ------------------
-            # ✅ STEP 1: Check Silver credits BEFORE AI
-            if not can_afford(current_user, FEATURE_KEY, currency="silver"):
-                flash(
-                    "Not enough Silver 🪙 credits. Upgrade to Pro ⭐ for deeper, "
-                    "profile-aware internship insights and Gold ⭐ runs.",
-                    "warning",
-                )
-                return redirect(url_for("billing.index"))
-
-            # ✅ STEP 2: Deduct Silver 🪙 BEFORE AI call (reserve credits)
-            try:
-                if not deduct_free(current_user, FEATURE_KEY, run_id=run_id):
-                    flash(
-                        "We couldn't deduct your Silver 🪙 credits right now. Please try again.",
-                        "danger",
-                    )
-                    return redirect(url_for("internships.index"))
-            except Exception as e:
-                current_app.logger.exception("Internship Free: deduct_free failed before AI: %s", e)
-                flash(
-                    "We couldn't process your credits right now. Please try again.",
-                    "danger",
-                )
-                return redirect(url_for("internships.index"))
-
-            # ✅ STEP 3: Run AI (credits already deducted)
-            try:
-                data, used_live_ai = generate_internship_analysis(
-                    pro_mode=False,
-                    internship_text=text,
-                    return_source=True,
-                )
-            except Exception as ai_error:
-                # ✅ STEP 4: AI failed → refund credits
-                current_app.logger.exception("Internship Free: AI call failed: %s", ai_error)
-                try:
-                    refund(
-                        current_user,
-                        feature=FEATURE_KEY,
-                        currency="silver",
-                        amount=None,  # Will use feature cost from config
-                        run_id=run_id,
-                        commit=True,
-                    )
-                    flash(
-                        "Analysis failed. Your Silver 🪙 credits were refunded. Please try again.",
-                        "danger",
-                    )
-                except Exception as refund_error:
-                    current_app.logger.exception("Internship Free: refund failed: %s", refund_error)
-                    flash(
-                        "Analysis failed. Please contact support if credits were deducted.",
-                        "danger",
-                    )
-                return redirect(url_for("internships.index"))
-
-        # ✅ STEP 5: Success! Credits already deducted, just show results
-        # AI data should follow INTERNSHIP_ANALYZER_JSON_SCHEMA, but we guard for safety
-        if not isinstance(data, dict):
-            data = {}
-
-        # Ensure required keys exist so template never crashes
-        data.setdefault("mode", "pro" if is_pro_run else "free")
-        data.setdefault("summary", "")
-        data.setdefault("skill_growth", [])
-        data.setdefault("skill_enhancement", [])
-        data.setdefault("career_impact", "")
-        data.setdefault("new_paths", [])
-        data.setdefault("resume_boost", [])
-        data.setdefault("meta", {})
-
-        # Persist this run into InternshipRecord for history
-        try:
-            # Naive role guess: first 120 chars of summary or empty
-            role_guess = (data.get("meta", {}) or {}).get("role_title") or ""
-            if not role_guess and data.get("summary"):
-                role_guess = (data["summary"][:120]).strip()
+    if is_pro_run:
+        if not current_user.is_pro:
+            flash(
+                "Internship Analyzer Pro requires an active Pro ⭐ plan.",
+                "warning",
+            )
+            return redirect(url_for("billing.index"))
 
-            record = InternshipRecord(
-                user_id=current_user.id,
-                role=role_guess or None,
-                location=None,
-                results_json=json.dumps(data),
+        if not can_afford(current_user, FEATURE_KEY, currency="gold"):
+            flash(
+                "Not enough Gold ⭐ credits. Add more in the Coins Shop or "
+                "adjust your usage.",
+                "warning",
+            )
+            return redirect(url_for("billing.index"))
+    else:
+        if not can_afford(current_user, FEATURE_KEY, currency="silver"):
+            flash(
+                "Not enough Silver 🪙 credits. Upgrade to Pro ⭐ for deeper, "
+                "profile-aware internship insights and Gold ⭐ runs.",
+                "warning",
             )
-            db.session.add(record)
-            db.session.commit()
-        except Exception as e:
-            current_app.logger.exception("Failed to save InternshipRecord: %s", e)
-            try:
-                db.session.rollback()
-            except Exception:
-                pass
+            return redirect(url_for("billing.index"))
 
-        return render_template(
-            "internships/index.html",
-            result=data,
-            mode="pro" if is_pro_run else "free",
-            is_pro=current_user.is_pro,
-            updated_tag=CAREER_AI_VERSION,
-            used_live_ai=used_live_ai,
+    try:
+        job = ai_jobs.start(
+            current_user,
+            "internship",
+            feature_key=FEATURE_KEY,
+            currency=currency,
+            args={"text": text, "pro_mode": is_pro_run},
         )
-
-    except Exception as e:
-        # ⚠️ Unexpected error → refund if we deducted
-        current_app.logger.exception("Internship analysis unexpected error: %s", e)
-        
-        # Try to refund (best effort)
-        try:
-            refund(
-                current_user,
-                feature=FEATURE_KEY,
-                currency="gold" if is_pro_run else "silver",
-                amount=None,
-                run_id=run_id,
-                commit=True,
-            )
-        except Exception:
-            pass
-        
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-        
-        # Schema-friendly error payload for template stability
-        err_payload = {
-            "mode": "pro" if is_pro_run else "free",
-            "summary": "We couldn't analyze that input. Try a simpler internship description.",
-            "skill_growth": [],
-            "skill_enhancement": [],
-            "career_impact": "",
-            "new_paths": [],
-            "resume_boost": [],
-            "meta": {"generated_at_utc": "", "inputs_digest": "sha256:error"},
-        }
-        
+    except AIJobError as e:
+        current_app.logger.warning("Internship analysis could not start: %s", e)
         flash(
-            "Analysis failed. If credits were deducted, they have been refunded. Please try again.",
-            "danger"
-        )
-        
-        return render_template(
-            "internships/index.html",
-            result=err_payload,
-            mode="pro" if is_pro_run else "free",
-            is_pro=current_user.is_pro,
-            updated_tag=CAREER_AI_VERSION,
-            used_live_ai=False,
+            "We couldn't start the analysis right now. No credits were used. Please try again.",
+            "danger",
         )
+        return redirect(url_for("internships.index"))
+
+    return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+
+@internships_bp.route("/job/<int:job_id>", methods=["GET"], endpoint="job_result")
+@login_required
+def job_result(job_id: int):
+    """Result of a finished background analysis (target of the waiting page)."""
+    job = ai_jobs.get_for_user(job_id, current_user.id)
+    if job is None or job.kind != "internship":
+        abort(404)
+    if job.status != "completed":
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+    result = job.result
+    return render_template(
+        "internships/index.html",
+        result=result.get("data") or {},
+        mode=result.get("mode") or "free",
+        is_pro=current_user.is_pro,
+        updated_tag=CAREER_AI_VERSION,
+        used_live_ai=bool(result.get("used_live_ai")),
+    )
 
 
 @internships_bp.route("/history", methods=["GET"], endpoint="history")
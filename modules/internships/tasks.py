@@ -0,0 +1,82 @@
+# modules/internships/tasks.py
+"""
+Background handler for Internship Analyzer runs (AIJob kind "internship").
+
+Runs in the RQ worker through modules.ai_jobs.engine.execute(); credits
+were reserved by the route and are refunded by the engine if this raises.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict
+
+from models import AIJob, InternshipRecord, User, db
+from modules.common.ai import generate_internship_analysis
+
+logger = logging.getLogger("internships")
+
+
+def _ensure_shape(data: Any, is_pro_run: bool) -> Dict[str, Any]:
+    """Required keys so the template never crashes (schema is guarded, not trusted)."""
+    if not isinstance(data, dict):
+        data = {}
+    data.setdefault("mode", "pro" if is_pro_run else "free")
+    data.setdefault("summary", "")
+    data.setdefault("skill_growth", [])
+    data.setdefault("skill_enhancement", [])
+    data.setdefault("career_impact", "")
+    data.setdefault("new_paths", [])
+    data.setdefault("resume_boost", [])
+    data.setdefault("meta", {})
+    return data
+
+
+def run_internship_analysis(job: AIJob, user: User) -> Dict[str, Any]:
+    args = job.args
+    is_pro_run = bool(args.get("pro_mode"))
+    text = args.get("text") or ""
+
+    if is_pro_run:
+        # Try to pull Profile Portal into the prompt (best-effort)
+        profile_dict = {}
+        try:
+            profile = getattr(user, "profile", None)
+            if profile and hasattr(profile, "to_dict"):
+                profile_dict = profile.to_dict()
+        except Exception as e:
+            logger.warning("Internship Analyzer: profile.to_dict() failed: %s", e)
+        data, used_live_ai = generate_internship_analysis(
+            pro_mode=True,
+            internship_text=text,
+            profile_json=profile_dict,
+            return_source=True,
+        )
+    else:
+        data, used_live_ai = generate_internship_analysis(
+            pro_mode=False,
+            internship_text=text,
+            return_source=True,
+        )
+
+    data = _ensure_shape(data, is_pro_run)
+
+    # Persist this run into InternshipRecord for history
+    # Naive role guess: first 120 chars of summary or empty
+    role_guess = (data.get("meta", {}) or {}).get("role_title") or ""
+    if not role_guess and data.get("summary"):
+        role_guess = (data["summary"][:120]).strip()
+
+    record = InternshipRecord(
+        user_id=user.id,
+        role=role_guess or None,
+        location=None,
+        results_json=json.dumps(data),
+        mode=str(data["mode"])[:16],
+    )
+    db.session.add(record)
+    db.session.flush()
+    job.record_id = record.id
+
+    return {"data": data, "used_live_ai": bool(used_live_ai), "mode": data["mode"]}
@@ -0,0 +1,286 @@
+# modules/jobpack/pdf.py
+"""
+Job Pack "Deep Evaluation" PDF: rendering and the cached artifact.
+
+A report's PDF only changes when its analysis or this layout changes, so
+it is rendered once and kept in JobPackPdf, keyed on
+
+    report id + sha256(analysis) + PDF_TEMPLATE_VERSION
+
+Pro runs queue the render in the background as soon as the report
+completes (modules/jobpack/tasks.py). The download route serves the
+stored bytes with an ETag of digest + version, and answers a matching
+If-None-Match with 304 without reading the PDF at all. A report whose
+artifact is missing or stale (older layout, re-run analysis) is rendered
+on first download and cached then.
+
+Bump PDF_TEMPLATE_VERSION whenever render_report_pdf's output changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+from sqlalchemy.exc import IntegrityError
+
+from models import JobPackPdf, JobPackReport, db
+
+logger = logging.getLogger(__name__)
+
+PDF_TEMPLATE_VERSION = "2"
+
+_MARGIN = 40
+_FONT = "Helvetica"
+_FONT_BOLD = "Helvetica-Bold"
+
+
+def analysis_digest(analysis: Optional[str]) -> str:
+    return hashlib.sha256((analysis or "").encode("utf-8")).hexdigest()
+
+
+def etag_for(digest: str) -> str:
+    return f"{digest[:32]}-v{PDF_TEMPLATE_VERSION}"
+
+
+# ---------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------
+def render_report_pdf(safe: dict) -> bytes:
+    """PDF bytes for a normalised Job Pack result (routes._safe_result)."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    text_width = width - 2 * _MARGIN
+    y = height - 60
+
+    def new_page():
+        nonlocal y
+        c.showPage()
+        y = height - 60
+
+    def section(title: str, lines: List[str], small: bool = False):
+        nonlocal y
+        size = 9 if small else 10
+        step = 10 if small else 12
+        if y < 80:
+            new_page()
+        c.setFont(_FONT_BOLD, 13)
+        c.setFillColor(colors.black)
+        c.drawString(_MARGIN, y, title)
+        y -= 18
+        c.setFont(_FONT, size)
+        for line in lines:
+            for para in (line or "").replace("\r", "").split("\n"):
+                # wrapped on measured string width, not character count
+                for chunk in simpleSplit(para.strip(), _FONT, size, text_width) or [""]:
+                    if chunk:
+                        c.drawString(_MARGIN, y, chunk)
+                    y -= step
+                    if y < 60:
+                        new_page()
+                        c.setFont(_FONT, size)
+
+    c.setFillColorRGB(0.1, 0.12, 0.18)
+    c.rect(0, height - 80, width, 80, fill=True, stroke=False)
+    c.setFont(_FONT_BOLD, 16)
+    c.setFillColor(colors.white)
+    c.drawString(_MARGIN, height - 50, "CareerAI Deep Evaluation Report ⭐")
+
+    section(
+        "Role Summary",
+        [
+            safe["summary"] or "No summary available.",
+            f"Detected Role: {safe['role_detected'] or '—'}",
+        ],
+    )
+
+    fit_lines: List[str] = []
+    for f in safe["fit_overview"]:
+        if isinstance(f, dict):
+            fit_lines.append(f"{f.get('category', '')}: {f.get('match', 0)}% — {f.get('comment', '')}")
+    if fit_lines:
+        section("Fit Overview", fit_lines)
+
+    subs = safe.get("subscores") or {}
+    section(
+        "ATS Score & Subscores (model estimates)",
+        [
+            f"Overall ATS Alignment (model estimate): {safe['ats_score']}%",
+            f"Keyword relevance: {subs.get('keyword_relevance', 0)}%",
+            f"Quantifiable impact: {subs.get('quantifiable_impact', 0)}%",
+            f"Formatting & clarity: {subs.get('formatting_clarity', 0)}%",
+            f"Professional tone: {subs.get('professional_tone', 0)}%",
+        ],
+    )
+
+    skill_lines: List[str] = []
+    for row in safe["skill_table"]:
+        if isinstance(row, dict) and row.get("skill"):
+            skill_lines.append(f"{row.get('skill', '')} — {row.get('status', '')}")
+    if skill_lines:
+        section("JD vs Resume Skill Match", skill_lines, small=True)
+
+    ra = safe.get("resume_ats") or {}
+    kc = ra.get("keyword_coverage") or {}
+    missing_kw = kc.get("missing_keywords") or []
+    present_kw = kc.get("present_keywords") or []
+    required_kw = kc.get("required_keywords") or []
+    phrases = ra.get("exact_phrases_to_add") or []
+
+    section(
+        "Resume ATS — Score (model estimate)",
+        [f"Resume ATS Score: {ra.get('resume_ats_score', 0)}%"],
+    )
+    section(
+        "Resume ATS — Must Fix (Blockers)",
+        [f"• {b}" for b in (ra.get("blockers") or [])] or ["None"],
+        small=True,
+    )
+    section(
+        "Resume ATS — Should Fix (Warnings)",
+        [f"• {w}" for w in (ra.get("warnings") or [])] or ["None"],
+        small=True,
+    )
+
+    if required_kw or present_kw or missing_kw:
+        kw_lines = []
+        if required_kw:
+            kw_lines.append("Required keywords: " + ", ".join(required_kw[:40]))
+        if present_kw:
+            kw_lines.append("Present in resume: " + ", ".join(present_kw[:40]))
+        if missing_kw:
+            kw_lines.append("Missing from resume: " + ", ".join(missing_kw[:40]))
+        section("Resume ATS — Keyword Coverage", kw_lines, small=True)
+
+    if phrases:
+        section("Resume ATS — Exact Phrases to Add", [f"• {p}" for p in phrases[:40]], small=True)
+
+    rra = ra.get("resume_rewrite_actions") or []
+    if rra:
+        section("Resume ATS — Rewrite Actions", [f"• {a}" for a in rra[:40]], small=True)
+
+    if safe["learning_links"]:
+        ll_lines: List[str] = []
+        for link in safe["learning_links"]:
+            if isinstance(link, dict):
+                ll_lines.append(f"{link.get('label', '')} — {link.get('url', '')}")
+                if link.get("why"):
+                    ll_lines.append(f"  • {link['why']}")
+        section("Learning Resources", ll_lines, small=True)
+
+    if safe["interview_qa"]:
+        qa_lines: List[str] = []
+        for qa in safe["interview_qa"]:
+            if not isinstance(qa, dict):
+                continue
+            if qa.get("q"):
+                qa_lines.append(f"Q: {qa['q']}")
+            for pt in qa.get("a_outline") or []:
+                qa_lines.append(f"  • {pt}")
+            if qa.get("why_it_matters"):
+                qa_lines.append(f"Why it matters: {qa['why_it_matters']}")
+            if qa.get("followup"):
+                qa_lines.append(f"Follow-up: {qa['followup']}")
+            qa_lines.append("")
+        section("Interview Q&A Practice", qa_lines, small=True)
+
+    if safe["practice_plan"]:
+        pp_lines: List[str] = []
+        for blk in safe["practice_plan"]:
+            if not isinstance(blk, dict):
+                continue
+            if blk.get("period"):
+                pp_lines.append(f"Period: {blk['period']}")
+            if blk.get("goals"):
+                pp_lines.append(f"Goals: {blk['goals']}")
+            for t in blk.get("tasks") or []:
+                pp_lines.append(f"  • {t}")
+            if blk.get("output"):
+                pp_lines.append(f"Output: {blk['output']}")
+            pp_lines.append("")
+        section("Practice Plan", pp_lines, small=True)
+
+    if safe["application_checklist"]:
+        section("Application Checklist", [f"• {item}" for item in safe["application_checklist"]], small=True)
+
+    if safe["rewrite_suggestions"]:
+        section("Resume Rewrite Suggestions", [f"• {s}" for s in safe["rewrite_suggestions"]], small=True)
+
+    if safe["next_steps"]:
+        section("Next Steps", [f"• {s}" for s in safe["next_steps"]])
+
+    section("Impact Summary", [safe["impact_summary"] or "Evaluation complete."])
+
+    c.save()
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------
+# Cached artifact
+# ---------------------------------------------------------------------
+def cached_pdf(report_id: int, digest: str) -> Optional[JobPackPdf]:
+    """The stored artifact if it matches this analysis and layout."""
+    return JobPackPdf.query.filter_by(
+        report_id=report_id,
+        analysis_digest=digest,
+        template_version=PDF_TEMPLATE_VERSION,
+    ).first()
+
+
+def build_pdf(report: JobPackReport, *, digest: Optional[str] = None) -> JobPackPdf:
+    """Render the report's PDF and store it (replacing a stale one). Commits."""
+    from modules.jobpack.routes import _safe_result
+
+    digest = digest or analysis_digest(report.analysis)
+    try:
+        raw = json.loads(report.analysis or "{}")
+    except Exception:
+        raw = {}
+    data = render_report_pdf(_safe_result(raw))
+    report_id = report.id
+
+    try:
+        return _store(report_id, digest, data)
+    except IntegrityError:
+        # Another request or worker inserted the row first (report_id is unique)
+        db.session.rollback()
+    return cached_pdf(report_id, digest) or _store(report_id, digest, data)
+
+
+def _store(report_id: int, digest: str, data: bytes) -> JobPackPdf:
+    art = JobPackPdf.query.filter_by(report_id=report_id).first()
+    if art is None:
+        art = JobPackPdf(report_id=report_id)
+        db.session.add(art)
+    art.analysis_digest = digest
+    art.template_version = PDF_TEMPLATE_VERSION
+    art.size = len(data)
+    art.pdf = data
+    art.created_at = datetime.utcnow()
+    db.session.commit()
+    return art
+
+
+def get_or_build(report: JobPackReport, *, digest: Optional[str] = None) -> JobPackPdf:
+    digest = digest or analysis_digest(report.analysis)
+    return cached_pdf(report.id, digest) or build_pdf(report, digest=digest)
+
+
+def prerender(report_id: int) -> bool:
+    """Worker entry: make sure a completed report has a current PDF."""
+    report = JobPackReport.query.get(report_id)
+    if report is None or report.status != "completed":
+        return False
+    digest = analysis_digest(report.analysis)
+    if cached_pdf(report_id, digest) is None:
+        build_pdf(report, digest=digest)
+    return True
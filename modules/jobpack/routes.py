@@ -18,11 +18,10 @@ from flask import (
     jsonify,
 )
 from flask_login import current_user, login_required
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from sqlalchemy.orm import undefer
 
 from models import JobPackReport, db
+from modules.jobpack import pdf as jobpack_pdf
 from modules.jobpack.utils_ats import analyze_jobpack
 from modules.common.profile_loader import load_profile_snapshot
 
@@ -30,7 +29,12 @@ from modules.common.profile_loader import load_profile_snapshot
 from modules.credits.engine import can_afford, deduct_free, deduct_pro
 
 # RQ tasks
-from modules.jobpack.tasks import enqueue_jobpack_analysis, get_job_status
+from modules.jobpack.tasks import (
+    apply_report_summary,
+    enqueue_jobpack_analysis,
+    enqueue_jobpack_pdf,
+    get_job_status,
+)
 
 jobpack_bp = Blueprint("jobpack", __name__, template_folder="../../templates/jobpack")
 
@@ -218,7 +222,8 @@ def index():
                     job_title=None,
                     company=None,
                     jd_text=jd_text,
-                    analysis=json.dumps({"_status": "queued"}, ensure_ascii=False),
+                    analysis=None,
+                    status="queued",
                     created_at=datetime.utcnow(),
                 )
                 db.session.add(report)
@@ -262,11 +267,9 @@ def index():
                     refund_amount=int(refund_amount or 0),
                 )
 
-                # Store job id in analysis meta (optional, best effort)
+                # Store job id so the status endpoint can answer from the row
                 try:
-                    report.analysis = json.dumps(
-                        {"_status": "queued", "_job_id": job_id}, ensure_ascii=False
-                    )
+                    report.job_id = job_id
                     db.session.commit()
                 except Exception:
                     db.session.rollback()
@@ -315,6 +318,7 @@ def index():
 
         # Persist (best-effort) BEFORE deducting credits, so we can attach run_id if needed
         report_id = None
+        report = None
         try:
             report = JobPackReport(
                 user_id=current_user.id,
@@ -322,11 +326,16 @@ def index():
                 company=None,
                 jd_text=jd_text,
                 analysis=json.dumps(result, ensure_ascii=False),
+                status="completed",
+                progress=100,
                 created_at=datetime.utcnow(),
             )
+            apply_report_summary(report, result)
             db.session.add(report)
             db.session.commit()
             report_id = report.id
+            if is_pro_run:
+                enqueue_jobpack_pdf(report_id, user_id=current_user.id)
         except Exception as e:
             current_app.logger.warning("JobPack report save failed: %s", e)
             try:
@@ -373,6 +382,7 @@ def index():
                 mode=mode,
                 is_pro=is_pro_run,
                 from_history=False,
+                report=report if report_id else None,
             )
         except Exception as e:
             current_app.logger.exception("JobPack result template failed: %s", e)
@@ -406,7 +416,29 @@ def api_job_status(job_id: str):
     Polled by the processing page.
     """
     try:
-        return jsonify(get_job_status(job_id)), 200
+        # Finished runs are answered from the report row; RQ is only asked
+        # while the run is in flight (it also notices jobs lost by a worker).
+        report = (
+            JobPackReport.query.with_entities(
+                JobPackReport.status, JobPackReport.progress, JobPackReport.error
+            )
+            .filter_by(job_id=job_id, user_id=current_user.id)
+            .first()
+        )
+        if report is not None and report.status in ("completed", "failed"):
+            out = {
+                "status": "finished" if report.status == "completed" else "failed",
+                "job_id": job_id,
+                "progress": report.progress,
+            }
+            if report.status == "failed":
+                out["error"] = "Analysis failed. Credits were refunded."
+            return jsonify(out), 200
+
+        out = get_job_status(job_id)
+        if report is not None:
+            out["progress"] = report.progress
+        return jsonify(out), 200
     except Exception as e:
         current_app.logger.exception("JobPack api_job_status error: %s", e)
         return jsonify({"status": "error"}), 200
@@ -460,13 +492,13 @@ def report(report_id: int):
     is_pro_run = "deep" in tier or "careerai" in tier
 
     # If still processing, show a soft message
-    if (result.get("_status") or "").lower() in ("queued", "processing"):
+    if report.status in ("queued", "processing"):
         flash(
             "This report is still processing. Please wait a moment and refresh.",
             "info",
         )
 
-    if (result.get("_status") or "").lower() == "failed":
+    if report.status == "failed":
         flash("This report failed. Credits were refunded. Please try again.", "warning")
 
     return render_template(
@@ -482,265 +514,69 @@ def report(report_id: int):
 # ---------------------- PDF Export ----------------------
 
 
-@jobpack_bp.route("/export/pdf", methods=["POST"], endpoint="export_pdf")
+@jobpack_bp.route("/report/<int:report_id>/pdf", methods=["GET"], endpoint="report_pdf")
 @login_required
-def export_pdf():
+def report_pdf(report_id: int):
     """
-    Export Job Pack report to PDF (Pro only).
-    Can accept either:
-    - data (raw JSON string from the page), or
-    - report_id (to reload from database, e.g. from history).
+    Download a report's Deep Evaluation PDF (Pro only).
+    Served from the cached artifact (modules/jobpack/pdf.py); a matching
+    If-None-Match gets 304 without touching the PDF bytes.
     """
     if not current_user.is_pro:
         flash("PDF export is a Pro feature.", "warning")
         return redirect(url_for("billing.index"))
 
-    try:
-        safe: dict
-
-        report_id = request.form.get("report_id")
-        if report_id:
-            try:
-                rid = int(report_id)
-            except ValueError:
-                flash("Invalid report id.", "danger")
-                return redirect(url_for("jobpack.history"))
-
-            report = (
-                JobPackReport.query.filter_by(id=rid, user_id=current_user.id)
-                .first()
-            )
-            if not report:
-                flash("Report not found.", "danger")
-                return redirect(url_for("jobpack.history"))
-
-            try:
-                raw = json.loads(report.analysis or "{}")
-            except Exception:
-                raw = {}
-            safe = _safe_result(raw)
-        else:
-            data = request.form.get("data")
-            if not data:
-                flash("Missing report data.", "danger")
-                return redirect(url_for("jobpack.index"))
-            safe = _safe_result(json.loads(data))
-
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        y = height - 60
-
-        def _wrap_line(text: str, max_chars: int = 100) -> List[str]:
-            text = (text or "").replace("\r", "")
-            lines_out: List[str] = []
-            for raw_line in (text.split("\n") or [""]):
-                line = raw_line.strip()
-                if not line:
-                    lines_out.append("")
-                    continue
-                while len(line) > max_chars:
-                    cut = line.rfind(" ", 0, max_chars)
-                    if cut <= 0:
-                        cut = max_chars
-                    lines_out.append(line[:cut].strip())
-                    line = line[cut:].strip()
-                lines_out.append(line)
-            return lines_out
-
-        def new_page():
-            nonlocal y
-            c.showPage()
-            y = height - 60
-
-        def section(title: str, lines: List[str], small: bool = False):
-            nonlocal y
-            if y < 80:
-                new_page()
-            c.setFont("Helvetica-Bold", 13)
-            c.setFillColor(colors.black)
-            c.drawString(40, y, title)
-            y -= 18
-            c.setFont("Helvetica", 9 if small else 10)
-            c.setFillColor(colors.black)
-            for line in lines:
-                for chunk in _wrap_line(line, max_chars=100):
-                    if not chunk:
-                        y -= 10 if small else 12
-                    else:
-                        c.drawString(40, y, chunk)
-                        y -= 10 if small else 12
-                    if y < 60:
-                        new_page()
-                        c.setFont("Helvetica", 9 if small else 10)
-
-        c.setFillColorRGB(0.1, 0.12, 0.18)
-        c.rect(0, height - 80, width, 80, fill=True, stroke=False)
-        c.setFont("Helvetica-Bold", 16)
-        c.setFillColor(colors.white)
-        c.drawString(40, height - 50, "CareerAI Deep Evaluation Report ⭐")
-
-        section(
-            "Role Summary",
-            [
-                safe["summary"] or "No summary available.",
-                f"Detected Role: {safe['role_detected'] or '—'}",
-            ],
-        )
-
-        fit_lines: List[str] = []
-        for f in safe["fit_overview"]:
-            if isinstance(f, dict):
-                cat = f.get("category", "")
-                m = f.get("match", 0)
-                comment = f.get("comment", "")
-                fit_lines.append(f"{cat}: {m}% — {comment}")
-        if fit_lines:
-            section("Fit Overview", fit_lines)
-
-        subs = safe.get("subscores") or {}
-        subs_lines = [
-            f"Overall ATS Alignment (model estimate): {safe['ats_score']}%",
-            f"Keyword relevance: {subs.get('keyword_relevance', 0)}%",
-            f"Quantifiable impact: {subs.get('quantifiable_impact', 0)}%",
-            f"Formatting & clarity: {subs.get('formatting_clarity', 0)}%",
-            f"Professional tone: {subs.get('professional_tone', 0)}%",
-        ]
-        section("ATS Score & Subscores (model estimates)", subs_lines)
-
-        skill_lines: List[str] = []
-        for row in safe["skill_table"]:
-            if isinstance(row, dict):
-                skill = row.get("skill", "")
-                status = row.get("status", "")
-                if skill:
-                    skill_lines.append(f"{skill} — {status}")
-        if skill_lines:
-            section("JD vs Resume Skill Match", skill_lines, small=True)
-
-        ra = safe.get("resume_ats") or {}
-        kc = ra.get("keyword_coverage") or {}
-        blockers = [f"• {b}" for b in (ra.get("blockers") or [])] or ["None"]
-        warnings = [f"• {w}" for w in (ra.get("warnings") or [])] or ["None"]
-        missing_kw = kc.get("missing_keywords") or []
-        present_kw = kc.get("present_keywords") or []
-        required_kw = kc.get("required_keywords") or []
-        phrases = ra.get("exact_phrases_to_add") or []
-
-        section(
-            "Resume ATS — Score (model estimate)",
-            [f"Resume ATS Score: {ra.get('resume_ats_score', 0)}%"],
-        )
-        section("Resume ATS — Must Fix (Blockers)", blockers, small=True)
-        section("Resume ATS — Should Fix (Warnings)", warnings, small=True)
-
-        if required_kw or present_kw or missing_kw:
-            kw_lines = []
-            if required_kw:
-                kw_lines.append("Required keywords: " + ", ".join(required_kw[:40]))
-            if present_kw:
-                kw_lines.append("Present in resume: " + ", ".join(present_kw[:40]))
-            if missing_kw:
-                kw_lines.append("Missing from resume: " + ", ".join(missing_kw[:40]))
-            section("Resume ATS — Keyword Coverage", kw_lines, small=True)
-
-        if phrases:
-            section(
-                "Resume ATS — Exact Phrases to Add",
-                [f"• {p}" for p in phrases[:40]],
-                small=True,
-            )
-
-        rra = ra.get("resume_rewrite_actions") or []
-        if rra:
-            section(
-                "Resume ATS — Rewrite Actions",
-                [f"• {a}" for a in rra[:40]],
-                small=True,
-            )
-
-        if safe["learning_links"]:
-            ll_lines: List[str] = []
-            for link in safe["learning_links"]:
-                if isinstance(link, dict):
-                    label = link.get("label", "")
-                    url = link.get("url", "")
-                    why = link.get("why", "")
-                    ll_lines.append(f"{label} — {url}")
-                    if why:
-                        ll_lines.append(f"  • {why}")
-            section("Learning Resources", ll_lines, small=True)
-
-        if safe["interview_qa"]:
-            qa_lines: List[str] = []
-            for qa in safe["interview_qa"]:
-                if not isinstance(qa, dict):
-                    continue
-                q = qa.get("q", "")
-                outline = qa.get("a_outline") or []
-                why = qa.get("why_it_matters", "")
-                follow = qa.get("followup", "")
-                if q:
-                    qa_lines.append(f"Q: {q}")
-                for pt in outline:
-                    qa_lines.append(f"  • {pt}")
-                if why:
-                    qa_lines.append(f"Why it matters: {why}")
-                if follow:
-                    qa_lines.append(f"Follow-up: {follow}")
-                qa_lines.append("")
-            section("Interview Q&A Practice", qa_lines, small=True)
-
-        if safe["practice_plan"]:
-            pp_lines: List[str] = []
-            for blk in safe["practice_plan"]:
-                if not isinstance(blk, dict):
-                    continue
-                period = blk.get("period", "")
-                goals = blk.get("goals", "")
-                tasks = blk.get("tasks") or []
-                output = blk.get("output", "")
-                if period:
-                    pp_lines.append(f"Period: {period}")
-                if goals:
-                    pp_lines.append(f"Goals: {goals}")
-                for t in tasks:
-                    pp_lines.append(f"  • {t}")
-                if output:
-                    pp_lines.append(f"Output: {output}")
-                pp_lines.append("")
-            section("Practice Plan", pp_lines, small=True)
-
-        if safe["application_checklist"]:
-            section(
-                "Application Checklist",
-                [f"• {item}" for item in safe["application_checklist"]],
-                small=True,
-            )
-
-        if safe["rewrite_suggestions"]:
-            section(
-                "Resume Rewrite Suggestions",
-                [f"• {s}" for s in safe["rewrite_suggestions"]],
-                small=True,
-            )
-
-        if safe["next_steps"]:
-            section("Next Steps", [f"• {s}" for s in safe["next_steps"]])
-
-        section("Impact Summary", [safe["impact_summary"] or "Evaluation complete."])
-
-        c.save()
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name="CareerAI_Deep_Evaluation_Report.pdf",
-            mimetype="application/pdf",
-        )
+    report = (
+        JobPackReport.query.options(undefer(JobPackReport.analysis))
+        .filter_by(id=report_id, user_id=current_user.id)
+        .first()
+    )
+    if not report:
+        flash("Report not found.", "danger")
+        return redirect(url_for("jobpack.history"))
+    if report.status != "completed":
+        flash("This report is not ready yet. Please try again in a moment.", "info")
+        return redirect(url_for("jobpack.report", report_id=report.id))
+
+    digest = jobpack_pdf.analysis_digest(report.analysis)
+    etag = jobpack_pdf.etag_for(digest)
+    if etag in request.if_none_match:
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
 
+    try:
+        art = jobpack_pdf.get_or_build(report, digest=digest)
     except Exception as e:
+        db.session.rollback()
         current_app.logger.exception("PDF export failed: %s", e)
         flash("Could not export PDF. Please try again later.", "danger")
-        return redirect(url_for("jobpack.index"))
+        return redirect(url_for("jobpack.report", report_id=report.id))
+
+    resp = send_file(
+        io.BytesIO(art.pdf),
+        as_attachment=True,
+        download_name="CareerAI_Deep_Evaluation_Report.pdf",
+        mimetype="application/pdf",
+        etag=etag,
+        last_modified=art.created_at,
+        max_age=0,
+    )
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+@jobpack_bp.route("/export/pdf", methods=["POST"], endpoint="export_pdf")
+@login_required
+def export_pdf():
+    """
+    Legacy form target: forwards report_id to the cached download. Raw
+    report JSON posted from the page is no longer rendered.
+    """
+    try:
+        rid = int(request.form.get("report_id") or "")
+    except ValueError:
+        flash("Open the report from your history to download its PDF.", "warning")
+        return redirect(url_for("jobpack.history"))
+    return redirect(url_for("jobpack.report_pdf", report_id=rid), code=303)
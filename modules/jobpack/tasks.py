@@ -23,6 +23,8 @@ from rq import Queue, get_current_job
 
 from models import db, JobPackReport, User  # type: ignore
 from modules.jobpack.utils_ats import analyze_jobpack
+from modules.common import scheduling, singleflight
+from modules.common.query_stats import track_queries
 from modules.credits.engine import add_credits
 
 
@@ -81,7 +83,7 @@ def _load_flask_app():
 
 
 # ----------------------------
-# Status JSON helpers
+# Status helpers
 # ----------------------------
 
 def _safe_json(obj: Any) -> str:
@@ -91,28 +93,40 @@ def _safe_json(obj: Any) -> str:
         return "{}"
 
 
-def _mark_report(report: JobPackReport, status: str, payload: Optional[Dict[str, Any]] = None):
+def _mark_report(
+    report: JobPackReport,
+    status: str,
+    *,
+    job_id: Optional[str] = None,
+    progress: Optional[int] = None,
+    error: Optional[str] = None,
+):
     """
-    Store status safely inside analysis JSON so UI can show progress,
-    without requiring DB migrations.
+    Record a status transition on the report's own columns; the analysis
+    JSON is only written once, with the finished result.
     """
-    base: Dict[str, Any] = {}
+    report.status = status
+    if progress is None:
+        progress = 100 if status in ("completed", "failed") else 0
+    report.progress = progress
+    if job_id:
+        report.job_id = job_id
+    if error is not None:
+        report.error = error[:2000]
+    report.updated_at = datetime.utcnow()
+
+
+def apply_report_summary(report: JobPackReport, result: Any) -> None:
+    """Copy the headline fields of a finished analysis onto the report row."""
+    if not isinstance(result, dict):
+        return
     try:
-        if report.analysis:
-            base = json.loads(report.analysis) if report.analysis.strip() else {}
-            if not isinstance(base, dict):
-                base = {}
-    except Exception:
-        base = {}
-
-    base["_status"] = status
-    base["_updated_at"] = datetime.utcnow().isoformat()
-
-    if payload:
-        # keep payload under reserved key
-        base["_meta"] = payload
-
-    report.analysis = _safe_json(base)
+        report.ats_score = int(float(result.get("ats_score")))
+    except (TypeError, ValueError):
+        report.ats_score = None
+    report.report_tier = (str(result.get("report_tier") or "")[:64]) or None
+    if not report.job_title:
+        report.job_title = (str(result.get("role_detected") or "")[:200]) or None
 
 
 # ----------------------------
@@ -137,13 +151,18 @@ def enqueue_jobpack_analysis(
     IMPORTANT:
     - Enqueue the function object (not a string path) to avoid RQ import parsing issues.
     """
-    q = get_queue(DEFAULT_QUEUE_NAME)
-
     # Import inside the function so both web + worker resolve the same module path
     from modules.jobpack.tasks import process_jobpack_analysis
 
-    job = q.enqueue(
+    job = scheduling.enqueue(
+        _redis(),
         process_jobpack_analysis,
+        user_id=user_id,
+        feature_key=feature_key,
+        currency=currency,
+        coalesce_key=singleflight.inputs_key(
+            "jobpack", feature_key, jd_text, resume_text, is_pro_run
+        ),
         kwargs=dict(
             user_id=user_id,
             report_id=report_id,
@@ -183,7 +202,7 @@ def process_jobpack_analysis(
     app = _load_flask_app()
     job = get_current_job()
 
-    with app.app_context():
+    with app.app_context(), track_queries("job:process_jobpack_analysis"):
         report = JobPackReport.query.filter_by(id=report_id, user_id=user_id).first()
         user = User.query.filter_by(id=user_id).first()
 
@@ -192,7 +211,7 @@ def process_jobpack_analysis(
             return {"ok": False, "error": "Report or user not found"}
 
         try:
-            _mark_report(report, "processing", payload={"job_id": job.id if job else None})
+            _mark_report(report, "processing", job_id=job.id if job else None, progress=10)
             db.session.commit()
         except Exception:
             db.session.rollback()
@@ -202,26 +221,15 @@ def process_jobpack_analysis(
 
             # Persist final result
             if isinstance(raw, dict):
-                # keep original payload but ensure we annotate completion meta
-                raw.setdefault("_status", "completed")
-                raw.setdefault("_job_id", job.id if job else None)
-                raw.setdefault("_completed_at", datetime.utcnow().isoformat())
                 report.analysis = _safe_json(raw)
-
-                # basic indexing fields
-                if not report.job_title:
-                    report.job_title = raw.get("role_detected") or report.job_title
+                apply_report_summary(report, raw)
             else:
-                report.analysis = _safe_json(
-                    {
-                        "_status": "completed",
-                        "_job_id": job.id if job else None,
-                        "_completed_at": datetime.utcnow().isoformat(),
-                        "raw": str(raw),
-                    }
-                )
+                report.analysis = _safe_json({"raw": str(raw)})
 
+            _mark_report(report, "completed", job_id=job.id if job else None)
             db.session.commit()
+            if is_pro_run:
+                enqueue_jobpack_pdf(report_id, user_id=user_id)
             return {"ok": True, "report_id": report_id}
 
         except Exception as e:
@@ -229,14 +237,7 @@ def process_jobpack_analysis(
             tb = traceback.format_exc()
 
             try:
-                report.analysis = _safe_json(
-                    {
-                        "_status": "failed",
-                        "_job_id": job.id if job else None,
-                        "_failed_at": datetime.utcnow().isoformat(),
-                        "error": err,
-                    }
-                )
+                _mark_report(report, "failed", job_id=job.id if job else None, error=err)
                 db.session.commit()
             except Exception:
                 db.session.rollback()
@@ -261,6 +262,39 @@ def process_jobpack_analysis(
             return {"ok": False, "error": err, "traceback": tb}
 
 
+def enqueue_jobpack_pdf(report_id: int, *, user_id: int) -> Optional[str]:
+    """
+    Queue the Deep Evaluation PDF render for a completed report on the bulk
+    queue. Best-effort: if it cannot be queued, the first download renders it.
+    """
+    try:
+        job = scheduling.enqueue(
+            _redis(),
+            process_jobpack_pdf,
+            user_id=user_id,
+            job_class="bulk",
+            kwargs=dict(report_id=report_id),
+            job_timeout=int(os.getenv("JOBPACK_PDF_JOB_TIMEOUT", "120")),
+            result_ttl=int(os.getenv("RQ_RESULT_TTL", "500")),
+            failure_ttl=int(os.getenv("RQ_FAILURE_TTL", "3600")),
+        )
+        return job.id
+    except Exception:
+        return None
+
+
+def process_jobpack_pdf(*, report_id: int) -> Dict[str, Any]:
+    app = _load_flask_app()
+    with app.app_context(), track_queries("job:process_jobpack_pdf"):
+        from modules.jobpack import pdf
+
+        try:
+            return {"ok": pdf.prerender(report_id), "report_id": report_id}
+        except Exception as e:
+            db.session.rollback()
+            return {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+
+
 def get_job_status(job_id: str) -> Dict[str, Any]:
     """
     Lightweight status helper. UI polls this.
@@ -285,17 +319,28 @@ def get_job_status(job_id: str) -> Dict[str, Any]:
     return out
 
 
-def get_queue_stats() -> Dict[str, int]:
+def get_queue_stats() -> Dict[str, Any]:
     """
-    For admin/ops monitoring later.
+    Queue stats for monitoring, over every scheduling queue (jobs are
+    routed by class, not only to DEFAULT_QUEUE_NAME): totals at the top
+    level plus a per-queue breakdown under "queues".
     """
-    q = get_queue(DEFAULT_QUEUE_NAME)
-    try:
-        return {
-            "queued": q.count,
-            "started": q.started_job_registry.count,
-            "finished": q.finished_job_registry.count,
-            "failed": q.failed_job_registry.count,
-        }
-    except Exception:
-        return {"queued": 0, "started": 0, "finished": 0, "failed": 0}
+    keys = ("queued", "started", "finished", "failed")
+    totals: Dict[str, Any] = {k: 0 for k in keys}
+    per_queue: Dict[str, Dict[str, int]] = {}
+    for name in scheduling.QUEUE_NAMES:
+        q = get_queue(name)
+        try:
+            stats = {
+                "queued": q.count,
+                "started": q.started_job_registry.count,
+                "finished": q.finished_job_registry.count,
+                "failed": q.failed_job_registry.count,
+            }
+        except Exception:
+            stats = {k: 0 for k in keys}
+        per_queue[name] = stats
+        for k in keys:
+            totals[k] += stats[k]
+    totals["queues"] = per_queue
+    return totals
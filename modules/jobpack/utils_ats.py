@@ -5,12 +5,35 @@ import os
 import re
 from typing import Any, Dict, List
 
+from modules.common.llm import chat_completion, extract_usage, layout_messages
+from modules.common.schemas import normalize_jobpack
+from modules.common.structured import (
+    parse_json_object,
+    record_fallback,
+    record_outcome,
+    structured_completion,
+    structured_schema,
+)
+from modules.common.prompt_budget import (
+    PromptSection,
+    assemble_sections,
+    compact_schema,
+)
+
 # ------------------------------------------------------------------
 # Model + freshness config (env-driven)
 # ------------------------------------------------------------------
 DEEP_MODEL = os.getenv("OPENAI_MODEL_DEEP", "gpt-4o")
 FAST_MODEL = os.getenv("OPENAI_MODEL_FAST", "gpt-4o-mini")
 
+# Token budget for the JD + resume part of the prompt (see prompt_budget.py)
+JOBPACK_INPUT_BUDGET = int(os.getenv("JOBPACK_INPUT_BUDGET_TOKENS", "2600"))
+
+# Second "repair" completion on low-quality output. Off by default: the
+# schema-constrained response already enforces the shape, and the extra
+# round-trip doubled latency on exactly the slowest requests.
+JOBPACK_REPAIR_ROUNDTRIP = os.getenv("JOBPACK_REPAIR_ROUNDTRIP", "0") == "1"
+
 CAREER_AI_VERSION = os.getenv("CAREER_AI_VERSION", "2025-Q4")
 FRESHNESS_NOTE = (
     "Use up-to-date knowledge as of " + CAREER_AI_VERSION + ". "
@@ -34,8 +57,8 @@ def _clean_jd(text: str) -> str:
         text,
         flags=re.I,
     )
-    # keep prompt context bounded
-    return text[:4000]
+    # Prompt context is bounded by token budget in analyze_jobpack.
+    return text
 
 
 # ------------------------------------------------------------------
@@ -173,6 +196,11 @@ JOBPACK_JSON_SCHEMA = r"""
 }
 """
 
+# Minified once at import; sent on every call.
+JOBPACK_JSON_SCHEMA_COMPACT = compact_schema(JOBPACK_JSON_SCHEMA)
+# Provider json_schema response_format + compiled validator, built once.
+JOBPACK_STRUCTURED = structured_schema("jobpack", JOBPACK_JSON_SCHEMA)
+
 
 # ------------------------------------------------------------------
 # Prompt templates (freshness-aware)
@@ -245,100 +273,8 @@ TASK
 # Normalizers (template safety)
 # ------------------------------------------------------------------
 def _normalize_for_template(data: Dict[str, Any]) -> Dict[str, Any]:
-  # fit_overview items: ensure "category" + "match" + "comment"
-  fo = data.get("fit_overview")
-  if isinstance(fo, list):
-      for item in fo:
-          if not isinstance(item, dict):
-              continue
-          item["category"] = (
-              item.get("category")
-              or item.get("name")
-              or item.get("area")
-              or "Technical Skills"
-          )
-          if "match" not in item and "score" in item:
-              try:
-                  item["match"] = int(item["score"])
-              except Exception:
-                  item["match"] = 0
-          item["match"] = int(item.get("match") or 0)
-          item["comment"] = item.get("comment", "")
-
-  # resume_ats defaults
-  ra = data.get("resume_ats") or {}
-  if isinstance(ra, dict):
-      ra.setdefault("resume_ats_score", data.get("ats_score", 0))
-      ra.setdefault("blockers", [])
-      ra.setdefault("warnings", [])
-      ra.setdefault(
-          "keyword_coverage",
-          {"required_keywords": [], "present_keywords": [], "missing_keywords": []},
-      )
-      ra.setdefault("resume_rewrite_actions", [])
-      ra.setdefault("exact_phrases_to_add", [])
-      data["resume_ats"] = ra
-
-  # learning_links: drop empty; forbid "Resource" without url
-  ll = data.get("learning_links")
-  if isinstance(ll, list):
-      cleaned = []
-      for item in ll:
-          if isinstance(item, dict):
-              label = (item.get("label") or "").strip()
-              url = (item.get("url") or "").strip()
-              why = (item.get("why") or "").strip()
-              if url.startswith("http") and label and label.lower() != "resource":
-                  cleaned.append(
-                      {"label": label, "url": url, "why": why or "Good primer."}
-                  )
-      data["learning_links"] = cleaned
-
-  # interview_qa: ensure keys exist
-  iqa = data.get("interview_qa")
-  if isinstance(iqa, list):
-      fixed: List[Dict[str, Any]] = []
-      for qa in iqa:
-          if isinstance(qa, dict):
-              qa["q"] = qa.get("q") or qa.get("question") or ""
-              qa.setdefault("a_outline", [])
-              qa.setdefault("why_it_matters", "")
-              qa.setdefault("followup", "")
-              fixed.append(qa)
-      data["interview_qa"] = fixed
-
-  # helper chips + counts for UI
-  if "detected_keywords" not in data and isinstance(data.get("skill_table"), list):
-      kw = []
-      for row in data["skill_table"]:
-          if isinstance(row, dict) and "skill" in row:
-              kw.append(str(row["skill"]))
-      data["detected_keywords"] = kw
-      data["matched_count"] = sum(
-          1
-          for r in data["skill_table"]
-          if isinstance(r, dict) and r.get("status") == "Matched"
-      )
-      data["missing_count"] = sum(
-          1
-          for r in data["skill_table"]
-          if isinstance(r, dict) and r.get("status") == "Missing"
-      )
-
-  # role_intel defaults
-  ri = data.get("role_intel") or {}
-  if isinstance(ri, dict):
-      ri.setdefault("seniority", "Not specified")
-      ri.setdefault("difficulty", "Not specified")
-      ri.setdefault("salary_band", "Varies by company — check latest bands for similar roles in your region.")
-      ri.setdefault("geo_focus", "Not specified")
-      ri.setdefault("market_notes", "")
-      ri.setdefault("typical_companies", [])
-      data["role_intel"] = ri
-
-  data.setdefault("report_tier", "CareerAI Deep Evaluation")
-  data.setdefault("resume_missing", False)
-  return data
+    """Defaults + template-safe shapes (see schemas.JobPackReport)."""
+    return normalize_jobpack(data)
 
 
 # ------------------------------------------------------------------
@@ -396,7 +332,7 @@ def _find_quality_issues(d: Dict[str, Any]) -> List[str]:
 
 
 # ------------------------------------------------------------------
-# Analyzer — model depends on mode, with repair pass (AI-only)
+# Analyzer — model depends on mode, schema-constrained output (AI-only)
 # ------------------------------------------------------------------
 def analyze_jobpack(
     jd_text: str, resume_text: str, pro_mode: bool = False
@@ -438,9 +374,19 @@ def analyze_jobpack(
     clean_jd = _clean_jd(jd_text or "")
     model = DEEP_MODEL if pro_mode else FAST_MODEL
 
-    # Resume handling
-    resume_raw = (resume_text or "")
-    resume_trimmed = resume_raw[:4000]
+    feature = "jobpack_pro" if pro_mode else "jobpack_free"
+
+    # JD + resume share one token budget; the JD wins ties.
+    parts = assemble_sections(
+        feature,
+        [
+            PromptSection("jd", clean_jd, priority=90, min_tokens=400),
+            PromptSection("resume", resume_text or "", priority=80, min_tokens=400),
+        ],
+        total_tokens=JOBPACK_INPUT_BUDGET,
+    )
+    clean_jd = parts["jd"]
+    resume_trimmed = parts["resume"]
     resume_missing = not bool(resume_trimmed.strip())
 
     resume_hint = (
@@ -450,70 +396,33 @@ def analyze_jobpack(
         else "Resume/Profile text is provided — use it heavily for ATS and fit analysis."
     )
 
-    # Prompt with freshness
-    prompt = JOBPACK_PROMPT.format(
-        freshness=FRESHNESS_NOTE,
-        schema=JOBPACK_JSON_SCHEMA,
-        jd=clean_jd,
-        resume=resume_trimmed,
-        resume_hint=resume_hint,
+    # Prompt with freshness; instructions + schema form a shared (cacheable) prefix
+    messages = layout_messages(
+        JOBPACK_PROMPT,
+        system="You output only valid JSON that matches the provided schema.",
+        static={
+            "freshness": FRESHNESS_NOTE,
+            "schema": JOBPACK_JSON_SCHEMA_COMPACT,
+            "resume_hint": resume_hint,
+        },
+        dynamic={"jd": clean_jd, "resume": resume_trimmed},
     )
 
     try:
-        resp = client.chat.completions.create(
+        result = structured_completion(
+            feature,
+            JOBPACK_STRUCTURED,
+            client=client,
             model=model,
             temperature=0.3,
             max_tokens=3200,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You output only valid JSON that matches the provided schema.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            response_format={"type": "json_object"},
+            messages=messages,
             timeout=90,
         )
-
-        raw = (resp.choices[0].message.content or "").strip()
-        if not raw:
-            raise ValueError("Empty response from model")
-
-        # Parse JSON (strip any accidental code fences)
-        raw_strip = raw.strip()
-        if raw_strip.startswith("```"):
-            raw_strip = re.sub(r"^```[a-zA-Z0-9]*\s*\n", "", raw_strip)
-            if raw_strip.endswith("```"):
-                raw_strip = raw_strip[:-3].strip()
-
-        try:
-            data = json.loads(raw_strip)
-        except json.JSONDecodeError:
-            m = re.search(r"(\{[\s\S]+\})", raw_strip)
-            if not m:
-                raise
-            data = json.loads(m.group(1))
+        resp = result.response
+        data = result.data
 
         # Defaults + normalization
-        defaults = {
-            "summary": "",
-            "role_detected": "",
-            "fit_overview": [],
-            "ats_score": 0,
-            "skill_table": [],
-            "rewrite_suggestions": [],
-            "next_steps": [],
-            "impact_summary": "",
-            "subscores": {},
-            "resume_ats": {},
-            "learning_links": [],
-            "interview_qa": [],
-            "practice_plan": [],
-            "application_checklist": [],
-            "role_intel": {},
-        }
-        for k, v in defaults.items():
-            data.setdefault(k, v)
         data = _normalize_for_template(data)
 
         # Wire resume_missing for the template (used for the yellow warning card)
@@ -530,16 +439,21 @@ def analyze_jobpack(
                 "JD may be outdated — please verify posting date (Check latest)."
             )
 
-        # Quality gate — if weak, ask model to repair once
+        # Quality gate — logged always; a repair round-trip only when enabled
         issues = _find_quality_issues(data)
         if issues:
+            record_outcome(feature, "quality_issues")
+            log.info("JobPack quality issues (%d): %s", len(issues), issues[0])
+        if issues and JOBPACK_REPAIR_ROUNDTRIP:
             issues_text = "- " + "\n- ".join(issues)
             repair_prompt = REPAIR_PROMPT.format(
                 freshness=FRESHNESS_NOTE,
                 issues=issues_text,
                 current_json=json.dumps(data, ensure_ascii=False),
             )
-            repair = client.chat.completions.create(
+            repair = chat_completion(
+                f"{feature}_repair",
+                client=client,
                 model=model,
                 temperature=0.25,
                 max_tokens=3200,
@@ -557,14 +471,10 @@ def analyze_jobpack(
                 response_format={"type": "json_object"},
                 timeout=90,
             )
-            raw2 = (repair.choices[0].message.content or "").strip()
             try:
-                data2 = json.loads(raw2)
+                data2, _ = parse_json_object(repair.choices[0].message.content or "")
             except Exception:
-                m2 = re.search(r"(\{[\s\S]+\})", raw2)
-                data2 = json.loads(m2.group(1)) if m2 else data
-            for k, v in defaults.items():
-                data2.setdefault(k, v)
+                data2 = data
             data = _normalize_for_template(data2)
 
             # Keep resume_missing flag consistent after repair
@@ -578,12 +488,14 @@ def analyze_jobpack(
             "input_tokens": getattr(usage, "prompt_tokens", None),
             "output_tokens": getattr(usage, "completion_tokens", None),
             "total_tokens": getattr(usage, "total_tokens", None),
+            "cached_tokens": extract_usage(resp)["cached_tokens"],
         }
 
         return data
 
     except Exception as e:
         log.exception("JobPack AI analysis failed: %s", e)
+        record_fallback(feature, str(e))
         return {
             "error": str(e),
             "summary": "An error occurred during AI analysis.",
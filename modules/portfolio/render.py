@@ -0,0 +1,187 @@
+# modules/portfolio/render.py
+"""
+Public portfolio pages: Markdown -> sanitized HTML, stored and cached.
+
+Published pages are shared on LinkedIn and similar sites, so they get far
+more reads than writes. Publishing renders content_md once (markdown +
+bleach) into PortfolioPage.content_html. Pages published before that
+column existed, or rendered by an older PORTFOLIO_HTML_VERSION, are
+re-rendered and stored on their first view.
+
+The public view (routes.view) then works in three layers:
+
+    1. a process-local LRU of finished responses (body, ETag,
+       Last-Modified), kept for PORTFOLIO_VIEW_CACHE_TTL seconds: no DB,
+       no template rendering
+    2. on a miss, a metadata-only query (id, is_public, updated_at); a
+       matching If-None-Match / If-Modified-Since is answered 304 there
+    3. otherwise the stored HTML is loaded and the template rendered
+
+Responses carry Cache-Control: public, max-age=PORTFOLIO_PUBLIC_MAX_AGE so
+browsers and CDNs can skip the app entirely. The ETag covers the page id,
+updated_at and the renderer/template versions.
+
+invalidate() drops a page from this process's LRU (publish calls it).
+Other workers notice within PORTFOLIO_VIEW_CACHE_TTL.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from models import PortfolioPage, db
+
+# Bump when md_to_html's output (extensions, allowed tags) changes.
+PORTFOLIO_HTML_VERSION = "1"
+
+PORTFOLIO_PUBLIC_MAX_AGE = int(os.getenv("PORTFOLIO_PUBLIC_MAX_AGE", "300"))
+PORTFOLIO_VIEW_CACHE_SIZE = int(os.getenv("PORTFOLIO_VIEW_CACHE_SIZE", "256"))
+PORTFOLIO_VIEW_CACHE_TTL = int(os.getenv("PORTFOLIO_VIEW_CACHE_TTL", "60"))
+
+
+# ---------------------------------------------------------------------
+# Markdown -> sanitized HTML
+# ---------------------------------------------------------------------
+def md_to_html(md_text: str) -> str:
+    text = md_text or ""
+    html = text
+    try:
+        import markdown
+
+        html = markdown.markdown(
+            text, extensions=["extra", "sane_lists", "smarty", "tables", "toc"]
+        )
+    except Exception:
+        html = (
+            text.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace("\n", "<br>")
+        )
+    try:
+        import bleach
+
+        allowed = set(bleach.sanitizer.ALLOWED_TAGS) | {
+            "p",
+            "pre",
+            "code",
+            "h1",
+            "h2",
+            "h3",
+            "h4",
+            "ul",
+            "ol",
+            "li",
+            "hr",
+            "br",
+            "blockquote",
+            "strong",
+            "em",
+            "table",
+            "thead",
+            "tbody",
+            "tr",
+            "th",
+            "td",
+            "a",
+        }
+        html = bleach.clean(
+            html,
+            tags=allowed,
+            attributes={"a": ["href", "title", "rel", "target"]},
+            strip=True,
+        )
+        html = html.replace("<a ", '<a target="_blank" rel="noopener nofollow" ')
+    except Exception:
+        pass
+    return html
+
+
+# ---------------------------------------------------------------------
+# Stored HTML
+# ---------------------------------------------------------------------
+def store_html(page: PortfolioPage, *, touch: bool = True) -> str:
+    """Render content_md into content_html (caller commits)."""
+    html = md_to_html(page.content_md)
+    page.content_html = html
+    page.html_version = PORTFOLIO_HTML_VERSION
+    if touch or page.updated_at is None:
+        page.updated_at = datetime.utcnow()
+    return html
+
+
+def page_html(page: PortfolioPage) -> str:
+    """Stored HTML if current; otherwise render and store it (best effort)."""
+    if page.html_version == PORTFOLIO_HTML_VERSION and page.content_html is not None:
+        return page.content_html
+
+    # same content, newer renderer: keep updated_at so client ETags stay valid
+    html = store_html(page, touch=False)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+    return html
+
+
+def last_modified(page) -> datetime:
+    return page.updated_at or page.created_at or datetime(1970, 1, 1)
+
+
+def page_etag(page, tag: str = "") -> str:
+    key = f"{page.id}:{last_modified(page).isoformat()}:{PORTFOLIO_HTML_VERSION}:{tag}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:32]
+
+
+# ---------------------------------------------------------------------
+# Response cache (per process)
+# ---------------------------------------------------------------------
+@dataclass(frozen=True)
+class CachedView:
+    body: bytes
+    etag: str
+    last_modified: datetime
+    expires: float
+
+
+_view_cache: "OrderedDict[int, CachedView]" = OrderedDict()
+_view_lock = threading.Lock()
+
+
+def cached_view(page_id: int) -> Optional[CachedView]:
+    with _view_lock:
+        hit = _view_cache.get(page_id)
+        if hit is None:
+            return None
+        if hit.expires <= time.monotonic():
+            _view_cache.pop(page_id, None)
+            return None
+        _view_cache.move_to_end(page_id)
+        return hit
+
+
+def remember_view(page_id: int, body: bytes, etag: str, modified: datetime) -> None:
+    if PORTFOLIO_VIEW_CACHE_SIZE <= 0 or PORTFOLIO_VIEW_CACHE_TTL <= 0:
+        return
+    entry = CachedView(body, etag, modified, time.monotonic() + PORTFOLIO_VIEW_CACHE_TTL)
+    with _view_lock:
+        _view_cache[page_id] = entry
+        _view_cache.move_to_end(page_id)
+        while len(_view_cache) > PORTFOLIO_VIEW_CACHE_SIZE:
+            _view_cache.popitem(last=False)
+
+
+def invalidate(page_id: Optional[int] = None) -> None:
+    """Drop one page (or all) from this process's response cache."""
+    with _view_lock:
+        if page_id is None:
+            _view_cache.clear()
+        else:
+            _view_cache.pop(page_id, None)
@@ -1,4 +1,3 @@
-import json
 import os
 import uuid
 from datetime import datetime
@@ -8,6 +7,7 @@ from flask import (
     abort,
     current_app,
     flash,
+    make_response,
     redirect,
     render_template,
     request,
@@ -15,12 +15,17 @@ from flask import (
 )
 from flask_login import current_user, login_required
 from sqlalchemy import case, inspect, text
+from sqlalchemy.orm import undefer
+from werkzeug.http import is_resource_modified
 
 from models import PortfolioPage, Project, UserProfile, PortfolioIdeaRun, db
-from modules.common.ai import generate_project_suggestions  # AI entrypoint
+from modules.ai_jobs import engine as ai_jobs
+from modules.ai_jobs.engine import AIJobError
+from modules.portfolio import render as page_render
+from modules.portfolio.render import md_to_html as _md_to_html
 
 # Phase 4: central credits engine
-from modules.credits.engine import can_afford, deduct_free, deduct_pro, refund  # ✅ add refund
+from modules.credits.engine import can_afford, deduct_pro, refund
 
 portfolio_bp = Blueprint(
     "portfolio", __name__, template_folder="../../templates/portfolio"
@@ -294,61 +299,6 @@ def _preflight_portfolio_schema():
         return "Schema preflight failed. See server logs."
 
 
-def _md_to_html(md_text: str) -> str:
-    text = md_text or ""
-    html = text
-    try:
-        import markdown
-
-        html = markdown.markdown(
-            text, extensions=["extra", "sane_lists", "smarty", "tables", "toc"]
-        )
-    except Exception:
-        html = (
-            text.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace("\n", "<br>")
-        )
-    try:
-        import bleach
-
-        allowed = set(bleach.sanitizer.ALLOWED_TAGS) | {
-            "p",
-            "pre",
-            "code",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "ul",
-            "ol",
-            "li",
-            "hr",
-            "br",
-            "blockquote",
-            "strong",
-            "em",
-            "table",
-            "thead",
-            "tbody",
-            "tr",
-            "th",
-            "td",
-            "a",
-        }
-        html = bleach.clean(
-            html,
-            tags=allowed,
-            attributes={"a": ["href", "title", "rel", "target"]},
-            strip=True,
-        )
-        html = html.replace("<a ", '<a target="_blank" rel="noopener nofollow" ')
-    except Exception:
-        pass
-    return html
-
-
 # ---------------------------
 # Routes
 # ---------------------------
@@ -375,6 +325,27 @@ def index():
     )
 
 
+def _start_ideas_job(feature_key: str, currency: str, args: dict, ctx: dict):
+    """Reserve credits and queue the suggestions run (modules/ai_jobs)."""
+    try:
+        job = ai_jobs.start(
+            current_user,
+            "portfolio_ideas",
+            feature_key=feature_key,
+            currency=currency,
+            args=args,
+        )
+    except AIJobError as e:
+        current_app.logger.warning("Portfolio wizard: job could not start: %s", e)
+        flash(
+            "We couldn’t start generating suggestions right now. No credits were used. "
+            "Please try again.",
+            "danger",
+        )
+        return render_template("portfolio/wizard.html", **ctx)
+    return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+
 @portfolio_bp.route("/wizard", methods=["GET", "POST"], endpoint="wizard")
 @login_required
 def wizard():
@@ -433,77 +404,17 @@ def wizard():
                 )
                 return redirect(url_for("billing.index"))
 
-            # ✅ Deduct BEFORE AI (hard gate)
-            run_id = f"pf_idea_free_{current_user.id}_{uuid.uuid4().hex[:8]}"
-            try:
-                if not deduct_free(current_user, "portfolio_idea_free", run_id=run_id):
-                    flash(
-                        "We couldn’t deduct your Silver 🪙 credits right now. Please try again.",
-                        "danger",
-                    )
-                    return render_template("portfolio/wizard.html", **ctx)
-            except Exception:
-                current_app.logger.exception("Portfolio wizard free: deduct_free failed.")
-                flash(
-                    "We couldn’t process your credits right now. Please try again.",
-                    "danger",
-                )
-                return render_template("portfolio/wizard.html", **ctx)
-
-            skills_list = (prof.skills if prof else []) or []
-            try:
-                ideas, used_live = generate_project_suggestions(
-                    trg, ind, lvl, skills_list, False, return_source=True
-                )
-            except Exception:
-                current_app.logger.exception("Portfolio wizard free: AI generation failed.")
-                try:
-                    refund(current_user, "portfolio_idea_free", currency="silver", run_id=run_id)
-                except Exception:
-                    current_app.logger.exception("Portfolio wizard free: refund failed after AI error.")
-                flash(
-                    "We couldn’t generate suggestions right now. Your Silver 🪙 credits were refunded.",
-                    "danger",
-                )
-                return render_template("portfolio/wizard.html", **ctx)
-
-            # Store run in history
-            try:
-                run = PortfolioIdeaRun(
-                    user_id=current_user.id,
-                    mode="free",
-                    target_role=trg,
-                    industry=ind,
-                    experience_level=lvl,
-                    focus_area=[],
-                    time_budget=None,
-                    preferred_stack=[],
-                    suggestions_json=json.dumps(ideas or []),
-                )
-                db.session.add(run)
-                db.session.commit()
-            except Exception as e:
-                current_app.logger.exception(
-                    "Portfolio wizard free: failed to store history: %s", e
-                )
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-                # ✅ If you consider history persistence required, refund here.
-                # Keeping behavior same: do not block user if history fails.
-
-            ctx.update(
+            return _start_ideas_job(
+                "portfolio_idea_free",
+                "silver",
                 {
+                    "mode": "free",
                     "target_role": trg,
                     "industry": ind,
                     "experience_level": lvl,
-                    "free_suggestions": ideas,
-                    "mode": "free",
-                }
+                },
+                ctx,
             )
-            flash("Free AI suggestion generated.", "success" if used_live else "warning")
-            return render_template("portfolio/wizard.html", **ctx)
 
         # ---- PRO MODE (Gold ⭐, 3 deep ideas) ----
         if action == "suggest_pro":
@@ -532,23 +443,6 @@ def wizard():
                 )
                 return redirect(url_for("billing.index"))
 
-            # ✅ Deduct BEFORE AI (hard gate)
-            run_id = f"pf_idea_pro_{current_user.id}_{uuid.uuid4().hex[:8]}"
-            try:
-                if not deduct_pro(current_user, "portfolio_idea_pro", run_id=run_id):
-                    flash(
-                        "We couldn’t deduct your Gold ⭐ credits right now. Please try again.",
-                        "danger",
-                    )
-                    return render_template("portfolio/wizard.html", **ctx)
-            except Exception:
-                current_app.logger.exception("Portfolio wizard pro: deduct_pro failed.")
-                flash(
-                    "We couldn’t process your credits right now. Please try again.",
-                    "danger",
-                )
-                return render_template("portfolio/wizard.html", **ctx)
-
             # Focus (with 'Other') + time budget + preferred stack
             focus_area = request.form.getlist("focus_area")
             other_focus = (request.form.get("focus_other") or "").strip()[:60]
@@ -568,85 +462,21 @@ def wizard():
                     if p.strip()
                 ]
 
-            use_profile = request.form.get("use_profile") == "1"
-
-            skills_list = (prof.skills if prof else []) or []
-            profile_payload = None
-            if use_profile and prof:
-                profile_payload = {
-                    "full_name": prof.full_name,
-                    "headline": prof.headline,
-                    "summary": prof.summary,
-                    "links": prof.links,
-                    "skills": prof.skills,
-                    "education": prof.education,
-                    "experience": prof.experience,
-                    "certifications": prof.certifications,
-                    # Preferences for deeper tailoring
-                    "preferences": {
-                        "focus_area": focus_area,
-                        "time_budget": time_budget,
-                        "preferred_stack": preferred_stack,
-                    },
-                }
-
-            try:
-                ideas, used_live = generate_project_suggestions(
-                    trg,
-                    ind,
-                    lvl,
-                    skills_list,
-                    True,
-                    return_source=True,
-                    profile_json=profile_payload,
-                )
-            except Exception:
-                current_app.logger.exception("Portfolio wizard pro: AI generation failed.")
-                try:
-                    refund(current_user, "portfolio_idea_pro", currency="gold", run_id=run_id)
-                except Exception:
-                    current_app.logger.exception("Portfolio wizard pro: refund failed after AI error.")
-                flash(
-                    "We couldn’t generate Pro suggestions right now. Your Gold ⭐ credits were refunded.",
-                    "danger",
-                )
-                return render_template("portfolio/wizard.html", **ctx)
-
-            # Store run in history
-            try:
-                run = PortfolioIdeaRun(
-                    user_id=current_user.id,
-                    mode="pro",
-                    target_role=trg,
-                    industry=ind,
-                    experience_level=lvl,
-                    focus_area=focus_area,
-                    time_budget=time_budget,
-                    preferred_stack=preferred_stack,
-                    suggestions_json=json.dumps(ideas or []),
-                )
-                db.session.add(run)
-                db.session.commit()
-            except Exception as e:
-                current_app.logger.exception(
-                    "Portfolio wizard pro: failed to store history: %s", e
-                )
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
-
-            ctx.update(
+            return _start_ideas_job(
+                "portfolio_idea_pro",
+                "gold",
                 {
+                    "mode": "pro",
                     "target_role": trg,
                     "industry": ind,
                     "experience_level": lvl,
-                    "pro_suggestions": ideas,
-                    "mode": "pro",
-                }
+                    "focus_area": focus_area,
+                    "time_budget": time_budget,
+                    "preferred_stack": preferred_stack,
+                    "use_profile": request.form.get("use_profile") == "1",
+                },
+                ctx,
             )
-            flash("Pro AI suggestions generated.", "success" if used_live else "warning")
-            return render_template("portfolio/wizard.html", **ctx)
 
         # Unknown/empty action → just show page again
         return render_template("portfolio/wizard.html", **ctx)
@@ -658,6 +488,36 @@ def wizard():
         return render_template("portfolio/wizard.html", **ctx)
 
 
+@portfolio_bp.route("/wizard/job/<int:job_id>", methods=["GET"], endpoint="wizard_result")
+@login_required
+def wizard_result(job_id: int):
+    """Wizard with the suggestions of a finished background run."""
+    job = ai_jobs.get_for_user(job_id, current_user.id)
+    if job is None or job.kind != "portfolio_ideas":
+        abort(404)
+    if job.status != "completed":
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+    result = job.result
+    mode = result.get("mode") or "free"
+    ideas = result.get("ideas") or []
+    ctx = {
+        "target_role": result.get("target_role") or "",
+        "industry": result.get("industry") or "",
+        "experience_level": result.get("experience_level") or "",
+        "mode": mode,
+        "free_suggestions": ideas if mode == "free" else [],
+        "pro_suggestions": ideas if mode == "pro" else [],
+        "prof": _get_profile_safe(),
+        "updated_tag": CAREER_AI_VERSION,
+    }
+    flash(
+        "Pro AI suggestions generated." if mode == "pro" else "Free AI suggestion generated.",
+        "success" if result.get("used_live_ai") else "warning",
+    )
+    return render_template("portfolio/wizard.html", **ctx)
+
+
 @portfolio_bp.route("/publish", methods=["GET", "POST"], endpoint="publish")
 @login_required
 def publish():
@@ -782,9 +642,11 @@ def publish():
                 "career_ai_version": CAREER_AI_VERSION,
             },
         )
+        page_render.store_html(page)
         db.session.add(page)
         db.session.flush()
         db.session.commit()
+        page_render.invalidate(page.id)
 
         # ✅ Success: nothing else needed (we already deducted before work)
         flash(
@@ -845,26 +707,57 @@ def preview():
     )
 
 
+def _public_response(body: bytes, etag: str, modified: datetime):
+    resp = make_response(body)
+    resp.set_etag(etag)
+    resp.last_modified = modified
+    resp.cache_control.public = True
+    resp.cache_control.max_age = page_render.PORTFOLIO_PUBLIC_MAX_AGE
+    return resp.make_conditional(request)
+
+
 @portfolio_bp.route("/view/<int:page_id>", methods=["GET"], endpoint="view")
 def view(page_id):
-    """Public view for published pages (minimal public chrome, Markdown rendered)."""
-    page = PortfolioPage.query.get_or_404(page_id)
-    if not page.is_public:
-        abort(404)
-    try:
-        rendered = _md_to_html(page.content_md)
-        return render_template(
-            "public_view.html",
-            page=page,
-            page_html=rendered,
-            updated_tag=CAREER_AI_VERSION,
-        )
-    except Exception as e:
-        current_app.logger.exception("Public portfolio render failed: %s", e)
-        rendered = _md_to_html(page.content_md)
-        return render_template(
-            "view.html", page=page, page_html=rendered, updated_tag=CAREER_AI_VERSION
+    """
+    Public view for published pages (minimal public chrome, Markdown rendered).
+    Served from the response cache / stored HTML; see modules/portfolio/render.py.
+    """
+    hit = page_render.cached_view(page_id)
+    if hit is not None:
+        return _public_response(hit.body, hit.etag, hit.last_modified)
+
+    # Metadata only: revalidations end here with a 304
+    meta = (
+        db.session.query(
+            PortfolioPage.id,
+            PortfolioPage.is_public,
+            PortfolioPage.created_at,
+            PortfolioPage.updated_at,
         )
+        .filter(PortfolioPage.id == page_id)
+        .first()
+    )
+    if meta is None or not meta.is_public:
+        abort(404)
+    etag = page_render.page_etag(meta, CAREER_AI_VERSION)
+    modified = page_render.last_modified(meta)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        return _public_response(b"", etag, modified)  # -> 304
+
+    page = (
+        PortfolioPage.query.options(undefer(PortfolioPage.content_html))
+        .filter_by(id=page_id)
+        .first_or_404()
+    )
+    rendered = page_render.page_html(page)
+    body = render_template(
+        "public_view.html",
+        page=page,
+        page_html=rendered,
+        updated_tag=CAREER_AI_VERSION,
+    ).encode("utf-8")
+    page_render.remember_view(page_id, body, etag, modified)
+    return _public_response(body, etag, modified)
 
 
 @portfolio_bp.route("/history", methods=["GET"], endpoint="history")
@@ -886,19 +779,8 @@ def history():
             pass
         runs = []
 
-    history_rows = []
-    for r in runs:
-        titles = []
-        try:
-            payload = json.loads(r.suggestions_json or "[]")
-            if isinstance(payload, list):
-                for it in payload[:3]:
-                    if isinstance(it, dict) and it.get("title"):
-                        titles.append(str(it["title"])[:120])
-        except Exception:
-            pass
-
-        history_rows.append({"run": r, "titles": titles})
+    # idea_titles is written with the run, so suggestions_json (deferred) is never loaded here
+    history_rows = [{"run": r, "titles": list(r.idea_titles or [])} for r in runs]
 
     return render_template(
         "portfolio/history.html",
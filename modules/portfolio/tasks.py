@@ -0,0 +1,94 @@
+# modules/portfolio/tasks.py
+"""
+Background handler for Portfolio wizard suggestions (AIJob kind
+"portfolio_ideas").
+
+Runs in the RQ worker through modules.ai_jobs.engine.execute(); the
+credits were reserved by the wizard route and are refunded by the engine
+if this raises.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+from models import AIJob, PortfolioIdeaRun, User, UserProfile, db
+from modules.common.ai import generate_project_suggestions
+
+
+def run_project_suggestions(job: AIJob, user: User) -> Dict[str, Any]:
+    args = job.args
+    is_pro = args.get("mode") == "pro"
+    trg = args.get("target_role") or ""
+    ind = args.get("industry") or ""
+    lvl = args.get("experience_level") or ""
+    focus_area = args.get("focus_area") or []
+    time_budget = args.get("time_budget")
+    preferred_stack = args.get("preferred_stack") or []
+
+    prof = UserProfile.query.filter_by(user_id=user.id).first()
+    skills_list = (prof.skills if prof else []) or []
+
+    if is_pro:
+        profile_payload = None
+        if args.get("use_profile") and prof:
+            profile_payload = {
+                "full_name": prof.full_name,
+                "headline": prof.headline,
+                "summary": prof.summary,
+                "links": prof.links,
+                "skills": prof.skills,
+                "education": prof.education,
+                "experience": prof.experience,
+                "certifications": prof.certifications,
+                # Preferences for deeper tailoring
+                "preferences": {
+                    "focus_area": focus_area,
+                    "time_budget": time_budget,
+                    "preferred_stack": preferred_stack,
+                },
+            }
+        ideas, used_live = generate_project_suggestions(
+            trg,
+            ind,
+            lvl,
+            skills_list,
+            True,
+            return_source=True,
+            profile_json=profile_payload,
+        )
+    else:
+        ideas, used_live = generate_project_suggestions(
+            trg, ind, lvl, skills_list, False, return_source=True
+        )
+
+    # Store run in history
+    run = PortfolioIdeaRun(
+        user_id=user.id,
+        mode="pro" if is_pro else "free",
+        target_role=trg,
+        industry=ind,
+        experience_level=lvl,
+        focus_area=focus_area if is_pro else [],
+        time_budget=time_budget if is_pro else None,
+        preferred_stack=preferred_stack if is_pro else [],
+        suggestions_json=json.dumps(ideas or []),
+        idea_titles=[
+            str(it["title"])[:120]
+            for it in (ideas or [])[:3]
+            if isinstance(it, dict) and it.get("title")
+        ],
+    )
+    db.session.add(run)
+    db.session.flush()
+    job.record_id = run.id
+
+    return {
+        "mode": "pro" if is_pro else "free",
+        "ideas": ideas or [],
+        "used_live_ai": bool(used_live),
+        "target_role": trg,
+        "industry": ind,
+        "experience_level": lvl,
+    }
@@ -3,13 +3,23 @@ from __future__ import annotations
 
 import os
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required
 
-from modules.common.ai import generate_referral_messages  # AI-only
+from modules.ai_jobs import engine as ai_jobs
+from modules.ai_jobs.engine import AIJobError
 
 # Phase 4: central credits engine
-from modules.credits.engine import can_afford, deduct_free
+from modules.credits.engine import can_afford
 
 referral_bp = Blueprint(
     "referral", __name__, template_folder="../../templates/referral"
@@ -29,7 +39,9 @@ def index():
     Referral Trainer — simple, single-mode feature.
 
     Current behavior:
-      - Uses Silver (🪙) credits via central credits engine.
+      - Uses Silver (🪙) credits via central credits engine, reserved
+        before the run and refunded if generation fails.
+      - Runs as a background AI job; the result opens at job_result.
       - Generates 2–3 short scripts students can lightly edit:
         warm, cold, and follow-up outreach.
 
@@ -61,7 +73,7 @@ def index():
             "job_description": (request.form.get("job_description") or "").strip(),
         }
 
-        # Silver credit check BEFORE AI
+        # Silver credit check, then reserve + queue (modules/ai_jobs)
         if not can_afford(current_user, FEATURE_KEY, currency="silver"):
             flash(
                 "Not enough Silver 🪙 credits for Referral Trainer. "
@@ -71,36 +83,23 @@ def index():
             return redirect(url_for("billing.index"))
 
         try:
-            msgs, used_live_ai = generate_referral_messages(
-                contact, profile, return_source=True
+            job = ai_jobs.start(
+                current_user,
+                "referral",
+                feature_key=FEATURE_KEY,
+                currency="silver",
+                args={"contact": contact, "profile": profile},
+            )
+        except AIJobError as e:
+            current_app.logger.warning("Referral Trainer could not start: %s", e)
+            flash(
+                "We couldn't start generating your templates. No credits were used. "
+                "Please try again.",
+                "danger",
             )
+            return redirect(url_for("referral.index"))
 
-            # Deduct Silver 🪙 AFTER successful AI
-            try:
-                if not deduct_free(current_user, FEATURE_KEY, run_id=None):
-                    # Soft failure: user still gets messages, but credits may not have updated.
-                    flash(
-                        "Your outreach templates were generated, but we had trouble "
-                        "updating your credits. Please contact support if this keeps happening.",
-                        "warning",
-                    )
-            except Exception as e:
-                # Log but don't break UX
-                from flask import current_app
-
-                current_app.logger.exception(
-                    "Referral Trainer credit deduction error: %s", e
-                )
-                flash(
-                    "Your outreach templates were generated, but we had trouble "
-                    "updating your credits. Please contact support if this keeps happening.",
-                    "warning",
-                )
-
-        except Exception as e:
-            err = f"ERROR: {e}"
-            msgs = {"warm": err, "cold": err, "follow": err}
-            used_live_ai = False
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
 
     return render_template(
         "referral/index.html",
@@ -108,3 +107,22 @@ def index():
         used_live_ai=used_live_ai,
         updated_tag=CAREER_AI_VERSION,
     )
+
+
+@referral_bp.route("/job/<int:job_id>", methods=["GET"], endpoint="job_result")
+@login_required
+def job_result(job_id: int):
+    """Templates from a finished background run (target of the waiting page)."""
+    job = ai_jobs.get_for_user(job_id, current_user.id)
+    if job is None or job.kind != "referral":
+        abort(404)
+    if job.status != "completed":
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+    result = job.result
+    return render_template(
+        "referral/index.html",
+        msgs=result.get("msgs") or {},
+        used_live_ai=bool(result.get("used_live_ai")),
+        updated_tag=CAREER_AI_VERSION,
+    )
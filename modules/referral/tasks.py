@@ -0,0 +1,23 @@
+# modules/referral/tasks.py
+"""
+Background handler for Referral Trainer runs (AIJob kind "referral").
+
+Runs in the RQ worker through modules.ai_jobs.engine.execute(); the
+Silver 🪙 cost was reserved by the route and is refunded by the engine if
+this raises.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from models import AIJob, User
+from modules.common.ai import generate_referral_messages
+
+
+def run_referral_messages(job: AIJob, user: User) -> Dict[str, Any]:
+    args = job.args
+    msgs, used_live_ai = generate_referral_messages(
+        args.get("contact") or {}, args.get("profile") or {}, return_source=True
+    )
+    return {"msgs": msgs or {}, "used_live_ai": bool(used_live_ai)}
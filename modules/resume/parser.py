@@ -1,16 +1,27 @@
 # modules/resume/parser.py
 
-import json
 import logging
 import os
 from typing import Any, Dict, Optional
 
 from openai import OpenAI
 
+from modules.common.llm import layout_messages
+from modules.common.prompt_budget import compact_text, fit_to_tokens
+from modules.common.structured import (
+    StructuredOutputError,
+    record_fallback,
+    structured_completion,
+    structured_schema,
+)
+
 logger = logging.getLogger(__name__)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Resume budget for the parse prompt (tokens; ~12k chars previously)
+PARSER_RESUME_TOKENS = int(os.getenv("PARSER_RESUME_TOKENS", "3000"))
+
 PROMPT_TEMPLATE = """
 You are a resume parser for a student/new-grad career platform called CareerAI.
 
@@ -96,6 +107,87 @@ Rules:
 - Use short, clean text, no emojis.
 """
 
+# JSON Schema for the structure above (converted once for structured output).
+PARSED_RESUME_JSON_SCHEMA = r"""
+{
+  "type": "object",
+  "additionalProperties": false,
+  "required": ["full_name","headline","summary","location","phone","links","skills","education","certifications","experience"],
+  "properties": {
+    "full_name": {"type": ["string","null"]},
+    "headline": {"type": ["string","null"]},
+    "summary": {"type": ["string","null"]},
+    "location": {"type": ["string","null"]},
+    "phone": {"type": ["string","null"]},
+    "links": {
+      "type": "object",
+      "additionalProperties": false,
+      "required": ["email","website","linkedin","github"],
+      "properties": {
+        "email": {"type": ["string","null"]},
+        "website": {"type": ["string","null"]},
+        "linkedin": {"type": ["string","null"]},
+        "github": {"type": ["string","null"]}
+      }
+    },
+    "skills": {
+      "type": "array",
+      "items": {
+        "type": "object",
+        "additionalProperties": false,
+        "required": ["name","level"],
+        "properties": {
+          "name": {"type": "string"},
+          "level": {"type": "integer","minimum": 1,"maximum": 5}
+        }
+      }
+    },
+    "education": {
+      "type": "array",
+      "items": {
+        "type": "object",
+        "additionalProperties": false,
+        "required": ["degree","school","year"],
+        "properties": {
+          "degree": {"type": ["string","null"]},
+          "school": {"type": ["string","null"]},
+          "year": {"type": ["string","null"]}
+        }
+      }
+    },
+    "certifications": {
+      "type": "array",
+      "items": {
+        "type": "object",
+        "additionalProperties": false,
+        "required": ["name","year"],
+        "properties": {
+          "name": {"type": ["string","null"]},
+          "year": {"type": ["string","null"]}
+        }
+      }
+    },
+    "experience": {
+      "type": "array",
+      "items": {
+        "type": "object",
+        "additionalProperties": false,
+        "required": ["role","company","start","end","bullets"],
+        "properties": {
+          "role": {"type": ["string","null"]},
+          "company": {"type": ["string","null"]},
+          "start": {"type": ["string","null"]},
+          "end": {"type": ["string","null"]},
+          "bullets": {"type": "array","items": {"type": "string"}}
+        }
+      }
+    }
+  }
+}
+"""
+
+PARSED_RESUME_STRUCTURED = structured_schema("parsed_resume", PARSED_RESUME_JSON_SCHEMA)
+
 
 def parse_resume_to_profile(resume_text: str) -> Optional[Dict[str, Any]]:
     """
@@ -110,36 +202,33 @@ def parse_resume_to_profile(resume_text: str) -> Optional[Dict[str, Any]]:
     if not resume_text or not resume_text.strip():
         return None
 
-    prompt = PROMPT_TEMPLATE.format(resume_text=resume_text[:12000])  # safety truncation
+    resume_text = fit_to_tokens(compact_text(resume_text), PARSER_RESUME_TOKENS)
+    messages = layout_messages(
+        PROMPT_TEMPLATE,
+        system="You output ONLY valid JSON. No prose.",
+        static={},
+        dynamic={"resume_text": resume_text},
+    )
 
     try:
-        resp = client.chat.completions.create(
+        result = structured_completion(
+            "resume_parse",
+            PARSED_RESUME_STRUCTURED,
+            client=client,
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You output ONLY valid JSON. No prose."},
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.2,
             max_tokens=1200,
         )
+        # Schema violations are logged/counted by structured_completion;
+        # downstream profile mapping already tolerates partial data.
+        return result.data
 
-        raw_text = resp.choices[0].message.content or ""
-        raw = raw_text.strip()
-
-        # Strip ```json ... ``` if the model wraps it
-        if raw.startswith("```"):
-            raw = raw.strip("`")
-            if raw.lower().startswith("json"):
-                raw = raw[4:].strip()
-
-        data = json.loads(raw)
-
-        if not isinstance(data, dict):
-            logger.warning("parse_resume_to_profile: JSON is not an object")
-            return None
-
-        return data
-
-    except Exception:
+    except StructuredOutputError as e:
+        logger.warning("parse_resume_to_profile: unusable model output (%s)", e)
+        record_fallback("resume_parse", str(e))
+        return None
+    except Exception as e:
         logger.exception("parse_resume_to_profile: OpenAI call failed")
+        record_fallback("resume_parse", str(e))
         return None
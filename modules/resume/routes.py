@@ -7,6 +7,8 @@ from flask_login import current_user, login_required
 from helpers import ai_resume_critique, extract_text_from_file
 from limits import can_use_free, can_use_pro, consume_free, consume_pro
 from models import ResumeAsset, db
+from modules.common.profile_loader import set_current_resume
+from modules.resume.utils import file_digest
 
 resume_bp = Blueprint("resume", __name__, template_folder="../../templates/resume")
 ALLOWED = {".pdf", ".docx", ".txt"}
@@ -40,11 +42,23 @@ def index():
                     updir, str(uuid.uuid4()) + os.path.splitext(f.filename)[1].lower()
                 )
                 f.save(path)
-                text = extract_text_from_file(path)
-                asset = ResumeAsset(
-                    user_id=current_user.id, filename=f.filename, text=text
-                )
-                db.session.add(asset)
+                with open(path, "rb") as fh:
+                    digest = file_digest(fh.read())
+                asset = ResumeAsset.query.filter_by(
+                    user_id=current_user.id, content_hash=digest
+                ).first()
+                if asset and asset.text:
+                    text = asset.text
+                else:
+                    text = extract_text_from_file(path)
+                    asset = ResumeAsset(
+                        user_id=current_user.id,
+                        filename=f.filename,
+                        text=text,
+                        content_hash=digest,
+                    )
+                    db.session.add(asset)
+                set_current_resume(current_user, asset)
                 db.session.commit()
         if not text:
             flash("Provide resume text or upload a file.", "error")
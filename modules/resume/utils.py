@@ -1,9 +1,286 @@
 # modules/resume/utils.py
+"""
+Bounded resume text extraction.
 
+PDF/DOCX parsing is pure-Python and CPU-bound; a single scanned or
+pathological file can pin a web worker for tens of seconds. Extraction
+therefore runs in a small process pool with:
+
+- a wall-clock budget per document (the worker is recycled on timeout),
+- a page budget (resumes are 1–3 pages; we never read past N pages),
+- an early stop once enough text for any downstream prompt is collected,
+- an in-process LRU cache keyed on the SHA-256 digest of the file bytes,
+  so re-uploading the same resume never re-parses it.
+
+Everything is env-tunable and degrades to inline extraction (still page-
+and char-bounded) if a process pool cannot be started.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Optional
+from typing import Optional, Tuple
+
+# Optional parsers (guarded)
+try:
+    from pypdf import PdfReader  # pypdf>=4
+except Exception:  # pragma: no cover
+    try:
+        from PyPDF2 import PdfReader  # type: ignore
+    except Exception:  # pragma: no cover
+        PdfReader = None  # type: ignore
+
+try:
+    from docx import Document  # pip install python-docx
+except Exception:  # pragma: no cover
+    Document = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Budgets (env-tunable)
+EXTRACT_MAX_PAGES = int(os.getenv("RESUME_EXTRACT_MAX_PAGES", "8"))
+EXTRACT_MAX_CHARS = int(os.getenv("RESUME_EXTRACT_MAX_CHARS", "20000"))
+EXTRACT_TIMEOUT_SECS = float(os.getenv("RESUME_EXTRACT_TIMEOUT_SECS", "10"))
+EXTRACT_WORKERS = int(os.getenv("RESUME_EXTRACT_WORKERS", "2"))
+EXTRACT_CACHE_SIZE = int(os.getenv("RESUME_EXTRACT_CACHE_SIZE", "128"))
+# "spawn" keeps the pool independent of gunicorn/RQ fork state; set to
+# "off" to always extract inline (e.g. in constrained containers).
+EXTRACT_START_METHOD = (os.getenv("RESUME_EXTRACT_START_METHOD", "spawn") or "").lower()
+
+
+# ---------------------------------------------------------------------
+# Digest + cache
+# ---------------------------------------------------------------------
+
+
+def file_digest(data: bytes) -> str:
+    """SHA-256 hex digest of raw file bytes (used as cache / dedupe key)."""
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key: str) -> Optional[str]:
+    with _cache_lock:
+        if key not in _cache:
+            return None
+        _cache.move_to_end(key)
+        return _cache[key]
+
 
-from pypdf import PdfReader  # make sure pypdf is in requirements.txt
+def _cache_put(key: str, text: str) -> None:
+    if EXTRACT_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = text
+        _cache.move_to_end(key)
+        while len(_cache) > EXTRACT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+# ---------------------------------------------------------------------
+# Worker-side extraction (top-level so it is picklable)
+# ---------------------------------------------------------------------
+
+
+def _extract_pdf_bytes(data: bytes, max_pages: int, max_chars: int) -> str:
+    if PdfReader is None:
+        return ""
+    reader = PdfReader(BytesIO(data))
+    texts = []
+    collected = 0
+    for idx, page in enumerate(reader.pages):
+        if max_pages and idx >= max_pages:
+            break
+        try:
+            page_text = page.extract_text() or ""
+        except Exception:
+            # Skip pages that fail to parse
+            continue
+        if page_text:
+            texts.append(page_text)
+            collected += len(page_text)
+        if max_chars and collected >= max_chars:
+            # Enough text for any downstream prompt; stop early.
+            break
+    return "\n".join(texts)
+
+
+def _extract_docx_bytes(data: bytes, max_chars: int) -> str:
+    if Document is None:
+        return ""
+    doc = Document(BytesIO(data))
+    parts = []
+    collected = 0
+    for par in doc.paragraphs:
+        t = par.text or ""
+        parts.append(t)
+        collected += len(t) + 1
+        if max_chars and collected >= max_chars:
+            break
+    return "\n".join(parts)
+
+
+def _extract_worker(data: bytes, kind: str, max_pages: int, max_chars: int) -> str:
+    if kind == "pdf":
+        text = _extract_pdf_bytes(data, max_pages, max_chars)
+    elif kind == "docx":
+        text = _extract_docx_bytes(data, max_chars)
+    else:
+        text = data.decode("utf-8", errors="ignore")
+    text = (text or "").strip()
+    if max_chars:
+        text = text[:max_chars]
+    return text
+
+
+# ---------------------------------------------------------------------
+# Process pool (lazy, per-process, recycled on timeout)
+# ---------------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool, _pool_pid
+    if EXTRACT_START_METHOD in ("off", "none", "inline") or EXTRACT_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        # A pool inherited across fork (gunicorn preload / RQ work-horse) is unusable.
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        try:
+            ctx = multiprocessing.get_context(EXTRACT_START_METHOD)
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=ctx)
+            _pool_pid = os.getpid()
+        except Exception as e:
+            logger.warning("Resume extract pool unavailable (%s); extracting inline.", e)
+            _pool = None
+            _pool_pid = None
+        return _pool
+
+
+def _recycle_pool(expected: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Tear down the pool so a stuck parse cannot hold a worker slot.
+    With `expected`, only if that pool is still the current one (a newer
+    pool created after it broke is left alone).
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if expected is not None and _pool is not expected:
+            return
+        pool, _pool, _pool_pid = _pool, None, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor cannot cancel a running task; terminate its
+    # processes directly, then release the executor without waiting.
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            proc.terminate()
+        except Exception:
+            pass
+    try:
+        pool.shutdown(wait=False, cancel_futures=True)
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------
+
+
+def _kind_for(filename: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".docx"):
+        return "docx"
+    return "txt"
+
+
+def extract_text_from_bytes(
+    data: bytes,
+    kind: str = "pdf",
+    *,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[Optional[str], str]:
+    """
+    Extract text from raw file bytes within the configured budgets.
+
+    Returns (text_or_None, sha256_digest). Results are cached by digest,
+    so identical uploads are parsed at most once per process.
+    """
+    digest = file_digest(data)
+    if not data:
+        return None, digest
+
+    max_pages = EXTRACT_MAX_PAGES if max_pages is None else max_pages
+    max_chars = EXTRACT_MAX_CHARS if max_chars is None else max_chars
+    timeout = EXTRACT_TIMEOUT_SECS if timeout is None else timeout
+
+    cache_key = f"{digest}:{kind}:{max_pages}:{max_chars}"
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return (cached or None), digest
+
+    text = ""
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            future = pool.submit(_extract_worker, data, kind, max_pages, max_chars)
+            text = future.result(timeout=timeout)
+        except FuturesTimeout:
+            logger.warning(
+                "Resume extract timed out after %.1fs (digest=%s, kind=%s, %d bytes)",
+                timeout, digest[:12], kind, len(data),
+            )
+            _recycle_pool(pool)
+            # Cache the miss so the same file does not burn another budget.
+            _cache_put(cache_key, "")
+            return None, digest
+        except BrokenProcessPool as e:
+            # A child crashed or was OOM-killed (possibly on this file), or the
+            # pool was recycled for another request's timeout. Never re-parse
+            # in the web process; the miss is not cached since it may not be
+            # this file's fault.
+            logger.warning(
+                "Resume extract pool broken (%s; digest=%s, kind=%s, %d bytes)",
+                e, digest[:12], kind, len(data),
+            )
+            _recycle_pool(pool)
+            return None, digest
+        except Exception as e:
+            logger.warning(
+                "Resume extract failed in pool (%s; digest=%s, kind=%s)", e, digest[:12], kind
+            )
+            _cache_put(cache_key, "")
+            return None, digest
+    else:
+        # Pool disabled (RESUME_EXTRACT_START_METHOD=inline / RESUME_EXTRACT_WORKERS=0)
+        # or could not be started
+        try:
+            text = _extract_worker(data, kind, max_pages, max_chars)
+        except Exception as e:
+            logger.warning("Resume extract failed inline (%s)", e)
+            text = ""
+
+    _cache_put(cache_key, text or "")
+    return (text or None), digest
 
 
 def extract_text_from_pdf(file_storage) -> Optional[str]:
@@ -11,28 +288,34 @@ def extract_text_from_pdf(file_storage) -> Optional[str]:
     Accepts a werkzeug FileStorage (from request.files['file']),
     returns extracted text or None on failure.
     """
+    text, _digest = extract_resume_upload(file_storage)
+    return text
+
+
+def extract_resume_upload(file_storage) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Like extract_text_from_pdf, but also returns the content digest so
+    callers can dedupe stored assets. Returns (text_or_None, digest_or_None).
+    """
     try:
         file_data = file_storage.read()
-        if not file_data:
-            return None
-
-        reader = PdfReader(BytesIO(file_data))
-        texts = []
-        for page in reader.pages:
-            try:
-                page_text = page.extract_text() or ""
-                texts.append(page_text)
-            except Exception:
-                # Skip pages that fail to parse
-                continue
-
-        text = "\n".join(t for t in texts if t)
         # Reset the stream pointer in case the caller needs to reuse it
         try:
             file_storage.stream.seek(0)
         except Exception:
             pass
-
-        return text.strip() or None
+        if not file_data:
+            return None, None
+        # Uploads are validated as PDF upstream; honour .docx if it ever slips through.
+        kind = "docx" if _kind_for(getattr(file_storage, "filename", "")) == "docx" else "pdf"
+        return extract_text_from_bytes(file_data, kind)
     except Exception:
-        return None
+        return None, None
+
+
+def extract_text_from_path(file_path: str) -> str:
+    """Bounded extraction for a file already on disk ("" on failure)."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    text, _digest = extract_text_from_bytes(data, _kind_for(file_path))
+    return text or ""
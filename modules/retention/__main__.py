@@ -0,0 +1,70 @@
+# modules/retention/__main__.py
+"""
+Command line for the retention engine (cron / ops).
+
+    python -m modules.retention status
+    python -m modules.retention run                      # cron, e.g. nightly
+    python -m modules.retention run --policy otp --policy jobpack
+    python -m modules.retention run --dry-run
+    python -m modules.retention run --archive-to file --max-seconds 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m modules.retention", description="Retention / archival")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("status", help="rows, eligible rows and archived rows per policy")
+
+    r = sub.add_parser("run", help="archive / delete cold rows")
+    r.add_argument("--policy", action="append", help="policy name (repeatable; default: all)")
+    r.add_argument("--dry-run", action="store_true", help="count only")
+    r.add_argument("--batch-size", type=int)
+    r.add_argument("--max-batches", type=int, help="per policy")
+    r.add_argument("--max-seconds", type=int, help="time budget for the whole run (0 = none)")
+    r.add_argument("--sleep-ms", type=int, help="pause between batches")
+    r.add_argument("--archive-to", choices=("table", "file"))
+
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from modules.jobpack.tasks import _load_flask_app
+
+    app = _load_flask_app()
+    with app.app_context():
+        from modules.retention import engine
+
+        if args.cmd == "status":
+            for row in engine.status():
+                print(json.dumps(row))
+            return 0
+
+        for name in args.policy or []:
+            try:
+                engine.get_policy(name)
+            except ValueError as e:
+                ap.error(str(e))
+        results = engine.run_all(
+            args.policy,
+            max_seconds=args.max_seconds,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            sleep_ms=args.sleep_ms,
+            archive_to=args.archive_to,
+            dry_run=args.dry_run,
+        )
+        for row in results:
+            print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
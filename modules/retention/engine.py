@@ -0,0 +1,342 @@
+# modules/retention/engine.py
+"""
+Retention for tables that otherwise grow forever.
+
+Each Policy names a table, the column that ages its rows and how long rows
+stay hot. Older rows are then either archived or deleted:
+
+    archive   copied as JSON (whole row, compressed) into archived_record,
+              or into gzip JSONL files under RETENTION_ARCHIVE_DIR
+              (RETENTION_ARCHIVE_TO=file), then deleted from the hot table
+    delete    dropped outright (OTP codes: secrets, nothing to keep)
+
+Rows move in batches of RETENTION_BATCH. Each batch is one short
+transaction: select ids, copy, delete, commit. On Postgres the ids are
+taken FOR UPDATE SKIP LOCKED, so a batch never waits on live traffic.
+A run sleeps RETENTION_SLEEP_MS between batches and stops after
+RETENTION_MAX_SECONDS. A stopped or crashed run loses nothing: moved rows
+are gone from the hot table, so the next run starts at the oldest row
+that is still eligible. Table archives are exactly-once (insert and delete
+commit together). File archives are at-least-once: a crash between
+writing the file and the commit writes that batch again next time, so
+readers should de-duplicate on (table, id).
+
+Days per policy come from RETENTION_<NAME>_DAYS (0 disables a policy).
+Each run also creates the upcoming monthly credit ledger partitions
+(modules/credits/ledger.py). Run it from cron
+(`python -m modules.retention run`) or enqueue it on the bulk queue
+(modules/retention/tasks.py).
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, delete, exists, func, insert, select
+
+from models import (
+    AdminActionLog,
+    ArchivedRecord,
+    CoachSavedPlan,
+    CreditTransaction,
+    DreamPlanSnapshot,
+    JobPackReport,
+    OTPRequest,
+    SkillMapSnapshot,
+    db,
+)
+from modules.credits import ledger
+
+logger = logging.getLogger("retention")
+
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "500"))
+RETENTION_SLEEP_MS = int(os.getenv("RETENTION_SLEEP_MS", "200"))
+RETENTION_MAX_SECONDS = int(os.getenv("RETENTION_MAX_SECONDS", "300"))
+# "table" (archived_record) or "file" (gzip JSONL under RETENTION_ARCHIVE_DIR)
+RETENTION_ARCHIVE_TO = os.getenv("RETENTION_ARCHIVE_TO", "table").strip().lower()
+RETENTION_ARCHIVE_DIR = Path(os.getenv("RETENTION_ARCHIVE_DIR", "instance/archive"))
+
+TERMINAL = ("completed", "failed")
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    model: Any
+    age_column: str
+    default_days: int
+    action: str = "archive"  # "archive" | "delete"
+    user_column: Optional[str] = "user_id"
+    # Only rows in these statuses (never in-flight runs)
+    statuses: Sequence[str] = ()
+    # Never move the newest row per group (what history pages open first)
+    keep_latest_per: Sequence[str] = ()
+    # Extra eligibility clauses: fn(table) -> list of SQL conditions
+    extra: Optional[Any] = field(default=None, compare=False)
+
+    @property
+    def days(self) -> int:
+        return int(os.getenv(f"RETENTION_{self.name.upper()}_DAYS", str(self.default_days)))
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+
+def _not_coach_plan_source(t) -> List[Any]:
+    # Coach saved plans point at their Dream snapshot
+    return [~exists().where(CoachSavedPlan.__table__.c.dream_snapshot_id == t.c.id)]
+
+
+POLICIES: Dict[str, Policy] = {
+    p.name: p
+    for p in (
+        Policy("otp", OTPRequest, "expires_at", 2, action="delete", user_column=None),
+        Policy(
+            "jobpack",
+            JobPackReport,
+            "created_at",
+            365,
+            statuses=TERMINAL,
+            keep_latest_per=("user_id",),
+        ),
+        Policy("skillmap", SkillMapSnapshot, "created_at", 365, keep_latest_per=("user_id",)),
+        Policy(
+            "dream",
+            DreamPlanSnapshot,
+            "created_at",
+            365,
+            statuses=TERMINAL,
+            keep_latest_per=("user_id", "path_type"),
+            extra=_not_coach_plan_source,
+        ),
+        Policy("admin_log", AdminActionLog, "created_at", 730, user_column="target_user_id"),
+        # Usage stats and admin totals read CreditDailyRollup, which keeps
+        # archived transactions counted.
+        Policy("credits", CreditTransaction, "created_at", 730, statuses=TERMINAL),
+    )
+}
+
+
+def get_policy(name: str) -> Policy:
+    try:
+        return POLICIES[name]
+    except KeyError:
+        raise ValueError(f"unknown retention policy {name!r} (known: {', '.join(POLICIES)})")
+
+
+def _eligible(policy: Policy, cutoff: datetime) -> List[Any]:
+    t = policy.table
+    conds = [t.c[policy.age_column] < cutoff]
+    if policy.statuses:
+        conds.append(t.c.status.in_(tuple(policy.statuses)))
+    if policy.keep_latest_per:
+        # eligible only if a newer (finished) row exists in the same group
+        newer = t.alias("newer")
+        same = [newer.c[c] == t.c[c] for c in policy.keep_latest_per]
+        if policy.statuses:
+            same.append(newer.c.status.in_(tuple(policy.statuses)))
+        conds.append(exists().where(and_(*same, newer.c.id > t.c.id)))
+    if policy.extra is not None:
+        conds.extend(policy.extra(t))
+    return conds
+
+
+def _is_pg() -> bool:
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+# ---------------------------------------------------------------------
+# Archive sinks
+# ---------------------------------------------------------------------
+def _row_json(row) -> str:
+    return json.dumps(dict(row), ensure_ascii=False, default=str)
+
+
+def _archive_to_table(policy: Policy, rows) -> None:
+    now = datetime.utcnow()
+    db.session.execute(
+        insert(ArchivedRecord.__table__),
+        [
+            {
+                "source_table": policy.table.name,
+                "source_id": row["id"],
+                "user_id": row[policy.user_column] if policy.user_column else None,
+                "created_at": row[policy.age_column],
+                "archived_at": now,
+                "payload": _row_json(row),
+            }
+            for row in rows
+        ],
+    )
+
+
+def _archive_to_file(policy: Policy, rows) -> Path:
+    name = policy.table.name
+    folder = RETENTION_ARCHIVE_DIR / name / datetime.utcnow().strftime("%Y-%m")
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{rows[0]['id']:010d}-{rows[-1]['id']:010d}.jsonl.gz"
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for row in rows:
+            fh.write(json.dumps({"table": name, "id": row["id"], "row": dict(row)}, ensure_ascii=False, default=str))
+            fh.write("\n")
+    with open(tmp, "rb") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)  # visible only once complete
+    return path
+
+
+# ---------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------
+def count_eligible(policy: Policy, *, now: Optional[datetime] = None) -> int:
+    if policy.days <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=policy.days)
+    t = policy.table
+    return int(db.session.execute(select(func.count()).select_from(t).where(*_eligible(policy, cutoff))).scalar() or 0)
+
+
+def run_policy(
+    policy: Policy,
+    *,
+    now: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+    deadline: Optional[float] = None,
+    sleep_ms: Optional[int] = None,
+    archive_to: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Move this policy's cold rows, batch by batch, until none are left or a
+    limit (max_batches, deadline as a time.monotonic() value) is hit.
+    dry_run only counts what would move.
+    """
+    days = policy.days
+    result: Dict[str, Any] = {
+        "policy": policy.name,
+        "table": policy.table.name,
+        "action": policy.action,
+        "days": days,
+        "rows": 0,
+        "batches": 0,
+        "done": True,
+        "dry_run": dry_run,
+    }
+    if days <= 0:
+        result["skipped"] = "disabled"
+        return result
+
+    t = policy.table
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    conds = _eligible(policy, cutoff)
+    batch_size = batch_size or RETENTION_BATCH
+    sleep_s = (RETENTION_SLEEP_MS if sleep_ms is None else sleep_ms) / 1000.0
+    archive_to = (archive_to or RETENTION_ARCHIVE_TO).lower()
+    result["cutoff"] = cutoff.isoformat()
+    if policy.action == "archive":
+        result["archive_to"] = archive_to
+
+    last_id = 0
+    while True:
+        if max_batches is not None and result["batches"] >= max_batches:
+            result["done"] = False
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            result["done"] = False
+            break
+
+        stmt = select(t.c.id).where(*conds, t.c.id > last_id).order_by(t.c.id).limit(batch_size)
+        if _is_pg() and not dry_run:
+            stmt = stmt.with_for_update(of=t, skip_locked=True)
+        ids = db.session.execute(stmt).scalars().all()
+        if not ids:
+            db.session.rollback()
+            break
+        last_id = ids[-1]
+
+        if dry_run:
+            result["rows"] += len(ids)
+            result["batches"] += 1
+            continue
+
+        try:
+            if policy.action == "archive":
+                rows = db.session.execute(select(t).where(t.c.id.in_(ids)).order_by(t.c.id)).mappings().all()
+                if archive_to == "file":
+                    _archive_to_file(policy, rows)
+                else:
+                    _archive_to_table(policy, rows)
+            db.session.execute(delete(t).where(t.c.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("retention policy=%s batch after id=%s failed", policy.name, ids[0] - 1)
+            raise
+
+        result["rows"] += len(ids)
+        result["batches"] += 1
+        if sleep_s and len(ids) == batch_size:
+            time.sleep(sleep_s)
+
+    db.session.expire_all()
+    logger.info(
+        "retention policy=%s action=%s rows=%s batches=%s done=%s dry_run=%s",
+        policy.name, policy.action, result["rows"], result["batches"], result["done"], dry_run,
+    )
+    return result
+
+
+def run_all(
+    names: Optional[Iterable[str]] = None,
+    *,
+    max_seconds: Optional[int] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    run_policy() for each policy (all by default) under one time budget.
+    Also creates the upcoming credit ledger partitions (Postgres).
+    """
+    try:
+        ledger.ensure_partitions()
+    except Exception:
+        db.session.rollback()
+        logger.exception("retention: ledger partition maintenance failed")
+
+    budget = RETENTION_MAX_SECONDS if max_seconds is None else max_seconds
+    deadline = time.monotonic() + budget if budget > 0 else None
+    policies = [get_policy(n) for n in names] if names else list(POLICIES.values())
+    return [run_policy(p, deadline=deadline, **kwargs) for p in policies]
+
+
+def status(*, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Per policy: days, hot rows, rows eligible now, archived rows so far."""
+    archived = dict(
+        db.session.query(ArchivedRecord.source_table, func.count(ArchivedRecord.id))
+        .group_by(ArchivedRecord.source_table)
+        .all()
+    )
+    out = []
+    for p in POLICIES.values():
+        out.append(
+            {
+                "policy": p.name,
+                "table": p.table.name,
+                "action": p.action,
+                "days": p.days,
+                "rows": int(db.session.execute(select(func.count()).select_from(p.table)).scalar() or 0),
+                "eligible": count_eligible(p, now=now),
+                "archived": int(archived.get(p.table.name, 0)),
+            }
+        )
+    return out
@@ -0,0 +1,71 @@
+# modules/retention/tasks.py
+"""
+RQ entry point for the retention engine.
+
+`enqueue_retention()` queues one run_all() on the bulk queue. A Redis
+lock keeps overlapping triggers (cron + admin, two schedulers) from
+walking the same tables at the same time; the run that loses the lock
+returns immediately and the next trigger picks up where the winner
+stopped.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from redis import Redis
+
+from modules.common import scheduling
+from modules.common.query_stats import track_queries
+
+logger = logging.getLogger("retention")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_LOCK = "retention:lock"
+
+
+def _redis() -> Redis:
+    return Redis.from_url(REDIS_URL)
+
+
+def enqueue_retention(policies: Optional[List[str]] = None, *, user_id: Optional[int] = None) -> str:
+    """Queue one retention run (all policies by default). Returns the RQ job id."""
+    from modules.retention.engine import RETENTION_MAX_SECONDS
+
+    job = scheduling.enqueue(
+        _redis(),
+        process_retention,
+        user_id=user_id or 0,
+        job_class="bulk",
+        kwargs=dict(policies=policies),
+        job_timeout=RETENTION_MAX_SECONDS + 300,
+        result_ttl=int(os.getenv("RQ_RESULT_TTL", "500")),
+        failure_ttl=int(os.getenv("RQ_FAILURE_TTL", "3600")),
+    )
+    return job.id
+
+
+def process_retention(*, policies: Optional[List[str]] = None) -> Dict[str, Any]:
+    from modules.jobpack.tasks import _load_flask_app
+    from modules.retention.engine import RETENTION_MAX_SECONDS
+
+    app = _load_flask_app()
+    conn = _redis()
+    if not conn.set(_LOCK, "1", nx=True, ex=RETENTION_MAX_SECONDS + 300):
+        return {"ok": False, "error": "retention already running"}
+    try:
+        with app.app_context(), track_queries("job:process_retention"):
+            from models import db
+            from modules.retention import engine
+
+            try:
+                return {"ok": True, "policies": engine.run_all(policies)}
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("retention run failed")
+                return {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+    finally:
+        conn.delete(_LOCK)
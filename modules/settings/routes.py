@@ -19,10 +19,11 @@ from werkzeug.utils import secure_filename
 from models import Project, ResumeAsset, UserProfile, db
 
 # Resume helpers
-from modules.resume.utils import extract_text_from_pdf
+from modules.resume.utils import extract_resume_upload, file_digest
 from modules.resume.parser import parse_resume_to_profile
 from modules.resume.skills_categorizer import categorize_skills  # NEW
 from modules.common.readiness import update_user_ready_score
+from modules.common.profile_loader import get_current_resume_asset, set_current_resume
 
 settings_bp = Blueprint(
     "settings", __name__, template_folder="../../templates/settings"
@@ -190,6 +191,72 @@ def _build_view(prof: UserProfile, projects: list):
     )
 
 
+def _merge_parsed_profile(prof, parsed: dict) -> bool:
+    """
+    Apply parser output to a profile without overwriting anything the
+    user already filled in. Returns True if any field changed.
+    Also used by the resume_parse batch (modules/batch/kinds.py).
+    """
+    applied_any = False  # track whether we actually changed something
+
+    if not prof.full_name and parsed.get("full_name"):
+        prof.full_name = parsed["full_name"].strip()
+        applied_any = True
+
+    if not prof.headline and parsed.get("headline"):
+        prof.headline = parsed["headline"].strip()
+        applied_any = True
+
+    if not prof.summary and parsed.get("summary"):
+        prof.summary = parsed["summary"].strip()
+        applied_any = True
+
+    if not prof.location and parsed.get("location"):
+        prof.location = parsed["location"].strip()
+        applied_any = True
+
+    if not prof.phone and parsed.get("phone"):
+        prof.phone = parsed["phone"].strip()
+        applied_any = True
+
+    # Links: merge, but do not overwrite existing keys
+    existing_links = prof.links or {}
+    parsed_links = parsed.get("links") or {}
+    if isinstance(parsed_links, dict):
+        for k, v in parsed_links.items():
+            k2 = (k or "").strip()
+            v2 = (v or "").strip()
+            if not k2 or not v2:
+                continue
+            if k2 not in existing_links or not existing_links.get(k2):
+                existing_links[k2] = v2
+                applied_any = True
+    prof.links = existing_links
+
+    # Skills / education / certifications / experience:
+    # if user has nothing yet, seed from parsed
+    parsed_skills = parsed.get("skills")
+    if not (prof.skills or []) and parsed_skills:
+        # Normalize parsed skills and store as container
+        norm_skills = _normalize_skills(parsed_skills)
+        prof.skills = _build_skills_container(norm_skills)
+        applied_any = True
+
+    if not (prof.education or []) and parsed.get("education"):
+        prof.education = parsed["education"]
+        applied_any = True
+
+    if not (prof.certifications or []) and parsed.get("certifications"):
+        prof.certifications = parsed["certifications"]
+        applied_any = True
+
+    if not (prof.experience or []) and parsed.get("experience"):
+        prof.experience = parsed["experience"]
+        applied_any = True
+
+    return applied_any
+
+
 def _ensure_profile():
     try:
         prof = UserProfile.query.filter_by(user_id=current_user.id).first()
@@ -360,8 +427,29 @@ def profile():
             filename = secure_filename(file.filename)
 
             try:
+                # 0) Same file uploaded again? Reuse the stored asset and skip
+                #    extraction + the AI parse entirely.
+                digest = file_digest(file.read())
+                file.stream.seek(0)
+                existing = (
+                    ResumeAsset.query.filter_by(
+                        user_id=current_user.id, content_hash=digest
+                    )
+                    .order_by(ResumeAsset.id.desc())
+                    .first()
+                )
+                if existing and existing.text:
+                    if current_user.current_resume_id != existing.id:
+                        set_current_resume(current_user, existing)
+                        db.session.commit()
+                    flash(
+                        "This resume is already on file — nothing new to import.",
+                        "info",
+                    )
+                    return redirect(url_for("settings.profile"))
+
                 # 1) Extract text from PDF
-                resume_text = extract_text_from_pdf(file)
+                resume_text, digest = extract_resume_upload(file)
                 if not resume_text:
                     flash(
                         "We couldn't read text from that PDF. "
@@ -375,8 +463,10 @@ def profile():
                     user_id=current_user.id,
                     filename=filename,
                     text=resume_text,
+                    content_hash=digest,
                 )
                 db.session.add(asset)
+                set_current_resume(current_user, asset)
 
                 # Ensure profile exists
                 prof = _ensure_profile()
@@ -388,63 +478,8 @@ def profile():
                 # 3) Call AI parser to suggest profile fields
                 parsed = parse_resume_to_profile(resume_text) or {}
 
-                applied_any = False  # track whether we actually changed something
-
                 # 4) Apply parsed fields non-destructively
-                if not prof.full_name and parsed.get("full_name"):
-                    prof.full_name = parsed["full_name"].strip()
-                    applied_any = True
-
-                if not prof.headline and parsed.get("headline"):
-                    prof.headline = parsed["headline"].strip()
-                    applied_any = True
-
-                if not prof.summary and parsed.get("summary"):
-                    prof.summary = parsed["summary"].strip()
-                    applied_any = True
-
-                if not prof.location and parsed.get("location"):
-                    prof.location = parsed["location"].strip()
-                    applied_any = True
-
-                if not prof.phone and parsed.get("phone"):
-                    prof.phone = parsed["phone"].strip()
-                    applied_any = True
-
-                # Links: merge, but do not overwrite existing keys
-                existing_links = prof.links or {}
-                parsed_links = parsed.get("links") or {}
-                if isinstance(parsed_links, dict):
-                    for k, v in parsed_links.items():
-                        k2 = (k or "").strip()
-                        v2 = (v or "").strip()
-                        if not k2 or not v2:
-                            continue
-                        if k2 not in existing_links or not existing_links.get(k2):
-                            existing_links[k2] = v2
-                            applied_any = True
-                prof.links = existing_links
-
-                # Skills / education / certifications / experience:
-                # if user has nothing yet, seed from parsed
-                parsed_skills = parsed.get("skills")
-                if not (prof.skills or []) and parsed_skills:
-                    # Normalize parsed skills and store as container
-                    norm_skills = _normalize_skills(parsed_skills)
-                    prof.skills = _build_skills_container(norm_skills)
-                    applied_any = True
-
-                if not (prof.education or []) and parsed.get("education"):
-                    prof.education = parsed["education"]
-                    applied_any = True
-
-                if not (prof.certifications or []) and parsed.get("certifications"):
-                    prof.certifications = parsed["certifications"]
-                    applied_any = True
-
-                if not (prof.experience or []) and parsed.get("experience"):
-                    prof.experience = parsed["experience"]
-                    applied_any = True
+                applied_any = _merge_parsed_profile(prof, parsed)
 
                 prof.updated_at = datetime.utcnow()
 
@@ -653,11 +688,7 @@ def profile():
 
     # GET
     try:
-        latest_resume = (
-            ResumeAsset.query.filter_by(user_id=current_user.id)
-            .order_by(ResumeAsset.created_at.desc())
-            .first()
-        )
+        latest_resume = get_current_resume_asset(current_user)
     except Exception:
         current_app.logger.exception("Failed fetching latest resume")
         latest_resume = None
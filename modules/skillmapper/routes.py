@@ -6,9 +6,9 @@ import logging
 import os
 import sys
 import traceback
-from datetime import datetime
 
 from flask import (
+    abort,
     jsonify,
     render_template,
     request,
@@ -18,15 +18,15 @@ from flask import (
     current_app,
 )
 from flask_login import current_user, login_required
-from sqlalchemy import desc
 
-from models import ResumeAsset, SkillMapSnapshot, UserProfile, db
-from modules.common.ai import generate_skillmap
-from modules.common.profile_loader import load_profile_snapshot
+from models import SkillMapSnapshot, User, UserProfile, db
+from modules.ai_jobs import engine as ai_jobs
+from modules.ai_jobs.engine import AIJobError
+from modules.common.profile_loader import get_current_resume_text, load_profile_snapshot
 from modules.auth.guards import require_verified_email
 
 # Phase 4: central credits engine
-from modules.credits.engine import can_afford, deduct_free, deduct_pro, refund  # ✅ add refund
+from modules.credits.engine import can_afford
 
 from . import bp
 
@@ -45,12 +45,8 @@ MAX_RESUME_TEXT = int(os.getenv("SM_MAX_RESUME_TEXT", "24000"))
 
 
 def _latest_resume_text(user_id: int) -> str:
-    r = (
-        ResumeAsset.query.filter_by(user_id=user_id)
-        .order_by(desc(ResumeAsset.created_at))
-        .first()
-    )
-    return (r.text or "") if r else ""
+    user = current_user if getattr(current_user, "id", None) == user_id else User.query.get(user_id)
+    return get_current_resume_text(user)
 
 
 def _profile_json(user_id: int) -> dict:
@@ -155,7 +151,9 @@ def index():
       - Deep roadmap with 3+ angles, micro-projects & trends.
 
     IMPORTANT (upgraded):
-    Credits are deducted BEFORE the AI run.
+    Credits are deducted BEFORE the AI run, which happens in the worker
+    (modules/ai_jobs, handler in tasks.py); the browser waits on
+    /ai-jobs/<id> and lands on job_result.
     If AI or DB save fails, credits are refunded.
     """
     is_pro_user = _current_is_pro_user()
@@ -169,10 +167,6 @@ def index():
         request.form.get("path_type") or request.args.get("path_type")
     )
 
-    skillmap = None
-    used_live_ai = False
-    snapshot = None
-
     profile_snapshot = load_profile_snapshot(current_user)
 
     if request.method == "POST":
@@ -220,40 +214,11 @@ def index():
                 )
                 return redirect(url_for("billing.index"))
 
-        # ✅ Deduct BEFORE AI (hard gate)
-        run_id = f"sm_{current_user.id}_{datetime.utcnow().isoformat()}"
-        try:
-            ok = (
-                deduct_pro(current_user, feature_key, run_id=run_id)
-                if pro_mode
-                else deduct_free(current_user, feature_key, run_id=run_id)
-            )
-            if not ok:
-                flash(
-                    "We couldn’t deduct your credits right now. Please try again.",
-                    "danger",
-                )
-                return redirect(url_for("skillmapper.index", mode=mode, path_type=path_type))
-        except Exception:
-            current_app.logger.exception("SkillMapper: credit deduction failed (pre-run).")
-            flash(
-                "We couldn’t process your credits right now. Please try again in a bit.",
-                "danger",
-            )
-            return redirect(url_for("skillmapper.index", mode=mode, path_type=path_type))
-
-        # Load Profile Portal + latest resume on file
+        # Inputs are checked here, before any credits are reserved
         profile = _profile_json(current_user.id)
         resume_text = _latest_resume_text(current_user.id)
-        if len(resume_text) > MAX_RESUME_TEXT:
-            resume_text = resume_text[:MAX_RESUME_TEXT]
 
         if not profile and not resume_text and not extra_skills:
-            # ✅ Refund because we already deducted
-            try:
-                refund(current_user, feature_key, currency=currency, run_id=run_id)
-            except Exception:
-                current_app.logger.exception("SkillMapper: refund failed after missing inputs.")
             flash(
                 "We couldn’t find a Profile Portal or resume yet. "
                 "Add your basics in Profile Portal, then try again.",
@@ -268,171 +233,80 @@ def index():
                 CAREER_AI_VERSION=CAREER_AI_VERSION,
             )
 
-        try:
-            if pro_mode:
-                # For Pro, require some profile content (it’s a profile-tuned roadmap)
-                if not profile:
-                    # ✅ Refund because we already deducted
-                    try:
-                        refund(current_user, feature_key, currency=currency, run_id=run_id)
-                    except Exception:
-                        current_app.logger.exception("SkillMapper: refund failed after empty profile.")
-                    flash(
-                        "Your Profile Portal looks empty. "
-                        "Please add basic details and skills first.",
-                        "warning",
-                    )
-                    return render_template(
-                        "skillmapper/index.html",
-                        mode=mode,
-                        is_pro_user=is_pro_user,
-                        profile_snapshot=profile_snapshot,
-                        path_type=path_type,
-                        CAREER_AI_VERSION=CAREER_AI_VERSION,
-                    )
-
-                hints = {
-                    "path_type": path_type,  # "job" | "startup" | "freelance"
-                    "region_sector": region_focus
-                    or "India · early-career tech roles",
-                    "time_horizon_months": time_horizon or 6,
-                    "focus": "current_snapshot",
-                }
-                skillmap, used_live_ai = generate_skillmap(
-                    pro_mode=True,
-                    profile_json=profile,
-                    resume_text=resume_text,
-                    return_source=True,
-                    hints=hints,
+        if pro_mode:
+            # For Pro, require some profile content (it’s a profile-tuned roadmap)
+            if not profile:
+                flash(
+                    "Your Profile Portal looks empty. "
+                    "Please add basic details and skills first.",
+                    "warning",
                 )
-            else:
-                if len(extra_skills) > MAX_FREE_TEXT:
-                    extra_skills = extra_skills[:MAX_FREE_TEXT]
-
-                hints = {
-                    "path_type": path_type,  # "job" | "startup" | "freelance"
-                    "region_focus": region_focus
-                    or "India · early-career tech roles",
-                    "target_domain": target_domain,
-                    "focus": "current_snapshot",
-                }
-                skillmap, used_live_ai = generate_skillmap(
-                    pro_mode=False,
-                    profile_json=profile or None,
-                    resume_text=resume_text,
-                    free_text_skills=extra_skills,
-                    return_source=True,
-                    hints=hints,
+                return render_template(
+                    "skillmapper/index.html",
+                    mode=mode,
+                    is_pro_user=is_pro_user,
+                    profile_snapshot=profile_snapshot,
+                    path_type=path_type,
+                    CAREER_AI_VERSION=CAREER_AI_VERSION,
                 )
 
-            log.info(
-                "SkillMapper HTML run pro_mode=%s path_type=%s used_live_ai=%s "
-                "has_profile=%s has_resume=%s region=%s target_domain=%s",
-                pro_mode,
-                path_type,
-                used_live_ai,
-                bool(profile),
-                bool(resume_text),
-                region_focus or ("India-default" if not pro_mode else "N/A"),
-                target_domain,
-            )
-        except Exception as e:
-            current_app.logger.exception("SkillMapper analysis failed: %s", e)
-            try:
-                refund(current_user, feature_key, currency=currency, run_id=run_id)
-            except Exception:
-                current_app.logger.exception("SkillMapper: refund failed after AI error.")
-            flash(
-                "Skill Mapper had a problem generating your roadmap. "
-                "Your credits were refunded. Please try again in a bit.",
-                "danger",
-            )
-            return render_template(
-                "skillmapper/index.html",
-                mode=mode,
-                is_pro_user=is_pro_user,
-                profile_snapshot=profile_snapshot,
-                path_type=path_type,
-                CAREER_AI_VERSION=CAREER_AI_VERSION,
-            )
-
-        # Ensure we have a dict and normalize roles for the templates
-        if isinstance(skillmap, dict):
-            skillmap = _normalize_roles(skillmap)
-
-        # Persist snapshot (required) — if this fails, refund
-        snapshot = None
+            hints = {
+                "path_type": path_type,  # "job" | "startup" | "freelance"
+                "region_sector": region_focus
+                or "India · early-career tech roles",
+                "time_horizon_months": time_horizon or 6,
+                "focus": "current_snapshot",
+            }
+        else:
+            hints = {
+                "path_type": path_type,  # "job" | "startup" | "freelance"
+                "region_focus": region_focus
+                or "India · early-career tech roles",
+                "target_domain": target_domain,
+                "focus": "current_snapshot",
+            }
+
+        # ✅ Deduct + queue; the worker refunds if AI or the snapshot save fails
         try:
-            snap = SkillMapSnapshot(
-                user_id=current_user.id,
-                source_title=(
-                    f"Skill Mapper ({path_type.title()} · Pro)"
-                    if pro_mode
-                    else f"Skill Mapper ({path_type.title()} · Free)"
-                ),
-                input_text="\n".join(
-                    part
-                    for part in [
-                        f"mode={mode}",
-                        f"path_type={path_type}",
-                        f"region={region_focus}" if region_focus else "",
-                        f"target_domain={target_domain}" if target_domain else "",
-                        f"time_horizon={time_horizon}" if time_horizon else "",
-                        extra_skills,
-                    ]
-                    if part
-                ),
-                skills_json=json_dumps_safe(skillmap),
-                created_at=datetime.utcnow(),
-            )
-            db.session.add(snap)
-            db.session.commit()
-            snapshot = snap
-        except Exception:
-            db.session.rollback()
-            current_app.logger.warning(
-                "SkillMapper snapshot save failed.", exc_info=True
+            job = ai_jobs.start(
+                current_user,
+                "skillmap",
+                feature_key=feature_key,
+                currency=currency,
+                args={
+                    "pro_mode": pro_mode,
+                    "path_type": path_type,
+                    "free_text_skills": "" if pro_mode else extra_skills[:MAX_FREE_TEXT],
+                    "hints": hints,
+                    "source_title": (
+                        f"Skill Mapper ({path_type.title()} · Pro)"
+                        if pro_mode
+                        else f"Skill Mapper ({path_type.title()} · Free)"
+                    ),
+                    "input_text": "\n".join(
+                        part
+                        for part in [
+                            f"mode={mode}",
+                            f"path_type={path_type}",
+                            f"region={region_focus}" if region_focus else "",
+                            f"target_domain={target_domain}" if target_domain else "",
+                            f"time_horizon={time_horizon}" if time_horizon else "",
+                            extra_skills,
+                        ]
+                        if part
+                    ),
+                },
             )
-            try:
-                refund(current_user, feature_key, currency=currency, run_id=run_id)
-            except Exception:
-                current_app.logger.exception("SkillMapper: refund failed after DB save error.")
+        except AIJobError as e:
+            current_app.logger.warning("SkillMapper: job could not start: %s", e)
             flash(
-                "We couldn’t save your Skill Mapper results. Your credits were refunded. Please try again.",
+                "We couldn’t start Skill Mapper right now. No credits were used. "
+                "Please try again in a bit.",
                 "danger",
             )
-            return render_template(
-                "skillmapper/index.html",
-                mode=mode,
-                is_pro_user=is_pro_user,
-                profile_snapshot=profile_snapshot,
-                path_type=path_type,
-                CAREER_AI_VERSION=CAREER_AI_VERSION,
-            )
+            return redirect(url_for("skillmapper.index", mode=mode, path_type=path_type))
 
-        # Enrich meta for the template
-        if isinstance(skillmap, dict):
-            meta = skillmap.get("meta") or {}
-            if not isinstance(meta, dict):
-                meta = {}
-            meta.setdefault("run_mode", "pro" if pro_mode else "free")
-            meta.setdefault("used_live_ai", bool(used_live_ai))
-            meta.setdefault("path_type", path_type)
-            if snapshot is not None:
-                meta.setdefault("snapshot_id", snapshot.id)
-            skillmap["meta"] = meta
-
-        return render_template(
-            "skillmapper/result.html",
-            skillmap=skillmap,
-            is_pro=pro_mode,  # deep vs free run (like Job Pack)
-            is_pro_user=is_pro_user,
-            mode=mode,
-            from_history=False,
-            snapshot=snapshot,
-            profile_snapshot=profile_snapshot,
-            CAREER_AI_VERSION=CAREER_AI_VERSION,
-        )
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
 
     # GET
     return render_template(
@@ -445,6 +319,50 @@ def index():
     )
 
 
+@bp.route("/job/<int:job_id>", methods=["GET"], endpoint="job_result")
+@login_required
+def job_result(job_id: int):
+    """Result of a finished background run (target of the waiting page)."""
+    job = ai_jobs.get_for_user(job_id, current_user.id)
+    if job is None or job.kind != "skillmap":
+        abort(404)
+    if job.status != "completed":
+        return redirect(url_for("ai_jobs.wait", job_id=job.id))
+
+    result = job.result
+    pro_mode = result.get("mode") == "pro"
+    skillmap = result.get("skillmap")
+    snapshot = (
+        SkillMapSnapshot.query.filter_by(id=job.record_id, user_id=current_user.id).first()
+        if job.record_id
+        else None
+    )
+
+    # Enrich meta for the template
+    if isinstance(skillmap, dict):
+        meta = skillmap.get("meta") or {}
+        if not isinstance(meta, dict):
+            meta = {}
+        meta.setdefault("run_mode", "pro" if pro_mode else "free")
+        meta.setdefault("used_live_ai", bool(result.get("used_live_ai")))
+        meta.setdefault("path_type", result.get("path_type") or "job")
+        if snapshot is not None:
+            meta.setdefault("snapshot_id", snapshot.id)
+        skillmap["meta"] = meta
+
+    return render_template(
+        "skillmapper/result.html",
+        skillmap=skillmap,
+        is_pro=pro_mode,  # deep vs free run (like Job Pack)
+        is_pro_user=_current_is_pro_user(),
+        mode="pro" if pro_mode else "free",
+        from_history=False,
+        snapshot=snapshot,
+        profile_snapshot=load_profile_snapshot(current_user),
+        CAREER_AI_VERSION=CAREER_AI_VERSION,
+    )
+
+
 # ---------------------- history + reopen snapshot ----------------------
 
 
@@ -523,6 +441,41 @@ def snapshot(snapshot_id: int):
 # ---------------------- legacy JSON endpoints (kept for compatibility) ----------------------
 
 
+def _api_start(feature_key: str, currency: str, args: dict):
+    """Reserve credits + queue a JSON-API run; 202 with the polling URL."""
+    try:
+        job = ai_jobs.start(
+            current_user,
+            "skillmap",
+            feature_key=feature_key,
+            currency=currency,
+            args=args,
+        )
+    except AIJobError as e:
+        log.warning("SkillMapper API: job could not start: %s", e)
+        return (
+            jsonify(
+                {
+                    "ok": False,
+                    "error": "We couldn’t start Skill Mapper right now. No credits were used.",
+                }
+            ),
+            503,
+        )
+    return (
+        jsonify(
+            {
+                "ok": True,
+                "job_id": job.id,
+                "status": job.status,
+                # ?result=1: the finished status carries {"skillmap", "used_live_ai", ...}
+                "status_url": url_for("ai_jobs.status", job_id=job.id, result=1),
+            }
+        ),
+        202,
+    )
+
+
 @bp.route("/free", methods=["POST"])
 @login_required
 @require_verified_email
@@ -530,6 +483,7 @@ def run_free():
     """
     Skill Mapper Free (JSON API).
     Billing upgraded: deduct BEFORE AI; refund on AI/DB failure.
+    Runs as a background AI job: answers 202 with a status_url to poll.
     """
     try:
         if not can_afford(current_user, "skill_mapper_free", currency="silver"):
@@ -544,31 +498,6 @@ def run_free():
                 402,
             )
 
-        # ✅ Deduct BEFORE AI
-        run_id = f"sm_free_{current_user.id}_{datetime.utcnow().isoformat()}"
-        try:
-            if not deduct_free(current_user, "skill_mapper_free", run_id=run_id):
-                return (
-                    jsonify(
-                        {
-                            "ok": False,
-                            "error": "We couldn’t deduct your Silver credits right now. Please try again.",
-                        }
-                    ),
-                    402,
-                )
-        except Exception:
-            log.exception("SkillMapper /free: credit deduction error (pre-run)")
-            return (
-                jsonify(
-                    {
-                        "ok": False,
-                        "error": "We couldn’t process your credits right now. Please try again.",
-                    }
-                ),
-                500,
-            )
-
         payload = request.get_json(silent=True) or {}
         extra_text = (payload.get("free_text_skills") or "").strip()
         target_domain = (payload.get("target_domain") or "").strip()
@@ -578,14 +507,8 @@ def run_free():
 
         profile = _profile_json(current_user.id)
         resume_text = _latest_resume_text(current_user.id)
-        if len(resume_text) > MAX_RESUME_TEXT:
-            resume_text = resume_text[:MAX_RESUME_TEXT]
 
         if not profile and not resume_text and not extra_text:
-            try:
-                refund(current_user, "skill_mapper_free", currency="silver", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /free: refund failed after missing inputs")
             return (
                 jsonify(
                     {
@@ -604,33 +527,15 @@ def run_free():
         if target_domain:
             free_hints["target_domain"] = target_domain
 
-        try:
-            data, used_live_ai = generate_skillmap(
-                pro_mode=False,
-                profile_json=profile or None,
-                resume_text=resume_text,
-                free_text_skills=extra_text,
-                return_source=True,
-                hints=free_hints,
-            )
-        except Exception:
-            log.exception("SkillMapper /free: AI failed")
-            try:
-                refund(current_user, "skill_mapper_free", currency="silver", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /free: refund failed after AI error")
-            return jsonify({"ok": False, "error": "Internal error (free). Credits refunded."}), 500
-
-        if isinstance(data, dict):
-            data = _normalize_roles(data)
-
-        # Persist snapshot (required) — refund if fails
-        snapshot = None
-        try:
-            snap = SkillMapSnapshot(
-                user_id=current_user.id,
-                source_title="Skill Mapper (Free API)",
-                input_text="\n\n".join(
+        return _api_start(
+            "skill_mapper_free",
+            "silver",
+            {
+                "pro_mode": False,
+                "free_text_skills": extra_text,
+                "hints": free_hints,
+                "source_title": "Skill Mapper (Free API)",
+                "input_text": "\n\n".join(
                     part
                     for part in [
                         f"target_domain={target_domain}" if target_domain else "",
@@ -638,22 +543,8 @@ def run_free():
                     ]
                     if part
                 ),
-                skills_json=json_dumps_safe(data),
-                created_at=datetime.utcnow(),
-            )
-            db.session.add(snap)
-            db.session.commit()
-            snapshot = snap
-        except Exception:
-            db.session.rollback()
-            log.warning("SkillMapper snapshot save failed (free).", exc_info=True)
-            try:
-                refund(current_user, "skill_mapper_free", currency="silver", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /free: refund failed after DB save error")
-            return jsonify({"ok": False, "error": "Could not save results. Credits refunded."}), 500
-
-        return jsonify({"ok": True, "data": data, "used_live_ai": used_live_ai})
+            },
+        )
     except Exception as e:
         log.exception("SkillMapper /free failed")
         traceback.print_exc(file=sys.stderr)
@@ -674,6 +565,7 @@ def run_pro():
     """
     Skill Mapper Pro (JSON API).
     Billing upgraded: deduct BEFORE AI; refund on AI/DB failure.
+    Runs as a background AI job: answers 202 with a status_url to poll.
     """
     try:
         if not current_user.is_pro:
@@ -700,35 +592,12 @@ def run_pro():
                 402,
             )
 
-        # ✅ Deduct BEFORE AI
-        run_id = f"sm_pro_{current_user.id}_{datetime.utcnow().isoformat()}"
-        try:
-            if not deduct_pro(current_user, "skill_mapper_pro", run_id=run_id):
-                return (
-                    jsonify(
-                        {
-                            "ok": False,
-                            "error": "We couldn’t deduct your Gold credits right now. Please try again.",
-                        }
-                    ),
-                    402,
-                )
-        except Exception:
-            log.exception("SkillMapper /pro: credit deduction error (pre-run)")
-            return jsonify({"ok": False, "error": "Credit processing failed."}), 500
-
         payload = request.get_json(silent=True) or {}
         use_profile = bool(payload.get("use_profile", True))
         pasted_resume_text = (payload.get("resume_text") or "").strip()
         region_sector = (payload.get("region_sector") or "").strip()
 
-        profile = _profile_json(current_user.id) if use_profile else {}
-
-        if use_profile and not profile:
-            try:
-                refund(current_user, "skill_mapper_pro", currency="gold", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /pro: refund failed after empty profile")
+        if use_profile and not _profile_json(current_user.id):
             return (
                 jsonify(
                     {
@@ -740,61 +609,27 @@ def run_pro():
                 400,
             )
 
-        resume_text = pasted_resume_text or _latest_resume_text(current_user.id)
-        if len(resume_text) > MAX_RESUME_TEXT:
-            resume_text = resume_text[:MAX_RESUME_TEXT]
-
         hints = {
             "region_sector": region_sector or "India · early-career tech roles",
             "use_profile": bool(use_profile),
             "focus": "current_snapshot",
         }
 
-        try:
-            data, used_live_ai = generate_skillmap(
-                pro_mode=True,
-                profile_json=profile if use_profile else None,
-                resume_text=resume_text,
-                return_source=True,
-                hints=hints,
-            )
-        except Exception:
-            log.exception("SkillMapper /pro: AI failed")
-            try:
-                refund(current_user, "skill_mapper_pro", currency="gold", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /pro: refund failed after AI error")
-            return jsonify({"ok": False, "error": "Internal error (pro). Credits refunded."}), 500
-
-        if isinstance(data, dict):
-            data = _normalize_roles(data)
-
-        # Persist snapshot (required) — refund if fails
-        snapshot = None
-        try:
-            snap = SkillMapSnapshot(
-                user_id=current_user.id,
-                source_title="Skill Mapper (Pro API)",
-                input_text=(
+        return _api_start(
+            "skill_mapper_pro",
+            "gold",
+            {
+                "pro_mode": True,
+                "use_profile": use_profile,
+                "resume_text": pasted_resume_text[:MAX_RESUME_TEXT],
+                "hints": hints,
+                "source_title": "Skill Mapper (Pro API)",
+                "input_text": (
                     f"profile={'on' if use_profile else 'off'}; "
                     f"region={region_sector or 'India-default'}"
                 ),
-                skills_json=json_dumps_safe(data),
-                created_at=datetime.utcnow(),
-            )
-            db.session.add(snap)
-            db.session.commit()
-            snapshot = snap
-        except Exception:
-            db.session.rollback()
-            log.warning("SkillMapper snapshot save failed (pro).", exc_info=True)
-            try:
-                refund(current_user, "skill_mapper_pro", currency="gold", run_id=run_id)
-            except Exception:
-                log.exception("SkillMapper /pro: refund failed after DB save error")
-            return jsonify({"ok": False, "error": "Could not save results. Credits refunded."}), 500
-
-        return jsonify({"ok": True, "data": data, "used_live_ai": used_live_ai})
+            },
+        )
     except Exception as e:
         log.exception("SkillMapper /pro failed")
         traceback.print_exc(file=sys.stderr)
@@ -0,0 +1,93 @@
+# modules/skillmapper/tasks.py
+"""
+Background handler for Skill Mapper runs (AIJob kind "skillmap").
+
+Serves the HTML flow and the legacy /free and /pro JSON endpoints. Runs
+in the RQ worker through modules.ai_jobs.engine.execute(); the credits
+were reserved by the route and are refunded by the engine if this raises
+(including when the snapshot cannot be saved).
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+from models import AIJob, SkillMapSnapshot, User, db
+from modules.common.ai import generate_skillmap
+from modules.common.profile_loader import get_current_resume_text
+from modules.skillmapper.routes import (
+    MAX_FREE_TEXT,
+    MAX_RESUME_TEXT,
+    _normalize_roles,
+    _profile_json,
+    json_dumps_safe,
+)
+
+log = logging.getLogger(__name__)
+
+
+def run_skillmap(job: AIJob, user: User) -> Dict[str, Any]:
+    args = job.args
+    pro_mode = bool(args.get("pro_mode"))
+    use_profile = bool(args.get("use_profile", True))
+    extra_skills = (args.get("free_text_skills") or "")[:MAX_FREE_TEXT]
+    hints = args.get("hints") or {}
+
+    # Load Profile Portal + latest resume on file (or the pasted one, /pro API)
+    profile = _profile_json(user.id) if use_profile else {}
+    resume_text = (args.get("resume_text") or get_current_resume_text(user))[:MAX_RESUME_TEXT]
+
+    if pro_mode:
+        skillmap, used_live_ai = generate_skillmap(
+            pro_mode=True,
+            profile_json=profile if use_profile else None,
+            resume_text=resume_text,
+            return_source=True,
+            hints=hints,
+        )
+    else:
+        skillmap, used_live_ai = generate_skillmap(
+            pro_mode=False,
+            profile_json=profile or None,
+            resume_text=resume_text,
+            free_text_skills=extra_skills,
+            return_source=True,
+            hints=hints,
+        )
+
+    log.info(
+        "SkillMapper job=%s pro_mode=%s path_type=%s used_live_ai=%s has_profile=%s has_resume=%s",
+        job.id,
+        pro_mode,
+        args.get("path_type") or "-",
+        used_live_ai,
+        bool(profile),
+        bool(resume_text),
+    )
+
+    # Ensure we have a dict and normalize roles for the templates
+    if isinstance(skillmap, dict):
+        skillmap = _normalize_roles(skillmap)
+
+    # Persist snapshot (required)
+    input_text = args.get("input_text") or ""
+    snap = SkillMapSnapshot(
+        user_id=user.id,
+        source_title=args.get("source_title") or "Skill Mapper",
+        input_text=input_text,
+        input_preview=input_text[:160] or None,
+        skills_json=json_dumps_safe(skillmap),
+        created_at=datetime.utcnow(),
+    )
+    db.session.add(snap)
+    db.session.flush()
+    job.record_id = snap.id
+
+    return {
+        "skillmap": skillmap,
+        "used_live_ai": bool(used_live_ai),
+        "mode": "pro" if pro_mode else "free",
+        "path_type": args.get("path_type"),
+    }
@@ -616,6 +616,54 @@
     });
   }
 
+  // Runs are background AI jobs: POST answers 202 {job_id, status, status_url}.
+  // Poll status_url until the job completes; its result carries the skillmap.
+  var POLL_MS = 2000;
+  var POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+  function waitForJob(statusUrl) {
+    var deadline = Date.now() + POLL_TIMEOUT_MS;
+    return new Promise(function (resolve, reject) {
+      function poll() {
+        fetch(statusUrl, { headers: { "X-Requested-With": "XMLHttpRequest" } })
+          .then(function (resp) {
+            return resp.json().catch(function () {
+              return {};
+            });
+          })
+          .then(function (st) {
+            if (st.status === "completed") {
+              resolve((st.result && st.result.skillmap) || {});
+            } else if (st.status === "failed" || st.status === "not_found") {
+              reject(new Error(st.error || "Skill Mapper run failed."));
+            } else if (Date.now() > deadline) {
+              reject(new Error("Skill Mapper is taking longer than usual. Check your history shortly."));
+            } else {
+              setTimeout(poll, POLL_MS);
+            }
+          })
+          .catch(function () {
+            if (Date.now() > deadline) {
+              reject(new Error("Lost connection while waiting for Skill Mapper."));
+            } else {
+              setTimeout(poll, POLL_MS);
+            }
+          });
+      }
+      poll();
+    });
+  }
+
+  function runJob(url, payload, fallbackError) {
+    return postJSON(url, payload).then(function (res) {
+      var body = res.body || {};
+      if (res.status !== 202 || !body.status_url) {
+        throw new Error(body.error || fallbackError(res.status));
+      }
+      return waitForJob(body.status_url);
+    });
+  }
+
   // ---------- Event listeners ----------
 
   if (freeBtn) {
@@ -626,29 +674,23 @@
       freeBtn.disabled = true;
       freeBtn.textContent = "Running…";
 
-      postJSON("/skillmapper/free", {
-        free_text_skills: text,
-        target_domain: domain
-      })
-        .then(function (res) {
-          var status = res.status;
-          var body = res.body || {};
-          if (!body || body.ok === false) {
-            var errMsg =
-              (body && body.error) ||
-              (status === 402
-                ? "Not enough Silver credits to run Skill Mapper."
-                : "Skill Mapper Free run failed.");
-            showToast(errMsg, "error");
-            return;
-          }
-          renderFreeResult(body.data || {});
+      runJob(
+        "/skillmapper/free",
+        { free_text_skills: text, target_domain: domain },
+        function (status) {
+          return status === 402
+            ? "Not enough Silver credits to run Skill Mapper."
+            : "Skill Mapper Free run failed.";
+        }
+      )
+        .then(function (data) {
+          renderFreeResult(data);
           showToast("Skill Mapper (Free) complete.", "success");
         })
         .catch(function (e) {
           console.error("SkillMapper /free error", e);
           showToast(
-            "Something went wrong while running Skill Mapper.",
+            (e && e.message) || "Something went wrong while running Skill Mapper.",
             "error"
           );
         })
@@ -673,30 +715,23 @@
       proBtn.disabled = true;
       proBtn.textContent = "Analyzing…";
 
-      postJSON("/skillmapper/pro", {
-        use_profile: useProfile,
-        region_sector: region,
-        resume_text: resumeText
-      })
-        .then(function (res) {
-          var status = res.status;
-          var body = res.body || {};
-          if (!body || body.ok === false) {
-            var errMsg =
-              (body && body.error) ||
-              (status === 403
-                ? "Skill Mapper Pro requires an active Pro plan."
-                : "Skill Mapper Pro run failed.");
-            showToast(errMsg, "error");
-            return;
-          }
-          renderProResult(body.data || {});
+      runJob(
+        "/skillmapper/pro",
+        { use_profile: useProfile, region_sector: region, resume_text: resumeText },
+        function (status) {
+          return status === 403
+            ? "Skill Mapper Pro requires an active Pro plan."
+            : "Skill Mapper Pro run failed.";
+        }
+      )
+        .then(function (data) {
+          renderProResult(data);
           showToast("Skill Mapper Pro analysis complete.", "success");
         })
         .catch(function (e) {
           console.error("SkillMapper /pro error", e);
           showToast(
-            "Something went wrong while running Skill Mapper Pro.",
+            (e && e.message) || "Something went wrong while running Skill Mapper Pro.",
             "error"
           );
         })
@@ -12,6 +12,11 @@ Environment Variables Required:
     REDIS_URL - Redis connection URL (e.g., redis://localhost:6379/0)
     DATABASE_URL - Postgres connection URL (or SQLite for dev)
     OPENAI_API_KEY - OpenAI API key
+
+Optional:
+    WORKER_METRICS_PORT - serve Prometheus metrics (job wait/run time,
+        queue depth) on this port; 0 disables (default 9101)
+    PROMETHEUS_MULTIPROC_DIR - also aggregate LLM metrics from job horses
 """
 
 import os
@@ -20,7 +25,7 @@ import logging
 from pathlib import Path
 
 from redis import Redis
-from rq import Worker, Queue
+from rq import Queue
 from dotenv import load_dotenv
 
 # ✅ Upgrade: Always load .env from the same directory as this worker.py
@@ -45,6 +50,7 @@ logger.info("OPENAI_API_KEY present: %s", bool(os.getenv("OPENAI_API_KEY")))
 
 # Get Redis URL from environment
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
 
 # Validate required environment variables
 REQUIRED_ENV_VARS = ["OPENAI_API_KEY"]
@@ -54,11 +60,10 @@ if missing_vars:
     logger.error("Please set them in your .env file or environment")
     sys.exit(1)
 
-# Queue names
-QUEUE_NAMES = [
-    "careerai_queue",  # Default queue for Job Pack, Skill Mapper, etc.
-    "careerai_priority",  # High-priority jobs (future use)
-]
+# Queue names (one per job class, see modules/common/scheduling.py):
+#   careerai_priority (Gold runs), careerai_queue (Pro silver runs),
+#   careerai_free (Free silver runs), careerai_bulk (over fair share / batch)
+from modules.common.scheduling import QUEUE_NAMES  # noqa: E402
 
 
 def main():
@@ -83,9 +88,20 @@ def main():
     # Create queues
     queues = [Queue(name, connection=redis_conn) for name in QUEUE_NAMES]
 
+    # Metrics exporter (no-op without prometheus_client)
+    try:
+        from modules.common.metrics import start_worker_exporter
+
+        if start_worker_exporter(WORKER_METRICS_PORT, redis_url=REDIS_URL):
+            logger.info(f"✓ Metrics on :{WORKER_METRICS_PORT}/metrics")
+    except Exception as e:
+        logger.warning(f"Metrics exporter not started: {e}")
+
     # Create worker
     try:
-        worker = Worker(
+        from modules.common.scheduling import SchedulingWorker
+
+        worker = SchedulingWorker(
             queues,
             connection=redis_conn,
             name=f"careerai-worker-{os.getpid()}",